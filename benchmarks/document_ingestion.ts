@@ -0,0 +1,192 @@
+import { performance } from 'node:perf_hooks'
+import { parseArgs, numberListArg, writeReport } from './lib/pg'
+import {
+    ChunkHash,
+    chunkText,
+    createLocalProcessor,
+    DEFAULT_CHUNK_OVERLAP,
+    DEFAULT_CHUNK_SIZE,
+    drainIngestionQueue,
+    hashContent,
+    MemoryIngestionQueue,
+} from '../src/lib/ingestionQueue'
+
+// Document ingestion benchmark.
+// Runs the vectorization queue on MemoryIngestionQueue (same semantics as
+// enqueue_document_jobs / claim_document_jobs) with createLocalProcessor and
+// an embedder that takes --embed-ms per chunk, for each worker count:
+//   upload     every document once, plus a second upload of some of them with
+//              the same content (must be refused as duplicates)
+//   vectorize  two drains at once on the same queue (two open tabs): every
+//              chunk must be embedded exactly once
+//   re-run     every document queued again after editing a few of them in
+//              place: only the chunks the edits touch may be embedded, the
+//              unedited documents end up 'skipped'
+// Reports the time and chunks embedded per phase; vectorize is what a full
+// re-embed costs.
+// No database or Supabase project needed.
+//
+// Usage:
+//   npx tsx benchmarks/document_ingestion.ts --documents 40 --check
+//
+// Options:
+//   --documents     documents of the agent (default 40)
+//   --chars         characters per document (default 20000)
+//   --edited        documents edited before the re-run (default 5)
+//   --edit-chars    characters replaced per edit (default 300)
+//   --concurrency   worker counts to compare (default 1,3,8)
+//   --embed-ms      embedding time per chunk (default 5)
+//   --check         exit 1 on duplicate uploads, chunks embedded twice or
+//                   unchanged chunks re-embedded
+//   --json          optional path for the JSON report
+
+const args = parseArgs({
+    documents: '40',
+    chars: '20000',
+    edited: '5',
+    'edit-chars': '300',
+    concurrency: '1,3,8',
+    'embed-ms': '5',
+    check: 'false',
+    json: '',
+})
+
+const AGENT_ID = 'agent-1'
+const USER_ID = 'user-1'
+const EMBED_MS = Number(args['embed-ms'])
+const STEP = DEFAULT_CHUNK_SIZE - DEFAULT_CHUNK_OVERLAP
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms))
+
+// Deterministic filler text, different per seed
+function makeText(seed: number, length: number) {
+    const words = ['agente', 'cliente', 'pedido', 'factura', 'envío', 'soporte', 'horario', 'precio', 'garantía', 'cuenta']
+    let state = seed + 1
+    let text = ''
+    while (text.length < length) {
+        state = (state * 1103515245 + 12345) % 2147483648
+        text += words[state % words.length] + (state % 7 === 0 ? '.\n' : ' ')
+    }
+    // chunkText trims: end on a non-space so offsets match
+    return text.slice(0, length - 1) + '.'
+}
+
+// Same-length replacement in the middle of the text: chunk boundaries stay put
+function editText(text: string, chars: number) {
+    const start = Math.floor(text.length / 2)
+    return { text: text.slice(0, start) + 'x'.repeat(chars) + text.slice(start + chars), start, end: start + chars }
+}
+
+// Chunks of chunkText overlapping [start, end)
+function chunksTouched(length: number, start: number, end: number) {
+    let touched = 0
+    for (let i = 0; i * STEP < length; i++) {
+        const from = i * STEP
+        if (from < end && from + DEFAULT_CHUNK_SIZE > start) touched++
+        if (from + DEFAULT_CHUNK_SIZE >= length) break
+    }
+    return touched
+}
+
+async function runScenario(concurrency: number) {
+    const queue = new MemoryIngestionQueue()
+    const texts = new Map<string, string>()
+    const embedded = new Map<string, number[]>()
+    const failures: string[] = []
+    const documents = Number(args.documents)
+
+    const embed = async (documentId: string, chunks: Array<ChunkHash & { text: string }>) => {
+        await sleep(EMBED_MS * chunks.length)
+        embedded.set(documentId, [...(embedded.get(documentId) || []), ...chunks.map(c => c.index)])
+    }
+    const processor = createLocalProcessor(queue, async id => texts.get(id)!, embed)
+
+    // upload
+    let duplicates = 0
+    for (let i = 0; i < documents + Math.ceil(documents / 4); i++) {
+        const seed = i < documents ? i : i - documents
+        const text = makeText(seed, Number(args.chars))
+        const { document, duplicate } = queue.addDocument({
+            id: `doc-${i}`,
+            agent_id: AGENT_ID,
+            user_id: USER_ID,
+            content_hash: await hashContent(text),
+        })
+        if (duplicate) duplicates++
+        else texts.set(document.id, text)
+    }
+    if (queue.documents.length !== documents) {
+        failures.push(`x${concurrency}: ${queue.documents.length - documents} duplicate uploads stored`)
+    }
+
+    // vectorize, from two tabs at once
+    const totalChunks = [...texts.values()].reduce((sum, text) => sum + chunkText(text).length, 0)
+    let start = performance.now()
+    await Promise.all([
+        drainIngestionQueue(queue, AGENT_ID, processor, { concurrency }),
+        drainIngestionQueue(queue, AGENT_ID, processor, { concurrency }),
+    ])
+    const vectorizeMs = performance.now() - start
+
+    const embeddedTwice = [...embedded.values()].reduce((sum, indexes) => sum + indexes.length - new Set(indexes).size, 0)
+    const firstEmbedded = [...embedded.values()].reduce((sum, indexes) => sum + indexes.length, 0)
+    if (embeddedTwice > 0) failures.push(`x${concurrency}: ${embeddedTwice} chunks embedded twice`)
+    if (firstEmbedded !== totalChunks) failures.push(`x${concurrency}: ${firstEmbedded} of ${totalChunks} chunks embedded`)
+
+    // re-run after editing a few documents
+    let expected = 0
+    for (const doc of queue.documents.slice(0, Number(args.edited))) {
+        const edit = editText(texts.get(doc.id)!, Number(args['edit-chars']))
+        texts.set(doc.id, edit.text)
+        expected += chunksTouched(edit.text.length, edit.start, edit.end)
+    }
+    queue.documents.forEach(doc => { doc.status = 'pending' })
+    embedded.clear()
+
+    start = performance.now()
+    const rerun = await drainIngestionQueue(queue, AGENT_ID, processor, { concurrency })
+    const rerunMs = performance.now() - start
+
+    const reembedded = [...embedded.values()].reduce((sum, indexes) => sum + indexes.length, 0)
+    if (reembedded !== expected) failures.push(`x${concurrency}: re-run embedded ${reembedded} chunks, edits touch ${expected}`)
+    if (rerun.skipped !== documents - Math.min(documents, Number(args.edited))) {
+        failures.push(`x${concurrency}: ${rerun.skipped} documents skipped on the re-run`)
+    }
+
+    return {
+        row: {
+            concurrency,
+            documents,
+            duplicates,
+            chunks: totalChunks,
+            vectorizeMs: Math.round(vectorizeMs),
+            rerunEmbedded: reembedded,
+            rerunSkippedDocs: rerun.skipped,
+            rerunMs: Math.round(rerunMs),
+        },
+        failures,
+    }
+}
+
+async function runBenchmark() {
+    console.log(`Agent: ${args.documents} documents x ${args.chars} chars, ${args.edited} edited, embed ${EMBED_MS} ms per chunk`)
+
+    const rows = []
+    const failures: string[] = []
+    for (const concurrency of numberListArg(args.concurrency)) {
+        const result = await runScenario(concurrency)
+        rows.push(result.row)
+        failures.push(...result.failures)
+    }
+
+    console.log('\nDocument ingestion:')
+    console.table(rows)
+    console.log(failures.length ? failures.map(f => `FAIL ${f}`).join('\n') : 'No duplicates, every chunk embedded once, re-runs only embed edited chunks.')
+
+    writeReport(args.json || undefined, { rows, failures })
+    if (failures.length > 0 && args.check === 'true') {
+        process.exitCode = 1
+    }
+}
+
+runBenchmark()
@@ -0,0 +1,236 @@
+import pg from 'pg'
+
+// Plan capture and comparison for the SQL benchmarks.
+// Plain statements are captured with EXPLAIN (ANALYZE, BUFFERS). RPCs only
+// show a Result node that way, so their inner statements are captured with
+// auto_explain (log_nested_statements) and read back from NOTICE messages.
+
+export interface PlanNode {
+    'Node Type': string
+    'Relation Name'?: string
+    'Index Name'?: string
+    'Actual Rows'?: number
+    'Actual Loops'?: number
+    'Shared Hit Blocks'?: number
+    'Shared Read Blocks'?: number
+    Plans?: PlanNode[]
+    [key: string]: unknown
+}
+
+export interface CapturedPlan {
+    queryText: string
+    planningMs: number
+    executionMs: number
+    plan: PlanNode
+}
+
+export interface SeqScan {
+    relation: string
+    tableRows: number
+    actualRows: number
+}
+
+export interface QueryReport {
+    name: string
+    source: string
+    kind: 'sql' | 'rpc'
+    latency: Record<string, number>
+    executionMs: number
+    sharedHit: number
+    sharedRead: number
+    seqScans: SeqScan[]
+    signature: string
+    plans: CapturedPlan[]
+    note?: string
+    /** Not measured: the function does not exist in this schema version */
+    skipped?: boolean
+}
+
+export interface SuiteReport {
+    label: string
+    createdAt: string
+    volumes: Record<string, number>
+    queries: QueryReport[]
+}
+
+export interface Flag {
+    query: string
+    kind: 'seq-scan' | 'new-seq-scan' | 'plan-changed' | 'slower'
+    detail: string
+}
+
+export function walkPlan(node: PlanNode, visit: (node: PlanNode) => void) {
+    visit(node)
+    node.Plans?.forEach(child => walkPlan(child, visit))
+}
+
+/**
+ * EXPLAIN (ANALYZE, BUFFERS) a plain statement
+ */
+export async function explainStatement(client: pg.Client, sql: string, params: unknown[]): Promise<CapturedPlan[]> {
+    const { rows } = await client.query(`EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) ${sql}`, params)
+    const [explained] = rows[0]['QUERY PLAN']
+
+    return [{
+        queryText: sql.trim(),
+        planningMs: explained['Planning Time'] ?? 0,
+        executionMs: explained['Execution Time'] ?? 0,
+        plan: explained.Plan,
+    }]
+}
+
+let autoExplainLoaded: boolean | null = null
+
+/**
+ * Load auto_explain for this session. Returns false when the role may not load it.
+ */
+export async function loadAutoExplain(client: pg.Client): Promise<boolean> {
+    if (autoExplainLoaded !== null) return autoExplainLoaded
+    try {
+        await client.query(`LOAD 'auto_explain'`)
+        autoExplainLoaded = true
+    } catch (err: any) {
+        console.warn(`auto_explain unavailable (${err.message}); RPC plans will not be captured`)
+        autoExplainLoaded = false
+    }
+    return autoExplainLoaded
+}
+
+/**
+ * Turn on auto_explain for the current transaction/savepoint. Must run before
+ * switching to a non-superuser role: these settings are superuser-only.
+ */
+export async function enableNestedExplain(client: pg.Client): Promise<boolean> {
+    if (!(await loadAutoExplain(client))) return false
+    await client.query(`SET LOCAL auto_explain.log_min_duration = 0`)
+    await client.query(`SET LOCAL auto_explain.log_analyze = on`)
+    await client.query(`SET LOCAL auto_explain.log_buffers = on`)
+    await client.query(`SET LOCAL auto_explain.log_nested_statements = on`)
+    await client.query(`SET LOCAL auto_explain.log_format = 'json'`)
+    await client.query(`SET LOCAL auto_explain.log_level = 'notice'`)
+    return true
+}
+
+/**
+ * Run a statement and collect the plans auto_explain reports for it and for
+ * everything it runs inside PL/pgSQL
+ */
+export async function explainNested(client: pg.Client, sql: string, params: unknown[]): Promise<CapturedPlan[]> {
+    const plans: CapturedPlan[] = []
+    const onNotice = (notice: { message?: string }) => {
+        const message = notice.message ?? ''
+        const duration = /duration: ([\d.]+) ms/.exec(message)
+        const start = message.indexOf('{')
+        if (!duration || start < 0) return
+
+        try {
+            const explained = JSON.parse(message.slice(start))
+            plans.push({
+                queryText: String(explained['Query Text'] ?? '').trim(),
+                planningMs: 0,
+                executionMs: Number(duration[1]),
+                plan: explained.Plan,
+            })
+        } catch {
+            // Not a plan notice
+        }
+    }
+
+    client.on('notice', onNotice)
+    try {
+        await client.query(sql, params)
+    } finally {
+        client.off('notice', onNotice)
+    }
+
+    // Nested statements finish first; drop the outer "SELECT rpc()" Result node
+    return plans.filter(p => p.queryText !== sql.trim() || plans.length === 1)
+}
+
+/**
+ * Node types and relations/indexes of every plan, as one comparable string
+ */
+export function planSignature(plans: CapturedPlan[]): string {
+    const describe = (node: PlanNode): string => {
+        const target = node['Index Name'] ?? node['Relation Name']
+        const self = target ? `${node['Node Type']}(${target})` : node['Node Type']
+        return node.Plans?.length ? `${self}[${node.Plans.map(describe).join(',')}]` : self
+    }
+    return plans.map(p => describe(p.plan)).join(' | ')
+}
+
+export function bufferTotals(plans: CapturedPlan[]) {
+    // Buffer counters are cumulative, the root node already includes its children
+    return plans.reduce((totals, p) => ({
+        sharedHit: totals.sharedHit + (p.plan['Shared Hit Blocks'] ?? 0),
+        sharedRead: totals.sharedRead + (p.plan['Shared Read Blocks'] ?? 0),
+    }), { sharedHit: 0, sharedRead: 0 })
+}
+
+/**
+ * Row estimates for every table in public, used to ignore seq scans on small tables
+ */
+export async function loadTableRows(client: pg.Client): Promise<Map<string, number>> {
+    const { rows } = await client.query<{ relname: string, rows: string }>(`
+        SELECT c.relname, GREATEST(c.reltuples, 0)::bigint AS rows
+        FROM pg_class c
+        WHERE c.relnamespace = 'public'::regnamespace AND c.relkind IN ('r', 'p')
+    `)
+    return new Map(rows.map(r => [r.relname, Number(r.rows)]))
+}
+
+export function findSeqScans(plans: CapturedPlan[], tableRows: Map<string, number>, minRows: number): SeqScan[] {
+    const scans: SeqScan[] = []
+    for (const p of plans) {
+        walkPlan(p.plan, node => {
+            const relation = node['Relation Name']
+            if (node['Node Type'] !== 'Seq Scan' || !relation) return
+
+            const rows = tableRows.get(relation) ?? 0
+            if (rows >= minRows) {
+                scans.push({
+                    relation,
+                    tableRows: rows,
+                    actualRows: (node['Actual Rows'] ?? 0) * (node['Actual Loops'] ?? 1),
+                })
+            }
+        })
+    }
+    return scans
+}
+
+/**
+ * Flags for the current run: seq scans on large tables and, when a baseline
+ * report is given, plan changes, new seq scans and p95 slowdowns
+ */
+export function compareReports(current: SuiteReport, baseline: SuiteReport | null, threshold: number): Flag[] {
+    const flags: Flag[] = []
+    const previous = new Map((baseline?.queries ?? []).map(q => [q.name, q]))
+
+    for (const q of current.queries) {
+        for (const scan of q.seqScans) {
+            flags.push({ query: q.name, kind: 'seq-scan', detail: `${scan.relation} (~${scan.tableRows} rows)` })
+        }
+
+        const before = previous.get(q.name)
+        if (!before || before.skipped || q.skipped) continue
+
+        const known = new Set(before.seqScans.map(s => s.relation))
+        q.seqScans
+            .filter(s => !known.has(s.relation))
+            .forEach(s => flags.push({ query: q.name, kind: 'new-seq-scan', detail: `${s.relation} (was not scanned in ${baseline!.label})` }))
+
+        if (before.signature !== q.signature) {
+            flags.push({ query: q.name, kind: 'plan-changed', detail: `${before.signature}  ->  ${q.signature}` })
+        }
+
+        const p95 = q.latency.p95 ?? 0
+        const baseP95 = before.latency.p95 ?? 0
+        // Ignore sub-millisecond noise
+        if (baseP95 > 0 && p95 > baseP95 * threshold && p95 - baseP95 > 1) {
+            flags.push({ query: q.name, kind: 'slower', detail: `p95 ${baseP95} ms -> ${p95} ms` })
+        }
+    }
+
+    return flags
+}
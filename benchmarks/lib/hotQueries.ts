@@ -0,0 +1,187 @@
+import type { SeedContext } from './seed'
+
+// The queries the app runs on every page load or poll, written the way
+// PostgREST sends them. `role` decides whose JWT claims are set, so RLS
+// policies are part of the measured plan just like in production.
+
+export type QueryRole = 'owner' | 'admin' | 'anon' | 'service'
+
+export interface HotQuery {
+    name: string
+    /** Where the app runs it */
+    source: string
+    kind: 'sql' | 'rpc'
+    role: QueryRole
+    sql: string
+    params: (ctx: SeedContext) => unknown[]
+}
+
+const daysAgo = (days: number) => new Date(Date.now() - days * 24 * 60 * 60 * 1000)
+
+export const HOT_QUERIES: HotQuery[] = [
+    {
+        name: 'conversations.list',
+        source: 'useConversations',
+        kind: 'sql',
+        role: 'owner',
+        sql: `SELECT * FROM ah_conversations ORDER BY started_at DESC`,
+        params: () => [],
+    },
+    {
+        name: 'conversations.messages',
+        source: 'useConversations',
+        kind: 'sql',
+        role: 'owner',
+        sql: `SELECT * FROM ah_messages WHERE conversation_id = ANY($1::uuid[]) ORDER BY created_at ASC`,
+        params: ctx => [ctx.ownerConversationIds],
+    },
+    {
+        name: 'public_conversations.agents',
+        source: 'ConversationsPage',
+        kind: 'sql',
+        role: 'owner',
+        sql: `SELECT id FROM ah_agents WHERE user_id = $1`,
+        params: ctx => [ctx.ownerId],
+    },
+    {
+        name: 'public_conversations.list',
+        source: 'ConversationsPage',
+        kind: 'sql',
+        role: 'owner',
+        sql: `
+            SELECT c.*, a.name, a.avatar_url
+            FROM ah_public_conversations c
+            LEFT JOIN ah_agents a ON a.id = c.agent_id
+            WHERE c.agent_id = ANY($1::uuid[])
+        `,
+        params: ctx => [ctx.ownerAgentIds],
+    },
+    {
+        name: 'public_conversations.messages',
+        source: 'ConversationsPage (one query per conversation, every 5 s)',
+        kind: 'sql',
+        role: 'owner',
+        sql: `SELECT * FROM ah_public_messages WHERE conversation_id = $1 ORDER BY created_at ASC`,
+        params: ctx => [ctx.ownerPublicConversationIds[0] ?? ctx.sample.conversationId],
+    },
+    {
+        name: 'widget.latest_conversation',
+        source: 'getConversationHistory',
+        kind: 'sql',
+        role: 'anon',
+        sql: `
+            SELECT id FROM ah_public_conversations
+            WHERE agent_id = $1 AND visitor_id = $2
+            ORDER BY started_at DESC
+            LIMIT 1
+        `,
+        params: ctx => [ctx.sample.agentId, ctx.sample.visitorId],
+    },
+    {
+        name: 'widget.history',
+        source: 'getConversationHistory',
+        kind: 'sql',
+        role: 'anon',
+        sql: `SELECT role, content, created_at FROM ah_public_messages WHERE conversation_id = $1 ORDER BY created_at ASC`,
+        params: ctx => [ctx.sample.conversationId],
+    },
+    {
+        // Before 20260128 this ran once per hook (useUserRole, useSubscription,
+        // useCredits, useConsumeCredits), each after its own auth.getUser()
+        name: 'session.user_roles',
+        source: 'identity hooks (replaced by get_session_snapshot)',
+        kind: 'sql',
+        role: 'owner',
+        sql: `SELECT role FROM user_roles WHERE user_id = $1`,
+        params: ctx => [ctx.ownerId],
+    },
+    {
+        name: 'rpc.get_session_snapshot',
+        source: 'AuthContext (one call per sign-in / token refresh)',
+        kind: 'rpc',
+        role: 'owner',
+        sql: `SELECT get_session_snapshot()`,
+        params: () => [],
+    },
+    {
+        // Before 20260130 the dashboard and agents page downloaded this every 30 s
+        name: 'dashboard.conversation_counts',
+        source: 'DashboardPage / AgentsPage (replaced by get_dashboard_summary)',
+        kind: 'sql',
+        role: 'owner',
+        sql: `SELECT agent_id FROM ah_public_conversations WHERE agent_id = ANY($1::uuid[])`,
+        params: ctx => [ctx.ownerAgentIds],
+    },
+    {
+        name: 'dashboard.usage_logs',
+        source: 'useDashboardStats (replaced by get_dashboard_summary)',
+        kind: 'sql',
+        role: 'owner',
+        sql: `SELECT id FROM ah_usage_logs WHERE user_id = $1`,
+        params: ctx => [ctx.ownerId],
+    },
+    {
+        name: 'rpc.get_dashboard_summary',
+        source: 'DashboardPage, UsageChart, AgentsPage',
+        kind: 'rpc',
+        role: 'owner',
+        sql: `SELECT get_dashboard_summary(30)`,
+        params: () => [],
+    },
+    {
+        name: 'rpc.get_admin_metrics',
+        source: 'admin metrics (supabase_admin_metrics.sql)',
+        kind: 'rpc',
+        role: 'admin',
+        sql: `SELECT get_admin_metrics($1)`,
+        params: () => [daysAgo(30)],
+    },
+    {
+        name: 'rpc.get_admin_users',
+        source: 'useAdminUsers',
+        kind: 'rpc',
+        role: 'admin',
+        sql: `SELECT get_admin_users()`,
+        params: () => [],
+    },
+    {
+        name: 'rpc.get_admin_users_page',
+        source: 'useAdminUsersPage',
+        kind: 'rpc',
+        role: 'admin',
+        sql: `SELECT get_admin_users_page($1, $2, $3, $4, $5, $6)`,
+        params: () => [null, 'all', 'created_at', 'desc', null, 15],
+    },
+    {
+        name: 'rpc.get_admin_users_page.search',
+        source: 'useAdminUsersPage',
+        kind: 'rpc',
+        role: 'admin',
+        sql: `SELECT get_admin_users_page($1, $2, $3, $4, $5, $6)`,
+        params: () => ['bench+12', 'all', 'agents_count', 'desc', null, 15],
+    },
+    {
+        name: 'rpc.get_admin_transactions_page',
+        source: 'useAdminTransactionsPage',
+        kind: 'rpc',
+        role: 'admin',
+        sql: `SELECT get_admin_transactions_page($1, $2, $3, $4, $5, $6, $7)`,
+        params: () => [null, 'all', null, 'created_at', 'desc', null, 50],
+    },
+    {
+        name: 'rpc.get_admin_overview',
+        source: 'useAdminStats',
+        kind: 'rpc',
+        role: 'admin',
+        sql: `SELECT get_admin_overview()`,
+        params: () => [],
+    },
+    {
+        name: 'rpc.process_subscription_cycle',
+        source: 'billing cron',
+        kind: 'rpc',
+        role: 'service',
+        sql: `SELECT process_subscription_cycle(NULL)`,
+        params: () => [],
+    },
+]
@@ -0,0 +1,256 @@
+import pg from 'pg'
+
+// Synthetic data for the SQL benchmarks. Everything is inserted into the real
+// public tables inside the caller's transaction, so the caller is expected to
+// run BEGIN before seedDatabase() and ROLLBACK when it is done.
+
+export interface SeedVolumes {
+    users: number
+    agentsPerUser: number
+    conversations: number
+    publicConversations: number
+    messagesPerConversation: number
+    usageLogs: number
+    transactions: number
+    days: number
+}
+
+export interface SeedContext {
+    adminId: string
+    ownerId: string
+    ownerAgentIds: string[]
+    ownerConversationIds: string[]
+    ownerPublicConversationIds: string[]
+    sample: { agentId: string, visitorId: string, conversationId: string }
+}
+
+export const volumesFromArgs = (args: Record<string, string>): SeedVolumes => ({
+    users: Number(args.users),
+    agentsPerUser: Number(args['agents-per-user']),
+    conversations: Number(args.conversations),
+    publicConversations: Number(args['public-conversations']),
+    messagesPerConversation: Number(args['messages-per-conversation']),
+    usageLogs: Number(args['usage-logs']),
+    transactions: Number(args.transactions),
+    days: Number(args.days),
+})
+
+export const SEED_DEFAULTS = {
+    users: '1000',
+    'agents-per-user': '3',
+    conversations: '20000',
+    'public-conversations': '50000',
+    'messages-per-conversation': '10',
+    'usage-logs': '200000',
+    transactions: '100000',
+    days: '90',
+}
+
+const step = async (client: pg.Client, label: string, sql: string, params: unknown[] = []) => {
+    const start = Date.now()
+    const result = await client.query(sql, params)
+    console.log(`  ${label}: ${result.rowCount ?? 0} rows (${Date.now() - start} ms)`)
+}
+
+/**
+ * Skip row triggers (conversation stats, credit deduction, auth hooks) while
+ * loading. Needs superuser; without it the load is just slower.
+ */
+async function disableTriggers(client: pg.Client): Promise<boolean> {
+    await client.query('SAVEPOINT seed_triggers')
+    try {
+        await client.query(`SET LOCAL session_replication_role = replica`)
+        return true
+    } catch {
+        await client.query('ROLLBACK TO SAVEPOINT seed_triggers')
+        console.log('  (triggers stay enabled: session_replication_role needs superuser)')
+        return false
+    }
+}
+
+/**
+ * Counters and summary tables that triggers keep up to date. With triggers
+ * off during the load they are still empty, so fill them the way their
+ * migrations backfill them. Skipped on schemas that predate them (the
+ * "before" run). Returns the extra tables to ANALYZE.
+ */
+async function rebuildDerived(client: pg.Client): Promise<string[]> {
+    const tables: string[] = []
+    const { rows: [found] } = await client.query(`
+        SELECT EXISTS (
+                   SELECT 1 FROM information_schema.columns
+                   WHERE table_schema = 'public' AND table_name = 'ah_profiles' AND column_name = 'agents_count'
+               ) AS agents_count,
+               to_regprocedure('public.rebuild_dashboard_stats(uuid)') IS NOT NULL AS dashboard_stats
+    `)
+
+    if (found.agents_count) {
+        // 20260124_admin_keyset_pagination
+        await step(client, 'ah_profiles.agents_count', `
+            UPDATE ah_profiles p
+            SET agents_count = counts.n
+            FROM (SELECT user_id, count(*)::int AS n FROM ah_agents GROUP BY user_id) counts
+            WHERE counts.user_id = p.user_id
+        `)
+    }
+    if (found.dashboard_stats) {
+        // 20260130_dashboard_summary
+        await step(client, 'rebuild_dashboard_stats()', `SELECT rebuild_dashboard_stats()`)
+        tables.push('ah_dashboard_agent_daily', 'ah_dashboard_agent_totals', 'ah_dashboard_usage_daily', 'ah_dashboard_usage_totals')
+    }
+    return tables
+}
+
+export async function seedDatabase(client: pg.Client, v: SeedVolumes): Promise<SeedContext> {
+    console.log(`Seeding ${JSON.stringify(v)}`)
+    const replica = await disableTriggers(client)
+
+    await client.query(`
+        CREATE TEMP TABLE seed_users ON COMMIT DROP AS
+        SELECT g AS n, gen_random_uuid() AS user_id,
+               now() - (g % $2) * interval '1 day' AS created_at
+        FROM generate_series(0, $1 - 1) g
+    `, [v.users, v.days])
+
+    await step(client, 'auth.users', `
+        INSERT INTO auth.users (id, email, created_at)
+        SELECT user_id, 'bench+' || n || '@example.com', created_at FROM seed_users
+    `)
+    await step(client, 'ah_profiles', `
+        INSERT INTO ah_profiles (user_id, email, full_name, created_at)
+        SELECT user_id, 'bench+' || n || '@example.com', 'Usuario ' || n, created_at FROM seed_users
+        ON CONFLICT DO NOTHING
+    `)
+    await step(client, 'ah_credits', `
+        INSERT INTO ah_credits (user_id, balance)
+        SELECT user_id, 50 + (n % 20) * 100 FROM seed_users
+        ON CONFLICT DO NOTHING
+    `)
+    // ~5% of subscriptions are due, which is what process_subscription_cycle picks up
+    await step(client, 'ah_subscriptions', `
+        INSERT INTO ah_subscriptions (user_id, plan_type, status, current_period_end)
+        SELECT user_id,
+               (ARRAY['free', 'pro', 'business'])[1 + n % 3]::subscription_plan,
+               'active',
+               CASE WHEN n % 20 = 0 THEN now() - interval '1 day' ELSE now() + (n % 30) * interval '1 day' END
+        FROM seed_users
+        ON CONFLICT DO NOTHING
+    `)
+    await step(client, 'user_roles', `
+        INSERT INTO user_roles (user_id, role)
+        SELECT user_id, CASE WHEN n = 0 THEN 'admin' ELSE 'user' END::app_role FROM seed_users
+        ON CONFLICT DO NOTHING
+    `)
+
+    await client.query(`
+        CREATE TEMP TABLE seed_agents ON COMMIT DROP AS
+        SELECT row_number() OVER () - 1 AS n, gen_random_uuid() AS id, u.user_id, u.created_at
+        FROM seed_users u CROSS JOIN generate_series(1, $1) k
+    `, [v.agentsPerUser])
+    await step(client, 'ah_agents', `
+        INSERT INTO ah_agents (id, user_id, name, status, created_at)
+        SELECT id, user_id, 'Agente ' || n,
+               (ARRAY['active', 'active', 'draft', 'paused'])[1 + n % 4]::agent_status,
+               created_at
+        FROM seed_agents
+    `)
+    const agentCount = v.users * v.agentsPerUser
+
+    await client.query(`
+        CREATE TEMP TABLE seed_conversations ON COMMIT DROP AS
+        SELECT gen_random_uuid() AS id, a.id AS agent_id, a.user_id,
+               now() - random() * $3 * interval '1 day' AS started_at
+        FROM generate_series(0, $1 - 1) g
+        JOIN seed_agents a ON a.n = g % $2
+    `, [v.conversations, agentCount, v.days])
+    await step(client, 'ah_conversations', `
+        INSERT INTO ah_conversations (id, agent_id, user_id, status, messages_count, tokens_used, started_at)
+        SELECT id, agent_id, user_id,
+               (ARRAY['active', 'resolved', 'closed', 'human_takeover'])[1 + (random() * 3)::int],
+               $1, $1 * 120, started_at
+        FROM seed_conversations
+    `, [v.messagesPerConversation])
+    await step(client, 'ah_messages', `
+        INSERT INTO ah_messages (conversation_id, role, content, tokens, created_at)
+        SELECT c.id, CASE WHEN m % 2 = 0 THEN 'user' ELSE 'assistant' END,
+               'Mensaje ' || m || ' de la conversación', 120,
+               c.started_at + m * interval '30 seconds'
+        FROM seed_conversations c CROSS JOIN generate_series(0, $1 - 1) m
+    `, [v.messagesPerConversation])
+
+    await client.query(`
+        CREATE TEMP TABLE seed_public_conversations ON COMMIT DROP AS
+        SELECT gen_random_uuid() AS id, a.id AS agent_id, 'visitor-' || g AS visitor_id,
+               now() - random() * $3 * interval '1 day' AS started_at
+        FROM generate_series(0, $1 - 1) g
+        JOIN seed_agents a ON a.n = g % $2
+    `, [v.publicConversations, agentCount, v.days])
+    await step(client, 'ah_public_conversations', `
+        INSERT INTO ah_public_conversations (id, agent_id, visitor_id, visitor_email, started_at, last_message_at, messages_count, tokens_used, status)
+        SELECT id, agent_id, visitor_id, visitor_id || '@example.com', started_at,
+               started_at + ($1 - 1) * interval '30 seconds', $1, $1 * 120,
+               CASE WHEN random() < 0.8 THEN 'active' ELSE 'archived' END
+        FROM seed_public_conversations
+    `, [v.messagesPerConversation])
+    await step(client, 'ah_public_messages', `
+        INSERT INTO ah_public_messages (conversation_id, role, content, created_at)
+        SELECT c.id, CASE WHEN m % 2 = 0 THEN 'user' ELSE 'assistant' END,
+               'Mensaje ' || m || ' del visitante', c.started_at + m * interval '30 seconds'
+        FROM seed_public_conversations c CROSS JOIN generate_series(0, $1 - 1) m
+    `, [v.messagesPerConversation])
+
+    await step(client, 'ah_usage_logs', `
+        INSERT INTO ah_usage_logs (user_id, agent_id, amount, description, created_at)
+        SELECT a.user_id, a.id, 1 + g % 5, 'Mensaje de chat', now() - random() * $3 * interval '1 day'
+        FROM generate_series(0, $1 - 1) g
+        JOIN seed_agents a ON a.n = g % $2
+    `, [v.usageLogs, agentCount, v.days])
+    await step(client, 'credit_transactions', `
+        INSERT INTO credit_transactions (user_id, agent_id, amount, type, description, created_at)
+        SELECT a.user_id, a.id,
+               CASE WHEN g % 4 = 0 THEN 500 ELSE -(1 + g % 5) END,
+               (CASE WHEN g % 4 = 0 THEN 'purchase' ELSE 'usage' END)::transaction_type,
+               'Transacción ' || g, now() - random() * $3 * interval '1 day'
+        FROM generate_series(0, $1 - 1) g
+        JOIN seed_agents a ON a.n = g % $2
+    `, [v.transactions, agentCount, v.days])
+
+    if (replica) await client.query(`SET LOCAL session_replication_role = origin`)
+    const derived = await rebuildDerived(client)
+
+    for (const table of [
+        'ah_profiles', 'ah_credits', 'ah_subscriptions', 'user_roles', 'ah_agents',
+        'ah_conversations', 'ah_messages', 'ah_public_conversations', 'ah_public_messages',
+        'ah_usage_logs', 'credit_transactions', ...derived,
+    ]) {
+        await client.query(`ANALYZE ${table}`)
+    }
+
+    return loadContext(client)
+}
+
+async function loadContext(client: pg.Client): Promise<SeedContext> {
+    const { rows: [admin] } = await client.query(`SELECT user_id FROM seed_users WHERE n = 0`)
+    const { rows: [owner] } = await client.query(`SELECT user_id FROM seed_users WHERE n = 1`)
+
+    const ids = async (sql: string) => (await client.query(sql, [owner.user_id])).rows.map(r => r.id as string)
+    const ownerAgentIds = await ids(`SELECT id FROM seed_agents WHERE user_id = $1`)
+    const ownerConversationIds = await ids(`SELECT id FROM seed_conversations WHERE user_id = $1`)
+    const ownerPublicConversationIds = await ids(`
+        SELECT c.id FROM seed_public_conversations c JOIN seed_agents a ON a.id = c.agent_id
+        WHERE a.user_id = $1
+    `)
+
+    const { rows: [sample] } = await client.query(`
+        SELECT id, agent_id, visitor_id FROM seed_public_conversations ORDER BY random() LIMIT 1
+    `)
+
+    return {
+        adminId: admin.user_id,
+        ownerId: owner.user_id,
+        ownerAgentIds,
+        ownerConversationIds,
+        ownerPublicConversationIds,
+        sample: { agentId: sample.agent_id, visitorId: sample.visitor_id, conversationId: sample.id },
+    }
+}
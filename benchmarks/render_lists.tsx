@@ -0,0 +1,137 @@
+import { createElement, ReactElement } from 'react'
+import { renderToStaticMarkup } from 'react-dom/server'
+import { performance } from 'node:perf_hooks'
+import { parseArgs, summarize, writeReport } from './lib/pg'
+import { ConversationList, ConversationListItem } from '../src/components/conversations/ConversationList'
+import { MessageBubble, MessageList } from '../src/components/conversations/MessageList'
+import type { Conversation, Message } from '../src/components/conversations/types'
+
+// Render benchmark for the conversations page lists.
+// Renders the conversation list (--conversations rows) and the message pane
+// (--messages bubbles) twice: every row mounted, as the page did before, and
+// through the virtualized ConversationList / MessageList with a 800 px
+// viewport. Reports render time and the number of DOM elements produced.
+// Render time comes from react-dom/server, a stand-in for React's commit
+// time in the browser (same component tree, no layout or paint); the
+// element count is what the browser would have to create and keep.
+// No database needed.
+//
+// Usage:
+//   npx tsx --tsconfig tsconfig.app.json benchmarks/render_lists.tsx --check
+//
+// Options:
+//   --conversations  rows in the conversation list (default 5000)
+//   --messages       messages in the open conversation (default 10000)
+//   --runs           renders per measurement (default 10)
+//   --max-nodes      most DOM elements a virtualized list may produce (default 2000)
+//   --check          exit 1 when a virtualized list exceeds --max-nodes or is not faster
+//   --json           optional path for the JSON report
+
+const args = parseArgs({
+    conversations: '5000',
+    messages: '10000',
+    runs: '10',
+    'max-nodes': '2000',
+    check: 'false',
+    json: '',
+})
+
+const RUNS = Number(args.runs)
+const MAX_NODES = Number(args['max-nodes'])
+
+// useLayoutEffect does nothing on the server; React 18 warns on every render
+const consoleError = console.error
+console.error = (...params: unknown[]) => {
+    if (typeof params[0] === 'string' && params[0].includes('useLayoutEffect does nothing on the server')) return
+    consoleError(...params)
+}
+
+const minutesAgo = (minutes: number) => new Date(Date.now() - minutes * 60000).toISOString()
+
+function makeMessages(conversationId: string, count: number): Message[] {
+    return Array.from({ length: count }, (_, i) => ({
+        id: `${conversationId}-m${i}`,
+        conversation_id: conversationId,
+        role: i % 2 === 0 ? 'user' : 'assistant',
+        content: i % 7 === 0
+            ? `Mensaje ${i}: una respuesta más larga del agente que ocupa varias líneas en la burbuja para que las alturas no sean todas iguales.`
+            : `Mensaje ${i}`,
+        created_at: minutesAgo(count - i),
+    }))
+}
+
+function makeConversations(count: number): Conversation[] {
+    return Array.from({ length: count }, (_, i) => ({
+        id: `c${i}`,
+        agent_id: `a${i % 20}`,
+        visitor_id: `v${i}`,
+        visitor_name: i % 3 === 0 ? null : `Visitante ${i}`,
+        visitor_email: `visitante${i}@example.com`,
+        status: ['active', 'human_takeover', 'resolved'][i % 3],
+        agent: { name: `Agente ${i % 20}`, avatar_url: null },
+        messages: makeMessages(`c${i}`, 3),
+    }))
+}
+
+const noop = () => undefined
+
+const countElements = (html: string) => (html.match(/<[a-zA-Z]/g) || []).length
+
+function measure(label: string, element: () => ReactElement) {
+    // Warm-up: JIT and module initialisation
+    renderToStaticMarkup(element())
+
+    const samples: number[] = []
+    let html = ''
+    for (let i = 0; i < RUNS; i++) {
+        const start = performance.now()
+        html = renderToStaticMarkup(element())
+        samples.push(performance.now() - start)
+    }
+    return { label, nodes: countElements(html), ...summarize(samples) }
+}
+
+function runBenchmark() {
+    const conversations = makeConversations(Number(args.conversations))
+    const messages = makeMessages('open', Number(args.messages))
+    const now = Date.now()
+
+    console.log(`Conversations: ${conversations.length}, messages: ${messages.length}, runs: ${RUNS}`)
+
+    const results = [
+        measure('conversations: full', () => createElement('div', null,
+            conversations.map(conv => createElement(ConversationListItem, {
+                key: conv.id, conversation: conv, selected: conv.id === 'c0', now, onSelect: noop,
+            })))),
+        measure('conversations: virtual', () => createElement(ConversationList, {
+            conversations, selectedId: 'c0', onSelect: noop,
+        })),
+        measure('messages: full', () => createElement('div', null,
+            messages.map(message => createElement(MessageBubble, {
+                key: message.id, message, visitorName: 'Visitante', agentName: 'Agente', agentAvatarUrl: null,
+            })))),
+        measure('messages: virtual', () => createElement(MessageList, {
+            messages, visitorName: 'Visitante', agentName: 'Agente', agentAvatarUrl: null,
+        })),
+    ]
+
+    console.log('\nRender time in ms (react-dom/server) and DOM elements:')
+    console.table(results.map(({ label, nodes, mean, p50, p95 }) => ({ label, nodes, mean, p50, p95 })))
+
+    const failures: string[] = []
+    for (const list of ['conversations', 'messages']) {
+        const full = results.find(r => r.label === `${list}: full`)!
+        const virtual = results.find(r => r.label === `${list}: virtual`)!
+        console.log(`${list}: x${(full.p50 / virtual.p50).toFixed(1)} faster, ${full.nodes} -> ${virtual.nodes} elements`)
+        if (virtual.nodes > MAX_NODES) failures.push(`${list}: ${virtual.nodes} elements > ${MAX_NODES}`)
+        if (virtual.p50 >= full.p50) failures.push(`${list}: virtualized render is not faster`)
+    }
+
+    failures.forEach(failure => console.log(`FAIL ${failure}`))
+    writeReport(args.json || undefined, { results, failures })
+    if (failures.length > 0 && args.check === 'true') {
+        process.exitCode = 1
+    }
+}
+
+runBenchmark()
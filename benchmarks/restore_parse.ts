@@ -0,0 +1,156 @@
+import { createReadStream, createWriteStream, statSync, unlinkSync } from 'node:fs'
+import { readFile } from 'node:fs/promises'
+import { tmpdir } from 'node:os'
+import { join } from 'node:path'
+import { performance } from 'node:perf_hooks'
+import { parseArgs, writeReport } from './lib/pg'
+import { JsonPath, JsonStreamScanner } from '../src/lib/jsonStream'
+
+// Backup restore client benchmark.
+// Writes a synthetic admin backup (same shape as admin_export_all_data) and
+// reads it twice:
+//   buffered   file.text() + JSON.parse, then one payload with every table
+//              (the previous restore; the RPC body is the whole backup again)
+//   streamed   chunks through JsonStreamScanner into batches of 500 rows
+//              (src/lib/backupRestore, without the upload)
+// Reports parse time, peak heap and the largest request body each would send.
+// No database needed. Run with --expose-gc for steadier heap numbers.
+//
+// Usage:
+//   npx tsx benchmarks/restore_parse.ts --messages 500000 --check
+//
+// Options:
+//   --messages  ah_public_messages rows (default 300000); other tables scale from it
+//   --batch     rows per uploaded batch (default 500, RESTORE_BATCH_ROWS)
+//   --check     exit 1 when streaming does not lower the peak heap or loses rows
+//   --json      optional path for the JSON report
+
+const args = parseArgs({
+    messages: '300000',
+    batch: '500',
+    check: 'false',
+    json: '',
+})
+
+const MESSAGES = Number(args.messages)
+const BATCH = Number(args.batch)
+const MB = 1024 * 1024
+
+const gc = (globalThis as any).gc as (() => void) | undefined
+
+async function writeBackup(path: string) {
+    const out = createWriteStream(path)
+    const write = (text: string) => new Promise<void>(resolve => {
+        if (out.write(text)) resolve()
+        else out.once('drain', resolve)
+    })
+    const conversations = Math.max(1, Math.round(MESSAGES / 20))
+    const agents = Math.max(1, Math.round(conversations / 100))
+    const tables: Record<string, (i: number) => unknown> = {
+        ah_agents: i => ({ id: `agent-${i}`, user_id: `user-${i % 50}`, name: `Agente ${i}`, system_prompt: 'Eres un asistente. '.repeat(20), status: 'active' }),
+        ah_public_conversations: i => ({ id: `conv-${i}`, agent_id: `agent-${i % agents}`, visitor_id: `visitor-${i}`, messages_count: 20, visitor_metadata: { ip: '10.0.0.1', ua: 'x'.repeat(120) } }),
+        ah_public_messages: i => ({ id: `msg-${i}`, conversation_id: `conv-${i % conversations}`, role: i % 2 ? 'assistant' : 'user', content: 'Hola, tengo una pregunta sobre el producto. '.repeat(4), created_at: new Date(1700000000000 + i * 1000).toISOString() }),
+    }
+    const counts: Record<string, number> = { ah_agents: agents, ah_public_conversations: conversations, ah_public_messages: MESSAGES }
+
+    await write(`{\n  "backup_version": "1.0",\n  "backup_date": "${new Date().toISOString()}",\n  "tables": {`)
+    let firstTable = true
+    for (const [table, row] of Object.entries(tables)) {
+        await write(`${firstTable ? '' : ','}\n    "${table}": [`)
+        firstTable = false
+        for (let i = 0; i < counts[table]; i++) {
+            await write(`${i ? ',' : ''}\n      ${JSON.stringify(row(i))}`)
+        }
+        await write('\n    ]')
+    }
+    await write('\n  }\n}\n')
+    await new Promise(resolve => out.end(resolve))
+    return Object.values(counts).reduce((a, b) => a + b, 0)
+}
+
+function heapSampler() {
+    let peak = process.memoryUsage().heapUsed
+    const sample = () => { peak = Math.max(peak, process.memoryUsage().heapUsed) }
+    const timer = setInterval(sample, 5)
+    return { sample, stop: () => { clearInterval(timer); sample(); return peak } }
+}
+
+async function runBuffered(path: string) {
+    gc?.()
+    const base = process.memoryUsage().heapUsed
+    const sampler = heapSampler()
+    const start = performance.now()
+    const backup = JSON.parse(await readFile(path, 'utf8'))
+    sampler.sample()
+    const body = JSON.stringify({ backup_data: backup })
+    sampler.sample()
+    const rows = Object.values(backup.tables as Record<string, unknown[]>).reduce((sum, table) => sum + table.length, 0)
+    const seconds = (performance.now() - start) / 1000
+    return { mode: 'buffered', rows, requests: 1, maxBodyKb: Math.round(body.length / 1024), seconds, peakHeapMb: (sampler.stop() - base) / MB }
+}
+
+async function runStreamed(path: string) {
+    gc?.()
+    const base = process.memoryUsage().heapUsed
+    const sampler = heapSampler()
+    const start = performance.now()
+    let rows = 0
+    let requests = 0
+    let maxBody = 0
+    let batch: unknown[] = []
+    let section = ''
+    const send = () => {
+        if (batch.length === 0) return
+        const body = JSON.stringify({ p_section: section, p_rows: batch })
+        maxBody = Math.max(maxBody, body.length)
+        requests++
+        batch = []
+    }
+
+    const scanner = new JsonStreamScanner(
+        (path: JsonPath) => path.length === 3 && path[0] === 'tables' && typeof path[2] === 'number',
+        (path, value) => {
+            if (path[1] !== section) {
+                send()
+                section = path[1] as string
+            }
+            batch.push(value)
+            rows++
+            if (batch.length >= BATCH) send()
+        }
+    )
+    for await (const chunk of createReadStream(path, { encoding: 'utf8' })) {
+        scanner.write(chunk as string)
+        sampler.sample()
+    }
+    scanner.end()
+    send()
+    const seconds = (performance.now() - start) / 1000
+    return { mode: 'streamed', rows, requests, maxBodyKb: Math.round(maxBody / 1024), seconds, peakHeapMb: (sampler.stop() - base) / MB }
+}
+
+async function runBenchmark() {
+    const path = join(tmpdir(), `restore_parse_${process.pid}.json`)
+    try {
+        const expected = await writeBackup(path)
+        console.log(`Backup: ${expected.toLocaleString()} rows, ${(statSync(path).size / MB).toFixed(1)} MB${gc ? '' : ' (no --expose-gc)'}`)
+
+        const results = [await runStreamed(path), await runBuffered(path)]
+        console.table(results.map(r => ({ ...r, seconds: r.seconds.toFixed(2), peakHeapMb: r.peakHeapMb.toFixed(1) })))
+
+        const [streamed, buffered] = results
+        const failures: string[] = []
+        results.filter(r => r.rows !== expected).forEach(r => failures.push(`${r.mode}: ${r.rows} rows, expected ${expected}`))
+        if (streamed.peakHeapMb >= buffered.peakHeapMb) failures.push('streaming does not lower the peak heap')
+        failures.forEach(failure => console.log(`FAIL ${failure}`))
+
+        writeReport(args.json || undefined, { rows: expected, batch: BATCH, results, failures })
+        if (failures.length > 0 && args.check === 'true') {
+            process.exitCode = 1
+        }
+    } finally {
+        unlinkSync(path)
+    }
+}
+
+runBenchmark()
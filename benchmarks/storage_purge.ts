@@ -0,0 +1,163 @@
+import { performance } from 'node:perf_hooks'
+import { parseArgs, numberListArg, writeReport } from './lib/pg'
+import { purgeStorage, StorageBucket } from '../src/lib/storageMaintenance'
+
+// Storage purge benchmark.
+// Builds an in-memory bucket laid out like ahdocuments (one folder per agent
+// holding its documents) with per-request latency, then empties it:
+//   legacy     one list() of the root and one remove() of what it returned
+//              (AdminDangerZone before: folders are not files, so nothing
+//              under an agent folder is deleted)
+//   purge xN   purgeStorage with N parallel workers
+//   resume     a purge aborted halfway, then run again with its checkpoint
+// Reports the time, files per second, requests made and files left behind.
+// No database or Supabase project needed.
+//
+// Usage:
+//   npx tsx benchmarks/storage_purge.ts --agents 200 --files 100 --check
+//
+// Options:
+//   --agents        agent folders (default 200)
+//   --files         documents per agent (default 100)
+//   --concurrency   worker counts to compare (default 1,4,8)
+//   --batch         paths per remove() (default 100)
+//   --list-ms       latency of list() (default 40)
+//   --remove-ms     latency of remove(), plus 0.2 ms per path (default 60)
+//   --check         exit 1 when a purge leaves files behind
+//   --json          optional path for the JSON report
+
+const args = parseArgs({
+    agents: '200',
+    files: '100',
+    concurrency: '1,4,8',
+    batch: '100',
+    'list-ms': '40',
+    'remove-ms': '60',
+    check: 'false',
+    json: '',
+})
+
+const LIST_MS = Number(args['list-ms'])
+const REMOVE_MS = Number(args['remove-ms'])
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms))
+
+// Checkpoints go to localStorage in the browser
+const memoryStorage = new Map<string, string>()
+Object.assign(globalThis, {
+    localStorage: {
+        getItem: (key: string) => memoryStorage.get(key) ?? null,
+        setItem: (key: string, value: string) => memoryStorage.set(key, value),
+        removeItem: (key: string) => memoryStorage.delete(key),
+    },
+})
+
+// Sorted file paths; folders are derived from them, as in Supabase Storage
+class FakeBucket implements StorageBucket {
+    files = new Set<string>()
+    requests = { list: 0, remove: 0 }
+
+    constructor(agents: number, filesPerAgent: number) {
+        for (let a = 0; a < agents; a++) {
+            const agentId = `agent-${String(a).padStart(5, '0')}`
+            for (let f = 0; f < filesPerAgent; f++) {
+                this.files.add(`${agentId}/${1700000000000 + f}_document_${f}.pdf`)
+            }
+        }
+    }
+
+    async list(path = '', options: { limit?: number, offset?: number } = {}) {
+        this.requests.list++
+        await sleep(LIST_MS)
+        const prefix = path ? `${path}/` : ''
+        const entries = new Map<string, string | null>()
+        for (const file of this.files) {
+            if (!file.startsWith(prefix)) continue
+            const rest = file.slice(prefix.length)
+            const slash = rest.indexOf('/')
+            if (slash === -1) entries.set(rest, file)
+            else entries.set(rest.slice(0, slash), null)
+        }
+        const offset = options.offset ?? 0
+        const limit = options.limit ?? 100
+        const data = [...entries.entries()]
+            .sort(([a], [b]) => a.localeCompare(b))
+            .slice(offset, offset + limit)
+            .map(([name, id]) => ({ name, id }))
+        return { data, error: null }
+    }
+
+    async remove(paths: string[]) {
+        this.requests.remove++
+        await sleep(REMOVE_MS + paths.length * 0.2)
+        paths.forEach(path => this.files.delete(path))
+        return { data: paths, error: null }
+    }
+}
+
+async function runLegacy(bucket: FakeBucket) {
+    const { data } = await bucket.list()
+    if (data && data.length > 0) await bucket.remove(data.map(f => f.name))
+}
+
+async function measure(label: string, run: (bucket: FakeBucket) => Promise<unknown>) {
+    const bucket = new FakeBucket(Number(args.agents), Number(args.files))
+    const total = bucket.files.size
+    const start = performance.now()
+    await run(bucket)
+    const seconds = (performance.now() - start) / 1000
+    const deleted = total - bucket.files.size
+    return {
+        label,
+        files: total,
+        deleted,
+        left: bucket.files.size,
+        seconds: Math.round(seconds * 100) / 100,
+        filesPerSec: Math.round(deleted / seconds),
+        listCalls: bucket.requests.list,
+        removeCalls: bucket.requests.remove,
+    }
+}
+
+async function runBenchmark() {
+    const batchSize = Number(args.batch)
+    console.log(`Bucket: ${args.agents} agent folders x ${args.files} files, list ${LIST_MS} ms, remove ${REMOVE_MS} ms`)
+
+    const results = [await measure('legacy', runLegacy)]
+
+    for (const concurrency of numberListArg(args.concurrency)) {
+        results.push(await measure(`purge x${concurrency}`, bucket => purgeStorage(bucket, {
+            batchSize,
+            concurrency,
+        })))
+    }
+
+    results.push(await measure('resume after abort', async bucket => {
+        const total = bucket.files.size
+        const controller = new AbortController()
+        const first = await purgeStorage(bucket, {
+            batchSize,
+            checkpointKey: 'bench-purge',
+            signal: controller.signal,
+            onProgress: progress => {
+                if (progress.deleted >= total / 2) controller.abort()
+            },
+        })
+        const second = await purgeStorage(bucket, { batchSize, checkpointKey: 'bench-purge' })
+        console.log(`resume: aborted at ${first.deleted} files, resumed run reports ${second.deleted} in total (resumed: ${second.resumed})`)
+    }))
+
+    console.log('\nBucket purge:')
+    console.table(results)
+
+    const failures = results.filter(r => r.label !== 'legacy' && r.left > 0)
+        .map(r => `${r.label}: ${r.left} files left`)
+    failures.forEach(failure => console.log(`FAIL ${failure}`))
+
+    writeReport(args.json || undefined, { results, failures })
+    if (failures.length > 0 && args.check === 'true') {
+        process.exitCode = 1
+    }
+}
+
+runBenchmark()
@@ -7,6 +7,8 @@ import { AuthProvider } from "@/contexts/AuthContext";
 import { ThemeProvider } from "@/contexts/ThemeContext";
 import { LanguageProvider } from "@/contexts/LanguageContext";
 import { PayPalScriptProvider } from "@paypal/react-paypal-js";
+import { persistQueryCache, PERSIST_MAX_AGE_MS, restoreQueryCache } from "@/lib/queryPersistence";
+import { supabase } from "@/integrations/supabase/client";
 import Index from "./pages/Index";
 import NotFound from "./pages/NotFound";
 import LoginPage from "./pages/auth/LoginPage";
@@ -34,7 +36,30 @@ import PlaygroundPage from "./pages/playground/PlaygroundPage";
 import WidgetPage from "./pages/widget/WidgetPage";
 import EmbedPage from "./pages/agents/EmbedPage";
 
-const queryClient = new QueryClient();
+// Persisted queries must outlive unmounts for as long as they are restored
+const queryClient = new QueryClient({
+  defaultOptions: {
+    queries: { gcTime: PERSIST_MAX_AGE_MS },
+  },
+});
+
+// Warm start: hydrate from the signed-in user's IndexedDB record before the
+// first render, then keep saving into the record of whoever is signed in
+export const restoreAppCache = async () => {
+  let userId: string | undefined;
+  try {
+    const { data: { session } } = await supabase.auth.getSession();
+    userId = session?.user.id;
+  } catch (error) {
+    console.warn('[QueryCache] No session, starting cold:', error);
+  }
+
+  if (userId) await restoreQueryCache(queryClient, userId);
+  supabase.auth.onAuthStateChange((_event, session) => {
+    userId = session?.user.id;
+  });
+  persistQueryCache(queryClient, () => userId);
+};
 
 // PayPal configuration
 const paypalClientId = import.meta.env.VITE_PAYPAL_CLIENT_ID || "";
@@ -17,14 +17,17 @@ import { Input } from '@/components/ui/input';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
 import { Badge } from '@/components/ui/badge';
 import { cn } from '@/lib/utils';
-import { useDocuments, useCreateDocument, useDeleteDocument, useRetryDocument } from '@/hooks/useDocuments';
+import { useDocuments, useCreateDocument, useDeleteDocument, useRetryDocument, useVectorizeDocuments } from '@/hooks/useDocuments';
 import { useCredits, useConsumeCredits } from '@/hooks/useCredits';
 import { useSubscription } from '@/hooks/useSubscription';
 import { useLanguage } from '@/contexts/LanguageContext';
 import { useToast } from '@/hooks/use-toast';
 import { supabase } from '@/integrations/supabase/client';
+import { removeStoragePaths } from '@/lib/storageMaintenance';
 import { DocumentStatus, DocumentType } from '@/types/database';
 import { getWebhookUrl } from '@/hooks/useWebhookUrl';
+import { findDuplicateDocument, hashContent } from '@/lib/documentIngestion';
+import { getEmbeddingsTarget } from '@/lib/embeddings';
 
 interface AgentDocumentsProps {
     agentId: string;
@@ -43,11 +46,12 @@ export const AgentDocuments = ({ agentId, agentName }: AgentDocumentsProps) => {
     const createDocument = useCreateDocument();
     const deleteDocument = useDeleteDocument();
     const retryDocument = useRetryDocument();
+    const vectorize = useVectorizeDocuments(agentId, agentName);
     const { t } = useLanguage();
     const { toast } = useToast();
     const [urlInput, setUrlInput] = useState('');
-    const [isVectorizing, setIsVectorizing] = useState(false);
     const [isUploading, setIsUploading] = useState(false);
+    const isVectorizing = vectorize.isPending;
 
     // Hooks para créditos
     const { data: creditsData } = useCredits();
@@ -59,9 +63,33 @@ export const AgentDocuments = ({ agentId, agentName }: AgentDocumentsProps) => {
         if (!files || files.length === 0) return;
 
         setIsUploading(true);
+        let uploadedCount = 0;
 
         try {
             for (const file of Array.from(files)) {
+                // Evitar re-subir (y re-vectorizar) el mismo contenido para este agente
+                const contentHash = await hashContent(file);
+                let duplicate: Awaited<ReturnType<typeof findDuplicateDocument>>;
+                try {
+                    duplicate = await findDuplicateDocument(agentId, contentHash);
+                } catch (lookupError) {
+                    // Sin la comprobación no sabemos si ya existe: no subir a ciegas
+                    console.error('Error checking for duplicate document:', lookupError);
+                    toast({
+                        title: 'Error al comprobar duplicados',
+                        description: `"${file.name}" no se subió: ${lookupError instanceof Error ? lookupError.message : (lookupError as { message?: string })?.message || 'Error desconocido'}`,
+                        variant: 'destructive',
+                    });
+                    continue;
+                }
+                if (duplicate) {
+                    toast({
+                        title: 'Documento duplicado',
+                        description: `"${file.name}" ya existe como "${duplicate.name}". No se volverá a subir.`,
+                    });
+                    continue;
+                }
+
                 // Cálculo de costo: 3 créditos por cada 100KB
                 // 100KB = 3, 200KB = 6, 500KB = 15, 1MB = 30
                 // Mínimo 3 créditos
@@ -136,15 +164,19 @@ export const AgentDocuments = ({ agentId, agentName }: AgentDocumentsProps) => {
                     file_path: filePath,
                     url: publicUrl,  // Guardamos la URL pública para que n8n pueda descargar
                     agent_id: agentId,
+                    content_hash: contentHash,
                 });
 
+                uploadedCount++;
                 console.log('✅ Archivo subido:', { filePath, publicUrl });
             }
 
-            toast({
-                title: 'Archivos subidos',
-                description: `Se subieron ${files.length} archivo(s) correctamente.`,
-            });
+            if (uploadedCount > 0) {
+                toast({
+                    title: 'Archivos subidos',
+                    description: `Se subieron ${uploadedCount} archivo(s) correctamente.`,
+                });
+            }
         } catch (error) {
             console.error('Error in file upload:', error);
             toast({
@@ -181,7 +213,7 @@ export const AgentDocuments = ({ agentId, agentName }: AgentDocumentsProps) => {
                     body: JSON.stringify({
                         documentId: id,
                         agentId,
-                        tableName: `embeddings_${agentId.split('-').join('_')}`,
+                        ...getEmbeddingsTarget(agentId),
                     }),
                 });
 
@@ -211,12 +243,10 @@ export const AgentDocuments = ({ agentId, agentName }: AgentDocumentsProps) => {
 
         // Si hay un archivo en storage, eliminarlo
         if (filePath) {
-            const { error } = await supabase.storage
-                .from('ahdocuments')
-                .remove([filePath]);
+            const { failed } = await removeStoragePaths(supabase.storage.from('ahdocuments'), [filePath]);
 
-            if (error) {
-                console.error('Error deleting file from storage:', error);
+            if (failed > 0) {
+                console.error('Error deleting file from storage:', filePath);
             }
         }
 
@@ -229,17 +259,6 @@ export const AgentDocuments = ({ agentId, agentName }: AgentDocumentsProps) => {
     };
 
     const handleVectorize = async () => {
-        const webhookUrl = await getWebhookUrl('VITE_N8N_VECTORIZE_WEBHOOK_URL');
-
-        if (!webhookUrl) {
-            toast({
-                title: 'Error de Configuración',
-                description: 'VITE_N8N_VECTORIZE_WEBHOOK_URL no está configurada.',
-                variant: 'destructive',
-            });
-            return;
-        }
-
         const pendingDocs = documents?.filter(d => d.status === 'pending' || d.status === 'failed') || [];
 
         if (pendingDocs.length === 0) {
@@ -250,80 +269,24 @@ export const AgentDocuments = ({ agentId, agentName }: AgentDocumentsProps) => {
             return;
         }
 
-        setIsVectorizing(true);
-
         try {
-            const response = await fetch(webhookUrl, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    agentId,
-                    agentName,
-                    // Convertir agentId a formato de tabla (guiones bajos)
-                    tableName: `embeddings_${agentId.split('-').join('_')}`,
-                    documents: pendingDocs.map(doc => ({
-                        id: doc.id,
-                        name: doc.name,
-                        type: doc.type,
-                        url: doc.url,  // URL pública para descargar el archivo
-                        file_path: doc.file_path,
-                    })),
-                    timestamp: new Date().toISOString(),
-                }),
-            });
-
-            if (!response.ok) {
-                throw new Error(`Error HTTP: ${response.status}`);
-            }
-
-            // Procesar respuesta del webhook
-            const data = await response.json();
-            console.log('Respuesta de vectorización:', data);
-
-            // Verificar si hay resultados exitosos - manejar diferentes formatos de respuesta
-            const results = data[0]?.results || data.results || data || [];
-            const successCount = Array.isArray(results)
-                ? results.filter((r: { success: boolean }) => r.success).length
-                : (results.success ? 1 : 0);
-
-            console.log('Results procesados:', results, 'Success count:', successCount);
-
-            if (successCount > 0) {
-                // Actualizar estado de documentos a 'indexed' en Supabase
-                const docIds = pendingDocs.map(d => d.id);
-                console.log('Actualizando documentos con IDs:', docIds);
-
-                const { data: updateData, error: updateError } = await supabase
-                    .from('ah_documents')
-                    .update({ status: 'indexed' })
-                    .in('id', docIds)
-                    .select();
-
-                console.log('Resultado update:', updateData, 'Error:', updateError);
+            // Un job por documento; el estado de cada uno llega por realtime a useDocuments
+            const summary = await vectorize.mutateAsync(pendingDocs);
+            console.log('Resumen de vectorización:', summary);
 
-                if (updateError) {
-                    console.error('Error actualizando estado:', updateError);
-                    toast({
-                        title: 'Error al actualizar estado',
-                        description: updateError.message,
-                        variant: 'destructive',
-                    });
-                } else {
-                    toast({
-                        title: '¡Vectorización completada!',
-                        description: `${successCount} documento(s) indexados correctamente.`,
-                    });
-                }
-            } else {
+            const indexed = summary.succeeded + summary.skipped;
+            if (summary.failed === 0 && indexed > 0) {
+                toast({
+                    title: '¡Vectorización completada!',
+                    description: `${indexed} documento(s) indexados correctamente.`,
+                });
+            } else if (summary.failed > 0) {
                 toast({
                     title: 'Vectorización finalizada',
-                    description: 'Revisa el estado de los documentos.',
+                    description: `${indexed} indexados, ${summary.failed} con error. Revisa el estado de los documentos.`,
                     variant: 'destructive',
                 });
             }
-
-            // Refrescar la lista
-            refetch();
         } catch (error) {
             console.error('Error vectorizing:', error);
             toast({
@@ -332,7 +295,7 @@ export const AgentDocuments = ({ agentId, agentName }: AgentDocumentsProps) => {
                 variant: 'destructive',
             });
         } finally {
-            setIsVectorizing(false);
+            refetch();
         }
     };
 
@@ -443,7 +406,7 @@ export const AgentDocuments = ({ agentId, agentName }: AgentDocumentsProps) => {
                     {isVectorizing ? (
                         <>
                             <Loader2 className="w-4 h-4 mr-2 animate-spin" />
-                            Vectorizando...
+                            Vectorizando{vectorize.progress ? ` (${vectorize.progress.done}/${vectorize.progress.total})` : '...'}
                         </>
                     ) : (
                         <>
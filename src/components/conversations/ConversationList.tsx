@@ -0,0 +1,100 @@
+import { memo, useEffect, useState } from 'react';
+import { Badge } from '@/components/ui/badge';
+import { cn } from '@/lib/utils';
+import { useVirtualList } from '@/hooks/useVirtualList';
+import { Conversation, formatTimeAgo, statusColors } from './types';
+
+// Row height before measuring (button + gap)
+const ESTIMATED_ROW_HEIGHT = 108;
+
+const getLastMessage = (conv: Conversation) => {
+  if (conv.messages.length === 0) return 'Sin mensajes';
+  const lastMsg = conv.messages[conv.messages.length - 1];
+  return lastMsg.content.length > 50 ? lastMsg.content.substring(0, 50) + '...' : lastMsg.content;
+};
+
+interface ConversationListItemProps {
+  conversation: Conversation;
+  selected: boolean;
+  now: number;
+  onSelect: (id: string) => void;
+}
+
+// Polls keep unchanged conversations referentially stable (structural sharing),
+// so only rows whose conversation or selection changed re-render
+export const ConversationListItem = memo(({ conversation: conv, selected, now, onSelect }: ConversationListItemProps) => (
+  <button
+    onClick={() => onSelect(conv.id)}
+    className={cn(
+      "w-full p-3 rounded-lg text-left transition-colors",
+      selected
+        ? "bg-primary/10 border border-primary/20"
+        : "hover:bg-muted/30"
+    )}
+  >
+    <div className="flex items-start justify-between mb-2">
+      <span className="font-medium text-foreground">
+        {conv.visitor_name || 'Visitante Anónimo'}
+      </span>
+      <span className="text-xs text-muted-foreground">
+        {conv.messages.length > 0
+          ? formatTimeAgo(conv.messages[conv.messages.length - 1].created_at, now)
+          : 'Sin fecha'}
+      </span>
+    </div>
+    <p className="text-sm text-muted-foreground truncate mb-2">{getLastMessage(conv)}</p>
+    <div className="flex items-center gap-2">
+      <Badge variant="outline" className="text-xs">{conv.agent.name}</Badge>
+      <Badge variant="outline" className={cn("text-xs capitalize", statusColors[conv.status] || '')}>
+        {conv.status}
+      </Badge>
+    </div>
+  </button>
+));
+ConversationListItem.displayName = 'ConversationListItem';
+
+interface ConversationListProps {
+  conversations: Conversation[];
+  selectedId: string | null;
+  onSelect: (id: string) => void;
+  className?: string;
+}
+
+/** Windowed conversation list: only the rows in view are mounted */
+export const ConversationList = ({ conversations, selectedId, onSelect, className }: ConversationListProps) => {
+  const { scrollRef, measureRef, virtualItems, totalSize } = useVirtualList({
+    items: conversations,
+    getKey: conv => conv.id,
+    estimateSize: ESTIMATED_ROW_HEIGHT,
+  });
+
+  // Refresh the "hace x min" labels once a minute
+  const [now, setNow] = useState(() => Date.now());
+  useEffect(() => {
+    const timer = setInterval(() => setNow(Date.now()), 60000);
+    return () => clearInterval(timer);
+  }, []);
+
+  return (
+    <div ref={scrollRef} className={cn("overflow-y-auto pb-2", className)}>
+      <div className="relative w-full" style={{ height: totalSize }}>
+        {virtualItems.map(({ index, key, start }) => (
+          <div
+            key={key}
+            data-key={key}
+            ref={measureRef}
+            className="absolute left-0 top-0 w-full px-2 pt-2"
+            style={{ transform: `translateY(${start}px)` }}
+          >
+            <ConversationListItem
+              conversation={conversations[index]}
+              selected={conversations[index].id === selectedId}
+              now={now}
+              onSelect={onSelect}
+            />
+          </div>
+        ))}
+      </div>
+    </div>
+  );
+};
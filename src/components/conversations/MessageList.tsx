@@ -0,0 +1,101 @@
+import { memo } from 'react';
+import { Bot } from 'lucide-react';
+import { cn } from '@/lib/utils';
+import { useVirtualList } from '@/hooks/useVirtualList';
+import { formatTime, Message } from './types';
+
+// Bubble height before measuring (one line of text + timestamp + gap)
+const ESTIMATED_MESSAGE_HEIGHT = 84;
+
+interface MessageBubbleProps {
+  message: Message;
+  visitorName: string | null;
+  agentName: string;
+  agentAvatarUrl: string | null;
+}
+
+export const MessageBubble = memo(({ message, visitorName, agentName, agentAvatarUrl }: MessageBubbleProps) => (
+  <div
+    className={cn(
+      "flex gap-3",
+      message.role === 'assistant' && "flex-row-reverse"
+    )}
+  >
+    <div className={cn(
+      "w-8 h-8 rounded-full flex items-center justify-center flex-shrink-0 overflow-hidden",
+      message.role === 'user' ? "bg-primary text-primary-foreground" : "bg-primary/10"
+    )}>
+      {message.role === 'user' ? (
+        <span className="text-sm font-medium">
+          {visitorName ? visitorName.charAt(0).toUpperCase() : '?'}
+        </span>
+      ) : (
+        agentAvatarUrl ? (
+          <img
+            src={agentAvatarUrl}
+            alt={agentName}
+            className="w-full h-full object-cover"
+          />
+        ) : (
+          <Bot className="w-4 h-4 text-primary" />
+        )
+      )}
+    </div>
+    <div className={cn(
+      "max-w-[70%] rounded-lg p-3",
+      message.role === 'user'
+        ? "bg-muted text-foreground"
+        : "bg-primary/10 text-foreground"
+    )}>
+      <p className="text-sm whitespace-pre-wrap">{message.content}</p>
+      <p className="text-xs text-muted-foreground mt-1">{formatTime(message.created_at)}</p>
+    </div>
+  </div>
+));
+MessageBubble.displayName = 'MessageBubble';
+
+interface MessageListProps {
+  messages: Message[];
+  visitorName: string | null;
+  agentName: string;
+  agentAvatarUrl: string | null;
+  className?: string;
+}
+
+/**
+ * Virtualized message pane anchored to the bottom: it opens on the latest
+ * message, follows new ones while the operator is at the end and keeps the
+ * position when older messages are loaded above. Mount it with
+ * `key={conversation.id}` so every conversation starts at its end.
+ */
+export const MessageList = ({ messages, visitorName, agentName, agentAvatarUrl, className }: MessageListProps) => {
+  const { scrollRef, measureRef, virtualItems, totalSize } = useVirtualList({
+    items: messages,
+    getKey: message => message.id,
+    estimateSize: ESTIMATED_MESSAGE_HEIGHT,
+    anchor: 'bottom',
+  });
+
+  return (
+    <div ref={scrollRef} className={cn("overflow-y-auto pb-4", className)}>
+      <div className="relative w-full" style={{ height: totalSize }}>
+        {virtualItems.map(({ index, key, start }) => (
+          <div
+            key={key}
+            data-key={key}
+            ref={measureRef}
+            className="absolute left-0 top-0 w-full px-4 pt-4"
+            style={{ transform: `translateY(${start}px)` }}
+          >
+            <MessageBubble
+              message={messages[index]}
+              visitorName={visitorName}
+              agentName={agentName}
+              agentAvatarUrl={agentAvatarUrl}
+            />
+          </div>
+        ))}
+      </div>
+    </div>
+  );
+};
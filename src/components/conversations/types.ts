@@ -0,0 +1,47 @@
+export interface Message {
+  id: string;
+  conversation_id: string;
+  role: 'user' | 'assistant';
+  content: string;
+  created_at: string;
+}
+
+export interface Conversation {
+  id: string;
+  agent_id: string;
+  visitor_id: string;
+  visitor_name: string | null;
+  visitor_email: string | null;
+  status: string;
+  created_at?: string;
+
+  agent: {
+    name: string;
+    avatar_url: string | null;
+  };
+  messages: Message[];
+}
+
+export const statusColors: Record<string, string> = {
+  active: 'bg-primary/10 text-primary border-primary/20',
+  resolved: 'bg-muted text-muted-foreground border-muted',
+  closed: 'bg-muted text-muted-foreground border-muted',
+  pending: 'bg-accent text-accent-foreground border-accent-foreground/20',
+};
+
+export function formatTimeAgo(dateString: string, now = Date.now()) {
+  const date = new Date(dateString);
+  const diffMs = now - date.getTime();
+  const diffMins = Math.floor(diffMs / 60000);
+  const diffHours = Math.floor(diffMs / 3600000);
+  const diffDays = Math.floor(diffMs / 86400000);
+
+  if (diffMins < 1) return 'Ahora';
+  if (diffMins < 60) return `hace ${diffMins} min`;
+  if (diffHours < 24) return `hace ${diffHours} hora${diffHours > 1 ? 's' : ''}`;
+  return `hace ${diffDays} día${diffDays > 1 ? 's' : ''}`;
+}
+
+export function formatTime(dateString: string) {
+  return new Date(dateString).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
+}
@@ -8,6 +8,7 @@ import { supabase } from '@/integrations/supabase/client';
 import { formatDistanceToNow } from 'date-fns';
 import { es } from 'date-fns/locale';
 import { Agent } from '@/types/database';
+import { useIsTabLeader } from '@/hooks/useTabLeader';
 
 const statusColors: Record<string, string> = {
   active: 'bg-green-100 text-green-700 border-green-200',
@@ -29,6 +30,7 @@ interface RecentConversationsProps {
 
 export const RecentConversations = ({ agents }: RecentConversationsProps) => {
   const navigate = useNavigate();
+  const isLeader = useIsTabLeader('recent-conversations-dashboard-v3');
 
   const { data: conversations, isLoading, isError, error } = useQuery({
     queryKey: ['recent-conversations-dashboard-v3', agents?.map(a => a.id).join(',')],
@@ -62,7 +64,9 @@ export const RecentConversations = ({ agents }: RecentConversationsProps) => {
     },
     enabled: !!agents && agents.length > 0,
     retry: 1,
-    refetchInterval: 5000
+    // Other tabs get the leader's results, so the leader polls even while hidden
+    refetchInterval: isLeader ? 5000 : false,
+    refetchIntervalInBackground: true
   });
 
   return (
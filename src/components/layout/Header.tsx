@@ -14,6 +14,8 @@ import { useLanguage } from '@/contexts/LanguageContext';
 import { useNavigate } from 'react-router-dom';
 import { Badge } from '@/components/ui/badge';
 import { useCredits } from '@/hooks/useCredits';
+import { useIsTabLeader } from '@/hooks/useTabLeader';
+import { useOwnNotificationDrain } from '@/hooks/useNotificationOutbox';
 import { useProfile } from '@/hooks/useProfile';
 import { useQuery } from '@tanstack/react-query';
 import { supabase } from '@/integrations/supabase/client';
@@ -37,8 +39,10 @@ export const Header = () => {
   const navigate = useNavigate();
   const { data: credits } = useCredits();
   const { data: profile } = useProfile();
+  useOwnNotificationDrain();
 
   // Fetch notifications (conversations needing attention)
+  const isNotificationsLeader = useIsTabLeader('notifications', !!user?.id);
   const { data: notifications = [] } = useQuery({
     queryKey: ['notifications', user?.id],
     queryFn: async () => {
@@ -106,7 +110,9 @@ export const Header = () => {
 
       return notifs;
     },
-    refetchInterval: 30000, // Refresh every 30 seconds
+    refetchInterval: isNotificationsLeader ? 30000 : false, // Refresh every 30 seconds (leader tab)
+    // The leader polls for every tab, so it keeps polling while hidden
+    refetchIntervalInBackground: true,
     enabled: !!user?.id,
   });
 
@@ -142,6 +142,26 @@ export default function ChatWidget({ agentId }: ChatWidgetProps) {
         setInputMessage('');
         setIsLoading(true);
 
+        // Streaming: the assistant bubble is created on the first token and
+        // updated in place until the stream completes
+        const streamingId = `stream-${Date.now()}`;
+        let hasStreamed = false;
+
+        const handleToken = (_token: string, content: string) => {
+            if (!hasStreamed) {
+                hasStreamed = true;
+                setIsLoading(false);
+                setMessages(prev => [...prev, {
+                    id: streamingId,
+                    role: 'assistant',
+                    content,
+                    timestamp: new Date()
+                }]);
+                return;
+            }
+            setMessages(prev => prev.map(m => m.id === streamingId ? { ...m, content } : m));
+        };
+
         try {
             const response = await sendPublicMessage(agentId, {
                 visitor_id: visitorId,
@@ -150,10 +170,11 @@ export default function ChatWidget({ agentId }: ChatWidgetProps) {
                     name: visitorName,
                     email: visitorEmail
                 }
-            });
+            }, handleToken);
 
             if (response.status === 'out_of_service') {
-                setIsOutOfService(true);
+                // Busy (retry_after_ms) is temporary: keep the chat open
+                if (!response.retry_after_ms) setIsOutOfService(true);
                 setMessages(prev => [...prev, {
                     id: Date.now().toString(),
                     role: 'assistant',
@@ -164,19 +185,26 @@ export default function ChatWidget({ agentId }: ChatWidgetProps) {
                 // Human is handling - don't add any automatic message
                 // The visitor's message was saved, they'll see human response via polling
             } else if (response.status === 'success' && response.response) {
-                // Only add message if there's actual content
-                setMessages(prev => [...prev, {
-                    id: Date.now().toString(),
-                    role: 'assistant',
-                    content: response.response,
-                    timestamp: new Date()
-                }]);
+                if (hasStreamed) {
+                    // Replace the streamed text with the final (persisted) answer
+                    setMessages(prev => prev.map(m =>
+                        m.id === streamingId ? { ...m, content: response.response } : m
+                    ));
+                } else {
+                    // Only add message if there's actual content
+                    setMessages(prev => [...prev, {
+                        id: Date.now().toString(),
+                        role: 'assistant',
+                        content: response.response,
+                        timestamp: new Date()
+                    }]);
+                }
             } else if (response.status === 'error') {
                 throw new Error(response.response || 'Error desconocido');
             }
         } catch (error) {
             console.error('Error sending message:', error);
-            setMessages(prev => [...prev, {
+            setMessages(prev => [...prev.filter(m => m.id !== streamingId), {
                 id: Date.now().toString(),
                 role: 'assistant',
                 content: 'Lo siento, hubo un error. Por favor, inténtalo más tarde.',
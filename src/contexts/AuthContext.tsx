@@ -1,13 +1,23 @@
 import React, { createContext, useContext, useState, useEffect, ReactNode } from 'react';
 import { User, Session } from '@supabase/supabase-js';
+import { useQuery, useQueryClient } from '@tanstack/react-query';
 import { supabase } from '@/integrations/supabase/client';
 import { sendWelcomeEmail } from '@/lib/notifications';
+import { fetchSessionSnapshot, SESSION_SNAPSHOT_KEY, SessionSnapshot, sessionSnapshotKey } from '@/lib/sessionSnapshot';
+import { clearPersistedQueries, PERSISTED_QUERY_PREFIXES } from '@/lib/queryPersistence';
+import { useIsTabLeader } from '@/hooks/useTabLeader';
+
+// Tables whose rows make up the session snapshot (all keyed by user_id)
+const SNAPSHOT_TABLES = ['ah_credits', 'ah_profiles', 'ah_subscriptions', 'user_roles'];
 
 interface AuthContextType {
   user: User | null;
   session: Session | null;
   isAuthenticated: boolean;
   isLoading: boolean;
+  /** Roles, profile, subscription and credits of the signed-in user */
+  snapshot: SessionSnapshot | undefined;
+  refreshSnapshot: () => Promise<void>;
   login: (email: string, password: string) => Promise<{ error: Error | null }>;
   register: (email: string, password: string, fullName: string, companyName?: string) => Promise<{ error: Error | null }>;
   logout: () => Promise<void>;
@@ -20,6 +30,7 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
   const [user, setUser] = useState<User | null>(null);
   const [session, setSession] = useState<Session | null>(null);
   const [isLoading, setIsLoading] = useState(true);
+  const queryClient = useQueryClient();
 
   useEffect(() => {
     // Set up auth state listener FIRST
@@ -28,6 +39,14 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
         setSession(session);
         setUser(session?.user ?? null);
         setIsLoading(false);
+
+        if (event === 'SIGNED_OUT') {
+          // Nothing of this user may be restored in the next session
+          queryClient.removeQueries({ predicate: query => PERSISTED_QUERY_PREFIXES.includes(String(query.queryKey[0])) });
+          clearPersistedQueries();
+        } else if (event === 'TOKEN_REFRESHED' || event === 'USER_UPDATED') {
+          queryClient.invalidateQueries({ queryKey: [SESSION_SNAPSHOT_KEY] });
+        }
       }
     );
 
@@ -39,7 +58,52 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
     });
 
     return () => subscription.unsubscribe();
-  }, []);
+  }, [queryClient]);
+
+  // Hooks never refetch the snapshot themselves; this observer refreshes a
+  // restored (IndexedDB) copy once it is more than a minute old
+  const { data: snapshot } = useQuery({
+    queryKey: sessionSnapshotKey(user?.id),
+    queryFn: fetchSessionSnapshot,
+    enabled: !!user,
+    staleTime: 60000,
+    refetchOnWindowFocus: false,
+  });
+
+  // Keep the snapshot fresh: balance changes are applied in place, anything
+  // else (role, plan, profile) refetches the snapshot. One tab holds the
+  // channel and shares the snapshot with the others.
+  const userId = user?.id;
+  const isSnapshotLeader = useIsTabLeader(SESSION_SNAPSHOT_KEY, !!userId);
+  useEffect(() => {
+    if (!userId || !isSnapshotLeader) return;
+
+    const channel = supabase.channel(`session-${userId}`);
+    SNAPSHOT_TABLES.forEach(table => {
+      channel.on(
+        'postgres_changes',
+        { event: '*', schema: 'public', table, filter: `user_id=eq.${userId}` },
+        (payload) => {
+          const row = payload.new as { balance?: number };
+          if (table === 'ah_credits' && row?.balance !== undefined) {
+            queryClient.setQueryData<SessionSnapshot>(sessionSnapshotKey(userId), prev => prev && {
+              ...prev,
+              credits: { user_id: userId, balance: row.balance! },
+            });
+            return;
+          }
+          queryClient.invalidateQueries({ queryKey: sessionSnapshotKey(userId) });
+        }
+      );
+    });
+    channel.subscribe();
+
+    return () => {
+      supabase.removeChannel(channel);
+    };
+  }, [userId, isSnapshotLeader, queryClient]);
+
+  const refreshSnapshot = () => queryClient.invalidateQueries({ queryKey: [SESSION_SNAPSHOT_KEY] });
 
   const login = async (email: string, password: string): Promise<{ error: Error | null }> => {
     const { error } = await supabase.auth.signInWithPassword({
@@ -111,6 +175,8 @@ export const AuthProvider = ({ children }: { children: ReactNode }) => {
         session,
         isAuthenticated: !!user,
         isLoading,
+        snapshot,
+        refreshSnapshot,
         login,
         register,
         logout,
@@ -129,3 +195,19 @@ export const useAuth = () => {
   }
   return context;
 };
+
+/**
+ * Read part of the session snapshot. All callers share one cached query, so
+ * any number of hooks on a page cost a single get_session_snapshot call.
+ */
+export function useSessionSnapshot<T>(select: (snapshot: SessionSnapshot) => T) {
+  const { user } = useAuth();
+
+  return useQuery({
+    queryKey: sessionSnapshotKey(user?.id),
+    queryFn: fetchSessionSnapshot,
+    enabled: !!user,
+    staleTime: Infinity,
+    select,
+  });
+}
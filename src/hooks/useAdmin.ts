@@ -1,4 +1,5 @@
-import { useQuery } from '@tanstack/react-query';
+import { useState } from 'react';
+import { keepPreviousData, useQuery, useQueryClient } from '@tanstack/react-query';
 import { supabase } from '@/integrations/supabase/client';
 import { useToast } from '@/hooks/use-toast';
 
@@ -46,6 +47,176 @@ export function useAdminUsers() {
     });
 }
 
+export interface KeysetCursor {
+    value: string;
+    id: string;
+}
+
+export interface AdminUsersFilters {
+    search: string;
+    role: string;
+    sort: 'created_at' | 'email' | 'agents_count';
+    direction: 'asc' | 'desc';
+    pageSize: number;
+}
+
+interface AdminUsersPageResult {
+    rows: AdminUser[];
+    nextCursor: KeysetCursor | null;
+    total: number | null;
+}
+
+/**
+ * Server-side paginated users (get_admin_users_page). Keeps the stack of
+ * keyset cursors so the page can go back and forth.
+ */
+export function useAdminUsersPage(filters: AdminUsersFilters) {
+    const { toast } = useToast();
+    const queryClient = useQueryClient();
+
+    // Cursor stack belongs to one filter set; changing filters starts over
+    const filtersKey = JSON.stringify(filters);
+    const [stack, setStack] = useState<{ key: string; cursors: (KeysetCursor | null)[] }>({
+        key: filtersKey,
+        cursors: [null],
+    });
+    const cursors = stack.key === filtersKey ? stack.cursors : [null];
+    const cursor = cursors[cursors.length - 1];
+
+    const query = useQuery({
+        queryKey: ['admin-users', filters, cursor],
+        queryFn: async (): Promise<AdminUsersPageResult> => {
+            const { data, error } = await (supabase.rpc as any)('get_admin_users_page', {
+                p_search: filters.search || null,
+                p_role: filters.role,
+                p_sort: filters.sort,
+                p_direction: filters.direction,
+                p_cursor: cursor,
+                p_limit: filters.pageSize,
+            });
+
+            if (error) {
+                toast({
+                    title: 'Error loading users',
+                    description: error.message,
+                    variant: 'destructive',
+                });
+                throw error;
+            }
+
+            return {
+                rows: (data.rows as any[]).map(user => ({
+                    id: user.id || user.user_id,
+                    user_id: user.user_id,
+                    email: user.email,
+                    full_name: user.full_name,
+                    role: user.role,
+                    credits_balance: user.credit_balance,
+                    agents_count: user.agents_count,
+                    created_at: user.created_at,
+                })),
+                nextCursor: data.next_cursor,
+                total: data.total,
+            };
+        },
+        placeholderData: keepPreviousData,
+    });
+
+    // Only the first page of a filter set carries the total
+    const firstPage = queryClient.getQueryData<AdminUsersPageResult>(['admin-users', filters, null]);
+
+    return {
+        ...query,
+        users: query.data?.rows ?? [],
+        total: firstPage?.total ?? null,
+        page: cursors.length,
+        hasNextPage: !!query.data?.nextCursor,
+        hasPreviousPage: cursors.length > 1,
+        nextPage: () => {
+            const next = query.data?.nextCursor;
+            if (next) setStack({ key: filtersKey, cursors: [...cursors, next] });
+        },
+        previousPage: () => setStack({ key: filtersKey, cursors: cursors.slice(0, Math.max(1, cursors.length - 1)) }),
+    };
+}
+
+export interface AdminTransactionsFilters {
+    search: string;
+    type: string;
+    /** Only the last N days; null for the whole history */
+    days: number | null;
+    sort: 'created_at' | 'amount';
+    direction: 'asc' | 'desc';
+    pageSize: number;
+}
+
+export interface AdminTransactionsTotals {
+    count: number;
+    purchase_credits: number;
+    purchase_revenue: number;
+}
+
+interface AdminTransactionsPageResult {
+    rows: any[];
+    nextCursor: KeysetCursor | null;
+    totals: AdminTransactionsTotals | null;
+}
+
+/**
+ * Server-side paginated credit transactions (get_admin_transactions_page).
+ * Same cursor handling as useAdminUsersPage.
+ */
+export function useAdminTransactionsPage(filters: AdminTransactionsFilters) {
+    const queryClient = useQueryClient();
+
+    const filtersKey = JSON.stringify(filters);
+    const [stack, setStack] = useState<{ key: string; cursors: (KeysetCursor | null)[] }>({
+        key: filtersKey,
+        cursors: [null],
+    });
+    const cursors = stack.key === filtersKey ? stack.cursors : [null];
+    const cursor = cursors[cursors.length - 1];
+
+    const query = useQuery({
+        queryKey: ['admin-transactions', filters, cursor],
+        queryFn: async (): Promise<AdminTransactionsPageResult> => {
+            const { data, error } = await (supabase.rpc as any)('get_admin_transactions_page', {
+                p_search: filters.search || null,
+                p_type: filters.type,
+                p_days: filters.days,
+                p_sort: filters.sort,
+                p_direction: filters.direction,
+                p_cursor: cursor,
+                p_limit: filters.pageSize,
+            });
+            if (error) throw error;
+
+            return {
+                rows: data.rows || [],
+                nextCursor: data.next_cursor,
+                totals: data.totals,
+            };
+        },
+        placeholderData: keepPreviousData,
+    });
+
+    const firstPage = queryClient.getQueryData<AdminTransactionsPageResult>(['admin-transactions', filters, null]);
+
+    return {
+        ...query,
+        transactions: query.data?.rows ?? [],
+        totals: firstPage?.totals ?? null,
+        page: cursors.length,
+        hasNextPage: !!query.data?.nextCursor,
+        hasPreviousPage: cursors.length > 1,
+        nextPage: () => {
+            const next = query.data?.nextCursor;
+            if (next) setStack({ key: filtersKey, cursors: [...cursors, next] });
+        },
+        previousPage: () => setStack({ key: filtersKey, cursors: cursors.slice(0, Math.max(1, cursors.length - 1)) }),
+    };
+}
+
 export function useAdminStats() {
     const { toast } = useToast();
 
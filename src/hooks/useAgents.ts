@@ -3,6 +3,8 @@ import { supabase } from '@/integrations/supabase/client';
 import { Agent, AgentObjective, AgentStatus } from '@/types/database';
 import { useToast } from '@/hooks/use-toast';
 import { getWebhookUrl } from '@/hooks/useWebhookUrl';
+import { useAuth } from '@/contexts/AuthContext';
+import { purgeStorage } from '@/lib/storageMaintenance';
 
 interface CreateAgentData {
   name: string;
@@ -26,6 +28,8 @@ interface UpdateAgentData extends Partial<CreateAgentData> {
   whatsapp_number?: string;
   webchat_enabled?: boolean;
   tools?: string[];
+  answer_cache_enabled?: boolean;
+  answer_cache_ttl_minutes?: number;
 }
 
 // Función helper para llamar al webhook de embeddings
@@ -117,10 +121,10 @@ export function useAgent(id: string) {
 export function useCreateAgent() {
   const queryClient = useQueryClient();
   const { toast } = useToast();
+  const { user } = useAuth();
 
   return useMutation({
     mutationFn: async (data: CreateAgentData) => {
-      const { data: { user } } = await supabase.auth.getUser();
       if (!user) throw new Error('Not authenticated');
 
       const { data: agent, error } = await supabase
@@ -223,9 +227,22 @@ export function useDeleteAgent() {
         .eq('id', id);
 
       if (error) throw error;
+
+      // Sus documentos viven bajo `${id}/` en el bucket.
+      // Si algo queda, se reintenta en el próximo purge; no bloquea el borrado.
+      try {
+        const purge = await purgeStorage(supabase.storage.from('ahdocuments'), { prefix: id });
+        if (purge.failed > 0) {
+          console.warn(`[DeleteAgent] ${purge.failed} archivos no se pudieron borrar:`, purge.failedPaths);
+        }
+      } catch (err) {
+        console.error('[DeleteAgent] Error limpiando storage:', err);
+      }
     },
     onSuccess: () => {
       queryClient.invalidateQueries({ queryKey: ['agents'] });
+      // Its counters go with it (cascade); realtime does not filter deletes by owner
+      queryClient.invalidateQueries({ queryKey: ['dashboard-summary'] });
       toast({
         title: 'Agente eliminado',
         description: 'El agente y su tabla de embeddings han sido eliminados.',
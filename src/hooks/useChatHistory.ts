@@ -0,0 +1,26 @@
+import { useMemo } from 'react';
+import { useInfiniteQuery } from '@tanstack/react-query';
+import { fetchChatHistoryPage, HistoryPage } from '@/lib/chatHistory';
+
+export function useChatHistory(sessionId: string) {
+  const query = useInfiniteQuery({
+    queryKey: ['chat-history', sessionId],
+    queryFn: ({ pageParam }) => fetchChatHistoryPage(sessionId, pageParam),
+    initialPageParam: null as number | null,
+    getNextPageParam: (lastPage: HistoryPage) => lastPage.nextCursor,
+    enabled: !!sessionId,
+    // Turns sent from the Playground are shown from local state; a send marks
+    // the history stale (no refetch) so the next mount loads them from the server
+    staleTime: Infinity,
+    refetchOnWindowFocus: false,
+    refetchOnReconnect: false,
+  });
+
+  // Pages arrive newest first; each page is already oldest-first inside
+  const messages = useMemo(
+    () => (query.data?.pages ?? []).slice().reverse().flatMap(page => page.messages),
+    [query.data]
+  );
+
+  return { ...query, messages };
+}
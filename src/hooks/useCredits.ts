@@ -1,48 +1,42 @@
+import { useEffect } from 'react';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { supabase } from '@/integrations/supabase/client';
 import { Credits, CreditTransaction } from '@/types/database';
 import { useToast } from '@/hooks/use-toast';
-import { sendLowCreditsEmail } from '@/lib/notifications';
-
-const LOW_CREDITS_THRESHOLD = 20;
+import { useAuth, useSessionSnapshot } from '@/contexts/AuthContext';
+import { useIsTabLeader } from '@/hooks/useTabLeader';
+import { fetchSessionSnapshot, isAdminSnapshot, SessionSnapshot, sessionSnapshotKey } from '@/lib/sessionSnapshot';
+import { dispatchEventNotifications } from '@/lib/notificationOutbox';
 
 export function useConsumeCredits() {
   const queryClient = useQueryClient();
   const { toast } = useToast();
+  const { user } = useAuth();
 
   return useMutation({
     mutationFn: async ({ amount, type, description, metadata }: { amount: number, type: string, description?: string, metadata?: any }) => {
-      const { data: { user } } = await supabase.auth.getUser();
       if (!user) throw new Error('Not authenticated');
 
       console.log('useConsumeCredits called with:', { amount, type });
 
-      // 0. Verificar si es admin para bypass
-      const { data: roleData } = await supabase
-        .from('user_roles')
-        .select('role')
-        .eq('user_id', user.id)
-        .maybeSingle();
+      // 0. Rol y saldo salen del snapshot de sesión (realtime lo mantiene al día)
+      const snapshot = await queryClient.ensureQueryData({
+        queryKey: sessionSnapshotKey(user.id),
+        queryFn: fetchSessionSnapshot,
+      });
 
-      const isAdmin = roleData?.role === 'admin';
-      console.log('User role check:', { userId: user.id, isAdmin, role: roleData?.role });
+      const isAdmin = isAdminSnapshot(snapshot);
+      console.log('User role check:', { userId: user.id, isAdmin, roles: snapshot.roles });
 
       let currentBalance = 999999;
 
       if (!isAdmin) {
         // 1. Verificar balance actual
-        const { data: creditData, error: fetchError } = await supabase
-          .from('ah_credits')
-          .select('balance')
-          .eq('user_id', user.id)
-          .single();
-
-        if (fetchError || !creditData) {
-          console.error('Error fetching balance:', fetchError);
+        if (!snapshot.credits) {
           throw new Error('No se pudo verificar el saldo de créditos');
         }
 
-        if (creditData.balance < amount) {
+        if (snapshot.credits.balance < amount) {
           throw new Error(`Saldo insuficiente. Necesitas ${amount} créditos.`);
         }
 
@@ -50,7 +44,7 @@ export function useConsumeCredits() {
         // The database TRIGGER on 'ah_usage_logs' will automatically 
         // subtract the amount from 'ah_credits' when the log is inserted below.
 
-        currentBalance = creditData.balance - amount; // Optimistic update
+        currentBalance = snapshot.credits.balance - amount; // Optimistic update
       }
 
       // 3. Registrar uso (PARA TODOS, incluido admin)
@@ -67,35 +61,22 @@ export function useConsumeCredits() {
         throw new Error(`Error al registrar uso: ${logError.message}`);
       }
 
-      // 4. Check and notify if credits are low (fire-and-forget)
-      if (!isAdmin && currentBalance < LOW_CREDITS_THRESHOLD && currentBalance >= 0) {
-        try {
-          const { data: profile } = await supabase
-            .from('ah_profiles')
-            .select('email, full_name')
-            .eq('user_id', user.id)
-            .single();
-
-          if (profile) {
-            sendLowCreditsEmail(
-              profile.email,
-              profile.full_name || 'Usuario',
-              user.id,
-              currentBalance,
-              LOW_CREDITS_THRESHOLD
-            ).catch(err => console.error('[Credits] Error sending low credits email:', err));
-          }
-        } catch (notifyError) {
-          console.error('[Credits] Error checking low credits notification:', notifyError);
-        }
-      }
+      // 4. Low credit alerts are queued by the ah_credits trigger in the same
+      // transaction (ah_notification_outbox), once per threshold crossing.
+      // Send it (fire-and-forget) while nothing drains the outbox on a schedule.
+      if (!isAdmin) void dispatchEventNotifications();
 
-      return { success: true, newBalance: currentBalance };
+      return { success: true, newBalance: currentBalance, isAdmin };
     },
-    onSuccess: () => {
-      queryClient.invalidateQueries({ queryKey: ['credits'] });
-      queryClient.invalidateQueries({ queryKey: ['usage-stats'] });
-      queryClient.invalidateQueries({ queryKey: ['dashboard-stats'] }); // Actualizar contadores
+    onSuccess: ({ newBalance, isAdmin }) => {
+      // The realtime update of ah_credits confirms this balance a moment later
+      if (!isAdmin) {
+        queryClient.setQueryData<SessionSnapshot>(sessionSnapshotKey(user?.id), prev => prev && {
+          ...prev,
+          credits: { user_id: prev.user_id, balance: newBalance },
+        });
+      }
+      queryClient.invalidateQueries({ queryKey: [DASHBOARD_SUMMARY_KEY] }); // Actualizar contadores
     },
     onError: (error) => {
       toast({
@@ -109,46 +90,15 @@ export function useConsumeCredits() {
 
 
 export function useCredits() {
-  const { toast } = useToast();
-
-  return useQuery({
-    queryKey: ['credits'],
-    queryFn: async () => {
-      const { data: { user } } = await supabase.auth.getUser();
-      if (!user) throw new Error('Not authenticated');
-
-      // Check admin for infinite credits visual
-      const { data: roleData } = await supabase
-        .from('user_roles')
-        .select('role')
-        .eq('user_id', user.id)
-        .maybeSingle();
-
-      if (roleData?.role === 'admin') {
-        return { balance: 999999, user_id: user.id } as Credits;
-      }
-
-      const { data, error } = await supabase
-        .from('ah_credits')
-        .select('balance, user_id')
-        .eq('user_id', user.id)
-        .single();
-
-      if (error) {
-        console.error('Error fetching credits:', error);
-        return { balance: 0, user_id: user.id } as Credits;
-      }
-
-      // Si no existe, retornar objeto dummy (el trigger de DB debería haberlo creado, 
-      // pero si falló o es usuario viejo, mostramos 0 o un valor seguro)
-      if (!data) {
-        return { balance: 0, user_id: user.id } as Credits;
-      }
+  return useSessionSnapshot(snapshot => {
+    // Check admin for infinite credits visual
+    if (isAdminSnapshot(snapshot)) {
+      return { balance: 999999, user_id: snapshot.user_id } as Credits;
+    }
 
-      return data as Credits;
-    },
-    // Refresh interval para mantener el saldo actualizado mientras chatea
-    refetchInterval: 30000,
+    // Si no existe, retornar objeto dummy (el trigger de DB debería haberlo creado, 
+    // pero si falló o es usuario viejo, mostramos 0 o un valor seguro)
+    return (snapshot.credits ?? { balance: 0, user_id: snapshot.user_id }) as Credits;
   });
 }
 
@@ -178,98 +128,98 @@ export function useCreditTransactions() {
   });
 }
 
-export function useUsageStats(days: number = 7) {
-  return useQuery({
-    queryKey: ['usage-stats', days],
-    queryFn: async () => {
-      const { data: { user } } = await supabase.auth.getUser();
-      if (!user) throw new Error('Not authenticated');
-
-      const startDate = new Date();
-      startDate.setDate(startDate.getDate() - days);
-
-      const { data, error } = await supabase
-        .from('ah_usage_logs')
-        .select('created_at, amount')
-        .eq('user_id', user.id)
-        .gte('created_at', startDate.toISOString())
-        .order('created_at', { ascending: true });
-
-      if (error) {
-        console.error('Error fetching usage stats:', error);
-        return [];
-      }
-
-      // Agrupar por día
-      const statsMap = new Map<string, { name: string, fullDate: string, credits: number, messages: number }>();
+export interface DashboardCounts {
+  total: number;
+  today: number;
+  last_7d: number;
+  last_30d: number;
+}
 
-      // Inicializar días
-      for (let i = 0; i < days; i++) {
-        const d = new Date();
-        d.setDate(d.getDate() - (days - 1 - i));
-        const dateStr = d.toLocaleDateString('en-US', { weekday: 'short' });
-        const fullDate = d.toISOString().split('T')[0];
-        statsMap.set(fullDate, { name: dateStr, fullDate, credits: 0, messages: 0 });
-      }
+export interface DashboardSummary {
+  conversations: DashboardCounts;
+  messages: DashboardCounts;
+  /** Widget conversations per agent id, all time */
+  agents: Record<string, number>;
+  /** One entry per UTC day, oldest first */
+  series: { day: string; conversations: number; messages: number; credits: number }[];
+  fetched_at: string;
+}
 
-      data.forEach(log => {
-        const date = log.created_at.split('T')[0];
-        if (statsMap.has(date)) {
-          const entry = statsMap.get(date)!;
-          entry.credits += log.amount;
-          entry.messages += 1; // Cada log es un mensaje
-        }
-      });
+export const DASHBOARD_SUMMARY_KEY = 'dashboard-summary';
+// Days of series returned by get_dashboard_summary
+const SUMMARY_DAYS = 30;
 
-      return Array.from(statsMap.values());
-    }
-  });
-}
+/**
+ * Dashboard counters maintained by the database (get_dashboard_summary): one
+ * small round-trip however much history the owner has. Kept fresh by
+ * useDashboardSummaryRealtime.
+ */
+export function useDashboardSummary<T = DashboardSummary>(select?: (summary: DashboardSummary) => T) {
+  const { user } = useAuth();
 
-export function useDashboardStats() {
   return useQuery({
-    queryKey: ['dashboard-stats'],
+    queryKey: [DASHBOARD_SUMMARY_KEY, user?.id],
+    enabled: !!user,
+    staleTime: 60000,
     queryFn: async () => {
-      const { data: { user } } = await supabase.auth.getUser();
-      if (!user) throw new Error('Not authenticated');
-
-      // Obtener logs de uso
-      const { data: usageLogs, error } = await supabase
-        .from('ah_usage_logs')
-        .select('id')
-        .eq('user_id', user.id);
-
-      if (error) {
-        console.error('Error fetching dashboard stats:', error);
-        return { conversations: 0, messages: 0 };
-      }
-
-      // Obtener agentes del usuario para contar sus conversaciones
-      // Método seguro: 2 pasos para evitar problemas de RLS complejos en joins automáticos
-      const { data: agents } = await supabase
-        .from('ah_agents')
-        .select('id')
-        .eq('user_id', user.id);
-
-      let conversationCount = 0;
-      const agentIds = agents?.map(a => a.id) || [];
-
-      if (agentIds.length > 0) {
-        const { count } = await supabase
-          .from('ah_public_conversations')
-          .select('*', { count: 'exact', head: true })
-          .in('agent_id', agentIds);
+      const { data, error } = await (supabase.rpc as any)('get_dashboard_summary', { p_days: SUMMARY_DAYS });
+      if (error) throw error;
+      return data as DashboardSummary;
+    },
+    select,
+  });
+}
 
-        conversationCount = count || 0;
-      }
+/**
+ * Refetch the summary when the owner's counters change. Mount once per page;
+ * only the leader tab subscribes, and bursts of changes (a busy widget)
+ * collapse into one refetch.
+ */
+export function useDashboardSummaryRealtime() {
+  const { user } = useAuth();
+  const queryClient = useQueryClient();
+  const userId = user?.id;
+  const isLeader = useIsTabLeader(DASHBOARD_SUMMARY_KEY, !!userId);
+
+  useEffect(() => {
+    if (!userId || !isLeader) return;
+
+    let timer: ReturnType<typeof setTimeout> | null = null;
+    const invalidate = () => {
+      if (timer) return;
+      timer = setTimeout(() => {
+        timer = null;
+        queryClient.invalidateQueries({ queryKey: [DASHBOARD_SUMMARY_KEY, userId] });
+      }, 2000);
+    };
+
+    const channel = supabase.channel(`dashboard-summary-${userId}`);
+    ['ah_dashboard_agent_totals', 'ah_dashboard_usage_totals'].forEach(table => {
+      channel.on('postgres_changes', { event: '*', schema: 'public', table, filter: `user_id=eq.${userId}` }, invalidate);
+    });
+    channel.subscribe();
+
+    return () => {
+      if (timer) clearTimeout(timer);
+      supabase.removeChannel(channel);
+    };
+  }, [userId, isLeader, queryClient]);
+}
 
-      // Contar mensajes totales
-      const totalMessages = usageLogs?.length || 0;
+export function useUsageStats(days: number = 7) {
+  // Agrupado por día en la base de datos (como máximo SUMMARY_DAYS)
+  return useDashboardSummary(summary => summary.series.slice(-days).map(entry => ({
+    name: new Date(`${entry.day}T00:00:00Z`).toLocaleDateString('en-US', { weekday: 'short', timeZone: 'UTC' }),
+    fullDate: entry.day,
+    credits: entry.credits,
+    messages: entry.messages,
+  })));
+}
 
-      return {
-        conversations: conversationCount,
-        messages: totalMessages
-      };
-    }
-  });
+export function useDashboardStats() {
+  return useDashboardSummary(summary => ({
+    conversations: summary.conversations.total,
+    conversationsToday: summary.conversations.today,
+    messages: summary.messages.total,
+  }));
 }
@@ -1,7 +1,16 @@
+import { useEffect, useState } from 'react';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { supabase } from '@/integrations/supabase/client';
 import { Document, DocumentType } from '@/types/database';
 import { useToast } from '@/hooks/use-toast';
+import { getWebhookUrl } from '@/hooks/useWebhookUrl';
+import { useAuth } from '@/contexts/AuthContext';
+import {
+  IngestionProgress,
+  SupabaseIngestionQueue,
+  createWebhookProcessor,
+  drainIngestionQueue,
+} from '@/lib/documentIngestion';
 
 interface CreateDocumentData {
   name: string;
@@ -10,10 +19,40 @@ interface CreateDocumentData {
   file_path?: string;
   file_size?: number;
   agent_id?: string;
+  content_hash?: string;
 }
 
 export function useDocuments(agentId?: string) {
   const { toast } = useToast();
+  const queryClient = useQueryClient();
+
+  // Ingestion jobs update ah_documents.status; patch the cached list in place
+  useEffect(() => {
+    if (!agentId) return;
+
+    const channel = supabase
+      .channel(`documents-${agentId}`)
+      .on(
+        'postgres_changes',
+        {
+          event: 'UPDATE',
+          schema: 'public',
+          table: 'ah_documents',
+          filter: `agent_id=eq.${agentId}`,
+        },
+        (payload) => {
+          const updated = payload.new as Document;
+          queryClient.setQueryData<Document[]>(['ah_documents', agentId], (prev) =>
+            prev?.map(doc => doc.id === updated.id ? { ...doc, ...updated } : doc)
+          );
+        }
+      )
+      .subscribe();
+
+    return () => {
+      supabase.removeChannel(channel);
+    };
+  }, [agentId, queryClient]);
 
   return useQuery({
     queryKey: ['ah_documents', agentId],
@@ -46,10 +85,10 @@ export function useDocuments(agentId?: string) {
 export function useCreateDocument() {
   const queryClient = useQueryClient();
   const { toast } = useToast();
+  const { user } = useAuth();
 
   return useMutation({
     mutationFn: async (data: CreateDocumentData) => {
-      const { data: { user } } = await supabase.auth.getUser();
       if (!user) throw new Error('Not authenticated');
 
       const { data: document, error } = await supabase
@@ -62,6 +101,7 @@ export function useCreateDocument() {
           file_path: data.file_path,
           file_size: data.file_size,
           agent_id: data.agent_id,
+          content_hash: data.content_hash,
           status: 'pending',
         })
         .select()
@@ -149,3 +189,33 @@ export function useRetryDocument() {
     },
   });
 }
+
+export function useVectorizeDocuments(agentId: string, agentName: string) {
+  const queryClient = useQueryClient();
+  const [progress, setProgress] = useState<IngestionProgress | null>(null);
+
+  const mutation = useMutation({
+    mutationFn: async (documents: Document[]) => {
+      const webhookUrl = await getWebhookUrl('VITE_N8N_VECTORIZE_WEBHOOK_URL');
+      if (!webhookUrl) {
+        throw new Error('VITE_N8N_VECTORIZE_WEBHOOK_URL no está configurada.');
+      }
+
+      const queue = new SupabaseIngestionQueue();
+      const processor = createWebhookProcessor(
+        queue,
+        webhookUrl,
+        { id: agentId, name: agentName },
+        documents
+      );
+
+      return drainIngestionQueue(queue, agentId, processor, { onProgress: setProgress });
+    },
+    onSettled: () => {
+      setProgress(null);
+      queryClient.invalidateQueries({ queryKey: ['ah_documents'] });
+    },
+  });
+
+  return { ...mutation, progress };
+}
@@ -0,0 +1,86 @@
+import { useEffect } from 'react';
+import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
+import { supabase } from '@/integrations/supabase/client';
+import { useToast } from '@/components/ui/use-toast';
+import { useAuth } from '@/contexts/AuthContext';
+import { useIsTabLeader } from '@/hooks/useTabLeader';
+import {
+    createWebhookSender,
+    dispatchEventNotifications,
+    drainOutbox,
+    DispatchSummary,
+    SupabaseOutboxQueue,
+} from '@/lib/notificationOutbox';
+
+export interface OutboxTemplateStats {
+    template: string;
+    queued: number;
+    sending: number;
+    sent: number;
+    failed: number;
+    sent_per_hour: number;
+    avg_delivery_seconds: number | null;
+    oldest_queued_at: string | null;
+}
+
+export const useNotificationOutbox = (hours: number = 24) => {
+    const { toast } = useToast();
+    const queryClient = useQueryClient();
+
+    const { data: stats, isLoading } = useQuery({
+        queryKey: ['notification-outbox', hours],
+        queryFn: async () => {
+            const { data, error } = await (supabase.rpc as any)('get_notification_outbox_stats', { p_hours: hours });
+            if (error) throw error;
+            return (data || []) as OutboxTemplateStats[];
+        },
+        refetchInterval: 30000,
+    });
+
+    const dispatch = useMutation({
+        mutationFn: async (): Promise<DispatchSummary> => {
+            return drainOutbox(new SupabaseOutboxQueue(), createWebhookSender(), { maxBatches: 20 });
+        },
+        onSuccess: (summary) => {
+            queryClient.invalidateQueries({ queryKey: ['notification-outbox'] });
+            const totals = Object.values(summary.templates).reduce(
+                (acc, t) => ({ sent: acc.sent + t.sent, failed: acc.failed + t.failed + t.retried }),
+                { sent: 0, failed: 0 }
+            );
+            toast({
+                title: 'Notifications dispatched',
+                description: `${totals.sent} sent, ${totals.failed} failed in ${summary.batches} batches`,
+            });
+        },
+        onError: (error: Error) => {
+            toast({
+                title: 'Dispatch failed',
+                description: error.message,
+                variant: 'destructive',
+            });
+        },
+    });
+
+    return { stats, isLoading, dispatch };
+};
+
+// How often the leader tab sends the signed-in user's queued notifications
+const OWN_NOTIFICATIONS_INTERVAL = 60000;
+
+/**
+ * Send the signed-in user's queued notifications (low credit alerts, new
+ * conversation emails whose widget tab closed too early) from the leader tab.
+ * Mount once, in the layout.
+ */
+export const useOwnNotificationDrain = () => {
+    const { user } = useAuth();
+    const isLeader = useIsTabLeader('notification-outbox-drain', !!user?.id);
+
+    useEffect(() => {
+        if (!user?.id || !isLeader) return;
+
+        void dispatchEventNotifications();
+        const timer = setInterval(() => void dispatchEventNotifications(), OWN_NOTIFICATIONS_INTERVAL);
+        return () => clearInterval(timer);
+    }, [user?.id, isLeader]);
+};
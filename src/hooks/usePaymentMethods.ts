@@ -1,6 +1,7 @@
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { supabase } from '@/integrations/supabase/client';
 import { useToast } from '@/components/ui/use-toast';
+import { SESSION_SNAPSHOT_KEY } from '@/lib/sessionSnapshot';
 
 interface PaymentMethod {
     has_payment_method: boolean;
@@ -45,7 +46,7 @@ export const usePaymentMethods = () => {
         },
         onSuccess: () => {
             queryClient.invalidateQueries({ queryKey: ['paymentMethod'] });
-            queryClient.invalidateQueries({ queryKey: ['subscription'] });
+            queryClient.invalidateQueries({ queryKey: [SESSION_SNAPSHOT_KEY] });
             toast({
                 title: "Tarjeta guardada",
                 description: "Tu método de pago ha sido actualizado.",
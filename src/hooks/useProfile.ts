@@ -1,7 +1,9 @@
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
+import { useMutation, useQueryClient } from '@tanstack/react-query';
 import { supabase } from '@/integrations/supabase/client';
 import { Profile } from '@/types/database';
 import { useToast } from '@/hooks/use-toast';
+import { useAuth, useSessionSnapshot } from '@/contexts/AuthContext';
+import { SessionSnapshot, sessionSnapshotKey } from '@/lib/sessionSnapshot';
 
 interface UpdateProfileData {
   full_name?: string;
@@ -12,57 +14,17 @@ interface UpdateProfileData {
 }
 
 export function useProfile() {
-  const { toast } = useToast();
-
-  return useQuery({
-    queryKey: ['profile'],
-    queryFn: async () => {
-      const { data: { user } } = await supabase.auth.getUser();
-      if (!user) throw new Error('Not authenticated');
-
-      // Intentar obtener perfil existente
-      const { data, error } = await supabase
-        .from('ah_profiles')
-        .select('*')
-        .eq('user_id', user.id)
-        .maybeSingle();
-
-      if (error) {
-        toast({
-          title: 'Error loading profile',
-          description: error.message,
-          variant: 'destructive',
-        });
-        throw error;
-      }
-
-      // Si no existe el perfil, crearlo
-      if (!data) {
-        const { data: newProfile, error: createError } = await supabase
-          .from('ah_profiles')
-          .insert({ user_id: user.id, email: user.email })
-          .select()
-          .single();
-
-        if (createError) {
-          console.error('Error creating profile:', createError);
-          throw createError;
-        }
-        return newProfile as Profile;
-      }
-
-      return data as Profile;
-    },
-  });
+  // The snapshot RPC creates the profile row when it is missing
+  return useSessionSnapshot(snapshot => snapshot.profile as Profile);
 }
 
 export function useUpdateProfile() {
   const queryClient = useQueryClient();
   const { toast } = useToast();
+  const { user } = useAuth();
 
   return useMutation({
     mutationFn: async (data: UpdateProfileData) => {
-      const { data: { user } } = await supabase.auth.getUser();
       if (!user) throw new Error('Not authenticated');
 
       const { data: profile, error } = await supabase
@@ -75,8 +37,8 @@ export function useUpdateProfile() {
       if (error) throw error;
       return profile as Profile;
     },
-    onSuccess: () => {
-      queryClient.invalidateQueries({ queryKey: ['profile'] });
+    onSuccess: (profile) => {
+      queryClient.setQueryData<SessionSnapshot>(sessionSnapshotKey(user?.id), prev => prev && { ...prev, profile });
       toast({
         title: 'Profile updated',
         description: 'Your changes have been saved.',
@@ -1,6 +1,5 @@
-import { useQuery } from '@tanstack/react-query';
-import { supabase } from '@/integrations/supabase/client';
-import { useToast } from '@/hooks/use-toast';
+import { useSessionSnapshot } from '@/contexts/AuthContext';
+import { isAdminSnapshot } from '@/lib/sessionSnapshot';
 
 export type SubscriptionPlan = 'free' | 'pro' | 'business';
 
@@ -34,54 +33,29 @@ export const PLAN_LIMITS = {
 };
 
 export function useSubscription() {
-    const { toast } = useToast();
-
-    return useQuery({
-        queryKey: ['subscription'],
-        queryFn: async () => {
-            const { data: { user } } = await supabase.auth.getUser();
-            if (!user) throw new Error('Not authenticated');
-
-            // Verificar rol de admin
-            const { data: roleData } = await supabase
-                .from('user_roles')
-                .select('role')
-                .eq('user_id', user.id)
-                .maybeSingle();
-
-            // Si es admin, forzar plan Business
-            if (roleData?.role === 'admin') {
-                return {
-                    id: 'admin-override',
-                    user_id: user.id,
-                    plan_type: 'business',
-                    status: 'active',
-                    current_period_end: null
-                } as Subscription;
-            }
-
-            const { data, error } = await supabase
-                .from('ah_subscriptions')
-                .select('*')
-                .eq('user_id', user.id)
-                .maybeSingle();
-
-            if (error) {
-                console.error('Error fetching subscription:', error);
-            }
-
-            // Default to free if no subscription found
-            if (!data) {
-                return {
-                    id: 'temp',
-                    user_id: user.id,
-                    plan_type: 'free',
-                    status: 'active',
-                    current_period_end: null
-                } as Subscription;
-            }
-
-            return data as Subscription;
-        },
+    return useSessionSnapshot(snapshot => {
+        // Si es admin, forzar plan Business
+        if (isAdminSnapshot(snapshot)) {
+            return {
+                id: 'admin-override',
+                user_id: snapshot.user_id,
+                plan_type: 'business',
+                status: 'active',
+                current_period_end: null
+            } as Subscription;
+        }
+
+        // Default to free if no subscription found
+        if (!snapshot.subscription) {
+            return {
+                id: 'temp',
+                user_id: snapshot.user_id,
+                plan_type: 'free',
+                status: 'active',
+                current_period_end: null
+            } as Subscription;
+        }
+
+        return snapshot.subscription;
     });
 }
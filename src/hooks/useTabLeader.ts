@@ -0,0 +1,29 @@
+import { useEffect, useState } from 'react';
+import { useQueryClient } from '@tanstack/react-query';
+import { acquireTabCoordinator, releaseTabCoordinator } from '@/lib/tabCoordinator';
+
+/**
+ * True in the one tab that polls and holds the realtime subscription for
+ * `topic` (the first query-key segment of the shared data). The other tabs
+ * showing the same topic receive the leader's results in their cache.
+ */
+export function useIsTabLeader(topic: string, enabled: boolean = true) {
+  const queryClient = useQueryClient();
+  const [isLeader, setIsLeader] = useState(false);
+
+  useEffect(() => {
+    if (!enabled) return;
+
+    const coordinator = acquireTabCoordinator(topic, queryClient);
+    setIsLeader(coordinator.isLeader());
+    const unsubscribe = coordinator.subscribe(() => setIsLeader(coordinator.isLeader()));
+
+    return () => {
+      unsubscribe();
+      releaseTabCoordinator(topic);
+      setIsLeader(false);
+    };
+  }, [topic, enabled, queryClient]);
+
+  return isLeader;
+}
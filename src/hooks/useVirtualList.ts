@@ -0,0 +1,212 @@
+import { useCallback, useEffect, useLayoutEffect, useMemo, useRef, useState } from 'react';
+
+/**
+ * Windowed rendering for long lists: only the rows inside the viewport (plus
+ * `overscan` pixels above and below) are mounted. Row heights start at
+ * `estimateSize` and are replaced by the measured height of every mounted
+ * row, keyed by `getKey`, so variable-height content lays out correctly.
+ *
+ * With `anchor: 'bottom'` (chat panes) the list opens at the end, stays
+ * pinned to the bottom while new items arrive if the user is already there,
+ * and keeps the visible item in place when older items are prepended.
+ *
+ * Usage: put `scrollRef` on the scrolling element, render a spacer of
+ * `totalSize` px and give every row `data-key={item.key}` and `measureRef`.
+ */
+
+export interface VirtualItem {
+  index: number;
+  key: string;
+  start: number;
+  size: number;
+}
+
+interface UseVirtualListOptions<T> {
+  items: readonly T[];
+  getKey: (item: T) => string;
+  estimateSize: number;
+  /** Extra pixels rendered above and below the viewport */
+  overscan?: number;
+  /** Viewport height assumed before the scroll element is measured (first render, SSR) */
+  initialHeight?: number;
+  anchor?: 'top' | 'bottom';
+}
+
+// Distance from the end still considered "at the bottom"
+const AT_BOTTOM_PX = 16;
+
+export function useVirtualList<T>({
+  items,
+  getKey,
+  estimateSize,
+  overscan = 400,
+  initialHeight = 800,
+  anchor = 'top',
+}: UseVirtualListOptions<T>) {
+  const [scrollElement, setScrollElement] = useState<HTMLElement | null>(null);
+  const [viewport, setViewport] = useState({ scrollTop: 0, height: initialHeight });
+  const [measureVersion, setMeasureVersion] = useState(0);
+  const sizes = useRef(new Map<string, number>());
+  const atBottom = useRef(anchor === 'bottom');
+  const firstKey = useRef<string | null>(null);
+  const getKeyRef = useRef(getKey);
+  getKeyRef.current = getKey;
+
+  const keys = useMemo(() => items.map(item => getKeyRef.current(item)), [items]);
+
+  // starts[i] = top of row i, starts[n] = total height
+  const starts = useMemo(() => {
+    const result = new Float64Array(keys.length + 1);
+    for (let i = 0; i < keys.length; i++) {
+      result[i + 1] = result[i] + (sizes.current.get(keys[i]) ?? estimateSize);
+    }
+    return result;
+    // measureVersion: sizes.current changed
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [keys, estimateSize, measureVersion]);
+
+  const startsRef = useRef(starts);
+  startsRef.current = starts;
+  const totalSize = starts[keys.length];
+
+  // Index of the row containing `offset`
+  const indexAt = (offset: number) => {
+    let low = 0;
+    let high = keys.length - 1;
+    while (low < high) {
+      const mid = (low + high) >> 1;
+      if (starts[mid + 1] <= offset) low = mid + 1;
+      else high = mid;
+    }
+    return Math.max(low, 0);
+  };
+
+  const virtualItems: VirtualItem[] = [];
+  if (keys.length > 0) {
+    const first = indexAt(Math.max(0, viewport.scrollTop - overscan));
+    const last = indexAt(viewport.scrollTop + viewport.height + overscan);
+    for (let index = first; index <= last; index++) {
+      virtualItems.push({ index, key: keys[index], start: starts[index], size: starts[index + 1] - starts[index] });
+    }
+  }
+
+  const syncViewport = useCallback((el: HTMLElement) => {
+    atBottom.current = el.scrollHeight - el.scrollTop - el.clientHeight <= AT_BOTTOM_PX;
+    setViewport(prev => prev.scrollTop === el.scrollTop && prev.height === el.clientHeight
+      ? prev
+      : { scrollTop: el.scrollTop, height: el.clientHeight });
+  }, []);
+
+  // Follow scrolling (one update per frame) and viewport resizes
+  useEffect(() => {
+    if (!scrollElement) return;
+
+    let frame = 0;
+    const onScroll = () => {
+      if (frame) return;
+      frame = requestAnimationFrame(() => {
+        frame = 0;
+        syncViewport(scrollElement);
+      });
+    };
+
+    scrollElement.addEventListener('scroll', onScroll, { passive: true });
+    const resizeObserver = typeof ResizeObserver !== 'undefined'
+      ? new ResizeObserver(() => syncViewport(scrollElement))
+      : null;
+    resizeObserver?.observe(scrollElement);
+    syncViewport(scrollElement);
+
+    return () => {
+      scrollElement.removeEventListener('scroll', onScroll);
+      resizeObserver?.disconnect();
+      if (frame) cancelAnimationFrame(frame);
+    };
+  }, [scrollElement, syncViewport]);
+
+  const scrollElementRef = useRef<HTMLElement | null>(null);
+  scrollElementRef.current = scrollElement;
+  const keysRef = useRef(keys);
+  keysRef.current = keys;
+
+  // Measure mounted rows; a row above the viewport that changes height
+  // shifts the scroll position by the same amount so the content does not jump
+  const rowObserver = useMemo(() => {
+    if (typeof ResizeObserver === 'undefined') return null;
+
+    return new ResizeObserver((entries, observer) => {
+      let changed = false;
+      for (const entry of entries) {
+        const el = entry.target as HTMLElement;
+        if (!el.isConnected) {
+          observer.unobserve(el);
+          continue;
+        }
+        const key = el.dataset.key;
+        if (!key) continue;
+
+        const size = entry.borderBoxSize?.[0]?.blockSize ?? el.offsetHeight;
+        const previous = sizes.current.get(key) ?? estimateSize;
+        if (Math.abs(previous - size) < 0.5) continue;
+
+        sizes.current.set(key, size);
+        changed = true;
+
+        const parent = scrollElementRef.current;
+        const index = keysRef.current.indexOf(key);
+        if (parent && !atBottom.current && index >= 0 && startsRef.current[index] < parent.scrollTop) {
+          parent.scrollTop += size - previous;
+        }
+      }
+      if (changed) setMeasureVersion(version => version + 1);
+    });
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, []);
+
+  useEffect(() => () => rowObserver?.disconnect(), [rowObserver]);
+
+  const measureRef = useCallback((el: HTMLElement | null) => {
+    if (el) rowObserver?.observe(el);
+  }, [rowObserver]);
+
+  // Bottom anchoring: stick to the end, or keep position when items are prepended
+  useLayoutEffect(() => {
+    if (!scrollElement || anchor !== 'bottom') return;
+
+    const previousFirst = firstKey.current;
+    firstKey.current = keys[0] ?? null;
+
+    if (atBottom.current) {
+      scrollElement.scrollTop = scrollElement.scrollHeight;
+    } else if (previousFirst && keys[0] !== previousFirst) {
+      const index = keys.indexOf(previousFirst);
+      if (index > 0) scrollElement.scrollTop += starts[index];
+    }
+    syncViewport(scrollElement);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [keys, totalSize, scrollElement, anchor]);
+
+  const scrollToIndex = useCallback((index: number) => {
+    if (scrollElementRef.current) {
+      scrollElementRef.current.scrollTop = startsRef.current[Math.max(0, Math.min(index, keysRef.current.length - 1))];
+    }
+  }, []);
+
+  return {
+    scrollRef: setScrollElement as (el: HTMLElement | null) => void,
+    measureRef,
+    virtualItems,
+    totalSize,
+    scrollToIndex,
+  };
+}
+
+/** Top/bottom spacer heights for tables, where rows cannot be absolutely positioned */
+export const virtualPadding = (virtualItems: VirtualItem[], totalSize: number) => {
+  if (virtualItems.length === 0) return { paddingTop: 0, paddingBottom: 0 };
+  const last = virtualItems[virtualItems.length - 1];
+  return {
+    paddingTop: virtualItems[0].start,
+    paddingBottom: totalSize - (last.start + last.size),
+  };
+};
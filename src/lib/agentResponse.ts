@@ -0,0 +1,54 @@
+/**
+ * Agent Response
+ * Cleanup of stored and streamed agent answers. No client dependency, so the
+ * benchmarks can run it next to the SQL port.
+ */
+
+/**
+ * Remove tool-call and retrieval metadata from an agent answer.
+ * Kept in sync with clean_agent_response() in SQL, which cleans stored history
+ * (benchmarks/chat_history_load.ts compares the two).
+ */
+export const cleanAgentResponse = (text: string): string => {
+    if (!text) return '';
+
+    // Remover [Used tools: Tool: ... Result: [...]] pattern completo
+    let cleaned = text.replace(/\[Used tools:[\s\S]*?Result:[\s\S]*?\]\s*/g, '');
+
+    // Remover [Used tools: ...] sin Result
+    cleaned = cleaned.replace(/\[Used tools:.*?\]/gs, '');
+
+    // Remover JSON objects que empiezan con {"type":"text"
+    cleaned = cleaned.replace(/\{"type":"text"[\s\S]*?\}/g, '');
+
+    // Remover JSON objects que empiezan con {"pageContent"
+    cleaned = cleaned.replace(/\{"pageContent":[\s\S]*?"\}/g, '');
+
+    // Remover metadata patterns como "metadata":{...}
+    cleaned = cleaned.replace(/"metadata":\{[^}]*\}/g, '');
+
+    // Remover Result: seguido de arrays JSON
+    cleaned = cleaned.replace(/Result:\s*\[[\s\S]*?\]\s*/g, '');
+
+    // Remover Input: patterns
+    cleaned = cleaned.replace(/Input:\s*"[^"]*"/g, '');
+
+    // Remover Tool: patterns
+    cleaned = cleaned.replace(/Tool:\s*\w+,?\s*/g, '');
+
+    // Limpiar caracteres escapados
+    cleaned = cleaned.replace(/\\n/g, '\n');
+    cleaned = cleaned.replace(/\\"/g, '"');
+
+    // Remover corchetes y llaves sueltas al inicio
+    cleaned = cleaned.replace(/^[\[\]\{\},\s]+/g, '');
+
+    // Remover corchetes y llaves sueltas al final
+    cleaned = cleaned.replace(/[\[\]\{\},\s]+$/g, '');
+
+    // Limpiar múltiples saltos de línea y espacios
+    cleaned = cleaned.replace(/\n{3,}/g, '\n\n');
+    cleaned = cleaned.replace(/\s{3,}/g, '  ');
+
+    return cleaned.trim();
+};
@@ -0,0 +1,222 @@
+/**
+ * Backup Restore
+ * Restores admin and user backups through the staged restore RPCs
+ * (20260131_staged_restore) instead of sending the whole file in one call.
+ * The file is read as a stream. Each table's rows are parsed one at a time
+ * (JsonStreamScanner) and uploaded in bounded batches. Then restore_apply
+ * runs until every batch is applied, a few thousand rows per call, in
+ * dependency order.
+ *
+ * Jobs are keyed by the file, so choosing the same file after an interruption
+ * resumes the job: batches the server already has are parsed but not
+ * uploaded again, and applied batches are skipped.
+ */
+
+import { supabase } from '@/integrations/supabase/client';
+import { JsonPath, JsonStreamScanner } from '@/lib/jsonStream';
+
+export type RestoreKind = 'admin' | 'user';
+
+export const RESTORE_BATCH_ROWS = 500;
+export const RESTORE_BATCH_BYTES = 512 * 1024;
+export const RESTORE_APPLY_ROWS = 5000;
+
+export interface RestoreProgress {
+    phase: 'staging' | 'applying' | 'done';
+    /** Section being uploaded or table being applied */
+    table: string | null;
+    bytesRead: number;
+    totalBytes: number;
+    stagedRows: number;
+    appliedRows: number;
+    /** Rows staged in the job; known once the upload is done */
+    totalRows: number;
+    resumed: boolean;
+}
+
+export interface RestoreResult {
+    jobId: string;
+    /** Rows inserted or updated per table */
+    restored: Record<string, number>;
+    resumed: boolean;
+}
+
+interface RestoreJob {
+    job_id: string;
+    status: 'staging' | 'applying' | 'failed';
+    resumed: boolean;
+    sections: string[] | null;
+    /** Batches already uploaded per section */
+    staged: Record<string, number>;
+}
+
+interface Batch {
+    section: string;
+    seq: number;
+    rows: unknown[];
+    bytes: number;
+}
+
+// Rows live under backup.tables (admin export) or backup.data (user export)
+const ROWS_KEY: Record<RestoreKind, string> = { admin: 'tables', user: 'data' };
+// User backups carry these as one object instead of an array
+const SINGLE_ROW_SECTIONS = ['profile', 'settings'];
+const HEADER_KEYS = ['backup_version', 'backup_type', 'backup_date'];
+
+const isValidHeader = (kind: RestoreKind, header: Record<string, unknown>) =>
+    !!header.backup_version && (kind === 'admin' || header.backup_type === 'user');
+
+export async function restoreBackup(
+    file: File,
+    kind: RestoreKind,
+    onProgress?: (progress: RestoreProgress) => void
+): Promise<RestoreResult> {
+    const { data: job, error } = await (supabase.rpc as any)('restore_begin', {
+        p_kind: kind,
+        p_file_key: `${file.name}:${file.size}:${file.lastModified}`,
+    });
+    if (error) throw error;
+
+    const progress: RestoreProgress = {
+        phase: 'staging',
+        table: null,
+        bytesRead: 0,
+        totalBytes: file.size,
+        stagedRows: 0,
+        appliedRows: 0,
+        totalRows: 0,
+        resumed: job.resumed,
+    };
+    const report = () => onProgress?.({ ...progress });
+
+    // Jobs interrupted while applying already have every batch
+    const header = job.status === 'staging'
+        ? await stageFile(file, kind, job, progress, report)
+        : {};
+
+    const { data: staged, error: finishError } = await (supabase.rpc as any)('restore_finish_staging', {
+        p_job_id: job.job_id,
+        p_header: header,
+    });
+    if (finishError) throw finishError;
+
+    progress.phase = 'applying';
+    progress.totalRows = staged.rows;
+    progress.appliedRows = staged.applied_rows;
+    report();
+
+    for (;;) {
+        const { data, error: applyError } = await (supabase.rpc as any)('restore_apply', {
+            p_job_id: job.job_id,
+            p_max_rows: RESTORE_APPLY_ROWS,
+        });
+        if (applyError) throw applyError;
+        if (!data.success) throw new Error(data.message);
+
+        progress.table = data.table;
+        progress.appliedRows += data.applied_rows;
+        if (data.done) {
+            progress.phase = 'done';
+            report();
+            return { jobId: job.job_id, restored: data.restored || {}, resumed: job.resumed };
+        }
+        report();
+    }
+}
+
+/** Stream the file and upload its rows; returns the backup header */
+async function stageFile(
+    file: File,
+    kind: RestoreKind,
+    job: RestoreJob,
+    progress: RestoreProgress,
+    report: () => void
+) {
+    const rowsKey = ROWS_KEY[kind];
+    const sections = new Set(job.sections || []);
+    const header: Record<string, unknown> = {};
+    const nextSeq = new Map<string, number>();
+    const ready: Batch[] = [];
+    let current: Batch | null = null;
+
+    const close = () => {
+        if (current && current.rows.length > 0) ready.push(current);
+        current = null;
+    };
+
+    const select = (path: JsonPath) =>
+        (path.length === 1 && HEADER_KEYS.includes(path[0] as string))
+        || (path[0] === rowsKey && sections.has(path[1] as string) && (
+            (path.length === 3 && typeof path[2] === 'number')
+            || (path.length === 2 && kind === 'user' && SINGLE_ROW_SECTIONS.includes(path[1] as string))
+        ));
+
+    const scanner = new JsonStreamScanner(select, (path, value, size) => {
+        if (path.length === 1) {
+            header[path[0]] = value;
+            return;
+        }
+        // The export writes the header first; stop before uploading a foreign file
+        if (!isValidHeader(kind, header)) throw new Error('Formato de backup inválido');
+        if (value === null) return;
+
+        const section = path[1] as string;
+        if (current?.section !== section) {
+            close();
+            const seq = nextSeq.get(section) || 0;
+            nextSeq.set(section, seq + 1);
+            current = { section, seq, rows: [], bytes: 0 };
+        }
+        current.rows.push(value);
+        current.bytes += size;
+        if (current.rows.length >= RESTORE_BATCH_ROWS || current.bytes >= RESTORE_BATCH_BYTES) {
+            close();
+        }
+    });
+
+    const upload = async () => {
+        for (let batch = ready.shift(); batch; batch = ready.shift()) {
+            progress.table = batch.section;
+            // Uploaded before an interruption: already on the server
+            if (batch.seq >= (job.staged[batch.section] || 0)) {
+                const { error } = await (supabase.rpc as any)('restore_stage_batch', {
+                    p_job_id: job.job_id,
+                    p_section: batch.section,
+                    p_seq: batch.seq,
+                    p_rows: batch.rows,
+                });
+                if (error) throw error;
+            }
+            progress.stagedRows += batch.rows.length;
+        }
+    };
+
+    const reader = file.stream().getReader();
+    const decoder = new TextDecoder();
+    for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        scanner.write(decoder.decode(value, { stream: true }));
+        progress.bytesRead += value.byteLength;
+        await upload();
+        report();
+    }
+    scanner.write(decoder.decode());
+    scanner.end();
+    close();
+    await upload();
+
+    if (!isValidHeader(kind, header)) throw new Error('Formato de backup inválido');
+    return header;
+}
+
+/** One-line status for the restore buttons */
+export function formatRestoreProgress(progress: RestoreProgress) {
+    const table = progress.table ? ` · ${progress.table}` : '';
+    const resumed = progress.resumed ? ' (reanudado)' : '';
+    if (progress.phase === 'staging') {
+        const percent = progress.totalBytes > 0 ? Math.floor((progress.bytesRead / progress.totalBytes) * 100) : 0;
+        return `Subiendo backup: ${percent}% · ${progress.stagedRows.toLocaleString()} filas${table}${resumed}`;
+    }
+    return `Aplicando: ${progress.appliedRows.toLocaleString()} / ${progress.totalRows.toLocaleString()} filas${table}${resumed}`;
+}
@@ -0,0 +1,256 @@
+import type { SupabaseClient } from '@supabase/supabase-js';
+
+/**
+ * Chat Admission
+ * Per-agent / per-tenant concurrency caps in front of the n8n chat webhook.
+ * A visitor message first gets a slot (or waits in the agent's bounded
+ * queue), then calls the webhook under a timeout, then gives the slot back.
+ * When the queue is full, the wait is too long or admission itself is down
+ * the caller answers with the agent's fallback message instead of hanging.
+ * The ticket is sent to the chat-dispatch edge function, which checks it with
+ * verify_chat_slot before forwarding to n8n, so skipping admission in the
+ * browser gains nothing.
+ */
+
+export type AdmissionStatus = 'granted' | 'waiting' | 'rejected' | 'expired';
+
+export interface AdmissionDecision {
+    ticket: string | null;
+    status: AdmissionStatus;
+    /** Waiting tickets of the same agent ahead of this one */
+    position?: number;
+    depth?: number;
+    retry_after_ms?: number;
+}
+
+export type ReleaseOutcome = 'ok' | 'timeout' | 'error' | 'queue_timeout';
+
+export interface ChatAdmission {
+    /** Ask for a slot (no ticket) or poll a waiting ticket */
+    request(agentId: string, ticket?: string | null): Promise<AdmissionDecision>;
+    release(ticket: string, outcome: ReleaseOutcome): Promise<void>;
+}
+
+export interface AdmissionLimits {
+    agentMaxRunning: number;
+    agentMaxQueued: number;
+    tenantMaxRunning: number;
+}
+
+export type SlotResult<T> =
+    | { status: 'ok'; value: T; waitMs: number }
+    | { status: 'rejected' | 'queue_timeout' | 'unavailable'; waitMs: number; retryAfterMs: number };
+
+export const DEFAULT_QUEUE_TIMEOUT_MS = 15000;
+export const DEFAULT_RUN_TIMEOUT_MS = 60000;
+
+export class ChatTimeoutError extends Error {
+    constructor(ms: number) {
+        super(`El agente no respondió en ${Math.round(ms / 1000)} s`);
+        this.name = 'ChatTimeoutError';
+    }
+}
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
+
+/**
+ * Run `fn` holding a chat slot of the agent. Waits for a slot at most
+ * `queueTimeoutMs`; `fn` gets an AbortSignal that fires after `runTimeoutMs`
+ * and the slot's ticket to pass on to the webhook. If the admission backend
+ * itself fails `fn` is not called: the result is 'unavailable'.
+ */
+export const withChatSlot = async <T>(
+    admission: ChatAdmission,
+    agentId: string,
+    fn: (signal: AbortSignal, ticket: string | null) => Promise<T>,
+    options: { queueTimeoutMs?: number; runTimeoutMs?: number; pollMs?: number } = {}
+): Promise<SlotResult<T>> => {
+    const queueTimeoutMs = options.queueTimeoutMs ?? DEFAULT_QUEUE_TIMEOUT_MS;
+    const runTimeoutMs = options.runTimeoutMs ?? DEFAULT_RUN_TIMEOUT_MS;
+    const startedAt = Date.now();
+
+    // Leaving the queue is best effort: an unpolled ticket is dropped after 10 s
+    const leaveQueue = (ticket: string | null) => {
+        if (!ticket) return;
+        admission.release(ticket, 'queue_timeout')
+            .catch(err => console.error('[Admission] Error leaving the queue:', err));
+    };
+
+    let decision: AdmissionDecision | null = null;
+    try {
+        decision = await admission.request(agentId);
+        while (decision.status === 'waiting' && Date.now() - startedAt < queueTimeoutMs) {
+            await sleep(options.pollMs ?? decision.retry_after_ms ?? 250);
+            decision = await admission.request(agentId, decision.ticket);
+        }
+    } catch (error) {
+        console.warn('[Admission] Admission unavailable, answering with the fallback:', error);
+        leaveQueue(decision?.ticket ?? null);
+        return { status: 'unavailable', waitMs: Date.now() - startedAt, retryAfterMs: 5000 };
+    }
+
+    if (decision.status === 'waiting') {
+        leaveQueue(decision.ticket);
+        return { status: 'queue_timeout', waitMs: Date.now() - startedAt, retryAfterMs: 5000 };
+    }
+
+    if (decision.status === 'rejected' || decision.status === 'expired') {
+        return {
+            status: 'rejected',
+            waitMs: Date.now() - startedAt,
+            retryAfterMs: decision.retry_after_ms ?? 5000,
+        };
+    }
+
+    const waitMs = Date.now() - startedAt;
+    const controller = new AbortController();
+    let timedOut = false;
+    const timer = setTimeout(() => {
+        timedOut = true;
+        controller.abort();
+    }, runTimeoutMs);
+
+    let outcome: ReleaseOutcome = 'ok';
+    try {
+        const value = await fn(controller.signal, decision.ticket);
+        return { status: 'ok', value, waitMs };
+    } catch (error) {
+        outcome = timedOut ? 'timeout' : 'error';
+        throw timedOut ? new ChatTimeoutError(runTimeoutMs) : error;
+    } finally {
+        clearTimeout(timer);
+        if (decision.ticket) {
+            admission.release(decision.ticket, outcome)
+                .catch(err => console.error('[Admission] Error releasing slot:', err));
+        }
+    }
+};
+
+/**
+ * Admission backed by request_chat_slot / release_chat_slot
+ */
+export class SupabaseChatAdmission implements ChatAdmission {
+    constructor(private client: SupabaseClient<any, any, any>) { }
+
+    async request(agentId: string, ticket: string | null = null) {
+        const { data, error } = await (this.client.rpc as any)('request_chat_slot', {
+            p_agent_id: agentId,
+            p_ticket: ticket,
+        });
+
+        if (error) throw error;
+        return data as AdmissionDecision;
+    }
+
+    async release(ticket: string, outcome: ReleaseOutcome) {
+        const { error } = await (this.client.rpc as any)('release_chat_slot', {
+            p_ticket: ticket,
+            p_outcome: outcome,
+        });
+
+        if (error) throw error;
+    }
+}
+
+interface MemoryTicket {
+    id: string;
+    agentId: string;
+    tenantId: string;
+    status: 'waiting' | 'running';
+    createdAt: number;
+}
+
+/**
+ * In-memory admission with the same scheduling as the SQL functions.
+ * Local stand-in for tests and benchmarks (benchmarks/chat_admission.ts).
+ */
+export class MemoryChatAdmission implements ChatAdmission {
+    tickets: MemoryTicket[] = [];
+    metrics = new Map<string, { admitted: number; rejected: number; queueTimeouts: number; waitMsTotal: number; depthMax: number }>();
+    private nextId = 1;
+
+    constructor(
+        private agents: Record<string, { tenantId: string }>,
+        private limits: AdmissionLimits
+    ) { }
+
+    async request(agentId: string, ticket: string | null = null): Promise<AdmissionDecision> {
+        const tenantId = this.agents[agentId]?.tenantId;
+        if (!tenantId) throw new Error('Agent not found');
+
+        const depth = this.waiting(agentId).length;
+        let current: MemoryTicket | undefined;
+
+        if (!ticket) {
+            if (depth >= this.limits.agentMaxQueued) {
+                this.metricsFor(agentId).rejected++;
+                return { ticket: null, status: 'rejected', depth, retry_after_ms: 5000 };
+            }
+            current = { id: String(this.nextId++), agentId, tenantId, status: 'waiting', createdAt: Date.now() };
+            this.tickets.push(current);
+            const metrics = this.metricsFor(agentId);
+            metrics.depthMax = Math.max(metrics.depthMax, depth + 1);
+        } else {
+            current = this.tickets.find(t => t.id === ticket);
+            if (!current) return { ticket, status: 'expired' };
+        }
+
+        if (current.status === 'waiting') this.grant(tenantId);
+        if (current.status === 'running') return { ticket: current.id, status: 'granted' };
+
+        const position = this.waiting(agentId).filter(t => t.createdAt < current!.createdAt).length;
+        return {
+            ticket: current.id,
+            status: 'waiting',
+            position,
+            depth: this.waiting(agentId).length,
+            retry_after_ms: Math.min(250 * (position + 1), 2000),
+        };
+    }
+
+    async release(ticket: string, outcome: ReleaseOutcome) {
+        const index = this.tickets.findIndex(t => t.id === ticket);
+        if (index < 0) return;
+
+        const [released] = this.tickets.splice(index, 1);
+        if (released.status === 'waiting') {
+            this.metricsFor(released.agentId).queueTimeouts++;
+        } else {
+            this.grant(released.tenantId);
+        }
+    }
+
+    private grant(tenantId: string) {
+        const running = (filter: (t: MemoryTicket) => boolean) =>
+            this.tickets.filter(t => t.status === 'running' && filter(t)).length;
+
+        let tenantRunning = running(t => t.tenantId === tenantId);
+        while (tenantRunning < this.limits.tenantMaxRunning) {
+            const candidates = this.tickets
+                .filter(t => t.tenantId === tenantId && t.status === 'waiting')
+                .map(t => ({ ticket: t, agentRunning: running(r => r.agentId === t.agentId) }))
+                .filter(c => c.agentRunning < this.limits.agentMaxRunning)
+                .sort((a, b) => a.agentRunning - b.agentRunning || a.ticket.createdAt - b.ticket.createdAt);
+
+            const next = candidates[0]?.ticket;
+            if (!next) return;
+
+            next.status = 'running';
+            const metrics = this.metricsFor(next.agentId);
+            metrics.admitted++;
+            metrics.waitMsTotal += Date.now() - next.createdAt;
+            tenantRunning++;
+        }
+    }
+
+    private waiting(agentId: string) {
+        return this.tickets.filter(t => t.agentId === agentId && t.status === 'waiting');
+    }
+
+    private metricsFor(agentId: string) {
+        if (!this.metrics.has(agentId)) {
+            this.metrics.set(agentId, { admitted: 0, rejected: 0, queueTimeouts: 0, waitMsTotal: 0, depthMax: 0 });
+        }
+        return this.metrics.get(agentId)!;
+    }
+}
@@ -0,0 +1,110 @@
+import { supabase } from '@/integrations/supabase/client';
+import { getWebhookUrl } from '@/hooks/useWebhookUrl';
+import { cleanAgentResponse } from './agentResponse';
+
+export { cleanAgentResponse };
+
+/**
+ * Chat History
+ * Playground history (n8n_chat_histories) served already normalized by the
+ * get_chat_history_page RPC, newest page first.
+ */
+
+export interface HistoryMessage {
+    id: string;
+    role: 'user' | 'assistant';
+    content: string;
+    /** null for rows stored before created_at existed */
+    timestamp: Date | null;
+}
+
+export interface HistoryPage {
+    /** Oldest first, ready to prepend */
+    messages: HistoryMessage[];
+    /** Pass as `before` to load the previous page; null when there is none */
+    nextCursor: number | null;
+}
+
+export const HISTORY_PAGE_SIZE = 50;
+
+/**
+ * Normalize raw n8n_chat_histories records (legacy history webhook)
+ */
+export const normalizeHistoryRecords = (data: any): HistoryMessage[] => {
+    const records = Array.isArray(data) ? data : (data?.[0] ? [data[0]] : []);
+    const messages: HistoryMessage[] = [];
+
+    for (const record of records) {
+        const msgData = typeof record.message === 'string'
+            ? JSON.parse(record.message)
+            : record.message;
+
+        if (msgData && msgData.content) {
+            messages.push({
+                id: record.id?.toString() || Date.now().toString(),
+                role: msgData.type === 'human' ? 'user' : 'assistant',
+                content: msgData.type === 'ai' ? cleanAgentResponse(msgData.content) : msgData.content,
+                timestamp: new Date(record.created_at || Date.now()),
+            });
+        }
+    }
+
+    return messages;
+};
+
+/**
+ * Whole session through the history webhook. Only used when the
+ * get_chat_history_page RPC is not available.
+ */
+const fetchLegacyHistory = async (sessionId: string): Promise<HistoryPage> => {
+    const webhookUrl = await getWebhookUrl('VITE_N8N_GET_HISTORY_WEBHOOK_URL');
+    if (!webhookUrl) return { messages: [], nextCursor: null };
+
+    const response = await fetch(webhookUrl, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ agentId: sessionId }),
+    });
+
+    if (!response.ok) throw new Error('Error al cargar historial');
+
+    return { messages: normalizeHistoryRecords(await response.json()), nextCursor: null };
+};
+
+/**
+ * One page of history. `before` is the cursor returned by the previous page.
+ */
+export const fetchChatHistoryPage = async (
+    sessionId: string,
+    before: number | null = null,
+    limit: number = HISTORY_PAGE_SIZE
+): Promise<HistoryPage> => {
+    const { data, error } = await (supabase.rpc as any)('get_chat_history_page', {
+        p_session_id: sessionId,
+        p_before_id: before,
+        p_limit: limit,
+    });
+
+    if (error) {
+        // RPC no instalado todavía: usar el webhook (sin paginación)
+        if (before === null && (error.code === 'PGRST202' || error.code === '42883')) {
+            console.warn('get_chat_history_page not available, using history webhook');
+            return fetchLegacyHistory(sessionId);
+        }
+        throw error;
+    }
+
+    const rows = (data || []) as Array<{ id: number; role: 'user' | 'assistant'; content: string; created_at: string | null }>;
+
+    return {
+        messages: rows
+            .map(row => ({
+                id: row.id.toString(),
+                role: row.role,
+                content: row.content,
+                timestamp: row.created_at ? new Date(row.created_at) : null,
+            }))
+            .reverse(),
+        nextCursor: rows.length === limit ? rows[rows.length - 1].id : null,
+    };
+};
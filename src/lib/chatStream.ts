@@ -0,0 +1,157 @@
+/**
+ * Chat Stream
+ * Calls the n8n chat webhook asking for a streamed answer and hands tokens to
+ * the UI as they arrive. Understands SSE (`data: ...` lines) and NDJSON
+ * (n8n "streaming" response mode: {"type":"begin|item|end","content":"..."}).
+ * Any other response is read whole and parsed like before (buffered mode).
+ */
+
+export interface ChatStreamResult {
+    /** Full answer text */
+    content: string;
+    /** Parsed body in buffered mode, last event in streaming mode */
+    data: any;
+    /** True when tokens were delivered progressively */
+    streamed: boolean;
+}
+
+export interface ChatStreamOptions {
+    onToken?: (token: string, content: string) => void;
+    signal?: AbortSignal;
+}
+
+interface StreamEvent {
+    token?: string;
+    done?: boolean;
+    data?: any;
+}
+
+/**
+ * Extract the answer from a buffered webhook response (all known n8n shapes)
+ */
+export const extractChatContent = (data: any): string => {
+    if (typeof data === 'string') return data;
+    return data?.output || data?.response || data?.message
+        || data?.[0]?.output || data?.[0]?.response || '';
+};
+
+/**
+ * Parse one SSE `data:` payload or NDJSON line. Returns null when the line is
+ * not a stream event (e.g. the first line of a plain JSON body).
+ */
+const parseStreamLine = (line: string, sse: boolean): StreamEvent | null => {
+    let payload = line;
+    if (sse) {
+        if (!line.startsWith('data:')) return { };
+        payload = line.slice(5).trimStart();
+        if (payload === '[DONE]') return { done: true };
+    }
+
+    try {
+        const event = JSON.parse(payload);
+        if (event && typeof event === 'object' && !Array.isArray(event)) {
+            if (event.type === 'item' || event.type === 'token' || event.type === 'delta') {
+                return { token: String(event.content ?? event.token ?? event.delta ?? '') };
+            }
+            if (event.type === 'begin') return { };
+            if (event.type === 'end' || event.type === 'done') return { done: true, data: event };
+            if (event.type === 'error') {
+                throw new Error(event.content || event.message || 'Error en el stream');
+            }
+        }
+        // JSON that is not a stream event: SSE carries whole tokens as JSON strings
+        if (sse && typeof event === 'string') return { token: event };
+        return sse ? { data: event } : null;
+    } catch (error) {
+        if (error instanceof SyntaxError) {
+            return sse ? { token: payload } : null;
+        }
+        throw error;
+    }
+};
+
+/**
+ * POST to the chat webhook and stream the answer when the webhook supports it
+ */
+export const postChatWebhook = async (
+    webhookUrl: string,
+    payload: Record<string, unknown>,
+    options: ChatStreamOptions = {}
+): Promise<ChatStreamResult> => {
+    const response = await fetch(webhookUrl, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream, application/x-ndjson, application/json',
+        },
+        body: JSON.stringify({ ...payload, stream: true }),
+        signal: options.signal,
+    });
+
+    if (!response.ok) {
+        const errorText = await response.text().catch(() => '');
+        throw new Error(`Error HTTP: ${response.status}${errorText ? ` - ${errorText}` : ''}`);
+    }
+
+    // Sin ReadableStream (navegadores viejos, proxies): modo buffered
+    if (!response.body) {
+        const data = await response.json();
+        return { content: extractChatContent(data), data, streamed: false };
+    }
+
+    const sse = (response.headers.get('content-type') || '').includes('text/event-stream');
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+
+    let raw = '';
+    let pending = '';
+    let content = '';
+    let lastData: any = null;
+    let streaming: boolean | null = sse ? true : null;
+
+    const handleLine = (line: string) => {
+        const trimmed = line.trim();
+        if (!trimmed || streaming === false) return;
+
+        const event = parseStreamLine(trimmed, sse);
+        if (!event) {
+            // First line is not an event: this is a regular JSON body
+            if (streaming === null) streaming = false;
+            return;
+        }
+
+        streaming = true;
+        if (event.data) lastData = event.data;
+        if (event.token) {
+            content += event.token;
+            options.onToken?.(event.token, content);
+        }
+    };
+
+    for (;;) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        const text = decoder.decode(value, { stream: true });
+        raw += text;
+        pending += text;
+
+        const lines = pending.split('\n');
+        pending = lines.pop() ?? '';
+        lines.forEach(handleLine);
+    }
+
+    const tail = decoder.decode();
+    raw += tail;
+    pending += tail;
+    if (pending) handleLine(pending);
+
+    if (streaming) {
+        // Some workflows send the final answer only in the end event
+        if (!content && lastData) content = extractChatContent(lastData);
+        return { content, data: lastData, streamed: true };
+    }
+
+    const data = JSON.parse(raw);
+    return { content: extractChatContent(data), data, streamed: false };
+};
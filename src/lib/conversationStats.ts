@@ -0,0 +1,47 @@
+import { supabase } from '@/integrations/supabase/client';
+
+/**
+ * Conversation Stats
+ * messages_count / last_message_at of widget conversations read through
+ * ah_public_conversation_stats (20260129_coalesced_conversation_stats.sql):
+ * the stored counters plus the deltas not flushed yet. The columns on
+ * ah_public_conversations trail the messages by up to one flush.
+ */
+
+export interface ConversationStats {
+    conversation_id: string;
+    agent_id: string;
+    messages_count: number;
+    last_message_at: string | null;
+    started_at: string;
+}
+
+/**
+ * Stats of the conversations started since `since` that the caller can see,
+ * optionally only those of `agentIds`
+ */
+export const fetchConversationStats = async (since: string, agentIds?: string[]) => {
+    let query = (supabase as any)
+        .from('ah_public_conversation_stats')
+        .select('conversation_id, agent_id, messages_count, last_message_at, started_at')
+        .gte('started_at', since);
+
+    if (agentIds) query = query.in('agent_id', agentIds);
+
+    const { data, error } = await query;
+    if (error) throw error;
+    return (data || []) as ConversationStats[];
+};
+
+/**
+ * Conversation rows started since `since`, with their counters replaced by
+ * the exact ones
+ */
+export const withExactStats = async <T extends { id: string }>(conversations: T[], since: string) => {
+    const stats = new Map((await fetchConversationStats(since)).map(s => [s.conversation_id, s]));
+
+    return conversations.map(c => {
+        const exact = stats.get(c.id);
+        return exact ? { ...c, messages_count: exact.messages_count, last_message_at: exact.last_message_at } : c;
+    });
+};
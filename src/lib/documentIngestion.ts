@@ -0,0 +1,199 @@
+import { supabase } from '@/integrations/supabase/client';
+import { getEmbeddingsTarget } from './embeddings';
+import type { ChunkHash, IngestionDocument, IngestionJob, IngestionQueue, JobProcessor, JobResult } from './ingestionQueue';
+
+export * from './ingestionQueue';
+
+/**
+ * Document Ingestion
+ * Per-document vectorization queue with content-hash deduplication and
+ * incremental (changed chunks only) re-embedding. The queue logic itself is
+ * in ingestionQueue.ts; this module backs it with Supabase and n8n.
+ */
+
+/**
+ * Queue backed by ah_document_jobs / ah_document_chunks
+ */
+export class SupabaseIngestionQueue implements IngestionQueue {
+    async enqueue(agentId: string) {
+        const { data, error } = await (supabase.rpc as any)('enqueue_document_jobs', { p_agent_id: agentId });
+
+        if (error) throw error;
+        return (data || []) as IngestionJob[];
+    }
+
+    async claim(agentId: string, limit: number) {
+        const { data, error } = await (supabase.rpc as any)('claim_document_jobs', {
+            p_agent_id: agentId,
+            p_limit: limit,
+        });
+
+        if (error) throw error;
+        return (data || []) as IngestionJob[];
+    }
+
+    async complete(job: IngestionJob, result: JobResult) {
+        if (result.chunks) {
+            const { error: chunkError } = await (supabase as any)
+                .from('ah_document_chunks')
+                .upsert(result.chunks.map(c => ({
+                    document_id: job.document_id,
+                    agent_id: job.agent_id,
+                    chunk_index: c.index,
+                    chunk_hash: c.hash,
+                })), { onConflict: 'document_id,chunk_index' });
+
+            if (chunkError) throw chunkError;
+
+            // Chunks past the new end belong to the previous version of the document
+            const { error: staleError } = await (supabase as any)
+                .from('ah_document_chunks')
+                .delete()
+                .eq('document_id', job.document_id)
+                .gte('chunk_index', result.chunks.length);
+
+            if (staleError) throw staleError;
+        }
+
+        const { error } = await (supabase as any)
+            .from('ah_document_jobs')
+            .update({
+                status: result.chunksEmbedded === 0 && result.chunksTotal > 0 ? 'skipped' : 'succeeded',
+                chunks_total: result.chunksTotal,
+                chunks_embedded: result.chunksEmbedded,
+                chunks_skipped: result.chunksSkipped,
+                error_message: null,
+                finished_at: new Date().toISOString(),
+            })
+            .eq('id', job.id);
+
+        if (error) throw error;
+    }
+
+    async fail(job: IngestionJob, message: string) {
+        const requeue = job.attempts < job.max_attempts;
+        const { error } = await (supabase as any)
+            .from('ah_document_jobs')
+            .update({
+                status: requeue ? 'queued' : 'failed',
+                error_message: message,
+                locked_at: null,
+                finished_at: requeue ? null : new Date().toISOString(),
+            })
+            .eq('id', job.id);
+
+        if (error) throw error;
+        return requeue;
+    }
+
+    async getChunkHashes(documentId: string) {
+        const { data, error } = await (supabase as any)
+            .from('ah_document_chunks')
+            .select('chunk_index, chunk_hash')
+            .eq('document_id', documentId)
+            .order('chunk_index', { ascending: true });
+
+        if (error) throw error;
+        return (data || []).map((c: { chunk_index: number; chunk_hash: string }) => ({
+            index: c.chunk_index,
+            hash: c.chunk_hash,
+        }));
+    }
+}
+
+/**
+ * Processor that sends one document per call to the n8n vectorize webhook.
+ * The already-embedded chunk hashes are sent along so the workflow can skip
+ * unchanged chunks; if it answers with `chunks`, they are stored for next time.
+ * Jobs of documents not in `documents` (queued from another tab) are loaded
+ * from ah_documents.
+ */
+export const createWebhookProcessor = (
+    queue: IngestionQueue,
+    webhookUrl: string,
+    agent: { id: string; name: string },
+    documents: IngestionDocument[]
+): JobProcessor => {
+    const byId = new Map(documents.map(d => [d.id, d]));
+
+    const loadDocument = async (documentId: string) => {
+        if (byId.has(documentId)) return byId.get(documentId)!;
+
+        const { data, error } = await (supabase as any)
+            .from('ah_documents')
+            .select('id, name, type, url, file_path')
+            .eq('id', documentId)
+            .maybeSingle();
+
+        if (error) throw error;
+        if (!data) throw new Error('Documento no encontrado');
+        byId.set(documentId, data as IngestionDocument);
+        return data as IngestionDocument;
+    };
+
+    return async (job) => {
+        const doc = await loadDocument(job.document_id);
+
+        const knownChunks = await queue.getChunkHashes(doc.id);
+
+        const response = await fetch(webhookUrl, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                agentId: agent.id,
+                agentName: agent.name,
+                ...getEmbeddingsTarget(agent.id),
+                jobId: job.id,
+                attempt: job.attempts,
+                documents: [{
+                    id: doc.id,
+                    name: doc.name,
+                    type: doc.type,
+                    url: doc.url,
+                    file_path: doc.file_path,
+                }],
+                knownChunks,
+                timestamp: new Date().toISOString(),
+            }),
+        });
+
+        if (!response.ok) {
+            throw new Error(`Error HTTP: ${response.status}`);
+        }
+
+        // Manejar diferentes formatos de respuesta de n8n
+        const data = await response.json();
+        const raw = data[0]?.results || data.results || data || [];
+        const result = Array.isArray(raw) ? raw[0] : raw;
+
+        if (!result?.success) {
+            throw new Error(result?.error || 'La vectorización no fue exitosa');
+        }
+
+        const chunks: ChunkHash[] | undefined = Array.isArray(result.chunks) ? result.chunks : undefined;
+        const chunksTotal = result.chunks_total ?? chunks?.length ?? 0;
+        const chunksEmbedded = result.chunks_embedded ?? chunksTotal;
+
+        return {
+            chunksTotal,
+            chunksEmbedded,
+            chunksSkipped: result.chunks_skipped ?? Math.max(0, chunksTotal - chunksEmbedded),
+            chunks,
+        };
+    };
+};
+
+/**
+ * Look up an existing document of the agent with the same content
+ */
+export const findDuplicateDocument = async (agentId: string, contentHash: string) => {
+    const { data, error } = await (supabase as any)
+        .from('ah_documents')
+        .select('id, name, status')
+        .eq('agent_id', agentId)
+        .eq('content_hash', contentHash)
+        .maybeSingle();
+
+    if (error) throw error;
+    return data as { id: string; name: string; status: string } | null;
+};
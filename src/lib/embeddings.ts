@@ -0,0 +1,20 @@
+/**
+ * Embeddings Store
+ * All agents share the ah_embeddings table; rows are scoped by agent_id.
+ * Webhook payloads carry these fields so n8n can read/write the right rows.
+ */
+
+export const EMBEDDINGS_TABLE = 'ah_embeddings';
+// Insert entry for the vector store node: resolves agent_id from metadata
+export const EMBEDDINGS_STORE = 'ah_embeddings_store';
+export const EMBEDDINGS_QUERY = 'match_embeddings';
+
+/**
+ * Vector store target for an agent, spread into n8n webhook payloads.
+ * Rows written by the workflow must carry metadata.agent_id (the filter).
+ */
+export const getEmbeddingsTarget = (agentId: string) => ({
+    tableName: EMBEDDINGS_STORE,
+    queryName: EMBEDDINGS_QUERY,
+    filter: { agent_id: agentId },
+});
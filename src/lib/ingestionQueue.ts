@@ -0,0 +1,345 @@
+import type { DocumentType } from '@/types/database';
+
+/**
+ * Ingestion Queue
+ * The vectorization job queue without a Supabase client: chunk hashing and
+ * diffing, the drain loop, the local processor and MemoryIngestionQueue.
+ * documentIngestion.ts adds the Supabase queue and the n8n processor on top,
+ * and re-exports all of this.
+ */
+
+export type IngestionJobStatus = 'queued' | 'running' | 'succeeded' | 'failed' | 'skipped';
+
+export interface IngestionJob {
+    id: string;
+    document_id: string;
+    agent_id: string;
+    user_id: string;
+    status: IngestionJobStatus;
+    attempts: number;
+    max_attempts: number;
+    chunks_total: number;
+    chunks_embedded: number;
+    chunks_skipped: number;
+    error_message: string | null;
+}
+
+export interface IngestionDocument {
+    id: string;
+    name: string;
+    type: DocumentType;
+    url: string | null;
+    file_path: string | null;
+}
+
+export interface ChunkHash {
+    index: number;
+    hash: string;
+}
+
+export interface JobResult {
+    chunksTotal: number;
+    chunksEmbedded: number;
+    chunksSkipped: number;
+    chunks?: ChunkHash[];
+}
+
+export type JobProcessor = (job: IngestionJob) => Promise<JobResult>;
+
+export interface IngestionProgress {
+    total: number;
+    done: number;
+    failed: number;
+    running: number;
+    job?: IngestionJob;
+}
+
+export interface IngestionSummary {
+    succeeded: number;
+    skipped: number;
+    failed: number;
+    retried: number;
+}
+
+/**
+ * Storage backend for the job queue. SupabaseIngestionQueue (documentIngestion)
+ * is the real one; MemoryIngestionQueue is the local stand-in.
+ */
+export interface IngestionQueue {
+    enqueue(agentId: string): Promise<IngestionJob[]>;
+    claim(agentId: string, limit: number): Promise<IngestionJob[]>;
+    complete(job: IngestionJob, result: JobResult): Promise<void>;
+    /** Returns true when the job was put back in the queue for another attempt */
+    fail(job: IngestionJob, message: string): Promise<boolean>;
+    getChunkHashes(documentId: string): Promise<ChunkHash[]>;
+}
+
+export const DEFAULT_CHUNK_SIZE = 1000;
+export const DEFAULT_CHUNK_OVERLAP = 200;
+export const DEFAULT_INGESTION_CONCURRENCY = 3;
+
+/**
+ * SHA-256 of a file, buffer or string as lowercase hex
+ */
+export const hashContent = async (content: Blob | ArrayBuffer | string): Promise<string> => {
+    let buffer: ArrayBuffer;
+    if (typeof content === 'string') {
+        buffer = new TextEncoder().encode(content).buffer as ArrayBuffer;
+    } else if (content instanceof ArrayBuffer) {
+        buffer = content;
+    } else {
+        buffer = await content.arrayBuffer();
+    }
+
+    const digest = await crypto.subtle.digest('SHA-256', buffer);
+    return Array.from(new Uint8Array(digest))
+        .map(b => b.toString(16).padStart(2, '0'))
+        .join('');
+};
+
+/**
+ * Split text in fixed-size overlapping chunks. Boundaries depend only on the
+ * text before them, so an edit only changes the chunks that contain it and
+ * the ones after it if the length changed.
+ */
+export const chunkText = (
+    text: string,
+    size: number = DEFAULT_CHUNK_SIZE,
+    overlap: number = DEFAULT_CHUNK_OVERLAP
+): string[] => {
+    const normalized = text.replace(/\r\n/g, '\n').trim();
+    if (!normalized) return [];
+
+    const step = Math.max(1, size - overlap);
+    const chunks: string[] = [];
+    for (let start = 0; start < normalized.length; start += step) {
+        chunks.push(normalized.slice(start, start + size));
+        if (start + size >= normalized.length) break;
+    }
+    return chunks;
+};
+
+export const hashChunks = async (chunks: string[]): Promise<ChunkHash[]> => {
+    const hashes = await Promise.all(chunks.map(chunk => hashContent(chunk)));
+    return hashes.map((hash, index) => ({ index, hash }));
+};
+
+/**
+ * Compare the chunk hashes already embedded with the new ones.
+ * `changed` must be (re-)embedded, `removed` must be deleted from the store.
+ */
+export const diffChunks = (previous: ChunkHash[], next: ChunkHash[]) => {
+    const previousByIndex = new Map(previous.map(c => [c.index, c.hash]));
+    const changed = next.filter(c => previousByIndex.get(c.index) !== c.hash);
+    const removed = previous
+        .filter(c => c.index >= next.length)
+        .map(c => c.index);
+
+    return { changed, removed, unchanged: next.length - changed.length };
+};
+
+/**
+ * Run queued jobs for an agent with at most `concurrency` in flight.
+ * Each worker claims one job at a time until the queue is empty.
+ */
+export const drainIngestionQueue = async (
+    queue: IngestionQueue,
+    agentId: string,
+    processor: JobProcessor,
+    options: {
+        concurrency?: number;
+        onProgress?: (progress: IngestionProgress) => void;
+    } = {}
+): Promise<IngestionSummary> => {
+    const concurrency = Math.max(1, options.concurrency ?? DEFAULT_INGESTION_CONCURRENCY);
+    const summary: IngestionSummary = { succeeded: 0, skipped: 0, failed: 0, retried: 0 };
+
+    const open = await queue.enqueue(agentId);
+    const progress: IngestionProgress = { total: open.length, done: 0, failed: 0, running: 0 };
+    const report = (job?: IngestionJob) => options.onProgress?.({ ...progress, job });
+
+    report();
+
+    const worker = async () => {
+        for (;;) {
+            const [job] = await queue.claim(agentId, 1);
+            if (!job) return;
+
+            progress.running++;
+            report(job);
+
+            try {
+                const result = await processor(job);
+                await queue.complete(job, result);
+
+                if (result.chunksEmbedded === 0 && result.chunksTotal > 0) {
+                    summary.skipped++;
+                } else {
+                    summary.succeeded++;
+                }
+                progress.done++;
+            } catch (error) {
+                const message = error instanceof Error ? error.message : String(error);
+                const requeued = await queue.fail(job, message);
+
+                if (requeued) {
+                    summary.retried++;
+                } else {
+                    summary.failed++;
+                    progress.failed++;
+                    progress.done++;
+                }
+            } finally {
+                progress.running--;
+                report(job);
+            }
+        }
+    };
+
+    await Promise.all(Array.from({ length: concurrency }, worker));
+    return summary;
+};
+
+export interface MemoryDocument {
+    id: string;
+    agent_id: string;
+    user_id: string;
+    content_hash: string | null;
+    status: string;
+}
+
+/**
+ * In-memory queue with the same semantics as the SQL functions: one open job
+ * per document, content hashes unique per agent.
+ * Local stand-in for tests and benchmarks (benchmarks/document_ingestion.ts).
+ */
+export class MemoryIngestionQueue implements IngestionQueue {
+    documents: MemoryDocument[] = [];
+    jobs: IngestionJob[] = [];
+    chunks = new Map<string, ChunkHash[]>();
+    private nextId = 1;
+
+    constructor(private maxAttempts: number = 3) { }
+
+    /**
+     * Add a pending document, or return the agent's document with the same
+     * content instead (idx_documents_agent_content_hash)
+     */
+    addDocument(doc: Omit<MemoryDocument, 'status'>) {
+        const duplicate = this.documents.find(d =>
+            d.agent_id === doc.agent_id && doc.content_hash && d.content_hash === doc.content_hash);
+        if (duplicate) return { document: duplicate, duplicate: true };
+
+        const document: MemoryDocument = { ...doc, status: 'pending' };
+        this.documents.push(document);
+        return { document, duplicate: false };
+    }
+
+    async enqueue(agentId: string) {
+        for (const doc of this.documents) {
+            if (doc.agent_id !== agentId || !['pending', 'failed'].includes(doc.status)) continue;
+            const hasOpenJob = this.jobs.some(j =>
+                j.document_id === doc.id && (j.status === 'queued' || j.status === 'running'));
+            if (hasOpenJob) continue;
+
+            this.jobs.push({
+                id: String(this.nextId++),
+                document_id: doc.id,
+                agent_id: agentId,
+                user_id: doc.user_id,
+                status: 'queued',
+                attempts: 0,
+                max_attempts: this.maxAttempts,
+                chunks_total: 0,
+                chunks_embedded: 0,
+                chunks_skipped: 0,
+                error_message: null,
+            });
+        }
+        return this.jobs
+            .filter(j => j.agent_id === agentId && (j.status === 'queued' || j.status === 'running'))
+            .map(j => ({ ...j }));
+    }
+
+    async claim(agentId: string, limit: number) {
+        const claimed = this.jobs
+            .filter(j => j.agent_id === agentId && j.status === 'queued')
+            .slice(0, limit);
+
+        for (const job of claimed) {
+            job.status = 'running';
+            job.attempts++;
+            this.setDocumentStatus(job.document_id, 'processing');
+        }
+        return claimed.map(j => ({ ...j }));
+    }
+
+    async complete(job: IngestionJob, result: JobResult) {
+        if (result.chunks) this.chunks.set(job.document_id, result.chunks);
+
+        const stored = this.find(job.id);
+        stored.status = result.chunksEmbedded === 0 && result.chunksTotal > 0 ? 'skipped' : 'succeeded';
+        stored.chunks_total = result.chunksTotal;
+        stored.chunks_embedded = result.chunksEmbedded;
+        stored.chunks_skipped = result.chunksSkipped;
+        stored.error_message = null;
+        this.setDocumentStatus(job.document_id, 'indexed');
+    }
+
+    async fail(job: IngestionJob, message: string) {
+        const stored = this.find(job.id);
+        const requeue = stored.attempts < stored.max_attempts;
+        stored.status = requeue ? 'queued' : 'failed';
+        stored.error_message = message;
+        if (!requeue) this.setDocumentStatus(job.document_id, 'failed');
+        return requeue;
+    }
+
+    async getChunkHashes(documentId: string) {
+        return this.chunks.get(documentId) || [];
+    }
+
+    private find(jobId: string) {
+        const job = this.jobs.find(j => j.id === jobId);
+        if (!job) throw new Error(`Unknown job ${jobId}`);
+        return job;
+    }
+
+    private setDocumentStatus(documentId: string, status: string) {
+        const doc = this.documents.find(d => d.id === documentId);
+        if (doc) doc.status = status;
+    }
+}
+
+/**
+ * Processor that chunks the document locally and only hands changed chunks
+ * to `embed`. benchmarks/document_ingestion.ts runs it on MemoryIngestionQueue.
+ */
+export const createLocalProcessor = (
+    queue: IngestionQueue,
+    loadText: (documentId: string) => Promise<string>,
+    embed: (documentId: string, chunks: Array<ChunkHash & { text: string }>, removed: number[]) => Promise<void>
+): JobProcessor => {
+    return async (job) => {
+        const text = await loadText(job.document_id);
+        const texts = chunkText(text);
+        const next = await hashChunks(texts);
+        const previous = await queue.getChunkHashes(job.document_id);
+        const { changed, removed, unchanged } = diffChunks(previous, next);
+
+        if (changed.length > 0 || removed.length > 0) {
+            await embed(
+                job.document_id,
+                changed.map(c => ({ ...c, text: texts[c.index] })),
+                removed
+            );
+        }
+
+        return {
+            chunksTotal: next.length,
+            chunksEmbedded: changed.length,
+            chunksSkipped: unchanged,
+            chunks: next,
+        };
+    };
+};
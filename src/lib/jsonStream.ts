@@ -0,0 +1,188 @@
+/**
+ * JSON Stream
+ * Incremental scanner for JSON documents too large to JSON.parse at once
+ * (backups). Text is fed chunk by chunk; the scanner keeps only the path to
+ * the current value and hands the values picked by `select(path)` to
+ * `onValue`, each parsed on its own. Everything else is skipped without being
+ * built, so memory stays at one chunk plus the largest selected value.
+ *
+ *   { "tables": { "ah_agents": [ {...}, {...} ] } }
+ *   select(['tables', 'ah_agents', 0]) -> true: the first agent is emitted
+ */
+
+export type JsonPath = (string | number)[];
+
+interface Frame {
+    array: boolean;
+    /** Current key (objects); null while the next key is expected */
+    key: string | null;
+    /** Current element (arrays) */
+    index: number;
+}
+
+type Mode = 'structure' | 'key' | 'skipString' | 'skipLiteral' | 'capture';
+
+const isWhitespace = (c: string) => c === ' ' || c === '\n' || c === '\r' || c === '\t';
+const isDelimiter = (c: string) => c === ',' || c === '}' || c === ']' || isWhitespace(c);
+
+export class JsonStreamScanner {
+    private stack: Frame[] = [];
+    private mode: Mode = 'structure';
+    private escaped = false;
+    private parts: string[] = [];
+    // Selected value being buffered
+    private capturePath: JsonPath = [];
+    private captureDepth = 0;
+    private captureInString = false;
+    private captureScalar = false;
+
+    constructor(
+        private select: (path: JsonPath) => boolean,
+        private onValue: (path: JsonPath, value: unknown, size: number) => void
+    ) {}
+
+    write(chunk: string) {
+        let i = 0;
+        while (i < chunk.length) {
+            switch (this.mode) {
+                case 'capture': i = this.scanCapture(chunk, i); break;
+                case 'key': i = this.scanString(chunk, i, true); break;
+                case 'skipString': i = this.scanString(chunk, i, false); break;
+                case 'skipLiteral': i = this.scanLiteral(chunk, i); break;
+                default: i = this.scanStructure(chunk, i);
+            }
+        }
+    }
+
+    /** Call after the last chunk; throws when the document is cut short */
+    end() {
+        if (this.mode === 'capture' && this.captureScalar) this.finishCapture('');
+        if (this.mode === 'skipLiteral') this.mode = 'structure';
+        if (this.mode !== 'structure' || this.stack.length > 0) {
+            throw new Error('Unexpected end of JSON input');
+        }
+    }
+
+    private path(): JsonPath {
+        return this.stack.map(frame => (frame.array ? frame.index : frame.key as string));
+    }
+
+    private scanStructure(chunk: string, i: number) {
+        const c = chunk[i];
+        const top = this.stack[this.stack.length - 1];
+
+        if (isWhitespace(c) || c === ':') return i + 1;
+        if (c === ',') {
+            if (top?.array) top.index++;
+            else if (top) top.key = null;
+            return i + 1;
+        }
+        if (c === '}' || c === ']') {
+            this.stack.pop();
+            return i + 1;
+        }
+        if (c === '"' && top && !top.array && top.key === null) {
+            this.mode = 'key';
+            this.parts = [];
+            return i + 1;
+        }
+
+        // A value starts here
+        const path = this.path();
+        if (this.select(path)) {
+            this.mode = 'capture';
+            this.capturePath = path;
+            this.captureDepth = 0;
+            this.captureInString = false;
+            this.captureScalar = c !== '{' && c !== '[' && c !== '"';
+            this.parts = [];
+            return this.scanCapture(chunk, i);
+        }
+        if (c === '{' || c === '[') {
+            this.stack.push({ array: c === '[', key: null, index: 0 });
+            return i + 1;
+        }
+        if (c === '"') {
+            this.mode = 'skipString';
+            return i + 1;
+        }
+        this.mode = 'skipLiteral';
+        return i + 1;
+    }
+
+    /** Object key (kept) or skipped string value, up to the closing quote */
+    private scanString(chunk: string, i: number, keep: boolean) {
+        for (let j = i; j < chunk.length; j++) {
+            const c = chunk[j];
+            if (this.escaped) {
+                this.escaped = false;
+            } else if (c === '\\') {
+                this.escaped = true;
+            } else if (c === '"') {
+                if (keep) {
+                    this.parts.push(chunk.slice(i, j));
+                    const raw = this.parts.join('');
+                    this.stack[this.stack.length - 1].key = raw.includes('\\') ? JSON.parse(`"${raw}"`) : raw;
+                    this.parts = [];
+                }
+                this.mode = 'structure';
+                return j + 1;
+            }
+        }
+        if (keep) this.parts.push(chunk.slice(i));
+        return chunk.length;
+    }
+
+    private scanLiteral(chunk: string, i: number) {
+        for (let j = i; j < chunk.length; j++) {
+            if (isDelimiter(chunk[j])) {
+                this.mode = 'structure';
+                return j;
+            }
+        }
+        return chunk.length;
+    }
+
+    private scanCapture(chunk: string, i: number) {
+        for (let j = i; j < chunk.length; j++) {
+            const c = chunk[j];
+            if (this.captureScalar) {
+                if (isDelimiter(c)) {
+                    this.finishCapture(chunk.slice(i, j));
+                    return j;
+                }
+            } else if (this.captureInString) {
+                if (this.escaped) {
+                    this.escaped = false;
+                } else if (c === '\\') {
+                    this.escaped = true;
+                } else if (c === '"') {
+                    this.captureInString = false;
+                    if (this.captureDepth === 0) {
+                        this.finishCapture(chunk.slice(i, j + 1));
+                        return j + 1;
+                    }
+                }
+            } else if (c === '"') {
+                this.captureInString = true;
+            } else if (c === '{' || c === '[') {
+                this.captureDepth++;
+            } else if (c === '}' || c === ']') {
+                if (--this.captureDepth === 0) {
+                    this.finishCapture(chunk.slice(i, j + 1));
+                    return j + 1;
+                }
+            }
+        }
+        this.parts.push(chunk.slice(i));
+        return chunk.length;
+    }
+
+    private finishCapture(tail: string) {
+        this.parts.push(tail);
+        const text = this.parts.join('');
+        this.parts = [];
+        this.mode = 'structure';
+        this.onValue(this.capturePath, JSON.parse(text), text.length);
+    }
+}
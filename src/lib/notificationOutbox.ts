@@ -0,0 +1,267 @@
+import { supabase } from '@/integrations/supabase/client';
+import { getWebhookUrl } from '@/hooks/useWebhookUrl';
+import { generateEmailPayload } from './emailTemplates';
+
+/**
+ * Notification Outbox
+ * Emails are queued in ah_notification_outbox by database triggers, in the
+ * same transaction as the event (new widget conversation, credit balance
+ * crossing the alert threshold). The dispatcher drains the outbox in batches
+ * to the n8n email webhooks with bounded concurrency and retries.
+ *
+ * Nothing drains the outbox on a schedule yet, so browsers send their own
+ * rows (EventOutboxQueue): the widget right after creating a conversation,
+ * and the leader tab of a signed-in user periodically.
+ */
+
+export type NotificationTemplate = Parameters<typeof generateEmailPayload>[0];
+
+export type OutboxStatus = 'queued' | 'sending' | 'sent' | 'failed';
+
+export interface OutboxNotification {
+    id: string;
+    user_id: string | null;
+    template: NotificationTemplate;
+    dedupe_key: string;
+    payload: Record<string, any>;
+    status: OutboxStatus;
+    attempts: number;
+    max_attempts: number;
+    /** Proof of the claim for callers that are not dispatchers */
+    claim_token: string | null;
+    created_at: string;
+}
+
+export interface OutboxQueue {
+    claim(limit: number): Promise<OutboxNotification[]>;
+    complete(ids: string[]): Promise<void>;
+    /** Returns true when the notification will be retried */
+    fail(notification: OutboxNotification, message: string): Promise<boolean>;
+}
+
+export type NotificationSender = (notification: OutboxNotification) => Promise<void>;
+
+export interface TemplateMetrics {
+    sent: number;
+    retried: number;
+    failed: number;
+    /** Sum of webhook call durations */
+    sendMs: number;
+    /** Sent per second over the whole run */
+    throughput: number;
+}
+
+export interface DispatchSummary {
+    batches: number;
+    durationMs: number;
+    templates: Record<string, TemplateMetrics>;
+}
+
+/** Webhook config key for each template (see webhook_configurations) */
+export const TEMPLATE_WEBHOOKS: Record<NotificationTemplate, string> = {
+    welcome: 'VITE_N8N_EMAIL_WELCOME_WEBHOOK',
+    new_message: 'VITE_N8N_EMAIL_NEW_MESSAGE_WEBHOOK',
+    new_conversation: 'VITE_N8N_EMAIL_NEW_CONVERSATION_WEBHOOK',
+    low_credits: 'VITE_N8N_EMAIL_LOW_CREDITS_WEBHOOK',
+    marketing: 'VITE_N8N_EMAIL_MARKETING_WEBHOOK',
+    weekly_report: 'VITE_N8N_EMAIL_WEEKLY_REPORT_WEBHOOK',
+};
+
+export const DEFAULT_OUTBOX_BATCH_SIZE = 25;
+export const DEFAULT_OUTBOX_CONCURRENCY = 4;
+
+/**
+ * Claim batches until the outbox has nothing due (or maxBatches is reached)
+ * and send each batch with at most `concurrency` webhook calls in flight.
+ * Successful rows of a batch are confirmed with a single call.
+ */
+export const drainOutbox = async (
+    queue: OutboxQueue,
+    send: NotificationSender,
+    options: {
+        batchSize?: number;
+        concurrency?: number;
+        maxBatches?: number;
+        onBatch?: (summary: DispatchSummary) => void;
+    } = {}
+): Promise<DispatchSummary> => {
+    const batchSize = Math.max(1, options.batchSize ?? DEFAULT_OUTBOX_BATCH_SIZE);
+    const concurrency = Math.max(1, options.concurrency ?? DEFAULT_OUTBOX_CONCURRENCY);
+    const maxBatches = options.maxBatches ?? Infinity;
+    const startedAt = performance.now();
+    const summary: DispatchSummary = { batches: 0, durationMs: 0, templates: {} };
+
+    const metricsFor = (template: string) => {
+        if (!summary.templates[template]) {
+            summary.templates[template] = { sent: 0, retried: 0, failed: 0, sendMs: 0, throughput: 0 };
+        }
+        return summary.templates[template];
+    };
+
+    const updateRates = () => {
+        summary.durationMs = Math.round(performance.now() - startedAt);
+        const seconds = Math.max(summary.durationMs / 1000, 0.001);
+        for (const metrics of Object.values(summary.templates)) {
+            metrics.throughput = Math.round(metrics.sent / seconds * 100) / 100;
+        }
+    };
+
+    while (summary.batches < maxBatches) {
+        const batch = await queue.claim(batchSize);
+        if (batch.length === 0) break;
+        summary.batches++;
+
+        const sent: string[] = [];
+        let next = 0;
+
+        const worker = async () => {
+            while (next < batch.length) {
+                const notification = batch[next++];
+                const metrics = metricsFor(notification.template);
+                const callStartedAt = performance.now();
+
+                try {
+                    await send(notification);
+                    sent.push(notification.id);
+                    metrics.sent++;
+                } catch (error) {
+                    const message = error instanceof Error ? error.message : String(error);
+                    const retried = await queue.fail(notification, message);
+                    if (retried) {
+                        metrics.retried++;
+                    } else {
+                        metrics.failed++;
+                    }
+                } finally {
+                    metrics.sendMs += Math.round(performance.now() - callStartedAt);
+                }
+            }
+        };
+
+        await Promise.all(Array.from({ length: Math.min(concurrency, batch.length) }, worker));
+        if (sent.length > 0) await queue.complete(sent);
+
+        updateRates();
+        options.onBatch?.(summary);
+
+        // A short batch means nothing else is due right now
+        if (batch.length < batchSize) break;
+    }
+
+    updateRates();
+    return summary;
+};
+
+/**
+ * Sender that renders the template and posts it to the template's n8n
+ * email webhook. Webhook URLs are resolved once per template.
+ */
+export const createWebhookSender = (): NotificationSender => {
+    const urls = new Map<string, Promise<string>>();
+
+    return async (notification) => {
+        const key = TEMPLATE_WEBHOOKS[notification.template];
+        if (!key) throw new Error(`Plantilla desconocida: ${notification.template}`);
+
+        if (!urls.has(key)) urls.set(key, getWebhookUrl(key));
+        const webhookUrl = await urls.get(key);
+        if (!webhookUrl) throw new Error(`Webhook ${key} no configurado`);
+
+        const response = await fetch(webhookUrl, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                ...generateEmailPayload(notification.template, notification.payload),
+                notificationId: notification.id,
+                dedupeKey: notification.dedupe_key,
+            }),
+        });
+
+        if (!response.ok) {
+            throw new Error(`Webhook failed: ${response.status}`);
+        }
+    };
+};
+
+/**
+ * Queue backed by ah_notification_outbox (admin or service role only)
+ */
+export class SupabaseOutboxQueue implements OutboxQueue {
+    async claim(limit: number) {
+        const { data, error } = await (supabase.rpc as any)('claim_notifications', { p_limit: limit });
+
+        if (error) throw error;
+        return (data || []) as OutboxNotification[];
+    }
+
+    async complete(ids: string[]) {
+        const { error } = await (supabase.rpc as any)('complete_notifications', { p_ids: ids });
+        if (error) throw error;
+    }
+
+    async fail(notification: OutboxNotification, message: string) {
+        const { data, error } = await (supabase.rpc as any)('fail_notification', {
+            p_id: notification.id,
+            p_error: message,
+        });
+
+        if (error) throw error;
+        return !!data;
+    }
+}
+
+/**
+ * Browser-side queue (claim_event_notifications) for the rows the current
+ * visitor or user may send: the new conversation email of `conversationId`,
+ * or the signed-in user's own notifications. Rows are confirmed with the
+ * claim token they came with.
+ */
+export class EventOutboxQueue implements OutboxQueue {
+    private tokens = new Map<string, string | null>();
+
+    constructor(private conversationId?: string) { }
+
+    async claim(limit: number) {
+        const { data, error } = await (supabase.rpc as any)('claim_event_notifications', {
+            p_conversation_id: this.conversationId ?? null,
+            p_limit: limit,
+        });
+
+        if (error) throw error;
+        const claimed = (data || []) as OutboxNotification[];
+        claimed.forEach(n => this.tokens.set(n.id, n.claim_token));
+        return claimed;
+    }
+
+    async complete(ids: string[]) {
+        const { error } = await (supabase.rpc as any)('complete_notifications', {
+            p_ids: ids,
+            p_tokens: ids.map(id => this.tokens.get(id)),
+        });
+        if (error) throw error;
+    }
+
+    async fail(notification: OutboxNotification, message: string) {
+        const { data, error } = await (supabase.rpc as any)('fail_notification', {
+            p_id: notification.id,
+            p_error: message,
+            p_token: notification.claim_token,
+        });
+
+        if (error) throw error;
+        return !!data;
+    }
+}
+
+/**
+ * Send what this browser may send right now. Never throws: a row that could
+ * not be sent stays in the outbox for the next drain.
+ */
+export const dispatchEventNotifications = async (conversationId?: string) => {
+    try {
+        return await drainOutbox(new EventOutboxQueue(conversationId), createWebhookSender(), { maxBatches: 4 });
+    } catch (error) {
+        console.error('[Outbox] Error dispatching notifications:', error);
+        return null;
+    }
+};
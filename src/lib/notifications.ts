@@ -1,5 +1,6 @@
 import { supabase } from '@/integrations/supabase/client';
 import { generateEmailPayload } from './emailTemplates';
+import { fetchConversationStats } from './conversationStats';
 
 /**
  * Send email via n8n webhook
@@ -271,30 +272,29 @@ export const sendWeeklyReport = async (userId: string, options: { skipCheck?: bo
         const startDate = new Date();
         startDate.setDate(startDate.getDate() - 7);
 
-        // Get conversations
-        const { data: conversations } = await supabase
-            .from('ah_conversations')
-            .select('*, agent:ah_agents(name)')
-            .eq('user_id', userId)
-            .gte('started_at', startDate.toISOString())
-            .lte('started_at', endDate.toISOString());
+        // Get the user's agents
+        const { data: agents, error: agentsError } = await supabase
+            .from('ah_agents')
+            .select('id, name, status')
+            .eq('user_id', userId);
 
-        const totalConversations = conversations?.length || 0;
+        if (agentsError) throw agentsError;
+        const agentNames = new Map((agents || []).map(a => [a.id, a.name]));
+        const activeAgents = (agents || []).filter(a => a.status === 'active').length;
 
-        // Calculate total messages (sum of messages_count or approximation)
-        const totalMessages = conversations?.reduce((acc, curr) => acc + (curr.messages_count || 0), 0) || 0;
+        // Widget conversations of those agents, with message counters that
+        // include the ones not flushed yet
+        const conversations = agentNames.size > 0
+            ? await fetchConversationStats(startDate.toISOString(), [...agentNames.keys()])
+            : [];
 
-        // Active agents count
-        const { count: activeAgents } = await supabase
-            .from('ah_agents')
-            .select('*', { count: 'exact', head: true })
-            .eq('user_id', userId)
-            .eq('status', 'active');
+        const totalConversations = conversations.length;
+        const totalMessages = conversations.reduce((acc, curr) => acc + (curr.messages_count || 0), 0);
 
         // Find top agent
         const agentCounts: Record<string, number> = {};
-        conversations?.forEach((c: any) => {
-            const agentName = c.agent?.name || 'Agente desconocido';
+        conversations.forEach(c => {
+            const agentName = agentNames.get(c.agent_id) || 'Agente desconocido';
             agentCounts[agentName] = (agentCounts[agentName] || 0) + 1;
         });
 
@@ -316,7 +316,7 @@ export const sendWeeklyReport = async (userId: string, options: { skipCheck?: bo
             endDate: endDate.toLocaleDateString(),
             totalConversations,
             totalMessages,
-            activeAgents: activeAgents || 0,
+            activeAgents,
             topAgentName,
             topAgentConversations
         });
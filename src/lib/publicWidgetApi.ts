@@ -1,12 +1,21 @@
 import { supabase } from "@/integrations/supabase/client";
-import { sendNewConversationEmail } from "./notifications";
-import { getWebhookUrl } from "@/hooks/useWebhookUrl";
+import { getEmbeddingsTarget } from "./embeddings";
+import { postChatWebhook } from "./chatStream";
+import { dispatchEventNotifications } from "./notificationOutbox";
+import { SupabaseChatAdmission, withChatSlot } from "./chatAdmission";
 
 /**
  * Public Widget API
  * Functions for the embeddable chat widget (no authentication required)
  */
 
+// Webhook calls go through per-agent / per-tenant admission (20260126_chat_admission.sql)
+// and reach n8n only via the chat-dispatch edge function, which checks the slot
+const chatAdmission = new SupabaseChatAdmission(supabase);
+const CHAT_DISPATCH_URL = `${import.meta.env.VITE_SUPABASE_URL}/functions/v1/chat-dispatch`;
+const CHAT_QUEUE_TIMEOUT_MS = 15000;
+const CHAT_RUN_TIMEOUT_MS = 60000;
+
 export interface WidgetConfig {
     agent: {
         id: string;
@@ -42,6 +51,8 @@ export interface SendMessageResponse {
     conversation_id: string;
     status: 'success' | 'out_of_service' | 'error';
     fallback_email?: string;
+    /** Set when the agent is only busy: the visitor can try again after this */
+    retry_after_ms?: number;
 }
 
 /**
@@ -77,11 +88,14 @@ export async function getWidgetConfig(agentId: string): Promise<WidgetConfig | n
 }
 
 /**
- * Send a message from a visitor and get agent response
+ * Send a message from a visitor and get agent response.
+ * When `onToken` is given and the webhook streams, tokens are delivered as
+ * they arrive; the AI message is saved once the stream completes.
  */
 export async function sendPublicMessage(
     agentId: string,
-    request: SendMessageRequest
+    request: SendMessageRequest,
+    onToken?: (token: string, content: string) => void
 ): Promise<SendMessageResponse> {
     try {
         // 1. Get agent and owner info
@@ -178,30 +192,9 @@ export async function sendPublicMessage(
 
             conversationId = newConv.id;
 
-            // Notify agent owner about new conversation (fire-and-forget)
-            try {
-                const { data: ownerProfile } = await supabase
-                    .from('ah_profiles')
-                    .select('email, full_name')
-                    .eq('user_id', agent.user_id)
-                    .single();
-
-                if (ownerProfile) {
-                    // Non-blocking call - don't await to not slow down the visitor
-                    sendNewConversationEmail(
-                        ownerProfile.email,
-                        ownerProfile.full_name || 'Usuario',
-                        agent.user_id,
-                        agent.name,
-                        request.visitor_info?.name || 'Visitante anónimo',
-                        request.visitor_info?.email || 'Sin email',
-                        conversationId
-                    ).catch(err => console.error('[Widget] Error sending new conversation email:', err));
-                }
-            } catch (notifyError) {
-                // Don't fail the conversation if notification fails
-                console.error('[Widget] Error notifying owner:', notifyError);
-            }
+            // The owner's email is queued by the insert trigger
+            // (ah_notification_outbox); send it now without making the visitor wait
+            void dispatchEventNotifications(conversationId);
         }
 
         // 5. Save user message
@@ -224,42 +217,69 @@ export async function sendPublicMessage(
             };
         }
 
-        // 6. Call n8n webhook for AI response
-        const webhookUrl = await getWebhookUrl('VITE_N8N_CHAT_WEBHOOK_URL');
-        if (!webhookUrl) {
-            console.error('[Widget] Webhook URL not configured');
-            throw new Error('Webhook URL not configured');
+        // 5.6 Repeated question: answer from the agent's cache, no LLM call and no credit
+        if (agent.answer_cache_enabled) {
+            const cached = await lookupCachedAnswer(agentId, request.message);
+            if (cached) {
+                await supabase
+                    .from('ah_public_messages')
+                    .insert({
+                        conversation_id: conversationId,
+                        role: 'assistant',
+                        content: cached
+                    });
+
+                return {
+                    response: cached,
+                    conversation_id: conversationId,
+                    status: 'success'
+                };
+            }
         }
 
+        // 6. Call n8n webhook for AI response (through chat-dispatch)
         const sessionId = `${agentId}_${request.visitor_id}`;
         const webhookPayload = {
             agentId: sessionId,
             agentName: agent.name,
-            tableName: `embeddings_${agentId.split('-').join('_')}`,
+            ...getEmbeddingsTarget(agentId),
             message: request.message,
-            systemPrompt: agent.system_prompt || ''
+            systemPrompt: agent.system_prompt || '',
+            // The workflow stores its answer for repeated questions (cache_agent_answer)
+            cacheAnswer: !!agent.answer_cache_enabled
         };
 
-        console.log('[Widget] Calling webhook:', webhookUrl);
+        console.log('[Widget] Calling webhook:', CHAT_DISPATCH_URL);
         console.log('[Widget] Payload:', webhookPayload);
 
-        const response = await fetch(webhookUrl, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(webhookPayload)
-        });
-
-        console.log('[Widget] Webhook response status:', response.status);
-
-        if (!response.ok) {
-            const errorText = await response.text();
-            console.error('[Widget] Webhook error:', errorText);
-            throw new Error(`Failed to get AI response: ${response.status}`);
+        const slot = await withChatSlot(
+            chatAdmission,
+            agentId,
+            // chat-dispatch checks the ticket (verify_chat_slot) before calling n8n
+            (signal, ticket) => postChatWebhook(
+                CHAT_DISPATCH_URL,
+                { ...webhookPayload, admissionAgentId: agentId, admissionTicket: ticket },
+                { onToken, signal }
+            ),
+            { queueTimeoutMs: CHAT_QUEUE_TIMEOUT_MS, runTimeoutMs: CHAT_RUN_TIMEOUT_MS }
+        );
+
+        if (slot.status !== 'ok') {
+            // Agent saturated or admission down: answer right away instead of piling onto n8n
+            console.warn('[Widget] Chat admission:', slot.status, `${slot.waitMs} ms`);
+            return {
+                response: agent.fallback_message || 'Estamos recibiendo muchas consultas. Por favor, inténtalo de nuevo en unos segundos.',
+                conversation_id: conversationId,
+                status: 'out_of_service',
+                fallback_email: agent.fallback_email || undefined,
+                retry_after_ms: slot.retryAfterMs
+            };
         }
 
-        const data = await response.json();
-        console.log('[Widget] Webhook response data:', data);
-        const aiResponse = data.output || data.response || data.message || 'Sin respuesta';
+        const result = slot.value;
+
+        console.log('[Widget] Webhook response:', { streamed: result.streamed, data: result.data });
+        const aiResponse = result.content || 'Sin respuesta';
 
         // 7. Save AI message
         await supabase
@@ -298,6 +318,24 @@ export async function sendPublicMessage(
     }
 }
 
+/**
+ * Cached answer for a repeated question (20260127_answer_cache.sql), or null.
+ * A failed lookup is a miss: the message goes to the webhook as usual.
+ */
+async function lookupCachedAnswer(agentId: string, message: string): Promise<string | null> {
+    const { data, error } = await (supabase.rpc as any)('lookup_cached_answer', {
+        p_agent_id: agentId,
+        p_message: message
+    });
+
+    if (error) {
+        console.warn('[Widget] Answer cache lookup failed:', error);
+        return null;
+    }
+
+    return data?.hit ? data.answer : null;
+}
+
 /**
  * Get conversation history for a visitor
  */
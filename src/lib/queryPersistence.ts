@@ -0,0 +1,166 @@
+import { dehydrate, hydrate, Query, QueryClient } from '@tanstack/react-query';
+
+/**
+ * Query Persistence
+ * Keeps the dashboard's React Query cache in IndexedDB so a reload or a new
+ * tab starts from the last known agents, conversations, credits and settings
+ * and refreshes them in the background instead of showing spinners.
+ *
+ * Each user gets their own record, so a cache is only ever restored for the
+ * account that wrote it. Bump CACHE_VERSION whenever the shape of a persisted
+ * query changes: caches written by other versions are dropped on restore.
+ *
+ * Only changed data is written: a poll that brings back the same result keeps
+ * the same data (structural sharing) and does not touch IndexedDB. Conversations
+ * are stored as a list without message bodies; the page refetches them on mount.
+ */
+
+export const CACHE_VERSION = 2;
+
+const DB_NAME = 'ai-companion-query-cache';
+const STORE = 'queries';
+const recordKey = (userId: string) => `dashboard:v${CACHE_VERSION}:${userId}`;
+
+/** Oldest cache that is still restored; also the gcTime of the QueryClient */
+export const PERSIST_MAX_AGE_MS = 24 * 60 * 60 * 1000;
+const SAVE_THROTTLE_MS = 1000;
+
+/** First query-key segment of everything worth persisting (user data, not admin views) */
+export const PERSISTED_QUERY_PREFIXES = [
+    'session-snapshot',
+    'ah_agents',
+    'ah_documents',
+    'public-conversations',
+    'user-settings',
+    'dashboard-summary',
+    'recent-conversations-dashboard-v3',
+    'paymentMethod',
+    'notifications',
+];
+
+/** Shrink the data of a query before it is written (by first query-key segment) */
+const PERSISTED_QUERY_SLIMMERS: Record<string, (data: any) => unknown> = {
+    'public-conversations': (conversations: Array<{ messages?: unknown[] }>) =>
+        conversations.map(conversation => ({ ...conversation, messages: [] })),
+};
+
+const slimDehydratedState = (state: ReturnType<typeof dehydrate>): ReturnType<typeof dehydrate> => ({
+    ...state,
+    queries: state.queries.map(query => {
+        const slim = PERSISTED_QUERY_SLIMMERS[String(query.queryKey[0])];
+        return slim && Array.isArray(query.state.data)
+            ? { ...query, state: { ...query.state, data: slim(query.state.data) } }
+            : query;
+    }),
+});
+
+interface PersistedRecord {
+    version: number;
+    savedAt: number;
+    state: ReturnType<typeof dehydrate>;
+}
+
+export const isPersistedQuery = (query: Query) =>
+    query.state.status === 'success' && PERSISTED_QUERY_PREFIXES.includes(String(query.queryKey[0]));
+
+const openDb = () => new Promise<IDBDatabase>((resolve, reject) => {
+    const request = indexedDB.open(DB_NAME, 1);
+    request.onupgradeneeded = () => request.result.createObjectStore(STORE);
+    request.onsuccess = () => resolve(request.result);
+    request.onerror = () => reject(request.error);
+});
+
+const withStore = async <T>(mode: IDBTransactionMode, fn: (store: IDBObjectStore) => IDBRequest<T>) => {
+    const db = await openDb();
+    try {
+        return await new Promise<T>((resolve, reject) => {
+            const request = fn(db.transaction(STORE, mode).objectStore(STORE));
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => reject(request.error);
+        });
+    } finally {
+        db.close();
+    }
+};
+
+/**
+ * Hydrate the client from the user's IndexedDB record; records of other users
+ * or versions are deleted. Resolves (never rejects) once done, so the app can
+ * wait for it before the first render.
+ */
+export const restoreQueryCache = async (queryClient: QueryClient, userId: string) => {
+    if (typeof indexedDB === 'undefined') return;
+
+    try {
+        const keys = await withStore('readonly', store => store.getAllKeys());
+        await Promise.all(keys
+            .filter(key => key !== recordKey(userId))
+            .map(key => withStore('readwrite', store => store.delete(key))));
+
+        const record = await withStore<PersistedRecord | undefined>('readonly', store => store.get(recordKey(userId)));
+        if (!record || record.version !== CACHE_VERSION) return;
+        if (Date.now() - record.savedAt > PERSIST_MAX_AGE_MS) {
+            await clearPersistedQueries();
+            return;
+        }
+
+        hydrate(queryClient, record.state);
+    } catch (error) {
+        console.warn('[QueryCache] Restore failed, starting cold:', error);
+    }
+};
+
+/**
+ * Save the persisted queries (throttled) whenever their data changes, in the
+ * record of the user signed in at that moment (nothing without one).
+ * Returns the unsubscribe function.
+ */
+export const persistQueryCache = (queryClient: QueryClient, getUserId: () => string | null | undefined) => {
+    if (typeof indexedDB === 'undefined') return () => undefined;
+
+    let timer: ReturnType<typeof setTimeout> | null = null;
+    // Data of each query as of the last save
+    const saved = new WeakMap<Query, unknown>();
+
+    const save = () => {
+        timer = null;
+        const userId = getUserId();
+        if (!userId) return;
+
+        queryClient.getQueryCache().getAll()
+            .filter(isPersistedQuery)
+            .forEach(query => saved.set(query, query.state.data));
+
+        const record: PersistedRecord = {
+            version: CACHE_VERSION,
+            savedAt: Date.now(),
+            state: slimDehydratedState(dehydrate(queryClient, { shouldDehydrateQuery: isPersistedQuery })),
+        };
+        withStore('readwrite', store => store.put(record, recordKey(userId)))
+            .catch(error => console.warn('[QueryCache] Save failed:', error));
+    };
+
+    const unsubscribe = queryClient.getQueryCache().subscribe(event => {
+        if (event.type !== 'updated' && event.type !== 'removed') return;
+        if (!PERSISTED_QUERY_PREFIXES.includes(String(event.query.queryKey[0]))) return;
+        // Fetch start/end with an unchanged result
+        if (event.type === 'updated' && saved.get(event.query) === event.query.state.data) return;
+        if (!timer) timer = setTimeout(save, SAVE_THROTTLE_MS);
+    });
+
+    return () => {
+        unsubscribe();
+        if (timer) clearTimeout(timer);
+    };
+};
+
+/** Forget everything persisted (sign-out) */
+export const clearPersistedQueries = async () => {
+    if (typeof indexedDB === 'undefined') return;
+
+    try {
+        await withStore('readwrite', store => store.clear());
+    } catch (error) {
+        console.warn('[QueryCache] Clear failed:', error);
+    }
+};
@@ -0,0 +1,40 @@
+import { supabase } from '@/integrations/supabase/client';
+import type { AppRole, Credits, Profile } from '@/types/database';
+import type { Subscription } from '@/hooks/useSubscription';
+
+/**
+ * Session Snapshot
+ * Everything the dashboard needs to know about the signed-in user (roles,
+ * profile, subscription, credit balance), fetched with one RPC
+ * (get_session_snapshot) and shared through the React Query cache.
+ * AuthContext loads it at sign-in and keeps it fresh; hooks read it with
+ * useSessionSnapshot instead of calling auth.getUser() and user_roles.
+ */
+
+export interface SessionSnapshot {
+    user_id: string;
+    roles: AppRole[];
+    profile: Profile;
+    subscription: Subscription | null;
+    credits: Pick<Credits, 'user_id' | 'balance'> | null;
+    fetched_at: string;
+}
+
+export const SESSION_SNAPSHOT_KEY = 'session-snapshot';
+
+export const sessionSnapshotKey = (userId: string | undefined) => [SESSION_SNAPSHOT_KEY, userId ?? null];
+
+/** Round-trips made for the snapshot since the page loaded (compare with the per-hook lookups it replaces) */
+export const sessionSnapshotStats = { fetches: 0, lastFetchMs: 0 };
+
+export const fetchSessionSnapshot = async (): Promise<SessionSnapshot> => {
+    const startedAt = performance.now();
+    const { data, error } = await (supabase.rpc as any)('get_session_snapshot');
+    sessionSnapshotStats.fetches++;
+    sessionSnapshotStats.lastFetchMs = Math.round(performance.now() - startedAt);
+
+    if (error) throw error;
+    return data as SessionSnapshot;
+};
+
+export const isAdminSnapshot = (snapshot: SessionSnapshot) => snapshot.roles.includes('admin');
@@ -0,0 +1,281 @@
+/**
+ * Storage Maintenance
+ * Bulk deletion for Supabase Storage buckets. list() returns one page of one
+ * folder (uploads live under `${agentId}/...`), so the purge walks the tree
+ * folder by folder, page by page, and feeds the file paths to a few workers
+ * that remove() them in bounded batches.
+ *
+ * A folder is fully listed before its files are queued, so deletions never
+ * shift the offsets of a listing in progress. Purges are idempotent: running
+ * one again only finds what is left. With a `checkpointKey` the folders
+ * already emptied and the counters are kept in localStorage, so an
+ * interrupted purge resumes where it stopped and reports cumulative totals.
+ *
+ * The bucket is passed in (supabase.storage.from(name)) so this module has no
+ * client dependency; benchmarks/storage_purge.ts drives it with a fake bucket.
+ */
+
+export const LIST_PAGE_SIZE = 1000;
+export const REMOVE_BATCH_SIZE = 100;
+export const PURGE_CONCURRENCY = 4;
+const MAX_ATTEMPTS = 3;
+const FAILED_SAMPLE = 20;
+
+/** The part of the storage-js bucket API the purge uses */
+export interface StorageBucket {
+    list(
+        path?: string,
+        options?: { limit?: number; offset?: number; sortBy?: { column: string; order: string } }
+    ): Promise<{ data: { name: string; id: string | null }[] | null; error: { message: string } | null }>;
+    remove(paths: string[]): Promise<{ data: unknown; error: { message: string } | null }>;
+}
+
+export interface PurgeProgress {
+    listed: number;
+    deleted: number;
+    failed: number;
+    batches: number;
+    /** Folder currently being listed */
+    folder: string;
+    elapsedMs: number;
+    filesPerSecond: number;
+    /** Counters include a previous, interrupted run */
+    resumed: boolean;
+    done: boolean;
+}
+
+export interface PurgeResult extends PurgeProgress {
+    /** Up to FAILED_SAMPLE paths that could not be removed */
+    failedPaths: string[];
+    aborted: boolean;
+}
+
+export interface PurgeOptions {
+    /** Folder to empty ('' for the whole bucket); no leading or trailing slash */
+    prefix?: string;
+    batchSize?: number;
+    concurrency?: number;
+    pageSize?: number;
+    onProgress?: (progress: PurgeProgress) => void;
+    signal?: AbortSignal;
+    /** Persist progress under this localStorage key to resume after an interruption */
+    checkpointKey?: string;
+}
+
+interface Checkpoint {
+    prefix: string;
+    completedFolders: string[];
+    deleted: number;
+    failed: number;
+    batches: number;
+    listed: number;
+    elapsedMs: number;
+}
+
+const joinPath = (folder: string, name: string) => (folder ? `${folder}/${name}` : name);
+
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
+
+const readCheckpoint = (key: string | undefined, prefix: string): Checkpoint | null => {
+    if (!key || typeof localStorage === 'undefined') return null;
+    try {
+        const checkpoint = JSON.parse(localStorage.getItem(key) || 'null') as Checkpoint | null;
+        return checkpoint?.prefix === prefix ? checkpoint : null;
+    } catch {
+        return null;
+    }
+};
+
+const writeCheckpoint = (key: string | undefined, checkpoint: Checkpoint | null) => {
+    if (!key || typeof localStorage === 'undefined') return;
+    try {
+        if (checkpoint) localStorage.setItem(key, JSON.stringify(checkpoint));
+        else localStorage.removeItem(key);
+    } catch {
+        // Quota or private mode: the purge still works, it just cannot resume
+    }
+};
+
+/** True when an interrupted purge left a checkpoint under `key` */
+export const hasPurgeCheckpoint = (key: string) =>
+    typeof localStorage !== 'undefined' && localStorage.getItem(key) !== null;
+
+/** All entries of one folder, page by page */
+async function listFolder(bucket: StorageBucket, folder: string, pageSize: number) {
+    const entries: { name: string; id: string | null }[] = [];
+    for (let offset = 0; ; offset += pageSize) {
+        const { data, error } = await bucket.list(folder, {
+            limit: pageSize,
+            offset,
+            sortBy: { column: 'name', order: 'asc' },
+        });
+        if (error) throw new Error(`Could not list "${folder || '/'}": ${error.message}`);
+        entries.push(...(data || []));
+        if (!data || data.length < pageSize) return entries;
+    }
+}
+
+/**
+ * Remove every object under `prefix`. Resolves with the final counters; an
+ * aborted purge resolves too (aborted: true) and keeps its checkpoint.
+ */
+export async function purgeStorage(bucket: StorageBucket, options: PurgeOptions = {}): Promise<PurgeResult> {
+    const prefix = (options.prefix || '').replace(/^\/+|\/+$/g, '');
+    const batchSize = Math.min(options.batchSize || REMOVE_BATCH_SIZE, 1000);
+    const concurrency = Math.max(1, options.concurrency || PURGE_CONCURRENCY);
+    const pageSize = options.pageSize || LIST_PAGE_SIZE;
+    const { signal, checkpointKey, onProgress } = options;
+
+    const previous = readCheckpoint(checkpointKey, prefix);
+    const completedFolders = new Set(previous?.completedFolders || []);
+    const startedAt = performance.now() - (previous?.elapsedMs || 0);
+    const failedPaths: string[] = [];
+    const progress: PurgeProgress = {
+        listed: previous?.listed || 0,
+        deleted: previous?.deleted || 0,
+        failed: previous?.failed || 0,
+        batches: previous?.batches || 0,
+        folder: prefix,
+        elapsedMs: 0,
+        filesPerSecond: 0,
+        resumed: !!previous,
+        done: false,
+    };
+
+    const report = () => {
+        progress.elapsedMs = Math.round(performance.now() - startedAt);
+        progress.filesPerSecond = progress.elapsedMs > 0
+            ? Math.round((progress.deleted / progress.elapsedMs) * 1000)
+            : 0;
+        onProgress?.({ ...progress });
+    };
+
+    const saveCheckpoint = () => writeCheckpoint(checkpointKey, {
+        prefix,
+        completedFolders: [...completedFolders],
+        deleted: progress.deleted,
+        failed: progress.failed,
+        batches: progress.batches,
+        listed: progress.listed,
+        elapsedMs: Math.round(performance.now() - startedAt),
+    });
+
+    // Batches waiting for a worker; the walker pauses while it is full
+    const queue: { paths: string[]; settle: (removed: boolean) => void }[] = [];
+    let walking = true;
+    let walkError: unknown = null;
+    const wake: (() => void)[] = [];
+    const notify = () => wake.splice(0).forEach(resolve => resolve());
+    const waitForChange = () => new Promise<void>(resolve => wake.push(resolve));
+    const onAbort = () => {
+        queue.splice(0).forEach(batch => batch.settle(false));
+        notify();
+    };
+    signal?.addEventListener('abort', onAbort);
+
+    const worker = async () => {
+        while (!signal?.aborted) {
+            const batch = queue.shift();
+            if (batch) {
+                notify();
+                const failed = await removeWithRetry(bucket, batch.paths, signal);
+                if (failed) {
+                    progress.failed += batch.paths.length;
+                    failedPaths.push(...batch.paths.slice(0, FAILED_SAMPLE - failedPaths.length));
+                } else {
+                    progress.deleted += batch.paths.length;
+                }
+                progress.batches++;
+                batch.settle(!failed);
+                report();
+                continue;
+            }
+            if (!walking) return;
+            await waitForChange();
+        }
+    };
+
+    // Queue the files of a folder; the returned function waits for their
+    // batches and tells whether every file was removed
+    const enqueue = async (paths: string[]) => {
+        const settled: Promise<boolean>[] = [];
+        for (let i = 0; i < paths.length && !signal?.aborted; i += batchSize) {
+            while (queue.length >= concurrency * 2 && !signal?.aborted) await waitForChange();
+            if (signal?.aborted) break;
+            settled.push(new Promise<boolean>(settle => queue.push({ paths: paths.slice(i, i + batchSize), settle })));
+            notify();
+        }
+        return async () => (await Promise.all(settled)).every(Boolean);
+    };
+
+    // Depth-first, so only one branch of folder names is held at a time. A
+    // folder counts as done (checkpoint) once all its files were removed and
+    // its subfolders are done; failed files are listed again on resume.
+    const walk = async (folder: string) => {
+        if (signal?.aborted || completedFolders.has(folder)) return;
+        progress.folder = folder;
+        report();
+
+        const entries = await listFolder(bucket, folder, pageSize);
+        const files = entries.filter(entry => entry.id !== null).map(entry => joinPath(folder, entry.name));
+        progress.listed += files.length;
+        const removed = await enqueue(files);
+
+        for (const entry of entries) {
+            if (entry.id === null) await walk(joinPath(folder, entry.name));
+        }
+
+        if (signal?.aborted) return;
+        if (!(await removed()) || signal?.aborted) return;
+        if (entries.some(entry => entry.id === null && !completedFolders.has(joinPath(folder, entry.name)))) return;
+        completedFolders.add(folder);
+        saveCheckpoint();
+    };
+
+    const workers = Array.from({ length: concurrency }, worker);
+    try {
+        await walk(prefix);
+    } catch (error) {
+        walkError = error;
+    } finally {
+        walking = false;
+        notify();
+    }
+    await Promise.all(workers);
+    signal?.removeEventListener('abort', onAbort);
+
+    const aborted = !!signal?.aborted;
+    if (walkError || aborted) {
+        saveCheckpoint();
+        if (walkError) throw walkError;
+    } else {
+        writeCheckpoint(checkpointKey, null);
+        progress.done = true;
+    }
+    report();
+
+    return { ...progress, failedPaths, aborted };
+}
+
+/** Returns the error message when the batch still fails after MAX_ATTEMPTS */
+async function removeWithRetry(bucket: StorageBucket, paths: string[], signal?: AbortSignal) {
+    for (let attempt = 1; ; attempt++) {
+        const { error } = await bucket.remove(paths);
+        if (!error) return null;
+        if (attempt >= MAX_ATTEMPTS || signal?.aborted) {
+            console.warn('[StoragePurge] Batch failed:', error.message);
+            return error.message;
+        }
+        await sleep(250 * 2 ** attempt);
+    }
+}
+
+/** Remove known paths (a document's file) in the same bounded, retried batches */
+export async function removeStoragePaths(bucket: StorageBucket, paths: string[]) {
+    let failed = 0;
+    for (let i = 0; i < paths.length; i += REMOVE_BATCH_SIZE) {
+        const batch = paths.slice(i, i + REMOVE_BATCH_SIZE);
+        if (await removeWithRetry(bucket, batch)) failed += batch.length;
+    }
+    return { removed: paths.length - failed, failed };
+}
@@ -0,0 +1,210 @@
+import { Query, QueryClient, QueryKey } from '@tanstack/react-query';
+
+/**
+ * Tab Coordinator
+ * Operators keep several dashboard tabs open. For each topic (the first
+ * query-key segment of the data being shared, e.g. 'public-conversations')
+ * the tabs that currently show it elect one leader over a BroadcastChannel.
+ * Only the leader polls and holds the realtime subscription, and it
+ * broadcasts every changed result of the topic's queries so the other tabs
+ * update their caches without touching the backend.
+ *
+ * Election: the leader sends a heartbeat every HEARTBEAT_MS. A tab that has
+ * not heard one for LEADER_TIMEOUT_MS claims leadership; when several claim
+ * (or two leaders meet after a freeze) the lowest tab id wins. A closing
+ * leader resigns so the next tab takes over right away.
+ */
+
+const CHANNEL_PREFIX = 'ai-companion-tabs:';
+const HEARTBEAT_MS = 1000;
+const LEADER_TIMEOUT_MS = 3000;
+const CLAIM_WINDOW_MS = 250;
+
+type TabMessage =
+    | { type: 'heartbeat' | 'claim' | 'resign'; tabId: string }
+    | { type: 'sync-request'; tabId: string }
+    | { type: 'query'; tabId: string; queryKey: QueryKey; data: unknown; updatedAt: number };
+
+export class TabCoordinator {
+    readonly tabId = `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 8)}`;
+    private channel: BroadcastChannel | null = null;
+    private leader = false;
+    private lastHeartbeatAt = 0;
+    private claimTimer: ReturnType<typeof setTimeout> | null = null;
+    private interval: ReturnType<typeof setInterval> | null = null;
+    private listeners = new Set<() => void>();
+    private unsubscribeCache: (() => void) | null = null;
+    /** Data of each query as last broadcast */
+    private shared = new WeakMap<Query, unknown>();
+
+    constructor(readonly topic: string, private queryClient: QueryClient) { }
+
+    /** Without BroadcastChannel every tab is its own leader (previous behaviour) */
+    start() {
+        if (this.interval || this.leader) return;
+        if (typeof BroadcastChannel === 'undefined') {
+            this.setLeader(true);
+            return;
+        }
+
+        this.channel = new BroadcastChannel(CHANNEL_PREFIX + this.topic);
+        this.channel.onmessage = event => this.handle(event.data as TabMessage);
+        this.lastHeartbeatAt = Date.now();
+        this.post({ type: 'sync-request', tabId: this.tabId });
+
+        this.shareQueries();
+        this.interval = setInterval(() => this.tick(), HEARTBEAT_MS);
+        window.addEventListener('pagehide', this.stop);
+        // Nobody answered quickly: we are probably the only tab
+        this.claimTimer = setTimeout(() => this.claim(), CLAIM_WINDOW_MS * 2);
+    }
+
+    stop = () => {
+        if (this.leader) this.post({ type: 'resign', tabId: this.tabId });
+        if (this.interval) clearInterval(this.interval);
+        this.cancelClaim();
+        this.unsubscribeCache?.();
+        this.channel?.close();
+        window.removeEventListener('pagehide', this.stop);
+        this.interval = null;
+        this.channel = null;
+        this.unsubscribeCache = null;
+        this.setLeader(false);
+    };
+
+    isLeader() {
+        return this.leader;
+    }
+
+    subscribe(listener: () => void) {
+        this.listeners.add(listener);
+        return () => {
+            this.listeners.delete(listener);
+        };
+    }
+
+    /**
+     * While leader, broadcast successful fetches of the topic's queries whose
+     * data changed (an identical poll result keeps the same data reference)
+     */
+    private shareQueries() {
+        this.unsubscribeCache = this.queryClient.getQueryCache().subscribe(event => {
+            if (!this.leader || !this.channel) return;
+            if (event.type !== 'updated' || event.action.type !== 'success') return;
+            if (!this.owns(event.query.queryKey)) return;
+            if (this.shared.get(event.query) === event.query.state.data) return;
+            this.postQuery(event.query);
+        });
+    }
+
+    private owns(queryKey: QueryKey) {
+        return queryKey[0] === this.topic;
+    }
+
+    private tick() {
+        if (this.leader) {
+            this.post({ type: 'heartbeat', tabId: this.tabId });
+        } else if (Date.now() - this.lastHeartbeatAt > LEADER_TIMEOUT_MS && !this.claimTimer) {
+            this.claim();
+        }
+    }
+
+    private claim() {
+        this.cancelClaim();
+        this.post({ type: 'claim', tabId: this.tabId });
+        this.claimTimer = setTimeout(() => {
+            this.claimTimer = null;
+            this.setLeader(true);
+            this.post({ type: 'heartbeat', tabId: this.tabId });
+        }, CLAIM_WINDOW_MS);
+    }
+
+    private handle(message: TabMessage) {
+        switch (message.type) {
+            case 'heartbeat':
+                if (this.leader && message.tabId > this.tabId) {
+                    // Two leaders: the other one will step down when it hears us
+                    this.post({ type: 'heartbeat', tabId: this.tabId });
+                    return;
+                }
+                this.lastHeartbeatAt = Date.now();
+                this.cancelClaim();
+                this.setLeader(false);
+                return;
+            case 'claim':
+                if (this.leader) {
+                    this.post({ type: 'heartbeat', tabId: this.tabId });
+                } else if (message.tabId < this.tabId) {
+                    this.cancelClaim();
+                    this.lastHeartbeatAt = Date.now();
+                }
+                return;
+            case 'resign':
+                this.lastHeartbeatAt = 0;
+                this.claim();
+                return;
+            case 'sync-request':
+                if (this.leader) this.syncTo();
+                return;
+            case 'query':
+                if (this.leader) return;
+                this.queryClient.setQueryData(message.queryKey, message.data, { updatedAt: message.updatedAt });
+                return;
+        }
+    }
+
+    /** Send a newly opened tab everything shared that is already cached */
+    private syncTo() {
+        this.queryClient.getQueryCache().getAll()
+            .filter(query => this.owns(query.queryKey) && query.state.status === 'success')
+            .forEach(query => this.postQuery(query));
+    }
+
+    private postQuery(query: Query) {
+        const { queryKey, state: { data, dataUpdatedAt } } = query;
+        try {
+            this.post({ type: 'query', tabId: this.tabId, queryKey, data, updatedAt: dataUpdatedAt });
+            this.shared.set(query, data);
+        } catch (error) {
+            // Not structured-cloneable: followers fetch it themselves
+            console.warn('[Tabs] Could not share query', queryKey, error);
+        }
+    }
+
+    private cancelClaim() {
+        if (this.claimTimer) clearTimeout(this.claimTimer);
+        this.claimTimer = null;
+    }
+
+    private setLeader(leader: boolean) {
+        if (this.leader === leader) return;
+        this.leader = leader;
+        this.listeners.forEach(listener => listener());
+    }
+
+    private post(message: TabMessage) {
+        this.channel?.postMessage(message);
+    }
+}
+
+const coordinators = new Map<string, { coordinator: TabCoordinator; users: number }>();
+
+/** Join the election of a topic; every call needs a matching releaseTabCoordinator */
+export const acquireTabCoordinator = (topic: string, queryClient: QueryClient) => {
+    let entry = coordinators.get(topic);
+    if (!entry) {
+        entry = { coordinator: new TabCoordinator(topic, queryClient), users: 0 };
+        coordinators.set(topic, entry);
+        entry.coordinator.start();
+    }
+    entry.users++;
+    return entry.coordinator;
+};
+
+/** Leave the election once the last user of the topic in this tab is gone */
+export const releaseTabCoordinator = (topic: string) => {
+    const entry = coordinators.get(topic);
+    if (!entry || --entry.users > 0) return;
+    coordinators.delete(topic);
+    entry.coordinator.stop();
+};
@@ -1,5 +1,7 @@
 import { createRoot } from "react-dom/client";
-import App from "./App.tsx";
+import App, { restoreAppCache } from "./App.tsx";
 import "./index.css";
 
-createRoot(document.getElementById("root")!).render(<App />);
+restoreAppCache().finally(() => {
+  createRoot(document.getElementById("root")!).render(<App />);
+});
@@ -1,4 +1,4 @@
-import { useState } from 'react';
+import { useMemo, useState } from 'react';
 import { Search, MoreVertical, Bot, Pause, Play, Trash2, Eye, Loader2, RefreshCw } from 'lucide-react';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
@@ -141,12 +141,15 @@ export const AdminAgentsPage = () => {
         }
     };
 
-    const filteredAgents = agents?.filter(agent => {
-        const matchesSearch = agent.name.toLowerCase().includes(search.toLowerCase()) ||
-            agent.user_email.toLowerCase().includes(search.toLowerCase());
-        const matchesStatus = statusFilter === 'all' || agent.status === statusFilter;
-        return matchesSearch && matchesStatus;
-    }) || [];
+    const filteredAgents = useMemo(() => {
+        const query = search.toLowerCase();
+        return agents?.filter(agent => {
+            const matchesSearch = agent.name.toLowerCase().includes(query) ||
+                agent.user_email.toLowerCase().includes(query);
+            const matchesStatus = statusFilter === 'all' || agent.status === statusFilter;
+            return matchesSearch && matchesStatus;
+        }) || [];
+    }, [agents, search, statusFilter]);
 
     const getStatusBadgeStyle = (status: string) => {
         switch (status) {
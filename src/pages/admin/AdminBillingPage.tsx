@@ -1,13 +1,16 @@
-import { useState } from 'react';
+import { memo, ReactNode, useEffect, useState } from 'react';
 import { useQuery } from '@tanstack/react-query';
 import {
-    DollarSign, Users, TrendingUp, Calendar, Zap, Download, RefreshCw
+    DollarSign, Users, TrendingUp, Calendar, Zap, Download, RefreshCw, Search
 } from 'lucide-react';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
 import { Badge } from '@/components/ui/badge';
 import { Button } from '@/components/ui/button';
+import { Input } from '@/components/ui/input';
 import { DashboardLayout } from '@/components/layout/DashboardLayout';
 import { supabase } from '@/integrations/supabase/client';
+import { useAdminTransactionsPage } from '@/hooks/useAdmin';
+import { useVirtualList, virtualPadding } from '@/hooks/useVirtualList';
 import {
     Table,
     TableBody,
@@ -38,8 +41,112 @@ const PLAN_NAMES: Record<string, string> = {
     business: 'Business',
 };
 
+// Table rows before measuring
+const ESTIMATED_ROW_HEIGHT = 61;
+
+type MeasureRef = (el: HTMLElement | null) => void;
+
+const SubscriptionRow = memo(({ sub, measureRef }: { sub: any; measureRef: MeasureRef }) => (
+    <TableRow data-key={sub.id} ref={measureRef}>
+        <TableCell>
+            <div>
+                <p className="font-medium">{sub.user_full_name || 'Sin nombre'}</p>
+                <p className="text-xs text-muted-foreground">{sub.user_email}</p>
+            </div>
+        </TableCell>
+        <TableCell>
+            <Badge variant={sub.plan_type === 'business' ? 'default' : sub.plan_type === 'pro' ? 'secondary' : 'outline'}>
+                {PLAN_NAMES[sub.plan_type] || sub.plan_type}
+            </Badge>
+        </TableCell>
+        <TableCell>
+            <Badge variant={sub.status === 'active' ? 'default' : 'destructive'} className="bg-green-500/20 text-green-600">
+                {sub.status}
+            </Badge>
+        </TableCell>
+        <TableCell>
+            {sub.current_period_end
+                ? new Date(sub.current_period_end).toLocaleDateString()
+                : '-'
+            }
+        </TableCell>
+        <TableCell className="font-medium">
+            ${PLAN_PRICES[sub.plan_type] || 0}
+        </TableCell>
+        <TableCell>
+            {sub.cancel_at_period_end && (
+                <Badge variant="destructive">Cancela al vencer</Badge>
+            )}
+        </TableCell>
+    </TableRow>
+));
+SubscriptionRow.displayName = 'SubscriptionRow';
+
+const CreditBalanceRow = memo(({ credit, measureRef }: { credit: any; measureRef: MeasureRef }) => (
+    <TableRow data-key={credit.id} ref={measureRef}>
+        <TableCell>
+            <div>
+                <p className="font-medium">{credit.user_full_name || 'Sin nombre'}</p>
+                <p className="text-xs text-muted-foreground">{credit.user_email}</p>
+            </div>
+        </TableCell>
+        <TableCell className="text-right">
+            <Badge variant="outline" className="gap-1">
+                <Zap className="w-3 h-3 text-yellow-500" />
+                {credit.balance?.toLocaleString() || 0}
+            </Badge>
+        </TableCell>
+    </TableRow>
+));
+CreditBalanceRow.displayName = 'CreditBalanceRow';
+
+interface VirtualTableProps<T> {
+    items: T[];
+    getKey: (item: T) => string;
+    columns: number;
+    header: ReactNode;
+    /** Shown in the body instead of rows (loading, empty) */
+    placeholder?: ReactNode;
+    renderRow: (item: T, measureRef: MeasureRef) => ReactNode;
+}
+
+// Tables with one row per user: only the rows in view are mounted, the rest
+// is replaced by spacer rows so the scrollbar keeps its size
+const VirtualTable = <T,>({ items, getKey, columns, header, placeholder, renderRow }: VirtualTableProps<T>) => {
+    const { scrollRef, measureRef, virtualItems, totalSize } = useVirtualList({
+        items,
+        getKey,
+        estimateSize: ESTIMATED_ROW_HEIGHT,
+        initialHeight: 600,
+    });
+    const { paddingTop, paddingBottom } = virtualPadding(virtualItems, totalSize);
+
+    return (
+        <div ref={scrollRef} className="max-h-[600px] overflow-y-auto">
+            <Table>
+                <TableHeader>
+                    {header}
+                </TableHeader>
+                <TableBody>
+                    {placeholder ?? (
+                        <>
+                            {paddingTop > 0 && (
+                                <tr style={{ height: paddingTop }}><td colSpan={columns} /></tr>
+                            )}
+                            {virtualItems.map(({ index }) => renderRow(items[index], measureRef))}
+                            {paddingBottom > 0 && (
+                                <tr style={{ height: paddingBottom }}><td colSpan={columns} /></tr>
+                            )}
+                        </>
+                    )}
+                </TableBody>
+            </Table>
+        </div>
+    );
+};
+
 export const AdminBillingPage = () => {
-    const [dateFilter, setDateFilter] = useState('30');
+    const [dateFilter, setDateFilter] = useState('all');
 
     // Fetch all subscriptions using RPC
     const { data: subscriptions, isLoading: loadingSubs, refetch: refetchSubs } = useQuery({
@@ -51,16 +158,33 @@ export const AdminBillingPage = () => {
         },
     });
 
-    // Fetch all credit transactions using RPC
-    const { data: transactions, isLoading: loadingTx } = useQuery({
-        queryKey: ['admin-transactions', dateFilter],
-        queryFn: async () => {
-            const { data, error } = await (supabase.rpc as any)('get_admin_transactions', {
-                days_limit: parseInt(dateFilter)
-            });
-            if (error) throw error;
-            return data || [];
-        },
+    // Credit transactions, paginated and filtered on the server
+    const [txSearch, setTxSearch] = useState('');
+    const [debouncedTxSearch, setDebouncedTxSearch] = useState('');
+    const [txType, setTxType] = useState('all');
+
+    useEffect(() => {
+        const timeout = setTimeout(() => setDebouncedTxSearch(txSearch.trim()), 300);
+        return () => clearTimeout(timeout);
+    }, [txSearch]);
+
+    const {
+        transactions,
+        totals: txTotals,
+        page: txPage,
+        hasNextPage: hasNextTxPage,
+        hasPreviousPage: hasPreviousTxPage,
+        nextPage: nextTxPage,
+        previousPage: previousTxPage,
+        isLoading: loadingTx,
+        isFetching: fetchingTx,
+    } = useAdminTransactionsPage({
+        search: debouncedTxSearch,
+        type: txType,
+        days: dateFilter === 'all' ? null : parseInt(dateFilter),
+        sort: 'created_at',
+        direction: 'desc',
+        pageSize: 50,
     });
 
     // Fetch all credits balances using RPC
@@ -79,13 +203,8 @@ export const AdminBillingPage = () => {
             return acc + (PLAN_PRICES[sub.plan_type] || 0);
         }, 0) || 0,
 
-        creditPurchases: transactions?.filter((t: any) => t.type === 'purchase').reduce((acc: number, t: any) => {
-            const amount = t.amount;
-            if (amount === 500) return acc + 15;
-            if (amount === 2000) return acc + 50;
-            if (amount === 5000) return acc + 100;
-            return acc;
-        }, 0) || 0,
+        // Whole period, computed by the RPC (the table only holds one page)
+        creditPurchases: Number(txTotals?.purchase_revenue ?? 0),
 
         activeSubscriptions: subscriptions?.filter((s: any) => s.status === 'active' && s.plan_type !== 'free').length || 0,
 
@@ -273,8 +392,11 @@ export const AdminBillingPage = () => {
                                 </CardDescription>
                             </CardHeader>
                             <CardContent>
-                                <Table>
-                                    <TableHeader>
+                                <VirtualTable
+                                    items={subscriptions ?? []}
+                                    getKey={(sub: any) => sub.id}
+                                    columns={6}
+                                    header={
                                         <TableRow>
                                             <TableHead>Usuario</TableHead>
                                             <TableHead>Plan</TableHead>
@@ -283,58 +405,24 @@ export const AdminBillingPage = () => {
                                             <TableHead>Ingreso/mes</TableHead>
                                             <TableHead>Notas</TableHead>
                                         </TableRow>
-                                    </TableHeader>
-                                    <TableBody>
-                                        {loadingSubs ? (
-                                            <TableRow>
-                                                <TableCell colSpan={6} className="text-center py-8">
-                                                    Cargando...
-                                                </TableCell>
-                                            </TableRow>
-                                        ) : subscriptions?.length === 0 ? (
-                                            <TableRow>
-                                                <TableCell colSpan={6} className="text-center py-8 text-muted-foreground">
-                                                    No hay suscripciones
-                                                </TableCell>
-                                            </TableRow>
-                                        ) : (
-                                            subscriptions?.map((sub: any) => (
-                                                <TableRow key={sub.id}>
-                                                    <TableCell>
-                                                        <div>
-                                                            <p className="font-medium">{sub.user_full_name || 'Sin nombre'}</p>
-                                                            <p className="text-xs text-muted-foreground">{sub.user_email}</p>
-                                                        </div>
-                                                    </TableCell>
-                                                    <TableCell>
-                                                        <Badge variant={sub.plan_type === 'business' ? 'default' : sub.plan_type === 'pro' ? 'secondary' : 'outline'}>
-                                                            {PLAN_NAMES[sub.plan_type] || sub.plan_type}
-                                                        </Badge>
-                                                    </TableCell>
-                                                    <TableCell>
-                                                        <Badge variant={sub.status === 'active' ? 'default' : 'destructive'} className="bg-green-500/20 text-green-600">
-                                                            {sub.status}
-                                                        </Badge>
-                                                    </TableCell>
-                                                    <TableCell>
-                                                        {sub.current_period_end
-                                                            ? new Date(sub.current_period_end).toLocaleDateString()
-                                                            : '-'
-                                                        }
-                                                    </TableCell>
-                                                    <TableCell className="font-medium">
-                                                        ${PLAN_PRICES[sub.plan_type] || 0}
-                                                    </TableCell>
-                                                    <TableCell>
-                                                        {sub.cancel_at_period_end && (
-                                                            <Badge variant="destructive">Cancela al vencer</Badge>
-                                                        )}
-                                                    </TableCell>
-                                                </TableRow>
-                                            ))
-                                        )}
-                                    </TableBody>
-                                </Table>
+                                    }
+                                    placeholder={loadingSubs ? (
+                                        <TableRow>
+                                            <TableCell colSpan={6} className="text-center py-8">
+                                                Cargando...
+                                            </TableCell>
+                                        </TableRow>
+                                    ) : subscriptions?.length === 0 ? (
+                                        <TableRow>
+                                            <TableCell colSpan={6} className="text-center py-8 text-muted-foreground">
+                                                No hay suscripciones
+                                            </TableCell>
+                                        </TableRow>
+                                    ) : undefined}
+                                    renderRow={(sub: any, measureRef) => (
+                                        <SubscriptionRow key={sub.id} sub={sub} measureRef={measureRef} />
+                                    )}
+                                />
                             </CardContent>
                         </Card>
                     </TabsContent>
@@ -349,17 +437,41 @@ export const AdminBillingPage = () => {
                                         Compras de créditos y movimientos
                                     </CardDescription>
                                 </div>
-                                <Select value={dateFilter} onValueChange={setDateFilter}>
-                                    <SelectTrigger className="w-40">
-                                        <SelectValue placeholder="Período" />
-                                    </SelectTrigger>
-                                    <SelectContent>
-                                        <SelectItem value="7">Últimos 7 días</SelectItem>
-                                        <SelectItem value="30">Últimos 30 días</SelectItem>
-                                        <SelectItem value="90">Últimos 90 días</SelectItem>
-                                        <SelectItem value="365">Último año</SelectItem>
-                                    </SelectContent>
-                                </Select>
+                                <div className="flex gap-2">
+                                    <div className="relative">
+                                        <Search className="absolute left-3 top-1/2 -translate-y-1/2 w-4 h-4 text-muted-foreground" />
+                                        <Input
+                                            placeholder="Buscar usuario..."
+                                            className="pl-10 w-56"
+                                            value={txSearch}
+                                            onChange={(e) => setTxSearch(e.target.value)}
+                                        />
+                                    </div>
+                                    <Select value={txType} onValueChange={setTxType}>
+                                        <SelectTrigger className="w-36">
+                                            <SelectValue placeholder="Tipo" />
+                                        </SelectTrigger>
+                                        <SelectContent>
+                                            <SelectItem value="all">Todos</SelectItem>
+                                            <SelectItem value="purchase">Compra</SelectItem>
+                                            <SelectItem value="usage">Uso</SelectItem>
+                                            <SelectItem value="bonus">Bonus</SelectItem>
+                                            <SelectItem value="refund">Reembolso</SelectItem>
+                                        </SelectContent>
+                                    </Select>
+                                    <Select value={dateFilter} onValueChange={setDateFilter}>
+                                        <SelectTrigger className="w-40">
+                                            <SelectValue placeholder="Período" />
+                                        </SelectTrigger>
+                                        <SelectContent>
+                                            <SelectItem value="7">Últimos 7 días</SelectItem>
+                                            <SelectItem value="30">Últimos 30 días</SelectItem>
+                                            <SelectItem value="90">Últimos 90 días</SelectItem>
+                                            <SelectItem value="365">Último año</SelectItem>
+                                            <SelectItem value="all">Todo el historial</SelectItem>
+                                        </SelectContent>
+                                    </Select>
+                                </div>
                             </CardHeader>
                             <CardContent>
                                 <Table>
@@ -380,14 +492,14 @@ export const AdminBillingPage = () => {
                                                     Cargando...
                                                 </TableCell>
                                             </TableRow>
-                                        ) : transactions?.length === 0 ? (
+                                        ) : transactions.length === 0 ? (
                                             <TableRow>
                                                 <TableCell colSpan={6} className="text-center py-8 text-muted-foreground">
                                                     No hay transacciones en este período
                                                 </TableCell>
                                             </TableRow>
                                         ) : (
-                                            transactions?.map((tx: any) => {
+                                            transactions.map((tx: any) => {
                                                 const value = tx.type === 'purchase'
                                                     ? (tx.amount === 500 ? 15 : tx.amount === 2000 ? 50 : tx.amount === 5000 ? 100 : 0)
                                                     : 0;
@@ -424,6 +536,34 @@ export const AdminBillingPage = () => {
                                         )}
                                     </TableBody>
                                 </Table>
+                                {(hasNextTxPage || hasPreviousTxPage) && (
+                                    <div className="flex items-center justify-between pt-4">
+                                        <p className="text-sm text-muted-foreground">
+                                            {txTotals ? `${txTotals.count} transacciones en el período` : ''}
+                                        </p>
+                                        <div className="flex gap-2">
+                                            <Button
+                                                variant="outline"
+                                                size="sm"
+                                                onClick={previousTxPage}
+                                                disabled={!hasPreviousTxPage || fetchingTx}
+                                            >
+                                                Anterior
+                                            </Button>
+                                            <span className="flex items-center px-3 text-sm">
+                                                Página {txPage}
+                                            </span>
+                                            <Button
+                                                variant="outline"
+                                                size="sm"
+                                                onClick={nextTxPage}
+                                                disabled={!hasNextTxPage || fetchingTx}
+                                            >
+                                                Siguiente
+                                            </Button>
+                                        </div>
+                                    </div>
+                                )}
                             </CardContent>
                         </Card>
                     </TabsContent>
@@ -438,32 +578,20 @@ export const AdminBillingPage = () => {
                                 </CardDescription>
                             </CardHeader>
                             <CardContent>
-                                <Table>
-                                    <TableHeader>
+                                <VirtualTable
+                                    items={creditBalances ?? []}
+                                    getKey={(credit: any) => credit.id}
+                                    columns={2}
+                                    header={
                                         <TableRow>
                                             <TableHead>Usuario</TableHead>
                                             <TableHead className="text-right">Créditos Disponibles</TableHead>
                                         </TableRow>
-                                    </TableHeader>
-                                    <TableBody>
-                                        {creditBalances?.map((credit: any) => (
-                                            <TableRow key={credit.id}>
-                                                <TableCell>
-                                                    <div>
-                                                        <p className="font-medium">{credit.user_full_name || 'Sin nombre'}</p>
-                                                        <p className="text-xs text-muted-foreground">{credit.user_email}</p>
-                                                    </div>
-                                                </TableCell>
-                                                <TableCell className="text-right">
-                                                    <Badge variant="outline" className="gap-1">
-                                                        <Zap className="w-3 h-3 text-yellow-500" />
-                                                        {credit.balance?.toLocaleString() || 0}
-                                                    </Badge>
-                                                </TableCell>
-                                            </TableRow>
-                                        ))}
-                                    </TableBody>
-                                </Table>
+                                    }
+                                    renderRow={(credit: any, measureRef) => (
+                                        <CreditBalanceRow key={credit.id} credit={credit} measureRef={measureRef} />
+                                    )}
+                                />
                             </CardContent>
                         </Card>
                     </TabsContent>
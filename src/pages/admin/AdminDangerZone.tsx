@@ -8,6 +8,8 @@ import { useState, useRef } from 'react';
 import { useToast } from '@/hooks/use-toast';
 import { supabase } from '@/integrations/supabase/client';
 import { useAuth } from '@/contexts/AuthContext';
+import { hasPurgeCheckpoint, purgeStorage, PurgeProgress } from '@/lib/storageMaintenance';
+import { formatRestoreProgress, restoreBackup, RestoreProgress } from '@/lib/backupRestore';
 import {
   AlertDialog,
   AlertDialogAction,
@@ -20,6 +22,8 @@ import {
   AlertDialogTrigger,
 } from "@/components/ui/alert-dialog";
 
+const STORAGE_PURGE_CHECKPOINT = 'storage-purge:ahdocuments';
+
 export const AdminDangerZone = () => {
   const { toast } = useToast();
   const { user } = useAuth();
@@ -28,6 +32,7 @@ export const AdminDangerZone = () => {
   const [isExporting, setIsExporting] = useState(false);
   const [isPurging, setIsPurging] = useState(false);
   const [isResetting, setIsResetting] = useState(false);
+  const [purgeProgress, setPurgeProgress] = useState<PurgeProgress | null>(null);
   const [lastBackup, setLastBackup] = useState<string | null>(null);
   const fileInputRef = useRef<HTMLInputElement>(null);
 
@@ -101,14 +106,20 @@ export const AdminDangerZone = () => {
   const handleSystemReset = async () => {
     setIsResetting(true);
     try {
-      // First, clear the storage bucket
-      const { data: files, error: listError } = await supabase.storage
-        .from('ahdocuments')
-        .list();
-
-      if (!listError && files && files.length > 0) {
-        const filePaths = files.map(f => f.name);
-        await supabase.storage.from('ahdocuments').remove(filePaths);
+      // First, empty the storage bucket (every agent folder, page by page).
+      // An interrupted purge resumes from its checkpoint on the next reset.
+      const purge = await purgeStorage(supabase.storage.from('ahdocuments'), {
+        checkpointKey: STORAGE_PURGE_CHECKPOINT,
+        onProgress: setPurgeProgress,
+      });
+
+      if (purge.failed > 0) {
+        console.warn('[Reset] Files left in storage:', purge.failedPaths);
+        toast({
+          title: "Some files could not be deleted",
+          description: `${purge.failed} files remain in storage. Run the reset again to retry them.`,
+          variant: "destructive",
+        });
       }
 
       // Then run the database reset
@@ -133,6 +144,7 @@ export const AdminDangerZone = () => {
       });
     } finally {
       setIsResetting(false);
+      setPurgeProgress(null);
     }
   };
 
@@ -142,6 +154,7 @@ export const AdminDangerZone = () => {
   };
 
   const [isRestoring, setIsRestoring] = useState(false);
+  const [restoreProgress, setRestoreProgress] = useState<RestoreProgress | null>(null);
 
   const handleFileChange = async (e: React.ChangeEvent<HTMLInputElement>) => {
     const file = e.target.files?.[0];
@@ -149,29 +162,13 @@ export const AdminDangerZone = () => {
 
     setIsRestoring(true);
     try {
-      const text = await file.text();
-      const backupData = JSON.parse(text);
-
-      // Validate backup structure
-      if (!backupData.backup_version || !backupData.tables) {
-        throw new Error('Invalid backup file format');
-      }
+      // Streamed and applied in batches; choosing the same file again resumes it
+      const { restored } = await restoreBackup(file, 'admin', setRestoreProgress);
 
-      // Call restore RPC
-      const { data, error } = await (supabase.rpc as any)('admin_restore_all_data', {
-        backup_data: backupData
+      toast({
+        title: "Backup restaurado",
+        description: `Restaurados: ${restored.ah_profiles ?? 0} perfiles, ${restored.ah_agents ?? 0} agentes, ${restored.user_settings ?? 0} configuraciones.`,
       });
-
-      if (error) throw error;
-
-      if (data.success) {
-        toast({
-          title: "Backup restaurado",
-          description: `Restaurados: ${data.restored.profiles} perfiles, ${data.restored.agents} agentes, ${data.restored.settings} configuraciones.`,
-        });
-      } else {
-        throw new Error(data.message);
-      }
     } catch (error: any) {
       toast({
         title: "Error al restaurar",
@@ -180,6 +177,7 @@ export const AdminDangerZone = () => {
       });
     } finally {
       setIsRestoring(false);
+      setRestoreProgress(null);
       if (fileInputRef.current) {
         fileInputRef.current.value = '';
       }
@@ -233,8 +231,12 @@ export const AdminDangerZone = () => {
                 Download Backup
               </Button>
 
-              <Button variant="outline" onClick={handleRestoreClick}>
-                <Upload className="w-4 h-4 mr-2" />
+              <Button variant="outline" onClick={handleRestoreClick} disabled={isRestoring}>
+                {isRestoring ? (
+                  <Loader2 className="w-4 h-4 mr-2 animate-spin" />
+                ) : (
+                  <Upload className="w-4 h-4 mr-2" />
+                )}
                 Load Backup File
               </Button>
               <input
@@ -246,6 +248,12 @@ export const AdminDangerZone = () => {
               />
             </div>
 
+            {restoreProgress && (
+              <p className="text-sm text-muted-foreground">
+                {formatRestoreProgress(restoreProgress)}
+              </p>
+            )}
+
             {lastBackup && (
               <p className="text-sm text-muted-foreground">
                 Last backup: {lastBackup}
@@ -389,6 +397,18 @@ export const AdminDangerZone = () => {
                 </AlertDialogFooter>
               </AlertDialogContent>
             </AlertDialog>
+            {purgeProgress ? (
+              <p className="text-sm text-muted-foreground">
+                Deleting files: {purgeProgress.deleted.toLocaleString()} / {purgeProgress.listed.toLocaleString()}
+                {' '}({purgeProgress.filesPerSecond} files/s)
+                {purgeProgress.folder && ` · ${purgeProgress.folder}`}
+                {purgeProgress.resumed && ' · resumed'}
+              </p>
+            ) : !isResetting && hasPurgeCheckpoint(STORAGE_PURGE_CHECKPOINT) && (
+              <p className="text-sm text-muted-foreground">
+                A previous reset was interrupted; the file purge will resume where it stopped.
+              </p>
+            )}
           </CardContent>
         </Card>
       </div>
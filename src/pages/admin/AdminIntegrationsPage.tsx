@@ -1,4 +1,4 @@
-import { Webhook, MessageSquare, Globe, Smartphone, Plus, Settings, Save, Loader2 } from 'lucide-react';
+import { Webhook, MessageSquare, Globe, Smartphone, Plus, Settings, Save, Loader2, Mail, Send } from 'lucide-react';
 import { DashboardLayout } from '@/components/layout/DashboardLayout';
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
@@ -7,6 +7,7 @@ import { Switch } from '@/components/ui/switch';
 import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
 import { useWebhooks } from '@/hooks/useWebhooks';
+import { useNotificationOutbox } from '@/hooks/useNotificationOutbox';
 import { useState } from 'react';
 import { useToast } from '@/components/ui/use-toast';
 
@@ -39,6 +40,7 @@ const integrations = [
 
 export const AdminIntegrationsPage = () => {
     const { webhooks, isLoading, updateWebhook } = useWebhooks();
+    const { stats: outboxStats, isLoading: outboxLoading, dispatch } = useNotificationOutbox();
     const [localWebhooks, setLocalWebhooks] = useState<Record<string, string>>({});
     const { toast } = useToast();
 
@@ -135,6 +137,58 @@ export const AdminIntegrationsPage = () => {
                     ))}
                 </div>
 
+                {/* Notification Outbox Section */}
+                <div className="space-y-4">
+                    <div className="flex items-center justify-between">
+                        <h2 className="text-xl font-semibold flex items-center gap-2">
+                            <Mail className="w-5 h-5" />
+                            Notification Outbox
+                        </h2>
+                        <Button size="sm" onClick={() => dispatch.mutate()} disabled={dispatch.isPending}>
+                            {dispatch.isPending ? <Loader2 className="w-4 h-4 mr-2 animate-spin" /> : <Send className="w-4 h-4 mr-2" />}
+                            Dispatch now
+                        </Button>
+                    </div>
+
+                    <Card className="bg-card">
+                        <CardHeader className="pb-3">
+                            <CardDescription>
+                                Emails queued by database events, last 24 hours per template
+                            </CardDescription>
+                        </CardHeader>
+                        <CardContent>
+                            {outboxLoading ? (
+                                <div className="flex justify-center p-4">
+                                    <Loader2 className="w-6 h-6 animate-spin text-primary" />
+                                </div>
+                            ) : !outboxStats || outboxStats.length === 0 ? (
+                                <p className="text-sm text-muted-foreground">No notifications in this period</p>
+                            ) : (
+                                <div className="space-y-2">
+                                    {outboxStats.map((row) => (
+                                        <div key={row.template} className="flex items-center justify-between p-3 rounded-lg border bg-background/50">
+                                            <div className="flex flex-col">
+                                                <span className="font-mono text-sm">{row.template}</span>
+                                                <span className="text-xs text-muted-foreground">
+                                                    {row.sent_per_hour}/h
+                                                    {row.avg_delivery_seconds !== null && ` · ${row.avg_delivery_seconds}s avg delivery`}
+                                                </span>
+                                            </div>
+                                            <div className="flex gap-2">
+                                                <Badge variant="outline">{row.queued + row.sending} queued</Badge>
+                                                <Badge variant="outline" className="bg-primary/10 text-primary border-primary/20">{row.sent} sent</Badge>
+                                                {row.failed > 0 && (
+                                                    <Badge variant="outline" className="bg-destructive/10 text-destructive border-destructive/20">{row.failed} failed</Badge>
+                                                )}
+                                            </div>
+                                        </div>
+                                    ))}
+                                </div>
+                            )}
+                        </CardContent>
+                    </Card>
+                </div>
+
                 {/* Webhook Configuration Section */}
                 <div className="space-y-4">
                     <h2 className="text-xl font-semibold flex items-center gap-2">
@@ -13,6 +13,7 @@ import {
 import { AreaChart, Area, XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, BarChart, Bar, PieChart, Pie, Cell, Legend } from 'recharts';
 import { useQuery } from '@tanstack/react-query';
 import { supabase } from '@/integrations/supabase/client';
+import { withExactStats } from '@/lib/conversationStats';
 import { format, subDays, parseISO } from 'date-fns';
 
 const COLORS = ['hsl(var(--primary))', 'hsl(var(--chart-2))', 'hsl(var(--chart-3))', 'hsl(var(--chart-4))', 'hsl(var(--chart-5))'];
@@ -50,7 +51,8 @@ export const AdminMetricsPage = () => {
                 return convData || [];
             }
             console.log('Admin Metrics: Got', data?.length || 0, 'from ah_public_conversations');
-            return data || [];
+            // Message counters including the ones not flushed yet
+            return withExactStats(data || [], startDate.toISOString());
         },
     });
 
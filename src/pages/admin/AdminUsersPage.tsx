@@ -1,7 +1,7 @@
-import { useState } from 'react';
+import { useEffect, useState } from 'react';
 import { Search, MoreVertical, Mail, Ban, Trash2, Eye, Loader2, RefreshCw } from 'lucide-react';
 import { UserDetailsDialog } from './UserDetailsDialog';
-import { AdminUser } from '@/hooks/useAdmin';
+import { AdminUser, AdminUsersFilters } from '@/hooks/useAdmin';
 import { useToast } from '@/hooks/use-toast';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
@@ -29,19 +29,45 @@ import {
   SelectTrigger,
   SelectValue,
 } from "@/components/ui/select";
-import { useAdminUsers } from '@/hooks/useAdmin';
+import { useAdminUsersPage } from '@/hooks/useAdmin';
 
 export const AdminUsersPage = () => {
-  const { data: users, isLoading, error, refetch } = useAdminUsers();
   const [search, setSearch] = useState('');
+  const [debouncedSearch, setDebouncedSearch] = useState('');
   const [roleFilter, setRoleFilter] = useState('all');
+  const [sort, setSort] = useState('created_at:desc');
   const [selectedUser, setSelectedUser] = useState<AdminUser | null>(null);
   const { toast } = useToast();
 
-  // Paginación
-  const [currentPage, setCurrentPage] = useState(1);
+  // Paginación (keyset, en el servidor)
   const ITEMS_PER_PAGE = 15;
 
+  useEffect(() => {
+    const timeout = setTimeout(() => setDebouncedSearch(search.trim()), 300);
+    return () => clearTimeout(timeout);
+  }, [search]);
+
+  const [sortColumn, sortDirection] = sort.split(':') as [AdminUsersFilters['sort'], AdminUsersFilters['direction']];
+  const {
+    users,
+    total,
+    page,
+    hasNextPage,
+    hasPreviousPage,
+    nextPage,
+    previousPage,
+    isLoading,
+    isFetching,
+    error,
+    refetch,
+  } = useAdminUsersPage({
+    search: debouncedSearch,
+    role: roleFilter,
+    sort: sortColumn,
+    direction: sortDirection,
+    pageSize: ITEMS_PER_PAGE,
+  });
+
   const handleSendEmail = (email: string) => {
     window.location.href = `mailto:${email}`;
   };
@@ -65,12 +91,8 @@ export const AdminUsersPage = () => {
     }
   };
 
-  const filteredUsers = users?.filter(user => {
-    const matchesSearch = (user.full_name?.toLowerCase() || '').includes(search.toLowerCase()) ||
-      user.email.toLowerCase().includes(search.toLowerCase());
-    const matchesRole = roleFilter === 'all' || user.role === roleFilter;
-    return matchesSearch && matchesRole;
-  }) || [];
+  const firstRow = (page - 1) * ITEMS_PER_PAGE + 1;
+  const totalPages = total !== null ? Math.max(1, Math.ceil(total / ITEMS_PER_PAGE)) : null;
 
   const getRoleBadgeStyle = (role: string) => {
     switch (role) {
@@ -114,8 +136,20 @@ export const AdminUsersPage = () => {
               <SelectItem value="user">User</SelectItem>
             </SelectContent>
           </Select>
-          <Button variant="outline" size="icon" onClick={() => refetch()} disabled={isLoading}>
-            <RefreshCw className={`w-4 h-4 ${isLoading ? 'animate-spin' : ''}`} />
+          <Select value={sort} onValueChange={setSort}>
+            <SelectTrigger className="w-[150px]">
+              <SelectValue placeholder="Sort" />
+            </SelectTrigger>
+            <SelectContent>
+              <SelectItem value="created_at:desc">Newest</SelectItem>
+              <SelectItem value="created_at:asc">Oldest</SelectItem>
+              <SelectItem value="email:asc">Email A-Z</SelectItem>
+              <SelectItem value="email:desc">Email Z-A</SelectItem>
+              <SelectItem value="agents_count:desc">Most agents</SelectItem>
+            </SelectContent>
+          </Select>
+          <Button variant="outline" size="icon" onClick={() => refetch()} disabled={isFetching}>
+            <RefreshCw className={`w-4 h-4 ${isFetching ? 'animate-spin' : ''}`} />
           </Button>
         </div>
 
@@ -127,7 +161,7 @@ export const AdminUsersPage = () => {
           <div className="text-center py-12">
             <p className="text-destructive">Error loading users</p>
           </div>
-        ) : filteredUsers.length === 0 ? (
+        ) : users.length === 0 ? (
           <div className="text-center py-12">
             <p className="text-muted-foreground">No users found</p>
             <Button variant="outline" className="mt-4" onClick={() => refetch()}>
@@ -149,8 +183,7 @@ export const AdminUsersPage = () => {
                   </TableRow>
                 </TableHeader>
                 <TableBody>
-                  {filteredUsers
-                    .slice((currentPage - 1) * ITEMS_PER_PAGE, currentPage * ITEMS_PER_PAGE)
+                  {users
                     .map((user) => (
                       <TableRow key={user.id}>
                         <TableCell>
@@ -216,28 +249,28 @@ export const AdminUsersPage = () => {
             </div>
 
             {/* Paginación */}
-            {filteredUsers.length > ITEMS_PER_PAGE && (
+            {(hasNextPage || hasPreviousPage) && (
               <div className="flex items-center justify-between p-4 bg-card border border-border rounded-lg mt-4">
                 <p className="text-sm text-muted-foreground">
-                  Mostrando {((currentPage - 1) * ITEMS_PER_PAGE) + 1} - {Math.min(currentPage * ITEMS_PER_PAGE, filteredUsers.length)} de {filteredUsers.length} usuarios
+                  Mostrando {firstRow} - {firstRow + users.length - 1}{total !== null && ` de ${total}`} usuarios
                 </p>
                 <div className="flex gap-2">
                   <Button
                     variant="outline"
                     size="sm"
-                    onClick={() => setCurrentPage(p => Math.max(1, p - 1))}
-                    disabled={currentPage === 1}
+                    onClick={previousPage}
+                    disabled={!hasPreviousPage || isFetching}
                   >
                     Anterior
                   </Button>
                   <span className="flex items-center px-3 text-sm">
-                    Página {currentPage} de {Math.ceil(filteredUsers.length / ITEMS_PER_PAGE)}
+                    Página {page}{totalPages !== null && ` de ${totalPages}`}
                   </span>
                   <Button
                     variant="outline"
                     size="sm"
-                    onClick={() => setCurrentPage(p => p + 1)}
-                    disabled={currentPage * ITEMS_PER_PAGE >= filteredUsers.length}
+                    onClick={nextPage}
+                    disabled={!hasNextPage || isFetching}
                   >
                     Siguiente
                   </Button>
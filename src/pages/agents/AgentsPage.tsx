@@ -6,6 +6,7 @@ import { DashboardLayout } from '@/components/layout/DashboardLayout';
 import { AgentCard } from '@/components/dashboard/AgentCard';
 import { useNavigate } from 'react-router-dom';
 import { useAgents, useUpdateAgent, useDeleteAgent } from '@/hooks/useAgents';
+import { useDashboardSummary, useDashboardSummaryRealtime } from '@/hooks/useCredits';
 import { useLanguage } from '@/contexts/LanguageContext';
 import { AgentStatus } from '@/types/database';
 import {
@@ -26,9 +27,6 @@ import {
   AlertDialogTitle,
 } from '@/components/ui/alert-dialog';
 
-import { useQuery } from '@tanstack/react-query';
-import { supabase } from '@/integrations/supabase/client';
-
 export const AgentsPage = () => {
   const navigate = useNavigate();
   const { data: agents, isLoading } = useAgents();
@@ -36,36 +34,9 @@ export const AgentsPage = () => {
   const deleteAgent = useDeleteAgent();
   const { t } = useLanguage();
 
-  // Fetch conversation counts per agent
-  const { data: conversationCounts } = useQuery({
-    queryKey: ['agent-conversations-count-list', (agents || []).map(a => a.id).join(',')],
-    queryFn: async () => {
-      if (!agents || agents.length === 0) return {};
-
-      const agentIds = agents.map(a => a.id);
-
-      // Fetch all conversations for these agents (ids only)
-      const { data, error } = await supabase
-        .from('ah_public_conversations')
-        .select('agent_id')
-        .in('agent_id', agentIds);
-
-      if (error) {
-        console.error('Error fetching conversation counts:', error);
-        return {};
-      }
-
-      // Aggregate counts in memory
-      const counts: Record<string, number> = {};
-      data?.forEach(c => {
-        counts[c.agent_id] = (counts[c.agent_id] || 0) + 1;
-      });
-
-      return counts;
-    },
-    enabled: !!agents && agents.length > 0,
-    refetchInterval: 30000
-  });
+  // Conversation counts per agent (maintained in the database)
+  useDashboardSummaryRealtime();
+  const { data: conversationCounts } = useDashboardSummary(summary => summary.agents);
 
   const [viewMode, setViewMode] = useState<'grid' | 'list'>('grid');
   const [search, setSearch] = useState('');
@@ -13,13 +13,15 @@ import {
     FolderOpen,
     Upload,
     X,
-    Code
+    Code,
+    Zap
 } from 'lucide-react';
 import { supabase } from '@/integrations/supabase/client';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
 import { Label } from '@/components/ui/label';
 import { Textarea } from '@/components/ui/textarea';
+import { Switch } from '@/components/ui/switch';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
 import { RadioGroup, RadioGroupItem } from '@/components/ui/radio-group';
 import { DashboardLayout } from '@/components/layout/DashboardLayout';
@@ -79,6 +81,8 @@ export const EditAgentPage = () => {
         widget_position: 'bottom-right',
         avatar_url: '',
     });
+    const [answerCache, setAnswerCache] = useState({ enabled: false, ttlMinutes: 1440 });
+    const [clearingCache, setClearingCache] = useState(false);
 
     useEffect(() => {
         if (agent) {
@@ -95,6 +99,10 @@ export const EditAgentPage = () => {
                 widget_position: agent.widget_position || 'bottom-right',
                 avatar_url: agent.avatar_url || '',
             });
+            setAnswerCache({
+                enabled: agent.answer_cache_enabled ?? false,
+                ttlMinutes: agent.answer_cache_ttl_minutes ?? 1440,
+            });
         }
     }, [agent]);
 
@@ -153,6 +161,25 @@ export const EditAgentPage = () => {
         updateFormData('avatar_url', '');
     };
 
+    // Vaciar la caché de respuestas (se vacía sola al cambiar el prompt o los documentos)
+    const handleClearAnswerCache = async () => {
+        if (!id) return;
+
+        setClearingCache(true);
+        try {
+            const { error } = await (supabase as any)
+                .from('ah_answer_cache')
+                .delete()
+                .eq('agent_id', id);
+
+            if (error) throw error;
+        } catch (error) {
+            console.error('Error clearing answer cache:', error);
+        } finally {
+            setClearingCache(false);
+        }
+    };
+
     const handleSave = async () => {
         if (!id || !formData.objective) return;
 
@@ -170,6 +197,8 @@ export const EditAgentPage = () => {
                     widget_color: formData.widget_color,
                     widget_position: formData.widget_position,
                     avatar_url: formData.avatar_url || null,
+                    answer_cache_enabled: answerCache.enabled,
+                    answer_cache_ttl_minutes: answerCache.ttlMinutes,
                 },
             });
         } catch (error) {
@@ -650,6 +679,63 @@ export const EditAgentPage = () => {
                             </CardContent>
                         </Card>
 
+                        <Card className="bg-card mt-6">
+                            <CardHeader>
+                                <CardTitle className="flex items-center gap-2">
+                                    <Zap className="w-5 h-5" />
+                                    Caché de Respuestas
+                                </CardTitle>
+                                <CardDescription>
+                                    Responde al instante las preguntas repetidas de los visitantes sin consumir créditos
+                                </CardDescription>
+                            </CardHeader>
+                            <CardContent className="space-y-6">
+                                <div className="flex items-center justify-between gap-4">
+                                    <div className="space-y-1">
+                                        <Label htmlFor="answer_cache_enabled">Activar caché</Label>
+                                        <p className="text-xs text-muted-foreground">
+                                            Se vacía automáticamente al cambiar el prompt del sistema o los documentos
+                                        </p>
+                                    </div>
+                                    <Switch
+                                        id="answer_cache_enabled"
+                                        checked={answerCache.enabled}
+                                        onCheckedChange={(checked) => setAnswerCache(prev => ({ ...prev, enabled: checked }))}
+                                    />
+                                </div>
+                                <div className="space-y-2">
+                                    <Label>Duración de las respuestas</Label>
+                                    <Select
+                                        value={String(answerCache.ttlMinutes)}
+                                        onValueChange={(value) => setAnswerCache(prev => ({ ...prev, ttlMinutes: Number(value) }))}
+                                        disabled={!answerCache.enabled}
+                                    >
+                                        <SelectTrigger>
+                                            <SelectValue />
+                                        </SelectTrigger>
+                                        <SelectContent>
+                                            <SelectItem value="60">1 hora</SelectItem>
+                                            <SelectItem value="360">6 horas</SelectItem>
+                                            <SelectItem value="1440">1 día</SelectItem>
+                                            <SelectItem value="10080">7 días</SelectItem>
+                                        </SelectContent>
+                                    </Select>
+                                </div>
+                                <Button
+                                    variant="outline"
+                                    onClick={handleClearAnswerCache}
+                                    disabled={clearingCache}
+                                >
+                                    {clearingCache ? (
+                                        <Loader2 className="w-4 h-4 mr-2 animate-spin" />
+                                    ) : (
+                                        <Trash2 className="w-4 h-4 mr-2" />
+                                    )}
+                                    Vaciar caché
+                                </Button>
+                            </CardContent>
+                        </Card>
+
                         <Card className="bg-card mt-6 border-destructive/50">
                             <CardHeader>
                                 <CardTitle className="text-destructive">{t('editAgent.dangerZone')}</CardTitle>
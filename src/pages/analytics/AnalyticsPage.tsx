@@ -15,6 +15,18 @@ import { supabase } from '@/integrations/supabase/client';
 import { Loader2 } from 'lucide-react';
 import { format, subDays, startOfDay, isAfter, parseISO } from 'date-fns';
 import { Conversation, Agent } from '@/types/database';
+import { withExactStats } from '@/lib/conversationStats';
+
+interface AnswerCacheStats {
+  agent_id: string;
+  agent_name: string;
+  lookups: number;
+  hits: number;
+  semantic_hits: number;
+  hit_rate: number;
+  latency_saved_ms: number;
+  entries: number;
+}
 
 const COLORS = ['hsl(var(--primary))', 'hsl(var(--chart-2))', 'hsl(var(--chart-3))', 'hsl(var(--chart-4))', 'hsl(var(--chart-5))'];
 
@@ -37,7 +49,8 @@ export const AnalyticsPage = () => {
         .order('started_at', { ascending: true });
 
       if (error) throw error;
-      return data as unknown as Conversation[];
+      // Message counters including the ones not flushed yet
+      return withExactStats(data as unknown as Conversation[], startDate.toISOString());
     },
   });
 
@@ -54,6 +67,19 @@ export const AnalyticsPage = () => {
     },
   });
 
+  // Answer cache hits per agent (only agents with the cache enabled)
+  const { data: cacheStats } = useQuery({
+    queryKey: ['analytics-answer-cache', timeRange],
+    queryFn: async () => {
+      const days = timeRange === '24h' ? 1 : timeRange === '7d' ? 7 : timeRange === '90d' ? 90 : 30;
+      const { data, error } = await (supabase.rpc as any)('get_answer_cache_stats', {
+        p_since: format(subDays(new Date(), days), 'yyyy-MM-dd'),
+      });
+      if (error) throw error;
+      return (data || []) as AnswerCacheStats[];
+    },
+  });
+
   const analyticsData = useMemo(() => {
     if (!conversations || !agents) return null;
 
@@ -219,6 +245,7 @@ export const AnalyticsPage = () => {
             <TabsTrigger value="trends">Tendencias</TabsTrigger>
             <TabsTrigger value="agents">Por Agente</TabsTrigger>
             <TabsTrigger value="distribution">Distribución</TabsTrigger>
+            <TabsTrigger value="cache">Caché</TabsTrigger>
           </TabsList>
 
           <TabsContent value="trends">
@@ -361,6 +388,53 @@ export const AnalyticsPage = () => {
               </Card>
             </div>
           </TabsContent>
+
+          <TabsContent value="cache">
+            <Card className="bg-card">
+              <CardHeader>
+                <CardTitle>Caché de Respuestas por Agente</CardTitle>
+              </CardHeader>
+              <CardContent>
+                {!cacheStats?.length ? (
+                  <p className="text-sm text-muted-foreground">
+                    Ningún agente tiene la caché de respuestas activada. Actívala en la configuración del agente.
+                  </p>
+                ) : (
+                  <div className="overflow-x-auto">
+                    <table className="w-full text-sm">
+                      <thead>
+                        <tr className="border-b text-left text-muted-foreground">
+                          <th className="py-2 pr-4 font-medium">Agente</th>
+                          <th className="py-2 pr-4 font-medium text-right">Consultas</th>
+                          <th className="py-2 pr-4 font-medium text-right">Aciertos</th>
+                          <th className="py-2 pr-4 font-medium text-right">Tasa de acierto</th>
+                          <th className="py-2 pr-4 font-medium text-right">Tiempo ahorrado</th>
+                          <th className="py-2 font-medium text-right">Respuestas guardadas</th>
+                        </tr>
+                      </thead>
+                      <tbody>
+                        {cacheStats.map(row => (
+                          <tr key={row.agent_id} className="border-b last:border-0">
+                            <td className="py-2 pr-4">{row.agent_name}</td>
+                            <td className="py-2 pr-4 text-right">{row.lookups}</td>
+                            <td className="py-2 pr-4 text-right">
+                              {row.hits}
+                              {row.semantic_hits > 0 && (
+                                <span className="text-xs text-muted-foreground"> ({row.semantic_hits} similares)</span>
+                              )}
+                            </td>
+                            <td className="py-2 pr-4 text-right">{(Number(row.hit_rate) * 100).toFixed(1)}%</td>
+                            <td className="py-2 pr-4 text-right">{(Number(row.latency_saved_ms) / 1000).toFixed(1)} s</td>
+                            <td className="py-2 text-right">{row.entries}</td>
+                          </tr>
+                        ))}
+                      </tbody>
+                    </table>
+                  </div>
+                )}
+              </CardContent>
+            </Card>
+          </TabsContent>
         </Tabs >
       </div >
     </DashboardLayout >
@@ -1,11 +1,11 @@
-import { useState, useEffect, useRef } from 'react';
-import { MessageSquare, Search, Filter, User, Bot, Clock, Loader2, RefreshCw, CheckCircle, UserCheck, RotateCcw, Send } from 'lucide-react';
+import { useState, useEffect, useMemo, useCallback } from 'react';
+import { useQuery, useQueryClient } from '@tanstack/react-query';
+import { MessageSquare, Search, Filter, User, Clock, Loader2, RefreshCw, CheckCircle, UserCheck, RotateCcw, Send } from 'lucide-react';
 import { Button } from '@/components/ui/button';
 import { Input } from '@/components/ui/input';
 import { DashboardLayout } from '@/components/layout/DashboardLayout';
 import { Badge } from '@/components/ui/badge';
 import { Card, CardContent } from '@/components/ui/card';
-import { ScrollArea } from '@/components/ui/scroll-area';
 import {
   Select,
   SelectContent,
@@ -16,89 +16,96 @@ import {
 import { cn } from '@/lib/utils';
 import { supabase } from '@/integrations/supabase/client';
 import { useAuth } from '@/contexts/AuthContext';
-
-interface Message {
-  id: string;
-  conversation_id: string;
-  role: 'user' | 'assistant';
-  content: string;
-  created_at: string;
-}
-
-interface Conversation {
-  id: string;
-  agent_id: string;
-  visitor_id: string;
-  visitor_name: string | null;
-  visitor_email: string | null;
-  status: string;
-  created_at?: string;
-
-  agent: {
-    name: string;
-    avatar_url: string | null;
-  };
-  messages: Message[];
-}
-
-const statusColors: Record<string, string> = {
-  active: 'bg-primary/10 text-primary border-primary/20',
-  resolved: 'bg-muted text-muted-foreground border-muted',
-  closed: 'bg-muted text-muted-foreground border-muted',
-  pending: 'bg-accent text-accent-foreground border-accent-foreground/20',
-};
-
-function formatTimeAgo(dateString: string) {
-  const date = new Date(dateString);
-  const now = new Date();
-  const diffMs = now.getTime() - date.getTime();
-  const diffMins = Math.floor(diffMs / 60000);
-  const diffHours = Math.floor(diffMs / 3600000);
-  const diffDays = Math.floor(diffMs / 86400000);
-
-  if (diffMins < 1) return 'Ahora';
-  if (diffMins < 60) return `hace ${diffMins} min`;
-  if (diffHours < 24) return `hace ${diffHours} hora${diffHours > 1 ? 's' : ''}`;
-  return `hace ${diffDays} día${diffDays > 1 ? 's' : ''}`;
-}
-
-function formatTime(dateString: string) {
-  return new Date(dateString).toLocaleTimeString([], { hour: '2-digit', minute: '2-digit' });
+import { useIsTabLeader } from '@/hooks/useTabLeader';
+import { ConversationList } from '@/components/conversations/ConversationList';
+import { MessageList } from '@/components/conversations/MessageList';
+import { Conversation, Message, formatTimeAgo, statusColors } from '@/components/conversations/types';
+
+// Shared between tabs: one tab polls and listens, the others get its results
+const CONVERSATIONS_KEY = 'public-conversations';
+
+async function fetchConversations(userId: string): Promise<Conversation[]> {
+  // Get user's agents first
+  const { data: userAgents, error: agentsError } = await supabase
+    .from('ah_agents')
+    .select('id')
+    .eq('user_id', userId);
+
+  if (agentsError) {
+    console.error('Error fetching user agents:', agentsError);
+    throw new Error('Error al cargar agentes');
+  }
+
+  if (!userAgents || userAgents.length === 0) {
+    return [];
+  }
+
+  const agentIds = userAgents.map(a => a.id);
+
+  // Get conversations for user's agents
+  const { data: convos, error: convError } = await supabase
+    .from('ah_public_conversations')
+    .select(`
+      *,
+      agent:ah_agents!ah_public_conversations_agent_id_fkey(name, avatar_url)
+    `)
+    .in('agent_id', agentIds);
+
+  if (convError) {
+    console.error('Error fetching conversations:', convError);
+    throw new Error('Error al cargar conversaciones');
+  }
+
+  // Get messages for each conversation
+  return Promise.all(
+    (convos || []).map(async (convo: any) => {
+      const { data: messages } = await supabase
+        .from('ah_public_messages')
+        .select('*')
+        .eq('conversation_id', convo.id)
+        .order('created_at', { ascending: true });
+
+      return {
+        ...convo,
+        messages: messages || []
+      };
+    })
+  );
 }
 
 export const ConversationsPage = () => {
   const { user } = useAuth();
-  const [conversations, setConversations] = useState<Conversation[]>([]);
-  const [selectedConversation, setSelectedConversation] = useState<Conversation | null>(null);
+  const queryClient = useQueryClient();
+  const isLeader = useIsTabLeader(CONVERSATIONS_KEY, !!user);
+  const [selectedId, setSelectedId] = useState<string | null>(null);
   const [search, setSearch] = useState('');
   const [statusFilter, setStatusFilter] = useState('all');
-  const [isLoading, setIsLoading] = useState(true);
-  const [error, setError] = useState<string | null>(null);
   const [ownerMessage, setOwnerMessage] = useState('');
   const [isSending, setIsSending] = useState(false);
 
-  const messagesEndRef = useRef<HTMLDivElement>(null);
+  const queryKey = [CONVERSATIONS_KEY, user?.id];
+  const { data: conversations = [], isLoading, error, refetch } = useQuery({
+    queryKey,
+    queryFn: () => fetchConversations(user!.id),
+    enabled: !!user,
+    // Poll every 5 seconds as fallback, in the leader tab only (hidden or not:
+    // the other tabs get its results)
+    refetchInterval: isLeader ? 5000 : false,
+    refetchIntervalInBackground: true,
+    refetchOnWindowFocus: isLeader,
+  });
 
-  const scrollToBottom = () => {
-    messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
-  };
+  // Auto-select first conversation if none selected
+  const selectedConversation = conversations.find(c => c.id === selectedId) ?? conversations[0] ?? null;
 
-  useEffect(() => {
-    if (selectedConversation?.messages) {
-      scrollToBottom();
-    }
-  }, [selectedConversation?.messages, selectedConversation?.id]);
+  const updateConversations = (update: (prev: Conversation[]) => Conversation[]) => {
+    queryClient.setQueryData<Conversation[]>(queryKey, prev => prev && update(prev));
+  };
 
-  // Load conversations on mount and when user changes
+  // Subscribe to new messages for real-time updates (leader tab only)
   useEffect(() => {
-    if (!user) {
-      setIsLoading(false);
-      return;
-    }
+    if (!user || !isLeader) return;
 
-    loadConversations(user.id);
-
-    // Subscribe to new messages for real-time updates
     const channel = supabase
       .channel('public-messages-realtime')
       .on(
@@ -109,7 +116,7 @@ export const ConversationsPage = () => {
           table: 'ah_public_messages'
         },
         () => {
-          loadConversations(user.id, true);
+          queryClient.invalidateQueries({ queryKey: [CONVERSATIONS_KEY, user.id] });
         }
       )
       .subscribe();
@@ -117,104 +124,12 @@ export const ConversationsPage = () => {
     return () => {
       supabase.removeChannel(channel);
     };
-  }, [user]);
-
-  const loadConversations = async (userId: string, silent = false) => {
-    try {
-      if (!silent) setIsLoading(true);
-      setError(null);
-
-      // Get user's agents first
-      const { data: userAgents, error: agentsError } = await supabase
-        .from('ah_agents')
-        .select('id')
-        .eq('user_id', userId);
-
-      if (agentsError) {
-        console.error('Error fetching user agents:', agentsError);
-        if (!silent) setError('Error al cargar agentes');
-        return;
-      }
-
-      if (!userAgents || userAgents.length === 0) {
-        setConversations([]);
-        return;
-      }
-
-      const agentIds = userAgents.map(a => a.id);
-
-      // Get conversations for user's agents
-      const { data: convos, error: convError } = await supabase
-        .from('ah_public_conversations')
-        .select(`
-          *,
-          agent:ah_agents!ah_public_conversations_agent_id_fkey(name, avatar_url)
-        `)
-        .in('agent_id', agentIds);
-
-      if (convError) {
-        console.error('Error fetching conversations:', convError);
-        if (!silent) setError('Error al cargar conversaciones');
-        return;
-      }
+  }, [user, isLeader, queryClient]);
 
-      // Get messages for each conversation
-      const conversationsWithMessages = await Promise.all(
-        (convos || []).map(async (convo: any) => {
-          const { data: messages } = await supabase
-            .from('ah_public_messages')
-            .select('*')
-            .eq('conversation_id', convo.id)
-            .order('created_at', { ascending: true });
-
-          return {
-            ...convo,
-            messages: messages || []
-          };
-        })
-      );
-
-      setConversations(conversationsWithMessages);
-
-      // Update selected conversation with fresh data if it exists
-      if (selectedConversation) {
-        const updatedSelected = conversationsWithMessages.find((c: any) => c.id === selectedConversation.id);
-        if (updatedSelected) {
-          // Only update if messages length changed or status changed to avoid unnecessary re-renders
-          if (updatedSelected.messages.length !== selectedConversation.messages.length ||
-            updatedSelected.status !== selectedConversation.status) {
-            setSelectedConversation(updatedSelected);
-          }
-        }
-      } else if (conversationsWithMessages.length > 0 && !selectedConversation) {
-        // Auto-select first conversation if none selected
-        setSelectedConversation(conversationsWithMessages[0]);
-      }
-    } catch (err) {
-      console.error('Error loading conversations:', err);
-      // Don't show error on screen for background updates, just log
-      if (!silent && !conversations.length) setError('Error inesperado');
-    } finally {
-      if (!silent) setIsLoading(false);
-    }
-  };
-
-  // Poll for updates every 5 seconds as fallback
-  useEffect(() => {
-    if (!user) return;
-
-    const interval = setInterval(() => {
-      // Silent update
-      loadConversations(user.id, true);
-    }, 5000);
-
-    return () => clearInterval(interval);
-  }, [user, selectedConversation?.id]); // Add dependency to valid closure if needed, though loadConversations uses user.id directly
-
-  const handleSelectConversation = (conv: Conversation) => {
-    setSelectedConversation(conv);
+  const handleSelectConversation = useCallback((id: string) => {
+    setSelectedId(id);
     setOwnerMessage('');
-  };
+  }, []);
 
   // Update conversation status
   const updateConversationStatus = async (conversationId: string, newStatus: string) => {
@@ -239,8 +154,9 @@ export const ConversationsPage = () => {
         notificationMessage = '✅ Esta conversación ha sido marcada como resuelta.';
       }
 
+      let newMsg: Message | null = null;
       if (notificationMessage) {
-        const { data: newMsg } = await supabase
+        const { data } = await supabase
           .from('ah_public_messages')
           .insert({
             conversation_id: conversationId,
@@ -249,28 +165,16 @@ export const ConversationsPage = () => {
           })
           .select()
           .single();
-
-        // Update local state with new message
-        if (newMsg && selectedConversation?.id === conversationId) {
-          const updatedMessages = [...selectedConversation.messages, newMsg as Message];
-          setSelectedConversation(prev => prev ? { ...prev, status: newStatus, messages: updatedMessages } : null);
-          setConversations(prev =>
-            prev.map(c => c.id === conversationId
-              ? { ...c, status: newStatus, messages: updatedMessages }
-              : c
-            )
-          );
-          return; // Already updated, no need to continue
-        }
+        newMsg = data as Message | null;
       }
 
       // Update local state
-      setConversations(prev =>
-        prev.map(c => c.id === conversationId ? { ...c, status: newStatus } : c)
+      updateConversations(prev =>
+        prev.map(c => c.id === conversationId
+          ? { ...c, status: newStatus, messages: newMsg ? [...c.messages, newMsg] : c.messages }
+          : c
+        )
       );
-      if (selectedConversation?.id === conversationId) {
-        setSelectedConversation(prev => prev ? { ...prev, status: newStatus } : null);
-      }
     } catch (err) {
       console.error('Error updating conversation status:', err);
     }
@@ -300,11 +204,9 @@ export const ConversationsPage = () => {
       }
 
       // Update local state
-      const updatedMessages = [...selectedConversation.messages, newMsg as Message];
-      setSelectedConversation(prev => prev ? { ...prev, messages: updatedMessages } : null);
-      setConversations(prev =>
+      updateConversations(prev =>
         prev.map(c => c.id === selectedConversation.id
-          ? { ...c, messages: updatedMessages }
+          ? { ...c, messages: [...c.messages, newMsg as Message] }
           : c
         )
       );
@@ -316,21 +218,17 @@ export const ConversationsPage = () => {
     }
   };
 
-  const filteredConversations = conversations.filter(conv => {
+  const filteredConversations = useMemo(() => {
     const query = search.toLowerCase();
-    const matchesSearch =
-      conv.agent.name.toLowerCase().includes(query) ||
-      (conv.visitor_name?.toLowerCase() || '').includes(query) ||
-      (conv.visitor_email?.toLowerCase() || '').includes(query);
-    const matchesStatus = statusFilter === 'all' || conv.status === statusFilter;
-    return matchesSearch && matchesStatus;
-  });
-
-  const getLastMessage = (conv: Conversation) => {
-    if (conv.messages.length === 0) return 'Sin mensajes';
-    const lastMsg = conv.messages[conv.messages.length - 1];
-    return lastMsg.content.length > 50 ? lastMsg.content.substring(0, 50) + '...' : lastMsg.content;
-  };
+    return conversations.filter(conv => {
+      const matchesSearch =
+        conv.agent.name.toLowerCase().includes(query) ||
+        (conv.visitor_name?.toLowerCase() || '').includes(query) ||
+        (conv.visitor_email?.toLowerCase() || '').includes(query);
+      const matchesStatus = statusFilter === 'all' || conv.status === statusFilter;
+      return matchesSearch && matchesStatus;
+    });
+  }, [conversations, search, statusFilter]);
 
   return (
     <DashboardLayout>
@@ -343,7 +241,7 @@ export const ConversationsPage = () => {
             </p>
           </div>
           <Button
-            onClick={() => user && loadConversations(user.id)}
+            onClick={() => refetch()}
             variant="outline"
             size="sm"
             className="gap-2"
@@ -357,9 +255,9 @@ export const ConversationsPage = () => {
           <div className="flex items-center justify-center h-96">
             <Loader2 className="w-8 h-8 animate-spin text-primary" />
           </div>
-        ) : error ? (
+        ) : error && !conversations.length ? (
           <div className="text-center py-12">
-            <p className="text-destructive">{error}</p>
+            <p className="text-destructive">{error.message || 'Error inesperado'}</p>
           </div>
         ) : conversations.length === 0 ? (
           <div className="flex items-center justify-center h-96">
@@ -398,40 +296,12 @@ export const ConversationsPage = () => {
                   </SelectContent>
                 </Select>
               </div>
-              <ScrollArea className="flex-1">
-                <div className="p-2 space-y-2">
-                  {filteredConversations.map((conv) => (
-                    <button
-                      key={conv.id}
-                      onClick={() => handleSelectConversation(conv)}
-                      className={cn(
-                        "w-full p-3 rounded-lg text-left transition-colors",
-                        selectedConversation?.id === conv.id
-                          ? "bg-primary/10 border border-primary/20"
-                          : "hover:bg-muted/30"
-                      )}
-                    >
-                      <div className="flex items-start justify-between mb-2">
-                        <span className="font-medium text-foreground">
-                          {conv.visitor_name || 'Visitante Anónimo'}
-                        </span>
-                        <span className="text-xs text-muted-foreground">
-                          {conv.messages.length > 0
-                            ? formatTimeAgo(conv.messages[conv.messages.length - 1].created_at)
-                            : 'Sin fecha'}
-                        </span>
-                      </div>
-                      <p className="text-sm text-muted-foreground truncate mb-2">{getLastMessage(conv)}</p>
-                      <div className="flex items-center gap-2">
-                        <Badge variant="outline" className="text-xs">{conv.agent.name}</Badge>
-                        <Badge variant="outline" className={cn("text-xs capitalize", statusColors[conv.status] || '')}>
-                          {conv.status}
-                        </Badge>
-                      </div>
-                    </button>
-                  ))}
-                </div>
-              </ScrollArea>
+              <ConversationList
+                conversations={filteredConversations}
+                selectedId={selectedConversation?.id ?? null}
+                onSelect={handleSelectConversation}
+                className="flex-1 min-h-0"
+              />
             </Card>
 
             {/* Conversation Detail */}
@@ -527,58 +397,20 @@ export const ConversationsPage = () => {
                       )}
                     </div>
                   </div>
-                  <ScrollArea className="flex-1 p-4">
-                    {selectedConversation.messages.length === 0 ? (
-                      <div className="flex items-center justify-center h-full text-muted-foreground">
-                        No hay mensajes en esta conversación
-                      </div>
-                    ) : (
-                      <div className="space-y-4">
-                        {selectedConversation.messages.map((message) => (
-                          <div
-                            key={message.id}
-                            className={cn(
-                              "flex gap-3",
-                              message.role === 'assistant' && "flex-row-reverse"
-                            )}
-                          >
-                            <div className={cn(
-                              "w-8 h-8 rounded-full flex items-center justify-center flex-shrink-0 overflow-hidden",
-                              message.role === 'user' ? "bg-primary text-primary-foreground" : "bg-primary/10"
-                            )}>
-                              {message.role === 'user' ? (
-                                <span className="text-sm font-medium">
-                                  {selectedConversation.visitor_name
-                                    ? selectedConversation.visitor_name.charAt(0).toUpperCase()
-                                    : '?'}
-                                </span>
-                              ) : (
-                                selectedConversation.agent.avatar_url ? (
-                                  <img
-                                    src={selectedConversation.agent.avatar_url}
-                                    alt={selectedConversation.agent.name}
-                                    className="w-full h-full object-cover"
-                                  />
-                                ) : (
-                                  <Bot className="w-4 h-4 text-primary" />
-                                )
-                              )}
-                            </div>
-                            <div className={cn(
-                              "max-w-[70%] rounded-lg p-3",
-                              message.role === 'user'
-                                ? "bg-muted text-foreground"
-                                : "bg-primary/10 text-foreground"
-                            )}>
-                              <p className="text-sm whitespace-pre-wrap">{message.content}</p>
-                              <p className="text-xs text-muted-foreground mt-1">{formatTime(message.created_at)}</p>
-                            </div>
-                          </div>
-                        ))}
-                        <div ref={messagesEndRef} />
-                      </div>
-                    )}
-                  </ScrollArea>
+                  {selectedConversation.messages.length === 0 ? (
+                    <div className="flex-1 flex items-center justify-center p-4 text-muted-foreground">
+                      No hay mensajes en esta conversación
+                    </div>
+                  ) : (
+                    <MessageList
+                      key={selectedConversation.id}
+                      messages={selectedConversation.messages}
+                      visitorName={selectedConversation.visitor_name}
+                      agentName={selectedConversation.agent.name}
+                      agentAvatarUrl={selectedConversation.agent.avatar_url}
+                      className="flex-1 min-h-0"
+                    />
+                  )}
 
                   {/* Owner Message Input - Only visible in human_takeover mode */}
                   {selectedConversation.status === 'human_takeover' && (
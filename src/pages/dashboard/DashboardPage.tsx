@@ -7,15 +7,12 @@ import { RecentConversations } from '@/components/dashboard/RecentConversations'
 import { UsageChart } from '@/components/dashboard/UsageChart';
 import { useNavigate } from 'react-router-dom';
 import { useProfile } from '@/hooks/useProfile';
-import { useCredits, useDashboardStats } from '@/hooks/useCredits';
+import { useCredits, useDashboardStats, useDashboardSummary, useDashboardSummaryRealtime } from '@/hooks/useCredits';
 import { useAgents, useUpdateAgent } from '@/hooks/useAgents';
 import { useSubscription, PLAN_LIMITS } from '@/hooks/useSubscription';
 import { useLanguage } from '@/contexts/LanguageContext';
 import { AgentStatus } from '@/types/database';
 
-import { useQuery } from '@tanstack/react-query';
-import { supabase } from '@/integrations/supabase/client';
-
 export const DashboardPage = () => {
   const navigate = useNavigate();
   const { data: profile } = useProfile();
@@ -26,36 +23,9 @@ export const DashboardPage = () => {
   const { data: subscription } = useSubscription();
   const { t } = useLanguage();
 
-  // Fetch conversation counts per agent for the cards
-  const { data: conversationCounts } = useQuery({
-    queryKey: ['agent-conversations-count-dashboard', (agents || []).map(a => a.id).join(',')],
-    queryFn: async () => {
-      if (!agents || agents.length === 0) return {};
-
-      const agentIds = agents.map(a => a.id);
-
-      // Fetch all conversations for these agents (ids only)
-      const { data, error } = await supabase
-        .from('ah_public_conversations')
-        .select('agent_id')
-        .in('agent_id', agentIds);
-
-      if (error) {
-        console.error('Error fetching conversation counts:', error);
-        return {};
-      }
-
-      // Aggregate counts in memory
-      const counts: Record<string, number> = {};
-      data?.forEach(c => {
-        counts[c.agent_id] = (counts[c.agent_id] || 0) + 1;
-      });
-
-      return counts;
-    },
-    enabled: !!agents && agents.length > 0,
-    refetchInterval: 30000 // Update every 30s
-  });
+  // Per-agent counts come with the summary; realtime keeps it current
+  useDashboardSummaryRealtime();
+  const { data: conversationCounts } = useDashboardSummary(summary => summary.agents);
 
   const displayName = profile?.full_name || 'there';
   const activeAgents = agents?.filter(a => a.status === 'active').length || 0;
@@ -105,6 +75,7 @@ export const DashboardPage = () => {
           <StatsCard
             title={t('dashboard.conversations')}
             value={stats?.conversations || 0}
+            description={stats?.conversationsToday ? `+${stats.conversationsToday} hoy` : undefined}
             icon={<MessageSquare className="w-6 h-6" />}
           />
           <StatsCard
@@ -1,4 +1,5 @@
-import { useState, useRef, useEffect } from 'react';
+import { useState, useRef, useEffect, useLayoutEffect, useMemo } from 'react';
+import { useQueryClient } from '@tanstack/react-query';
 import {
     Send,
     Bot,
@@ -37,6 +38,10 @@ import {
 } from '@/components/ui/select';
 import { supabase } from '@/integrations/supabase/client';
 import { cn } from '@/lib/utils';
+import { EMBEDDINGS_TABLE, getEmbeddingsTarget } from '@/lib/embeddings';
+import { postChatWebhook } from '@/lib/chatStream';
+import { cleanAgentResponse } from '@/lib/chatHistory';
+import { useChatHistory } from '@/hooks/useChatHistory';
 import { useAgents } from '@/hooks/useAgents';
 import { useCredits, useConsumeCredits } from '@/hooks/useCredits';
 import { useProfile } from '@/hooks/useProfile';
@@ -48,7 +53,8 @@ interface Message {
     id: string;
     role: 'user' | 'assistant';
     content: string;
-    timestamp: Date;
+    /** null for history stored before created_at existed */
+    timestamp: Date | null;
     sources?: string[];
 }
 
@@ -57,6 +63,7 @@ export const PlaygroundPage = () => {
     const { data: profile } = useProfile();
     const { toast } = useToast();
     const { t } = useLanguage();
+    const queryClient = useQueryClient();
 
     // Hooks de créditos
     const { data: creditsData } = useCredits();
@@ -66,7 +73,6 @@ export const PlaygroundPage = () => {
     const [messages, setMessages] = useState<Message[]>([]);
     const [inputMessage, setInputMessage] = useState('');
     const [isLoading, setIsLoading] = useState(false);
-    const [isLoadingHistory, setIsLoadingHistory] = useState(false);
     const [clearDialogOpen, setClearDialogOpen] = useState(false);
     const scrollRef = useRef<HTMLDivElement>(null);
 
@@ -77,114 +83,39 @@ export const PlaygroundPage = () => {
         ? `${selectedAgentId}_${profile.id}`
         : '';
 
-    // Cargar historial cuando se selecciona un agente
-    const cleanAgentResponse = (text: string): string => {
-        if (!text) return '';
-
-        // Remover [Used tools: Tool: ... Result: [...]] pattern completo
-        let cleaned = text.replace(/\[Used tools:[\s\S]*?Result:[\s\S]*?\]\s*/g, '');
-
-        // Remover [Used tools: ...] sin Result
-        cleaned = cleaned.replace(/\[Used tools:.*?\]/gs, '');
-
-        // Remover JSON objects que empiezan con {"type":"text"
-        cleaned = cleaned.replace(/\{"type":"text"[\s\S]*?\}/g, '');
-
-        // Remover JSON objects que empiezan con {"pageContent"
-        cleaned = cleaned.replace(/\{"pageContent":[\s\S]*?"\}/g, '');
-
-        // Remover metadata patterns como "metadata":{...}
-        cleaned = cleaned.replace(/"metadata":\{[^}]*\}/g, '');
-
-        // Remover Result: seguido de arrays JSON
-        cleaned = cleaned.replace(/Result:\s*\[[\s\S]*?\]\s*/g, '');
-
-        // Remover Input: patterns
-        cleaned = cleaned.replace(/Input:\s*"[^"]*"/g, '');
-
-        // Remover Tool: patterns
-        cleaned = cleaned.replace(/Tool:\s*\w+,?\s*/g, '');
-
-        // Limpiar caracteres escapados
-        cleaned = cleaned.replace(/\\n/g, '\n');
-        cleaned = cleaned.replace(/\\"/g, '"');
-
-        // Remover corchetes y llaves sueltas al inicio
-        cleaned = cleaned.replace(/^[\[\]\{\},\s]+/g, '');
+    // Historial ya normalizado, paginado desde el más reciente
+    const history = useChatHistory(sessionId);
+    const allMessages = useMemo<Message[]>(
+        () => [...history.messages, ...messages],
+        [history.messages, messages]
+    );
 
-        // Remover corchetes y llaves sueltas al final
-        cleaned = cleaned.replace(/[\[\]\{\},\s]+$/g, '');
+    // Al cargar páginas anteriores, mantener la posición visible del scroll
+    const prependAnchorRef = useRef<number | null>(null);
 
-        // Limpiar múltiples saltos de línea y espacios
-        cleaned = cleaned.replace(/\n{3,}/g, '\n\n');
-        cleaned = cleaned.replace(/\s{3,}/g, '  ');
+    const handleMessagesScroll = () => {
+        const el = scrollRef.current;
+        if (!el || el.scrollTop > 80 || !history.hasNextPage || history.isFetchingNextPage) return;
 
-        return cleaned.trim();
+        prependAnchorRef.current = el.scrollHeight - el.scrollTop;
+        history.fetchNextPage();
     };
 
-    // Cargar historial cuando se selecciona un agente
-    const loadHistory = async (currentSessionId: string) => {
-        const webhookUrl = await getWebhookUrl('VITE_N8N_GET_HISTORY_WEBHOOK_URL');
-        if (!webhookUrl) return;
-
-        setIsLoadingHistory(true);
-        try {
-            const response = await fetch(webhookUrl, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({ agentId: currentSessionId }), // Usar el ID pasado como argumento
-            });
-
-            if (!response.ok) throw new Error('Error al cargar historial');
-
-            const data = await response.json();
-            console.log('Historial cargado:', data);
-
-            // Parsear mensajes del historial
-            const historyMessages: Message[] = [];
-            const records = Array.isArray(data) ? data : (data[0] ? [data[0]] : []);
-
-            for (const record of records) {
-                const msgData = typeof record.message === 'string'
-                    ? JSON.parse(record.message)
-                    : record.message;
+    useLayoutEffect(() => {
+        const el = scrollRef.current;
+        if (!el || prependAnchorRef.current === null || history.isFetchingNextPage) return;
 
-                if (msgData && msgData.content) {
-                    // Limpiar el contenido de metadata si es del asistente
-                    const content = msgData.type === 'ai'
-                        ? cleanAgentResponse(msgData.content)
-                        : msgData.content;
+        el.scrollTop = el.scrollHeight - prependAnchorRef.current;
+        prependAnchorRef.current = null;
+    }, [history.messages, history.isFetchingNextPage]);
 
-                    historyMessages.push({
-                        id: record.id?.toString() || Date.now().toString(),
-                        role: msgData.type === 'human' ? 'user' : 'assistant',
-                        content: content,
-                        timestamp: new Date(record.created_at || Date.now()),
-                    });
-                }
-            }
-
-            setMessages(historyMessages);
-        } catch (error) {
-            console.error('Error loading history:', error);
-        } finally {
-            setIsLoadingHistory(false);
-        }
-    };
-
-    // Cargar historial cuando cambia el agente
-    useEffect(() => {
-        if (sessionId && selectedAgentId) {
-            loadHistory(sessionId);
-        }
-    }, [sessionId, selectedAgentId]);
-
-    // Auto-scroll to bottom when new messages arrive
+    // Auto-scroll to bottom when new messages arrive (or the first history page loads)
+    const newestPageLoaded = (history.data?.pages.length ?? 0) > 0;
     useEffect(() => {
         if (scrollRef.current) {
             scrollRef.current.scrollTop = scrollRef.current.scrollHeight;
         }
-    }, [messages]);
+    }, [messages, newestPageLoaded]);
 
     // Función para simular escritura humana dividiendo la respuesta
     const typeMessageHumanLike = async (fullContent: string, sources: string[] = []) => {
@@ -255,6 +186,10 @@ export const PlaygroundPage = () => {
         if (!sessionId) return;
 
         setMessages([]);
+        queryClient.setQueryData(['chat-history', sessionId], {
+            pages: [{ messages: [], nextCursor: null }],
+            pageParams: [null],
+        });
 
         try {
             const webhookUrl = await getWebhookUrl('VITE_N8N_CLEAR_HISTORY_WEBHOOK_URL');
@@ -335,27 +270,39 @@ export const PlaygroundPage = () => {
                 throw new Error('VITE_N8N_CHAT_WEBHOOK_URL no está configurada');
             }
 
-            const response = await fetch(webhookUrl, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    agentId: sessionId, // Usar sessionId para mantener memoria por usuario
-                    agentName: selectedAgent?.name,
-                    tableName: `embeddings_${selectedAgentId.split('-').join('_')}`,
-                    message: userMessage.content,
-                    systemPrompt: selectedAgent?.system_prompt || '',
-                    history: messages.slice(-10).map(m => ({
-                        role: m.role,
-                        content: m.content
-                    })),
-                }),
+            // Si el webhook hace streaming, la respuesta se va mostrando token a token
+            const streamingId = `stream-${Date.now()}`;
+            let hasStreamed = false;
+
+            const result = await postChatWebhook(webhookUrl, {
+                agentId: sessionId, // Usar sessionId para mantener memoria por usuario
+                agentName: selectedAgent?.name,
+                ...getEmbeddingsTarget(selectedAgentId),
+                message: userMessage.content,
+                systemPrompt: selectedAgent?.system_prompt || '',
+                history: allMessages.slice(-10).map(m => ({
+                    role: m.role,
+                    content: m.content
+                })),
+            }, {
+                onToken: (_token, content) => {
+                    const visible = cleanAgentResponse(content);
+                    if (!hasStreamed) {
+                        hasStreamed = true;
+                        setIsLoading(false);
+                        setMessages(prev => [...prev, {
+                            id: streamingId,
+                            role: 'assistant' as const,
+                            content: visible,
+                            timestamp: new Date(),
+                        }]);
+                        return;
+                    }
+                    setMessages(prev => prev.map(m => m.id === streamingId ? { ...m, content: visible } : m));
+                },
             });
 
-            if (!response.ok) {
-                throw new Error(`Error HTTP: ${response.status}`);
-            }
-
-            const data = await response.json();
+            const data = result.data || {};
             console.log('Respuesta del agente:', data);
 
             // Consumir 1 crédito por mensaje exitoso
@@ -367,17 +314,28 @@ export const PlaygroundPage = () => {
             });
 
             // Obtener el contenido de la respuesta
-            let fullContent = data.output || data.response || data.message || data[0]?.output || data[0]?.response || 'Sin respuesta';
+            let fullContent = result.content || 'Sin respuesta';
 
             // Limpiar el contenido de metadata de herramientas
             fullContent = cleanAgentResponse(fullContent);
 
             const sources = data.sources || [];
 
+            // n8n ya guardó el turno: la próxima vez que se monte el Playground
+            // el historial se recarga con él (sin refetch ahora, ya está en pantalla)
+            queryClient.invalidateQueries({ queryKey: ['chat-history', sessionId], refetchType: 'none' });
+
             setIsLoading(false);
 
-            // Usar efecto de escritura humana
-            await typeMessageHumanLike(fullContent, sources);
+            if (hasStreamed) {
+                // Stream completo: dejar el texto final limpio y las fuentes
+                setMessages(prev => prev.map(m =>
+                    m.id === streamingId ? { ...m, content: fullContent, sources } : m
+                ));
+            } else {
+                // Modo buffered: usar efecto de escritura humana
+                await typeMessageHumanLike(fullContent, sources);
+            }
 
         } catch (error) {
             console.error('Error sending message:', error);
@@ -436,6 +394,8 @@ export const PlaygroundPage = () => {
                                 onValueChange={(value) => {
                                     setSelectedAgentId(value);
                                     setMessages([]);
+                                    // Recargar el historial del servidor al cambiar de agente
+                                    queryClient.removeQueries({ queryKey: ['chat-history'] });
                                 }}
                             >
                                 <SelectTrigger>
@@ -477,7 +437,7 @@ export const PlaygroundPage = () => {
                                     <div className="flex items-center gap-2">
                                         <Database className="w-4 h-4 text-muted-foreground" />
                                         <span className="text-sm text-muted-foreground">
-                                            Base: embeddings_{selectedAgentId.split('-')[0]}...
+                                            Base: {EMBEDDINGS_TABLE} ({selectedAgentId.split('-')[0]}...)
                                         </span>
                                     </div>
                                     <Button
@@ -542,8 +502,8 @@ export const PlaygroundPage = () => {
                                 </div>
 
                                 {/* Messages */}
-                                <div className="flex-1 overflow-y-auto p-4" ref={scrollRef}>
-                                    {messages.length === 0 ? (
+                                <div className="flex-1 overflow-y-auto p-4" ref={scrollRef} onScroll={handleMessagesScroll}>
+                                    {allMessages.length === 0 ? (
                                         <div className="flex items-center justify-center h-full text-center">
                                             <div>
                                                 <MessageSquare className="w-12 h-12 text-muted-foreground mx-auto mb-3" />
@@ -557,7 +517,12 @@ export const PlaygroundPage = () => {
                                         </div>
                                     ) : (
                                         <div className="space-y-4">
-                                            {messages.map((message) => (
+                                            {history.isFetchingNextPage && (
+                                                <div className="flex justify-center">
+                                                    <Loader2 className="w-4 h-4 animate-spin text-muted-foreground" />
+                                                </div>
+                                            )}
+                                            {allMessages.map((message) => (
                                                 <div
                                                     key={message.id}
                                                     className={cn(
@@ -603,9 +568,11 @@ export const PlaygroundPage = () => {
                                                             : "bg-primary/10 text-foreground"
                                                     )}>
                                                         <p className="text-sm whitespace-pre-wrap">{message.content}</p>
-                                                        <p className="text-xs text-muted-foreground mt-1">
-                                                            {formatTime(message.timestamp)}
-                                                        </p>
+                                                        {message.timestamp && (
+                                                            <p className="text-xs text-muted-foreground mt-1">
+                                                                {formatTime(message.timestamp)}
+                                                            </p>
+                                                        )}
                                                         {message.sources && message.sources.length > 0 && (
                                                             <div className="mt-2 pt-2 border-t border-border/50">
                                                                 <p className="text-xs text-muted-foreground">Fuentes:</p>
@@ -45,6 +45,7 @@ import {
 import { useSettings } from '@/hooks/useSettings';
 import { sendWeeklyReport } from '@/lib/notifications';
 import { supabase } from '@/integrations/supabase/client';
+import { formatRestoreProgress, restoreBackup, RestoreProgress } from '@/lib/backupRestore';
 
 export const SettingsPage = () => {
   const { user } = useAuth();
@@ -129,6 +130,7 @@ export const SettingsPage = () => {
   };
 
   const [isRestoring, setIsRestoring] = useState(false);
+  const [restoreProgress, setRestoreProgress] = useState<RestoreProgress | null>(null);
 
   const handleFileChange = async (e: React.ChangeEvent<HTMLInputElement>) => {
     const file = e.target.files?.[0];
@@ -136,28 +138,13 @@ export const SettingsPage = () => {
 
     setIsRestoring(true);
     try {
-      const text = await file.text();
-      const backupData = JSON.parse(text);
+      // Streamed and applied in batches; choosing the same file again resumes it
+      const { restored } = await restoreBackup(file, 'user', setRestoreProgress);
 
-      if (!backupData.backup_version || !backupData.data) {
-        throw new Error('Formato de backup inválido');
-      }
-
-      // Call restore RPC
-      const { data, error } = await (supabase.rpc as any)('user_restore_my_data', {
-        backup_data: backupData
+      toast({
+        title: 'Backup restaurado',
+        description: `Se restauraron ${restored.ah_agents ?? 0} agentes, perfil y configuraciones.`,
       });
-
-      if (error) throw error;
-
-      if (data.success) {
-        toast({
-          title: 'Backup restaurado',
-          description: `Se restauraron ${data.restored.agents} agentes, perfil y configuraciones.`,
-        });
-      } else {
-        throw new Error(data.message);
-      }
     } catch (error: any) {
       toast({
         title: 'Error al restaurar',
@@ -166,6 +153,7 @@ export const SettingsPage = () => {
       });
     } finally {
       setIsRestoring(false);
+      setRestoreProgress(null);
       if (fileInputRef.current) {
         fileInputRef.current.value = '';
       }
@@ -520,7 +508,9 @@ export const SettingsPage = () => {
                 <div className="flex items-center justify-between p-4 rounded-lg border border-border">
                   <div>
                     <p className="font-medium text-foreground">Importar Backup</p>
-                    <p className="text-sm text-muted-foreground">Cargar un archivo de backup previo</p>
+                    <p className="text-sm text-muted-foreground">
+                      {restoreProgress ? formatRestoreProgress(restoreProgress) : 'Cargar un archivo de backup previo'}
+                    </p>
                   </div>
                   <Button variant="outline" onClick={handleImportClick} disabled={isRestoring}>
                     {isRestoring ? (
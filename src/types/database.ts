@@ -43,6 +43,9 @@ export interface Agent {
   whatsapp_number: string | null;
   webchat_enabled: boolean;
   tools: string[];
+  answer_cache_enabled?: boolean;
+  answer_cache_ttl_minutes?: number;
+  answer_cache_max_entries?: number;
   created_at: string;
   updated_at: string;
 }
@@ -59,6 +62,7 @@ export interface Document {
   status: DocumentStatus;
   error_message: string | null;
   chunks_count: number;
+  content_hash?: string | null;
   created_at: string;
   updated_at: string;
 }
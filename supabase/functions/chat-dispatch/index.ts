@@ -0,0 +1,124 @@
+import { createClient } from 'https://esm.sh/@supabase/supabase-js@2';
+
+/**
+ * Chat Dispatch
+ * The only caller of the n8n chat webhook for the public widget. The widget
+ * posts the webhook payload here with its admission ticket; the call is
+ * forwarded (and the answer streamed back) only while the ticket holds a
+ * running slot of the agent (verify_chat_slot, 20260126_chat_admission.sql).
+ *
+ * Required setup, or the browser can still reach n8n directly:
+ *   supabase secrets set CHAT_DISPATCH_SECRET=<random string>
+ *   In the chat workflow's Webhook node: Authentication = Header Auth,
+ *   header X-Chat-Dispatch-Secret with the same value.
+ * The webhook URL is read like the app does (get_webhook_url with
+ * VITE_N8N_CHAT_WEBHOOK_URL), or from the N8N_CHAT_WEBHOOK_URL secret.
+ */
+
+const WEBHOOK_KEY = 'VITE_N8N_CHAT_WEBHOOK_URL';
+
+const corsHeaders = {
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type, accept',
+    'Access-Control-Allow-Methods': 'POST, OPTIONS',
+};
+
+const json = (body: unknown, status: number) =>
+    new Response(JSON.stringify(body), {
+        status,
+        headers: { ...corsHeaders, 'Content-Type': 'application/json' },
+    });
+
+const supabase = createClient(
+    Deno.env.get('SUPABASE_URL')!,
+    Deno.env.get('SUPABASE_SERVICE_ROLE_KEY')!,
+    { auth: { persistSession: false } }
+);
+
+let webhookUrl: string | null = Deno.env.get('N8N_CHAT_WEBHOOK_URL') || null;
+
+const getWebhookUrl = async () => {
+    if (webhookUrl) return webhookUrl;
+
+    const { data, error } = await supabase.rpc('get_webhook_url', { webhook_key: WEBHOOK_KEY });
+    if (error) throw error;
+
+    webhookUrl = data || null;
+    return webhookUrl;
+};
+
+Deno.serve(async (req) => {
+    if (req.method === 'OPTIONS') {
+        return new Response('ok', { headers: corsHeaders });
+    }
+    if (req.method !== 'POST') {
+        return json({ error: 'Method not allowed' }, 405);
+    }
+
+    const secret = Deno.env.get('CHAT_DISPATCH_SECRET');
+    if (!secret) {
+        console.error('[chat-dispatch] CHAT_DISPATCH_SECRET is not set');
+        return json({ error: 'Chat dispatch not configured' }, 503);
+    }
+
+    let payload: Record<string, unknown>;
+    try {
+        payload = await req.json();
+    } catch {
+        return json({ error: 'Invalid JSON body' }, 400);
+    }
+
+    const { admissionAgentId, admissionTicket } = payload;
+    if (typeof admissionAgentId !== 'string' || typeof admissionTicket !== 'string') {
+        return json({ error: 'Missing admission ticket' }, 403);
+    }
+
+    const { data: admitted, error: verifyError } = await supabase.rpc('verify_chat_slot', {
+        p_agent_id: admissionAgentId,
+        p_ticket: admissionTicket,
+    });
+    if (verifyError) {
+        console.error('[chat-dispatch] verify_chat_slot failed:', verifyError);
+        return json({ error: 'Admission unavailable' }, 503);
+    }
+    if (!admitted) {
+        return json({ error: 'No running chat slot for this ticket' }, 429);
+    }
+
+    let url: string | null;
+    try {
+        url = await getWebhookUrl();
+    } catch (error) {
+        console.error('[chat-dispatch] get_webhook_url failed:', error);
+        url = null;
+    }
+    if (!url) {
+        return json({ error: 'Webhook URL not configured' }, 503);
+    }
+
+    // Aborted with the visitor's request, so a timed-out widget call stops n8n too
+    let upstream: Response;
+    try {
+        upstream = await fetch(url, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': req.headers.get('accept') || 'application/json',
+                'X-Chat-Dispatch-Secret': secret,
+            },
+            body: JSON.stringify(payload),
+            signal: req.signal,
+        });
+    } catch (error) {
+        console.error('[chat-dispatch] Webhook call failed:', error);
+        return json({ error: 'Webhook unreachable' }, 502);
+    }
+
+    return new Response(upstream.body, {
+        status: upstream.status,
+        headers: {
+            ...corsHeaders,
+            'Content-Type': upstream.headers.get('content-type') || 'application/json',
+        },
+    });
+});
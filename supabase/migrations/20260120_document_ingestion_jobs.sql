@@ -0,0 +1,191 @@
+-- Migration: Document Ingestion Jobs
+-- Description: Per-document vectorization queue with content-hash deduplication
+-- and chunk-level tracking for incremental re-embedding
+
+-- Content hash of the uploaded file (SHA-256, hex). Used to skip re-uploads
+-- of the same file to the same agent.
+ALTER TABLE ah_documents
+  ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_documents_agent_content_hash
+ON ah_documents(agent_id, content_hash)
+WHERE content_hash IS NOT NULL;
+
+-- Table: ah_document_jobs
+-- One row per vectorization request for a document
+CREATE TABLE IF NOT EXISTS ah_document_jobs (
+  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  document_id UUID NOT NULL REFERENCES ah_documents(id) ON DELETE CASCADE,
+  agent_id UUID NOT NULL REFERENCES ah_agents(id) ON DELETE CASCADE,
+  user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+  status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'running', 'succeeded', 'failed', 'skipped')),
+  attempts INTEGER NOT NULL DEFAULT 0,
+  max_attempts INTEGER NOT NULL DEFAULT 3,
+  chunks_total INTEGER NOT NULL DEFAULT 0,
+  chunks_embedded INTEGER NOT NULL DEFAULT 0,
+  chunks_skipped INTEGER NOT NULL DEFAULT 0,
+  error_message TEXT,
+  locked_at TIMESTAMPTZ,
+  finished_at TIMESTAMPTZ,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Only one open job per document; re-enqueueing an open document is a no-op
+CREATE UNIQUE INDEX IF NOT EXISTS idx_document_jobs_open
+ON ah_document_jobs(document_id)
+WHERE status IN ('queued', 'running');
+
+CREATE INDEX IF NOT EXISTS idx_document_jobs_agent_status
+ON ah_document_jobs(agent_id, status, created_at);
+
+-- Table: ah_document_chunks
+-- Hash of every chunk already embedded, so only changed chunks are re-embedded
+CREATE TABLE IF NOT EXISTS ah_document_chunks (
+  document_id UUID NOT NULL REFERENCES ah_documents(id) ON DELETE CASCADE,
+  chunk_index INTEGER NOT NULL,
+  agent_id UUID NOT NULL REFERENCES ah_agents(id) ON DELETE CASCADE,
+  chunk_hash TEXT NOT NULL,
+  embedded_at TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (document_id, chunk_index)
+);
+
+CREATE INDEX IF NOT EXISTS idx_document_chunks_agent
+ON ah_document_chunks(agent_id);
+
+-- RLS Policies
+ALTER TABLE ah_document_jobs ENABLE ROW LEVEL SECURITY;
+ALTER TABLE ah_document_chunks ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view their own document jobs"
+  ON ah_document_jobs FOR SELECT
+  USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can insert their own document jobs"
+  ON ah_document_jobs FOR INSERT
+  WITH CHECK (auth.uid() = user_id);
+
+CREATE POLICY "Users can update their own document jobs"
+  ON ah_document_jobs FOR UPDATE
+  USING (auth.uid() = user_id);
+
+CREATE POLICY "Users can view chunks of their agents"
+  ON ah_document_chunks FOR SELECT
+  USING (agent_id IN (SELECT id FROM ah_agents WHERE user_id = auth.uid()));
+
+CREATE POLICY "Users can manage chunks of their agents"
+  ON ah_document_chunks FOR ALL
+  USING (agent_id IN (SELECT id FROM ah_agents WHERE user_id = auth.uid()))
+  WITH CHECK (agent_id IN (SELECT id FROM ah_agents WHERE user_id = auth.uid()));
+
+CREATE TRIGGER update_document_jobs_updated_at
+  BEFORE UPDATE ON ah_document_jobs
+  FOR EACH ROW
+  EXECUTE FUNCTION update_updated_at_column();
+
+-- Enqueue every pending/failed document of an agent. Returns the open jobs.
+CREATE OR REPLACE FUNCTION enqueue_document_jobs(p_agent_id UUID)
+RETURNS SETOF ah_document_jobs
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO ah_document_jobs (document_id, agent_id, user_id)
+  SELECT d.id, d.agent_id, d.user_id
+  FROM ah_documents d
+  WHERE d.agent_id = p_agent_id
+    AND d.status IN ('pending', 'failed')
+  ON CONFLICT (document_id) WHERE status IN ('queued', 'running') DO NOTHING;
+
+  RETURN QUERY
+  SELECT * FROM ah_document_jobs
+  WHERE agent_id = p_agent_id
+    AND status IN ('queued', 'running')
+  ORDER BY created_at;
+END;
+$$;
+
+-- Claim up to p_limit queued jobs for a worker. SKIP LOCKED lets several
+-- workers (browser tabs, n8n, the local test worker) drain the same queue.
+-- Jobs stuck in 'running' longer than p_lease are considered abandoned.
+CREATE OR REPLACE FUNCTION claim_document_jobs(
+  p_agent_id UUID,
+  p_limit INTEGER DEFAULT 3,
+  p_lease INTERVAL DEFAULT INTERVAL '10 minutes'
+)
+RETURNS SETOF ah_document_jobs
+LANGUAGE plpgsql
+SECURITY INVOKER
+SET search_path = public
+AS $$
+BEGIN
+  RETURN QUERY
+  UPDATE ah_document_jobs j
+  SET status = 'running',
+      attempts = j.attempts + 1,
+      locked_at = NOW()
+  WHERE j.id IN (
+    SELECT id FROM ah_document_jobs
+    WHERE agent_id = p_agent_id
+      AND (
+        status = 'queued'
+        OR (status = 'running' AND locked_at < NOW() - p_lease)
+      )
+    ORDER BY created_at
+    LIMIT p_limit
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING j.*;
+END;
+$$;
+
+-- Mirror job state onto the document row so useDocuments sees progress
+-- through realtime changes on ah_documents.
+CREATE OR REPLACE FUNCTION sync_document_status_from_job()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF NEW.status = 'running' THEN
+    UPDATE ah_documents
+    SET status = 'processing', error_message = NULL
+    WHERE id = NEW.document_id;
+  ELSIF NEW.status IN ('succeeded', 'skipped') THEN
+    UPDATE ah_documents
+    SET status = 'indexed',
+        error_message = NULL,
+        chunks_count = NEW.chunks_total
+    WHERE id = NEW.document_id;
+  ELSIF NEW.status = 'failed' THEN
+    UPDATE ah_documents
+    SET status = 'failed', error_message = NEW.error_message
+    WHERE id = NEW.document_id;
+  END IF;
+
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trigger_sync_document_status
+AFTER UPDATE OF status ON ah_document_jobs
+FOR EACH ROW
+WHEN (OLD.status IS DISTINCT FROM NEW.status)
+EXECUTE FUNCTION sync_document_status_from_job();
+
+-- Realtime for document progress
+DO $$
+DECLARE
+  v_table TEXT;
+BEGIN
+  FOREACH v_table IN ARRAY ARRAY['ah_documents', 'ah_document_jobs'] LOOP
+    IF NOT EXISTS (
+      SELECT 1 FROM pg_publication_tables
+      WHERE pubname = 'supabase_realtime' AND schemaname = 'public' AND tablename = v_table
+    ) THEN
+      EXECUTE format('ALTER PUBLICATION supabase_realtime ADD TABLE public.%I', v_table);
+    END IF;
+  END LOOP;
+END $$;
+
+COMMENT ON TABLE ah_document_jobs IS 'Vectorization queue: one job per document ingestion attempt';
+COMMENT ON TABLE ah_document_chunks IS 'Chunk hashes already embedded, used for incremental re-embedding';
+COMMENT ON COLUMN ah_documents.content_hash IS 'SHA-256 of the uploaded content, unique per agent';
@@ -0,0 +1,250 @@
+-- Migration: Consolidated Embeddings Store
+-- Description: One hash-partitioned embeddings table keyed by agent, with an
+-- HNSW index per partition, replacing the dynamic embeddings_<agent> tables
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+-- Table: ah_embeddings
+-- Same shape as the LangChain/n8n Supabase vector store (content, metadata,
+-- embedding) plus agent_id/document_id columns used for filtering and cleanup.
+CREATE TABLE IF NOT EXISTS ah_embeddings (
+  id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+  agent_id UUID NOT NULL REFERENCES ah_agents(id) ON DELETE CASCADE,
+  document_id UUID REFERENCES ah_documents(id) ON DELETE CASCADE,
+  chunk_index INTEGER,
+  content TEXT,
+  metadata JSONB DEFAULT '{}'::jsonb,
+  embedding VECTOR(1536),
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (agent_id, id)
+) PARTITION BY HASH (agent_id);
+
+-- 16 partitions keeps each HNSW graph small enough to build and search
+-- quickly, and a WHERE agent_id = ... query only touches one of them.
+DO $$
+BEGIN
+  FOR i IN 0..15 LOOP
+    EXECUTE format(
+      'CREATE TABLE IF NOT EXISTS ah_embeddings_p%s PARTITION OF ah_embeddings FOR VALUES WITH (MODULUS 16, REMAINDER %s)',
+      i, i
+    );
+  END LOOP;
+END;
+$$;
+
+-- Indexes (created on every partition)
+CREATE INDEX IF NOT EXISTS idx_embeddings_hnsw
+ON ah_embeddings USING hnsw (embedding vector_cosine_ops)
+WITH (m = 16, ef_construction = 64);
+
+CREATE INDEX IF NOT EXISTS idx_embeddings_document
+ON ah_embeddings(document_id)
+WHERE document_id IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_embeddings_metadata
+ON ah_embeddings USING gin (metadata jsonb_path_ops);
+
+-- Fill document_id/chunk_index from metadata when they are not given.
+-- agent_id is the partition key: Postgres routes the row before BEFORE ROW
+-- triggers run, so it has to be a real column by then (see
+-- ah_embeddings_store for writers that only know metadata).
+CREATE OR REPLACE FUNCTION fill_embedding_keys()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF NEW.document_id IS NULL THEN
+    NEW.document_id := NULLIF(COALESCE(NEW.metadata->>'document_id', NEW.metadata->>'documentId'), '')::uuid;
+  END IF;
+
+  IF NEW.chunk_index IS NULL AND NEW.metadata ? 'chunk_index' THEN
+    NEW.chunk_index := (NEW.metadata->>'chunk_index')::int;
+  END IF;
+
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_fill_embedding_keys ON ah_embeddings;
+
+CREATE TRIGGER trigger_fill_embedding_keys
+BEFORE INSERT ON ah_embeddings
+FOR EACH ROW
+EXECUTE FUNCTION fill_embedding_keys();
+
+-- Write path of the n8n vector store node, which only sends content,
+-- metadata and embedding (tableName in the vectorize payload). agent_id is
+-- resolved from metadata before the row reaches ah_embeddings. agent_id is
+-- left out of the view on purpose: without the full primary key PostgREST
+-- sends the node's upsert as a plain INSERT, which the trigger can take.
+CREATE OR REPLACE VIEW ah_embeddings_store
+WITH (security_invoker = true)
+AS
+SELECT id, content, metadata, embedding
+FROM ah_embeddings;
+
+CREATE OR REPLACE FUNCTION insert_embedding_from_store()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+  v_agent_id UUID := NULLIF(COALESCE(NEW.metadata->>'agent_id', NEW.metadata->>'agentId'), '')::uuid;
+BEGIN
+  IF v_agent_id IS NULL THEN
+    RAISE EXCEPTION 'ah_embeddings_store requires metadata.agent_id';
+  END IF;
+
+  INSERT INTO ah_embeddings (agent_id, content, metadata, embedding)
+  VALUES (v_agent_id, NEW.content, COALESCE(NEW.metadata, '{}'::jsonb), NEW.embedding)
+  RETURNING id INTO NEW.id;
+
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trigger_insert_embedding_from_store ON ah_embeddings_store;
+
+CREATE TRIGGER trigger_insert_embedding_from_store
+INSTEAD OF INSERT ON ah_embeddings_store
+FOR EACH ROW
+EXECUTE FUNCTION insert_embedding_from_store();
+
+-- Similarity search for one agent. Signature matches the vector store node's
+-- query function (query_embedding, match_count, filter); filter.agent_id is
+-- required and any other keys are matched against metadata.
+CREATE OR REPLACE FUNCTION match_embeddings(
+  query_embedding VECTOR(1536),
+  match_count INTEGER DEFAULT 5,
+  filter JSONB DEFAULT '{}'::jsonb
+)
+RETURNS TABLE (id BIGINT, content TEXT, metadata JSONB, similarity FLOAT)
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+  v_agent_id UUID := NULLIF(COALESCE(filter->>'agent_id', filter->>'agentId'), '')::uuid;
+  v_metadata JSONB := filter - 'agent_id' - 'agentId';
+BEGIN
+  IF v_agent_id IS NULL THEN
+    RAISE EXCEPTION 'match_embeddings requires filter.agent_id';
+  END IF;
+
+  PERFORM set_config('hnsw.ef_search', '100', true);
+
+  -- pgvector >= 0.8: keep scanning the graph until enough rows pass the filter
+  BEGIN
+    PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+  EXCEPTION WHEN OTHERS THEN
+    NULL;
+  END;
+
+  RETURN QUERY
+  SELECT e.id, e.content, e.metadata, 1 - (e.embedding <=> query_embedding) AS similarity
+  FROM ah_embeddings e
+  WHERE e.agent_id = v_agent_id
+    AND (v_metadata = '{}'::jsonb OR e.metadata @> v_metadata)
+  ORDER BY e.embedding <=> query_embedding
+  LIMIT match_count;
+END;
+$$;
+
+-- RLS Policies
+ALTER TABLE ah_embeddings ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view embeddings of their agents" ON ah_embeddings;
+CREATE POLICY "Users can view embeddings of their agents"
+  ON ah_embeddings FOR SELECT
+  USING (agent_id IN (SELECT id FROM ah_agents WHERE user_id = auth.uid()));
+
+DROP POLICY IF EXISTS "Users can delete embeddings of their agents" ON ah_embeddings;
+CREATE POLICY "Users can delete embeddings of their agents"
+  ON ah_embeddings FOR DELETE
+  USING (agent_id IN (SELECT id FROM ah_agents WHERE user_id = auth.uid()));
+
+-- ============================================
+-- Migration path from embeddings_<agent> tables
+-- ============================================
+
+-- Bookkeeping so the copy can be re-run safely
+CREATE TABLE IF NOT EXISTS ah_embeddings_migrations (
+  table_name TEXT PRIMARY KEY,
+  agent_id UUID NOT NULL,
+  rows_copied BIGINT NOT NULL DEFAULT 0,
+  source_dropped BOOLEAN NOT NULL DEFAULT false,
+  migrated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Copy every legacy per-agent table into ah_embeddings. Tables whose agent
+-- no longer exists are skipped. Pass p_drop_source => true to drop the legacy
+-- tables once they have been copied (can be done in a later run).
+CREATE OR REPLACE FUNCTION migrate_agent_embeddings(p_drop_source BOOLEAN DEFAULT false)
+RETURNS TABLE (table_name TEXT, agent_id UUID, rows_copied BIGINT, dropped BOOLEAN)
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  tbl TEXT;
+  v_agent_id UUID;
+  v_rows BIGINT;
+  v_done BOOLEAN;
+BEGIN
+  FOR tbl IN
+    SELECT t.tablename FROM pg_tables t
+    WHERE t.schemaname = 'public'
+      AND t.tablename LIKE 'embeddings\_%'
+      AND replace(substring(t.tablename FROM 12), '_', '-') ~ '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
+    ORDER BY t.tablename
+  LOOP
+    v_agent_id := replace(substring(tbl FROM 12), '_', '-')::uuid;
+
+    IF NOT EXISTS (SELECT 1 FROM ah_agents a WHERE a.id = v_agent_id) THEN
+      CONTINUE;
+    END IF;
+
+    SELECT EXISTS (SELECT 1 FROM ah_embeddings_migrations m WHERE m.table_name = tbl) INTO v_done;
+
+    IF NOT v_done THEN
+      EXECUTE format(
+        'INSERT INTO ah_embeddings (agent_id, document_id, chunk_index, content, metadata, embedding)
+         SELECT $1,
+                d.id,
+                NULLIF(src.metadata->>''chunk_index'', '''')::int,
+                src.content,
+                COALESCE(src.metadata, ''{}''::jsonb) || jsonb_build_object(''agent_id'', $1),
+                src.embedding
+         FROM public.%I src
+         LEFT JOIN ah_documents d
+           ON d.id::text = COALESCE(src.metadata->>''document_id'', src.metadata->>''documentId'')',
+        tbl
+      ) USING v_agent_id;
+      GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+      INSERT INTO ah_embeddings_migrations (table_name, agent_id, rows_copied)
+      VALUES (tbl, v_agent_id, v_rows);
+    ELSE
+      SELECT m.rows_copied INTO v_rows FROM ah_embeddings_migrations m WHERE m.table_name = tbl;
+    END IF;
+
+    IF p_drop_source THEN
+      EXECUTE format('DROP TABLE IF EXISTS public.%I CASCADE', tbl);
+      UPDATE ah_embeddings_migrations m SET source_dropped = true WHERE m.table_name = tbl;
+    END IF;
+
+    table_name := tbl;
+    agent_id := v_agent_id;
+    rows_copied := v_rows;
+    dropped := p_drop_source;
+    RETURN NEXT;
+  END LOOP;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION migrate_agent_embeddings(BOOLEAN) FROM PUBLIC, anon, authenticated;
+-- Only n8n (service role) writes embeddings
+REVOKE ALL ON ah_embeddings_store FROM PUBLIC, anon, authenticated;
+GRANT SELECT, INSERT ON ah_embeddings_store TO service_role;
+
+COMMENT ON TABLE ah_embeddings IS 'Document chunk embeddings for all agents, hash-partitioned by agent_id';
+COMMENT ON VIEW ah_embeddings_store IS 'Insert-only entry for writers that carry agent_id in metadata (n8n vector store node)';
+COMMENT ON FUNCTION match_embeddings(VECTOR, INTEGER, JSONB) IS 'HNSW similarity search scoped to filter.agent_id';
+COMMENT ON FUNCTION migrate_agent_embeddings(BOOLEAN) IS 'Copies legacy embeddings_<agent> tables into ah_embeddings (idempotent)';
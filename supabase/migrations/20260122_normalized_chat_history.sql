@@ -0,0 +1,129 @@
+-- Migration: Normalized Chat History
+-- Description: Store n8n chat memory rows already normalized (role, clean
+-- content, timestamp) and serve them newest-first with cursor pagination
+
+-- n8n's Postgres Chat Memory only writes session_id and message.
+-- The normalized columns are filled by trigger on insert. Rows older than
+-- this migration keep created_at NULL: their real time is unknown, and the
+-- history is ordered by id anyway.
+ALTER TABLE n8n_chat_histories
+  ADD COLUMN IF NOT EXISTS role TEXT,
+  ADD COLUMN IF NOT EXISTS content TEXT,
+  ADD COLUMN IF NOT EXISTS created_at TIMESTAMPTZ;
+
+ALTER TABLE n8n_chat_histories ALTER COLUMN created_at SET DEFAULT NOW();
+
+CREATE INDEX IF NOT EXISTS idx_chat_histories_session_id
+ON n8n_chat_histories(session_id, id DESC);
+
+-- SQL port of the Playground's cleanAgentResponse(): strips tool-call and
+-- retrieval metadata that LangChain agents leave in the stored AI message.
+-- Notes: '.' already matches newlines in Postgres regexes (JS needs [\s\S]),
+-- and a whole pattern takes the greediness of its first quantifier. The JS
+-- patterns that are lazy but end in a greedy \s* are done in two steps: the
+-- lazy part becomes a \x01 marker, then the marker and the whitespace after
+-- it are removed. benchmarks/chat_history_load.ts checks parity with the JS.
+CREATE OR REPLACE FUNCTION clean_agent_response(p_text TEXT)
+RETURNS TEXT
+LANGUAGE plpgsql
+IMMUTABLE
+AS $$
+DECLARE
+  cleaned TEXT := COALESCE(p_text, '');
+BEGIN
+  cleaned := regexp_replace(cleaned, '\[Used tools:.*?Result:.*?\]', E'\x01', 'g');
+  cleaned := regexp_replace(cleaned, E'\x01\\s*', '', 'g');
+  cleaned := regexp_replace(cleaned, '\[Used tools:.*?\]', '', 'g');
+  cleaned := regexp_replace(cleaned, '\{"type":"text".*?\}', '', 'g');
+  cleaned := regexp_replace(cleaned, '\{"pageContent":.*?"\}', '', 'g');
+  cleaned := regexp_replace(cleaned, '"metadata":\{[^}]*\}', '', 'g');
+  cleaned := regexp_replace(cleaned, 'Result:\s*?\[.*?\]', E'\x01', 'g');
+  cleaned := regexp_replace(cleaned, E'\x01\\s*', '', 'g');
+  cleaned := regexp_replace(cleaned, 'Input:\s*"[^"]*"', '', 'g');
+  cleaned := regexp_replace(cleaned, 'Tool:\s*\w+,?\s*', '', 'g');
+  cleaned := replace(cleaned, '\n', E'\n');
+  cleaned := replace(cleaned, '\"', '"');
+  cleaned := regexp_replace(cleaned, '^[\[\]\{\},\s]+', '');
+  cleaned := regexp_replace(cleaned, '[\[\]\{\},\s]+$', '');
+  cleaned := regexp_replace(cleaned, '\n{3,}', E'\n\n', 'g');
+  cleaned := regexp_replace(cleaned, '\s{3,}', '  ', 'g');
+
+  RETURN btrim(cleaned);
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION normalize_chat_history_row()
+RETURNS TRIGGER AS $$
+DECLARE
+  msg JSONB := NEW.message;
+BEGIN
+  -- Some workflows store the message as a JSON string
+  IF jsonb_typeof(msg) = 'string' THEN
+    BEGIN
+      msg := (msg #>> '{}')::jsonb;
+    EXCEPTION WHEN others THEN
+      msg := jsonb_build_object('type', 'ai', 'content', msg #>> '{}');
+    END;
+  END IF;
+
+  NEW.role := CASE WHEN msg->>'type' = 'human' THEN 'user' ELSE 'assistant' END;
+  NEW.content := CASE
+    WHEN msg->>'type' = 'ai' THEN clean_agent_response(msg->>'content')
+    ELSE msg->>'content'
+  END;
+  IF TG_OP = 'INSERT' THEN
+    NEW.created_at := COALESCE(NEW.created_at, NOW());
+  END IF;
+
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_normalize_chat_history ON n8n_chat_histories;
+CREATE TRIGGER trigger_normalize_chat_history
+BEFORE INSERT OR UPDATE OF message ON n8n_chat_histories
+FOR EACH ROW
+EXECUTE FUNCTION normalize_chat_history_row();
+
+-- Backfill existing rows (re-fires the trigger)
+UPDATE n8n_chat_histories SET message = message WHERE content IS NULL;
+
+-- One page of a session, newest first. Pass the smallest id of the previous
+-- page as p_before_id to get older messages; NULL starts from the newest.
+-- Playground sessions are '<agent_id>_<profile_id>', so the caller must own
+-- the agent.
+CREATE OR REPLACE FUNCTION get_chat_history_page(
+  p_session_id TEXT,
+  p_before_id BIGINT DEFAULT NULL,
+  p_limit INTEGER DEFAULT 50
+)
+RETURNS TABLE (id BIGINT, role TEXT, content TEXT, created_at TIMESTAMPTZ)
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM ah_agents a
+    WHERE a.id::text = split_part(p_session_id, '_', 1)
+      AND (a.user_id = auth.uid() OR public.has_role(auth.uid(), 'admin'))
+  ) THEN
+    RAISE EXCEPTION 'Not authorized';
+  END IF;
+
+  RETURN QUERY
+  SELECT h.id::bigint, h.role, h.content, h.created_at
+  FROM n8n_chat_histories h
+  WHERE h.session_id = p_session_id
+    AND (p_before_id IS NULL OR h.id < p_before_id)
+    AND h.content IS NOT NULL
+    AND h.content <> ''
+  ORDER BY h.id DESC
+  LIMIT LEAST(GREATEST(p_limit, 1), 200);
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_chat_history_page(TEXT, BIGINT, INTEGER) TO authenticated;
+
+COMMENT ON FUNCTION get_chat_history_page(TEXT, BIGINT, INTEGER) IS 'Keyset-paginated, pre-normalized chat history for a Playground session';
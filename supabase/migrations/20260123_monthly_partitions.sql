@@ -0,0 +1,612 @@
+-- Migration: Monthly Partitions for Message and Usage Tables
+-- Description: Range-partition ah_public_messages, ah_messages, ah_usage_logs
+-- and credit_transactions by month, pre-create future partitions and move
+-- partitions past their retention horizon into a compressed, queryable archive
+
+-- ============================================
+-- Configuration
+-- ============================================
+
+-- Table: ah_partition_config
+-- One row per partitioned table. index_columns lists the indexes every
+-- partition gets (column lists as written in CREATE INDEX).
+CREATE TABLE IF NOT EXISTS ah_partition_config (
+  table_name TEXT PRIMARY KEY,
+  time_column TEXT NOT NULL DEFAULT 'created_at',
+  index_columns TEXT[] NOT NULL DEFAULT ARRAY[]::TEXT[],
+  premake_months INTEGER NOT NULL DEFAULT 3,
+  retention INTERVAL NOT NULL DEFAULT INTERVAL '12 months',
+  -- Start of the first monthly partition; anything older is still in
+  -- <table>_legacy until split_legacy_partition() has moved it out
+  partitioned_from TIMESTAMPTZ,
+  converted_at TIMESTAMPTZ,
+  last_maintenance_at TIMESTAMPTZ
+);
+
+INSERT INTO ah_partition_config (table_name, index_columns, retention) VALUES
+  ('ah_public_messages', ARRAY['conversation_id, created_at', 'created_at'], INTERVAL '12 months'),
+  ('ah_messages', ARRAY['conversation_id, created_at', 'created_at'], INTERVAL '12 months'),
+  ('ah_usage_logs', ARRAY['user_id, created_at', 'agent_id, created_at', 'created_at'], INTERVAL '24 months'),
+  ('credit_transactions', ARRAY['user_id, created_at', 'created_at'], INTERVAL '24 months')
+ON CONFLICT (table_name) DO NOTHING;
+
+ALTER TABLE ah_partition_config ENABLE ROW LEVEL SECURITY;
+
+-- ============================================
+-- Archive storage
+-- ============================================
+
+-- Table: ah_event_archive
+-- Archived partitions, stored as chunks of up to 1000 rows in one JSONB array.
+-- Each chunk is large enough to be TOAST-compressed, so archived months take a
+-- fraction of the heap + index size and need no indexes.
+CREATE TABLE IF NOT EXISTS ah_event_archive (
+  id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  table_name TEXT NOT NULL,
+  partition_name TEXT NOT NULL,
+  chunk_no INTEGER NOT NULL,
+  row_count INTEGER NOT NULL,
+  range_start TIMESTAMPTZ NOT NULL,
+  range_end TIMESTAMPTZ NOT NULL,
+  rows JSONB NOT NULL,
+  archived_at TIMESTAMPTZ DEFAULT NOW(),
+  UNIQUE (partition_name, chunk_no)
+);
+
+CREATE INDEX IF NOT EXISTS idx_event_archive_range
+ON ah_event_archive(table_name, range_start, range_end);
+
+-- lz4 compresses and decompresses much faster than the default pglz (PG 14+)
+DO $$
+BEGIN
+  ALTER TABLE ah_event_archive ALTER COLUMN rows SET COMPRESSION lz4;
+EXCEPTION WHEN OTHERS THEN
+  NULL;
+END;
+$$;
+
+-- Service role / SQL editor only
+ALTER TABLE ah_event_archive ENABLE ROW LEVEL SECURITY;
+
+-- ============================================
+-- Partition helpers
+-- ============================================
+
+CREATE OR REPLACE FUNCTION partition_index_name(p_table TEXT, p_columns TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT left(p_table || '_' || regexp_replace(p_columns, '[^a-z0-9]+', '_', 'g') || '_idx', 63);
+$$;
+
+-- Create the monthly partitions from the current month up to premake_months
+-- ahead (and the default partition). Safe to run any number of times.
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(p_table TEXT)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  cfg ah_partition_config%ROWTYPE;
+  v_month TIMESTAMPTZ;
+  v_last TIMESTAMPTZ;
+  v_name TEXT;
+  v_created INTEGER := 0;
+BEGIN
+  SELECT * INTO cfg FROM ah_partition_config WHERE table_name = p_table;
+  IF NOT FOUND OR cfg.partitioned_from IS NULL THEN
+    RAISE EXCEPTION '% is not partitioned yet', p_table;
+  END IF;
+
+  EXECUTE format('CREATE TABLE IF NOT EXISTS public.%I PARTITION OF public.%I DEFAULT', p_table || '_default', p_table);
+
+  v_month := GREATEST(cfg.partitioned_from, date_trunc('month', NOW()));
+  v_last := date_trunc('month', NOW()) + make_interval(months => cfg.premake_months);
+
+  WHILE v_month <= v_last LOOP
+    v_name := p_table || '_p' || to_char(v_month, 'YYYYMM');
+
+    IF to_regclass('public.' || quote_ident(v_name)) IS NULL THEN
+      EXECUTE format(
+        'CREATE TABLE public.%I PARTITION OF public.%I FOR VALUES FROM (%L) TO (%L)',
+        v_name, p_table, v_month, v_month + INTERVAL '1 month'
+      );
+      v_created := v_created + 1;
+    END IF;
+
+    v_month := v_month + INTERVAL '1 month';
+  END LOOP;
+
+  RETURN v_created;
+END;
+$$;
+
+-- Statements that make the conversion of a large table a metadata-only swap.
+-- Run them one by one (outside a transaction) before this migration; they
+-- only take locks that let reads and writes continue:
+--   SELECT stmt FROM partition_prep_statements('ah_public_messages');
+CREATE OR REPLACE FUNCTION partition_prep_statements(p_table TEXT)
+RETURNS TABLE (stmt TEXT)
+LANGUAGE plpgsql
+STABLE
+SET search_path = public
+AS $$
+DECLARE
+  cfg ah_partition_config%ROWTYPE;
+  v_boundary TIMESTAMPTZ := date_trunc('month', NOW()) + INTERVAL '1 month';
+  v_columns TEXT;
+BEGIN
+  SELECT * INTO cfg FROM ah_partition_config WHERE table_name = p_table;
+
+  stmt := format('UPDATE public.%I SET %I = NOW() WHERE %I IS NULL', p_table, cfg.time_column, cfg.time_column);
+  RETURN NEXT;
+  stmt := format(
+    'ALTER TABLE public.%I ADD CONSTRAINT %I CHECK (%I IS NOT NULL AND %I < %L) NOT VALID',
+    p_table, p_table || '_partition_bound', cfg.time_column, cfg.time_column, v_boundary
+  );
+  RETURN NEXT;
+  stmt := format('ALTER TABLE public.%I VALIDATE CONSTRAINT %I', p_table, p_table || '_partition_bound');
+  RETURN NEXT;
+  stmt := format(
+    'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS %I ON public.%I (id, %I)',
+    p_table || '_legacy_pkey', p_table, cfg.time_column
+  );
+  RETURN NEXT;
+
+  FOREACH v_columns IN ARRAY cfg.index_columns LOOP
+    stmt := format(
+      'CREATE INDEX CONCURRENTLY IF NOT EXISTS %I ON public.%I (%s)',
+      partition_index_name(p_table || '_legacy', v_columns), p_table, v_columns
+    );
+    RETURN NEXT;
+  END LOOP;
+END;
+$$;
+
+-- Convert a plain table into a monthly-partitioned one without copying data:
+-- the existing heap is attached as <table>_legacy, covering everything before
+-- the first monthly partition. Policies, triggers, grants, foreign keys and
+-- the realtime publication are carried over to the new parent. When the prep
+-- statements were run first, every step below is a catalog change (the
+-- foreign keys of the legacy partition are attached, not re-validated).
+-- split_legacy_partitions() (scheduled after the migration) then moves the
+-- legacy rows into monthly partitions.
+CREATE OR REPLACE FUNCTION convert_to_monthly_partitions(p_table TEXT)
+RETURNS TEXT
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  cfg ah_partition_config%ROWTYPE;
+  v_legacy TEXT := p_table || '_legacy';
+  v_bound_name TEXT := p_table || '_partition_bound';
+  v_boundary TIMESTAMPTZ;
+  v_columns TEXT;
+  v_pkey TEXT;
+  v_triggers TEXT[];
+  v_foreign_keys TEXT[];
+  v_def TEXT;
+  v_in_realtime BOOLEAN;
+  v_rls BOOLEAN;
+  pol RECORD;
+  grt RECORD;
+BEGIN
+  SELECT * INTO cfg FROM ah_partition_config WHERE table_name = p_table;
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'No partition config for %', p_table;
+  END IF;
+
+  IF EXISTS (SELECT 1 FROM pg_class WHERE oid = ('public.' || quote_ident(p_table))::regclass AND relkind = 'p') THEN
+    PERFORM ensure_monthly_partitions(p_table);
+    RETURN p_table || ' already partitioned';
+  END IF;
+
+  -- 1. Bound check: reuse the one from partition_prep_statements() if present
+  SELECT substring(pg_get_constraintdef(c.oid) FROM '''([^'']+)''')::timestamptz
+  INTO v_boundary
+  FROM pg_constraint c
+  WHERE c.conrelid = ('public.' || quote_ident(p_table))::regclass AND c.conname = v_bound_name;
+
+  IF v_boundary IS NULL OR v_boundary <= NOW() THEN
+    EXECUTE format('ALTER TABLE public.%I DROP CONSTRAINT IF EXISTS %I', p_table, v_bound_name);
+    v_boundary := date_trunc('month', NOW()) + INTERVAL '1 month';
+
+    EXECUTE format('UPDATE public.%I SET %I = NOW() WHERE %I IS NULL', p_table, cfg.time_column, cfg.time_column);
+    EXECUTE format(
+      'ALTER TABLE public.%I ADD CONSTRAINT %I CHECK (%I IS NOT NULL AND %I < %L) NOT VALID',
+      p_table, v_bound_name, cfg.time_column, cfg.time_column, v_boundary
+    );
+  END IF;
+  EXECUTE format('ALTER TABLE public.%I VALIDATE CONSTRAINT %I', p_table, v_bound_name);
+  -- Uses the validated check instead of scanning (PG 12+)
+  EXECUTE format('ALTER TABLE public.%I ALTER COLUMN %I SET NOT NULL', p_table, cfg.time_column);
+
+  -- 2. Primary key must include the partition key
+  EXECUTE format('CREATE UNIQUE INDEX IF NOT EXISTS %I ON public.%I (id, %I)', v_legacy || '_pkey', p_table, cfg.time_column);
+  SELECT c.conname INTO v_pkey FROM pg_constraint c
+  WHERE c.conrelid = ('public.' || quote_ident(p_table))::regclass AND c.contype = 'p';
+  IF v_pkey IS NOT NULL AND v_pkey <> v_legacy || '_pkey' THEN
+    EXECUTE format('ALTER TABLE public.%I DROP CONSTRAINT %I', p_table, v_pkey);
+  END IF;
+  IF v_pkey IS NULL OR v_pkey <> v_legacy || '_pkey' THEN
+    EXECUTE format('ALTER TABLE public.%I ADD CONSTRAINT %I PRIMARY KEY USING INDEX %I', p_table, v_legacy || '_pkey', v_legacy || '_pkey');
+  END IF;
+
+  FOREACH v_columns IN ARRAY cfg.index_columns LOOP
+    EXECUTE format('CREATE INDEX IF NOT EXISTS %I ON public.%I (%s)', partition_index_name(v_legacy, v_columns), p_table, v_columns);
+  END LOOP;
+
+  -- 3. Remember what has to move to the parent
+  SELECT array_agg(pg_get_triggerdef(t.oid)) INTO v_triggers
+  FROM pg_trigger t
+  WHERE t.tgrelid = ('public.' || quote_ident(p_table))::regclass AND NOT t.tgisinternal;
+
+  -- LIKE ... INCLUDING CONSTRAINTS only copies CHECK constraints
+  SELECT array_agg(format('ALTER TABLE public.%I ADD CONSTRAINT %I %s', p_table, c.conname, pg_get_constraintdef(c.oid)))
+  INTO v_foreign_keys
+  FROM pg_constraint c
+  WHERE c.conrelid = ('public.' || quote_ident(p_table))::regclass AND c.contype = 'f';
+
+  SELECT EXISTS (
+    SELECT 1 FROM pg_publication_tables
+    WHERE pubname = 'supabase_realtime' AND schemaname = 'public' AND tablename = p_table
+  ) INTO v_in_realtime;
+
+  SELECT relrowsecurity INTO v_rls FROM pg_class WHERE oid = ('public.' || quote_ident(p_table))::regclass;
+
+  -- Triggers are cloned from the parent to every partition, so the legacy
+  -- partition must not keep its own copy
+  FOR v_def IN SELECT t.tgname FROM pg_trigger t
+    WHERE t.tgrelid = ('public.' || quote_ident(p_table))::regclass AND NOT t.tgisinternal
+  LOOP
+    EXECUTE format('DROP TRIGGER %I ON public.%I', v_def, p_table);
+  END LOOP;
+
+  IF v_in_realtime THEN
+    EXECUTE format('ALTER PUBLICATION supabase_realtime DROP TABLE public.%I', p_table);
+  END IF;
+
+  -- 4. Swap
+  EXECUTE format('ALTER TABLE public.%I RENAME TO %I', p_table, v_legacy);
+  EXECUTE format(
+    'CREATE TABLE public.%I (LIKE public.%I INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED INCLUDING COMMENTS) PARTITION BY RANGE (%I)',
+    p_table, v_legacy, cfg.time_column
+  );
+  EXECUTE format('ALTER TABLE public.%I DROP CONSTRAINT IF EXISTS %I', p_table, v_bound_name);
+  EXECUTE format('ALTER TABLE public.%I ADD PRIMARY KEY (id, %I)', p_table, cfg.time_column);
+  EXECUTE format(
+    'ALTER TABLE public.%I ATTACH PARTITION public.%I FOR VALUES FROM (MINVALUE) TO (%L)',
+    p_table, v_legacy, v_boundary
+  );
+
+  -- Matching legacy indexes are attached, not rebuilt
+  FOREACH v_columns IN ARRAY cfg.index_columns LOOP
+    EXECUTE format('CREATE INDEX IF NOT EXISTS %I ON public.%I (%s)', partition_index_name(p_table, v_columns), p_table, v_columns);
+  END LOOP;
+
+  UPDATE ah_partition_config
+  SET partitioned_from = v_boundary, converted_at = NOW()
+  WHERE table_name = p_table;
+  PERFORM ensure_monthly_partitions(p_table);
+
+  -- 5. Foreign keys (with their ON DELETE actions), access rules, triggers
+  -- and realtime on the parent
+  IF v_foreign_keys IS NOT NULL THEN
+    FOREACH v_def IN ARRAY v_foreign_keys LOOP
+      EXECUTE v_def;
+    END LOOP;
+  END IF;
+
+  IF v_rls THEN
+    EXECUTE format('ALTER TABLE public.%I ENABLE ROW LEVEL SECURITY', p_table);
+  END IF;
+
+  FOR pol IN SELECT * FROM pg_policies WHERE schemaname = 'public' AND tablename = v_legacy LOOP
+    EXECUTE format(
+      'CREATE POLICY %I ON public.%I AS %s FOR %s TO %s%s%s',
+      pol.policyname, p_table, pol.permissive, pol.cmd,
+      (SELECT string_agg(CASE WHEN r = 'public' THEN 'PUBLIC' ELSE quote_ident(r) END, ', ') FROM unnest(pol.roles) r),
+      CASE WHEN pol.qual IS NOT NULL THEN ' USING (' || pol.qual || ')' ELSE '' END,
+      CASE WHEN pol.with_check IS NOT NULL THEN ' WITH CHECK (' || pol.with_check || ')' ELSE '' END
+    );
+  END LOOP;
+
+  FOR grt IN
+    SELECT grantee, privilege_type FROM information_schema.role_table_grants
+    WHERE table_schema = 'public' AND table_name = v_legacy AND grantee <> current_user
+  LOOP
+    EXECUTE format('GRANT %s ON public.%I TO %s', grt.privilege_type, p_table,
+      CASE WHEN grt.grantee = 'PUBLIC' THEN 'PUBLIC' ELSE quote_ident(grt.grantee) END);
+  END LOOP;
+
+  IF v_triggers IS NOT NULL THEN
+    FOREACH v_def IN ARRAY v_triggers LOOP
+      -- Captured before the rename, so the definition already names the parent
+      EXECUTE v_def;
+    END LOOP;
+  END IF;
+
+  IF v_in_realtime THEN
+    ALTER PUBLICATION supabase_realtime SET (publish_via_partition_root = true);
+    EXECUTE format('ALTER PUBLICATION supabase_realtime ADD TABLE public.%I', p_table);
+  END IF;
+
+  RETURN p_table || ' partitioned from ' || v_boundary;
+END;
+$$;
+
+-- Move the newest month still in <table>_legacy into its own monthly
+-- partition (plus empty partitions for any months between it and the legacy
+-- upper bound), then re-attach the rest of the legacy partition below it.
+-- Repeat until it returns NULL to have every old month archivable on its own:
+--   SELECT split_legacy_partition('ah_public_messages');
+-- Rows are copied, so on a large table run it in its own transaction per
+-- month. Row triggers do not fire for the moved rows.
+CREATE OR REPLACE FUNCTION split_legacy_partition(p_table TEXT)
+RETURNS BIGINT
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  cfg ah_partition_config%ROWTYPE;
+  v_legacy TEXT := p_table || '_legacy';
+  v_upper TIMESTAMPTZ;
+  v_latest TIMESTAMPTZ;
+  v_month TIMESTAMPTZ;
+  v_from TIMESTAMPTZ;
+  v_name TEXT;
+  v_rows BIGINT := 0;
+  v_left BOOLEAN;
+BEGIN
+  SELECT * INTO cfg FROM ah_partition_config WHERE table_name = p_table;
+  IF NOT FOUND OR cfg.partitioned_from IS NULL THEN
+    RAISE EXCEPTION '% is not partitioned yet', p_table;
+  END IF;
+
+  IF to_regclass('public.' || quote_ident(v_legacy)) IS NULL THEN
+    RETURN NULL;
+  END IF;
+
+  SELECT substring(pg_get_expr(c.relpartbound, c.oid) FROM 'TO \(''([^'']+)''\)')::timestamptz
+  INTO v_upper
+  FROM pg_class c
+  WHERE c.oid = ('public.' || quote_ident(v_legacy))::regclass;
+
+  EXECUTE format('SELECT max(%I) FROM public.%I', cfg.time_column, v_legacy) INTO v_latest;
+
+  -- Detaching also drops the trigger clones, so the DELETE below fires nothing
+  EXECUTE format('ALTER TABLE public.%I DETACH PARTITION public.%I', p_table, v_legacy);
+
+  v_from := COALESCE(date_trunc('month', v_latest), v_upper);
+  v_month := v_from;
+  WHILE v_month < v_upper LOOP
+    v_name := p_table || '_p' || to_char(v_month, 'YYYYMM');
+    EXECUTE format(
+      'CREATE TABLE public.%I PARTITION OF public.%I FOR VALUES FROM (%L) TO (%L)',
+      v_name, p_table, v_month, LEAST(v_month + INTERVAL '1 month', v_upper)
+    );
+    v_month := v_month + INTERVAL '1 month';
+  END LOOP;
+
+  IF v_latest IS NOT NULL THEN
+    v_name := p_table || '_p' || to_char(v_from, 'YYYYMM');
+    EXECUTE format('ALTER TABLE public.%I DISABLE TRIGGER USER', v_name);
+    EXECUTE format(
+      'WITH moved AS (DELETE FROM public.%I WHERE %I >= %L RETURNING *)
+       INSERT INTO public.%I SELECT * FROM moved',
+      v_legacy, cfg.time_column, v_from, v_name
+    );
+    GET DIAGNOSTICS v_rows = ROW_COUNT;
+    EXECUTE format('ALTER TABLE public.%I ENABLE TRIGGER USER', v_name);
+  END IF;
+
+  UPDATE ah_partition_config SET partitioned_from = v_from WHERE table_name = p_table;
+
+  EXECUTE format('SELECT EXISTS (SELECT 1 FROM public.%I)', v_legacy) INTO v_left;
+  IF v_left THEN
+    EXECUTE format(
+      'ALTER TABLE public.%I ATTACH PARTITION public.%I FOR VALUES FROM (MINVALUE) TO (%L)',
+      p_table, v_legacy, v_from
+    );
+  ELSE
+    EXECUTE format('DROP TABLE public.%I', v_legacy);
+  END IF;
+
+  RETURN v_rows;
+END;
+$$;
+
+-- One split_legacy_partition() step for every table that still has a legacy
+-- partition: one month per table per call, so each call is a short
+-- transaction. Scheduled by pg_cron below until nothing is left, then it
+-- unschedules itself.
+CREATE OR REPLACE FUNCTION split_legacy_partitions()
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_table TEXT;
+  v_rows BIGINT;
+  result JSONB := '{}'::jsonb;
+BEGIN
+  FOR v_table IN SELECT table_name FROM ah_partition_config WHERE partitioned_from IS NOT NULL LOOP
+    v_rows := split_legacy_partition(v_table);
+    IF v_rows IS NOT NULL THEN
+      result := result || jsonb_build_object(v_table, v_rows);
+    END IF;
+  END LOOP;
+
+  IF result = '{}'::jsonb AND EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+    PERFORM cron.unschedule(jobid) FROM cron.job WHERE jobname = 'ah-partition-legacy-split';
+  END IF;
+
+  RETURN result::json;
+END;
+$$;
+
+-- ============================================
+-- Archival
+-- ============================================
+
+-- Copy one partition into ah_event_archive and drop it
+CREATE OR REPLACE FUNCTION archive_partition(p_table TEXT, p_partition TEXT)
+RETURNS BIGINT
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_column TEXT;
+  v_rows BIGINT;
+BEGIN
+  SELECT time_column INTO v_column FROM ah_partition_config WHERE table_name = p_table;
+
+  EXECUTE format(
+    'INSERT INTO ah_event_archive (table_name, partition_name, chunk_no, row_count, range_start, range_end, rows)
+     SELECT %L, %L, archive_chunk, count(*), min(%I), max(%I), jsonb_agg(to_jsonb(t) - ''archive_chunk'' ORDER BY %I)
+     FROM (
+       SELECT p.*, ((row_number() OVER (ORDER BY p.%I)) - 1) / 1000 AS archive_chunk
+       FROM public.%I p
+     ) t
+     GROUP BY archive_chunk
+     ON CONFLICT (partition_name, chunk_no) DO NOTHING',
+    p_table, p_partition, v_column, v_column, v_column, v_column, p_partition
+  );
+  GET DIAGNOSTICS v_rows = ROW_COUNT;
+
+  EXECUTE format('ALTER TABLE public.%I DETACH PARTITION public.%I', p_table, p_partition);
+  EXECUTE format('DROP TABLE public.%I', p_partition);
+
+  RETURN v_rows;
+END;
+$$;
+
+-- Archive every partition that ends before NOW() - retention
+CREATE OR REPLACE FUNCTION archive_expired_partitions(p_table TEXT)
+RETURNS TABLE (partition_name TEXT, chunks BIGINT)
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  cfg ah_partition_config%ROWTYPE;
+  part RECORD;
+BEGIN
+  SELECT * INTO cfg FROM ah_partition_config WHERE table_name = p_table;
+
+  FOR part IN
+    SELECT c.relname,
+           substring(pg_get_expr(c.relpartbound, c.oid) FROM 'TO \(''([^'']+)''\)')::timestamptz AS upper_bound
+    FROM pg_inherits i
+    JOIN pg_class c ON c.oid = i.inhrelid
+    WHERE i.inhparent = ('public.' || quote_ident(p_table))::regclass
+      AND pg_get_expr(c.relpartbound, c.oid) <> 'DEFAULT'
+    ORDER BY 2
+  LOOP
+    EXIT WHEN part.upper_bound > date_trunc('month', NOW() - cfg.retention);
+
+    partition_name := part.relname;
+    chunks := archive_partition(p_table, part.relname);
+    RETURN NEXT;
+  END LOOP;
+END;
+$$;
+
+-- Rows of an archived table between two timestamps, typed like the live table:
+--   SELECT * FROM archived_rows(NULL::ah_public_messages, '2025-01-01', '2025-02-01');
+CREATE OR REPLACE FUNCTION archived_rows(p_row ANYELEMENT, p_from TIMESTAMPTZ, p_to TIMESTAMPTZ)
+RETURNS SETOF ANYELEMENT
+LANGUAGE plpgsql
+STABLE
+SET search_path = public
+AS $$
+DECLARE
+  v_table TEXT := pg_typeof(p_row)::text;
+  v_column TEXT;
+BEGIN
+  SELECT time_column INTO v_column FROM ah_partition_config WHERE table_name = v_table;
+
+  RETURN QUERY EXECUTE format(
+    'SELECT r.* FROM ah_event_archive a
+     CROSS JOIN LATERAL jsonb_populate_recordset($1, a.rows) r
+     WHERE a.table_name = %L
+       AND a.range_start < $3 AND a.range_end >= $2
+       AND r.%I >= $2 AND r.%I < $3
+     ORDER BY r.%I',
+    v_table, v_column, v_column, v_column
+  ) USING p_row, p_from, p_to;
+END;
+$$;
+
+-- Daily job: future partitions + archival for every configured table
+CREATE OR REPLACE FUNCTION run_partition_maintenance()
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  cfg ah_partition_config%ROWTYPE;
+  v_created INTEGER;
+  v_archived INTEGER;
+  result JSONB := '{}'::jsonb;
+BEGIN
+  FOR cfg IN SELECT * FROM ah_partition_config WHERE partitioned_from IS NOT NULL LOOP
+    v_created := ensure_monthly_partitions(cfg.table_name);
+    SELECT count(*) INTO v_archived FROM archive_expired_partitions(cfg.table_name);
+
+    UPDATE ah_partition_config SET last_maintenance_at = NOW() WHERE table_name = cfg.table_name;
+    result := result || jsonb_build_object(cfg.table_name, jsonb_build_object('created', v_created, 'archived', v_archived));
+  END LOOP;
+
+  RETURN result::json;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION ensure_monthly_partitions(TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION convert_to_monthly_partitions(TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION split_legacy_partition(TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION split_legacy_partitions() FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION archive_partition(TEXT, TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION archive_expired_partitions(TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION run_partition_maintenance() FROM PUBLIC, anon, authenticated;
+
+-- ============================================
+-- Convert and schedule
+-- ============================================
+
+-- Superseded by the (conversation_id, created_at) and (created_at) partitioned
+-- indexes. Dropped first: once attached to the parent's index they can no
+-- longer be dropped on their own.
+DROP INDEX IF EXISTS idx_public_msg_conv;
+DROP INDEX IF EXISTS idx_public_msg_created;
+
+SELECT convert_to_monthly_partitions('ah_public_messages');
+SELECT convert_to_monthly_partitions('ah_messages');
+SELECT convert_to_monthly_partitions('ah_usage_logs');
+SELECT convert_to_monthly_partitions('credit_transactions');
+
+-- The migration only swaps in the partitioned parents. Old history moves
+-- into monthly partitions afterwards, one month per table every 5 minutes
+-- (each run is its own transaction), so archival can work month by month.
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+    PERFORM cron.schedule('ah-partition-maintenance', '15 3 * * *', 'SELECT run_partition_maintenance()');
+    PERFORM cron.schedule('ah-partition-legacy-split', '*/5 * * * *', 'SELECT split_legacy_partitions()');
+  ELSE
+    RAISE WARNING 'pg_cron is not installed: run SELECT split_legacy_partitions() in its own transaction until it returns {}, and SELECT run_partition_maintenance() daily';
+  END IF;
+END;
+$$;
+
+COMMENT ON TABLE ah_partition_config IS 'Monthly partitioning and retention settings per table';
+COMMENT ON TABLE ah_event_archive IS 'Archived partitions as compressed JSONB chunks; read with archived_rows()';
+COMMENT ON FUNCTION split_legacy_partitions() IS 'Moves one more month of every <table>_legacy into its own partition (pg_cron, until done)';
+COMMENT ON FUNCTION run_partition_maintenance() IS 'Creates upcoming monthly partitions and archives expired ones (daily via pg_cron)';
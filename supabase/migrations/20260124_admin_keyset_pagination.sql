@@ -0,0 +1,298 @@
+-- Migration: Paginated Admin Users and Transactions
+-- Description: Keyset-paginated, server-filtered admin RPCs with trigram
+-- search on email/name and a maintained agents_count on ah_profiles
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- ============================================
+-- Agent counter
+-- ============================================
+
+ALTER TABLE ah_profiles
+  ADD COLUMN IF NOT EXISTS agents_count INTEGER NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION sync_profile_agents_count()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  IF TG_OP = 'UPDATE' AND NEW.user_id IS NOT DISTINCT FROM OLD.user_id THEN
+    RETURN NULL;
+  END IF;
+
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    UPDATE ah_profiles SET agents_count = agents_count + 1 WHERE user_id = NEW.user_id;
+  END IF;
+
+  IF TG_OP IN ('DELETE', 'UPDATE') THEN
+    UPDATE ah_profiles SET agents_count = GREATEST(agents_count - 1, 0) WHERE user_id = OLD.user_id;
+  END IF;
+
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trigger_sync_profile_agents_count ON ah_agents;
+CREATE TRIGGER trigger_sync_profile_agents_count
+AFTER INSERT OR DELETE OR UPDATE OF user_id ON ah_agents
+FOR EACH ROW
+EXECUTE FUNCTION sync_profile_agents_count();
+
+-- Backfill
+UPDATE ah_profiles p
+SET agents_count = counts.n
+FROM (SELECT user_id, count(*)::int AS n FROM ah_agents GROUP BY user_id) counts
+WHERE counts.user_id = p.user_id;
+
+-- ============================================
+-- Indexes
+-- ============================================
+
+-- Substring search (ILIKE '%term%') over name + email
+CREATE INDEX IF NOT EXISTS idx_profiles_search_trgm
+ON ah_profiles USING gin ((COALESCE(full_name, '') || ' ' || email) gin_trgm_ops);
+
+-- Keyset orders
+CREATE INDEX IF NOT EXISTS idx_profiles_created_id ON ah_profiles(created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_profiles_email_id ON ah_profiles(email, id);
+CREATE INDEX IF NOT EXISTS idx_profiles_agents_count_id ON ah_profiles(agents_count DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_user_roles_user_role ON user_roles(user_id, role);
+
+-- ============================================
+-- RPCs
+-- ============================================
+
+-- Escape LIKE wildcards so the search term is matched literally
+CREATE OR REPLACE FUNCTION escape_like(p_term TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT replace(replace(replace(p_term, '\', '\\'), '%', '\%'), '_', '\_');
+$$;
+
+-- One page of users. Sort by created_at (default), email or agents_count.
+-- Pass the next_cursor of the previous page as p_cursor; total is only
+-- computed for the first page (p_cursor NULL).
+-- Returns { rows: [...], next_cursor: {value, id} | null, total?: number }
+CREATE OR REPLACE FUNCTION get_admin_users_page(
+  p_search TEXT DEFAULT NULL,
+  p_role TEXT DEFAULT NULL,
+  p_sort TEXT DEFAULT 'created_at',
+  p_direction TEXT DEFAULT 'desc',
+  p_cursor JSONB DEFAULT NULL,
+  p_limit INTEGER DEFAULT 25
+)
+RETURNS JSON
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_limit INTEGER := LEAST(GREATEST(COALESCE(p_limit, 25), 1), 200);
+  v_search TEXT := NULLIF(btrim(p_search), '');
+  v_role TEXT := NULLIF(p_role, 'all');
+  v_col TEXT;
+  v_type TEXT;
+  v_dir TEXT := CASE WHEN lower(p_direction) = 'asc' THEN 'ASC' ELSE 'DESC' END;
+  v_filter TEXT;
+  v_rows JSONB;
+  v_last JSONB;
+  v_total BIGINT;
+BEGIN
+  IF NOT public.has_role(auth.uid(), 'admin') THEN
+    RAISE EXCEPTION 'Access denied';
+  END IF;
+
+  CASE p_sort
+    WHEN 'email' THEN v_col := 'p.email'; v_type := 'text';
+    WHEN 'agents_count' THEN v_col := 'p.agents_count'; v_type := 'integer';
+    ELSE v_col := 'p.created_at'; v_type := 'timestamptz';
+  END CASE;
+
+  IF v_search IS NOT NULL THEN
+    v_search := '%' || escape_like(v_search) || '%';
+  END IF;
+
+  v_filter := '
+    ($1::text IS NULL OR (COALESCE(p.full_name, '''') || '' '' || p.email) ILIKE $1)
+    AND ($2::text IS NULL OR CASE
+      WHEN $2 = ''user'' THEN NOT EXISTS (
+        SELECT 1 FROM user_roles ur WHERE ur.user_id = p.user_id AND ur.role IN (''admin'', ''moderator''))
+      ELSE EXISTS (
+        SELECT 1 FROM user_roles ur WHERE ur.user_id = p.user_id AND ur.role::text = $2)
+    END)';
+
+  EXECUTE format(
+    'SELECT jsonb_agg(t) FROM (
+       SELECT p.id, p.user_id, p.email, p.full_name, p.created_at, p.agents_count,
+              COALESCE(c.balance, 0) AS credit_balance,
+              COALESCE((SELECT ur.role::text FROM user_roles ur WHERE ur.user_id = p.user_id ORDER BY ur.role LIMIT 1), ''user'') AS role,
+              %1$s AS sort_value
+       FROM ah_profiles p
+       LEFT JOIN ah_credits c ON c.user_id = p.user_id
+       WHERE %2$s
+         AND ($3::jsonb IS NULL OR (%1$s, p.id) %3$s (($3->>''value'')::%4$s, ($3->>''id'')::uuid))
+       ORDER BY %1$s %5$s, p.id %5$s
+       LIMIT $4
+     ) t',
+    v_col, v_filter, CASE v_dir WHEN 'ASC' THEN '>' ELSE '<' END, v_type, v_dir
+  ) INTO v_rows USING v_search, v_role, p_cursor, v_limit + 1;
+
+  v_rows := COALESCE(v_rows, '[]'::jsonb);
+
+  IF jsonb_array_length(v_rows) > v_limit THEN
+    v_rows := v_rows - v_limit;
+    v_last := v_rows -> (v_limit - 1);
+  END IF;
+
+  IF p_cursor IS NULL THEN
+    EXECUTE format('SELECT count(*) FROM ah_profiles p WHERE %s', v_filter)
+    INTO v_total USING v_search, v_role;
+  END IF;
+
+  RETURN json_build_object(
+    'rows', v_rows,
+    'next_cursor', CASE WHEN v_last IS NULL THEN NULL
+      ELSE jsonb_build_object('value', v_last->>'sort_value', 'id', v_last->>'id') END,
+    'total', v_total
+  );
+END;
+$$;
+
+-- One page of credit transactions, newest first (or by amount), over the
+-- whole history unless p_days restricts it to the last p_days days. Search
+-- matches the user's name/email. The first page also carries totals for the
+-- whole filtered range.
+-- Returns { rows: [...], next_cursor: {value, id} | null, totals?: {...} }
+CREATE OR REPLACE FUNCTION get_admin_transactions_page(
+  p_search TEXT DEFAULT NULL,
+  p_type TEXT DEFAULT NULL,
+  p_days INTEGER DEFAULT NULL,
+  p_sort TEXT DEFAULT 'created_at',
+  p_direction TEXT DEFAULT 'desc',
+  p_cursor JSONB DEFAULT NULL,
+  p_limit INTEGER DEFAULT 50
+)
+RETURNS JSON
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_limit INTEGER := LEAST(GREATEST(COALESCE(p_limit, 50), 1), 200);
+  v_search TEXT := NULLIF(btrim(p_search), '');
+  v_type TEXT := NULLIF(p_type, 'all');
+  v_since TIMESTAMPTZ := CASE WHEN p_days > 0 THEN NOW() - make_interval(days => p_days) END;
+  v_col TEXT;
+  v_cast TEXT;
+  v_dir TEXT := CASE WHEN lower(p_direction) = 'asc' THEN 'ASC' ELSE 'DESC' END;
+  v_filter TEXT;
+  v_rows JSONB;
+  v_last JSONB;
+  v_totals JSON;
+BEGIN
+  IF NOT public.has_role(auth.uid(), 'admin') THEN
+    RAISE EXCEPTION 'Access denied';
+  END IF;
+
+  CASE p_sort
+    WHEN 'amount' THEN v_col := 'tr.amount'; v_cast := 'integer';
+    ELSE v_col := 'tr.created_at'; v_cast := 'timestamptz';
+  END CASE;
+
+  IF v_search IS NOT NULL THEN
+    v_search := '%' || escape_like(v_search) || '%';
+  END IF;
+
+  -- With a window, the created_at bound goes first so only the partitions in
+  -- range are scanned
+  v_filter := CASE WHEN v_since IS NOT NULL THEN 'tr.created_at >= $1 AND ' ELSE '' END || '
+    ($2::text IS NULL OR tr.type::text = $2)
+    AND ($3::text IS NULL OR tr.user_id IN (
+      SELECT sp.user_id FROM ah_profiles sp
+      WHERE (COALESCE(sp.full_name, '''') || '' '' || sp.email) ILIKE $3))';
+
+  EXECUTE format(
+    'SELECT jsonb_agg(t) FROM (
+       SELECT tr.id, tr.user_id, tr.amount, tr.type, tr.description, tr.created_at,
+              p.full_name AS user_full_name, p.email AS user_email,
+              %1$s AS sort_value
+       FROM credit_transactions tr
+       LEFT JOIN ah_profiles p ON p.user_id = tr.user_id
+       WHERE %2$s
+         AND ($4::jsonb IS NULL OR (%1$s, tr.id) %3$s (($4->>''value'')::%4$s, ($4->>''id'')::uuid))
+       ORDER BY %1$s %5$s, tr.id %5$s
+       LIMIT $5
+     ) t',
+    v_col, v_filter, CASE v_dir WHEN 'ASC' THEN '>' ELSE '<' END, v_cast, v_dir
+  ) INTO v_rows USING v_since, v_type, v_search, p_cursor, v_limit + 1;
+
+  v_rows := COALESCE(v_rows, '[]'::jsonb);
+
+  IF jsonb_array_length(v_rows) > v_limit THEN
+    v_rows := v_rows - v_limit;
+    v_last := v_rows -> (v_limit - 1);
+  END IF;
+
+  IF p_cursor IS NULL THEN
+    -- Same package prices as purchase_extra_credits()
+    EXECUTE format(
+      'SELECT json_build_object(
+         ''count'', count(*),
+         ''purchase_credits'', COALESCE(sum(tr.amount) FILTER (WHERE tr.type = ''purchase''), 0),
+         ''purchase_revenue'', COALESCE(sum(CASE WHEN tr.type = ''purchase'' THEN
+           CASE tr.amount WHEN 500 THEN 15 WHEN 2000 THEN 50 WHEN 5000 THEN 100 ELSE 0 END END), 0)
+       )
+       FROM credit_transactions tr
+       WHERE %s', v_filter
+    ) INTO v_totals USING v_since, v_type, v_search;
+  END IF;
+
+  RETURN json_build_object(
+    'rows', v_rows,
+    'next_cursor', CASE WHEN v_last IS NULL THEN NULL
+      ELSE jsonb_build_object('value', v_last->>'sort_value', 'id', v_last->>'id') END,
+    'totals', v_totals
+  );
+END;
+$$;
+
+-- The unpaginated RPC now reads the counter (p.* includes agents_count)
+CREATE OR REPLACE FUNCTION get_admin_users()
+RETURNS json
+LANGUAGE plpgsql
+SECURITY DEFINER
+AS $$
+DECLARE
+    result json;
+BEGIN
+    IF NOT public.has_role(auth.uid(), 'admin') THEN
+        RAISE EXCEPTION 'Access denied';
+    END IF;
+
+    SELECT json_agg(t) INTO result FROM (
+        SELECT
+            p.*,
+            COALESCE((SELECT ur.role::text FROM user_roles ur WHERE ur.user_id = p.user_id ORDER BY ur.role LIMIT 1), 'user') as role,
+            COALESCE(c.balance, 0) as credit_balance
+        FROM ah_profiles p
+        LEFT JOIN ah_credits c ON p.user_id = c.user_id
+        ORDER BY p.created_at DESC
+    ) t;
+
+    RETURN COALESCE(result, '[]'::json);
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION get_admin_users_page(TEXT, TEXT, TEXT, TEXT, JSONB, INTEGER) TO authenticated;
+GRANT EXECUTE ON FUNCTION get_admin_transactions_page(TEXT, TEXT, INTEGER, TEXT, TEXT, JSONB, INTEGER) TO authenticated;
+
+COMMENT ON COLUMN ah_profiles.agents_count IS 'Number of agents owned by the user, maintained by trigger on ah_agents';
+COMMENT ON FUNCTION get_admin_users_page(TEXT, TEXT, TEXT, TEXT, JSONB, INTEGER) IS 'Keyset-paginated admin user list with search, role filter and sorting';
+COMMENT ON FUNCTION get_admin_transactions_page(TEXT, TEXT, INTEGER, TEXT, TEXT, JSONB, INTEGER) IS 'Keyset-paginated admin credit transactions with search, type and optional date window (p_days NULL = all history)';
@@ -0,0 +1,410 @@
+-- Migration: Notification Outbox
+-- Description: Transactional outbox for notification emails. Rows are written
+-- by triggers in the same transaction as the event that causes them, deduped
+-- by key, and drained in batches by a dispatcher (src/lib/notificationOutbox.ts
+-- or an n8n schedule calling the same RPCs). Until such a schedule exists the
+-- browsers drain their own rows: the widget sends the new conversation email
+-- of the conversation it just created, and a signed-in user's leader tab sends
+-- the notifications addressed to that user (claim_event_notifications).
+
+-- Table: ah_notification_outbox
+CREATE TABLE IF NOT EXISTS ah_notification_outbox (
+  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE,
+  template TEXT NOT NULL,
+  -- Same key = same notification; a second insert is a no-op
+  dedupe_key TEXT NOT NULL,
+  -- Data for generateEmailPayload(template, payload)
+  payload JSONB NOT NULL DEFAULT '{}'::jsonb,
+  status TEXT NOT NULL DEFAULT 'queued' CHECK (status IN ('queued', 'sending', 'sent', 'failed')),
+  attempts INTEGER NOT NULL DEFAULT 0,
+  max_attempts INTEGER NOT NULL DEFAULT 5,
+  next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  locked_at TIMESTAMPTZ,
+  -- Set on every claim; browsers confirm their rows with it
+  claim_token UUID,
+  sent_at TIMESTAMPTZ,
+  error_message TEXT,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_notification_outbox_dedupe
+ON ah_notification_outbox(dedupe_key);
+
+-- Dispatcher scan: only open rows are indexed
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_pending
+ON ah_notification_outbox(next_attempt_at)
+WHERE status IN ('queued', 'sending');
+
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_user_pending
+ON ah_notification_outbox(user_id)
+WHERE status IN ('queued', 'sending');
+
+CREATE INDEX IF NOT EXISTS idx_notification_outbox_template_created
+ON ah_notification_outbox(template, created_at);
+
+-- Low credit alerts are armed again once the balance goes back over the threshold
+ALTER TABLE ah_credits
+  ADD COLUMN IF NOT EXISTS low_credits_alerted_at TIMESTAMPTZ;
+
+-- RLS: rows are only written by triggers (SECURITY DEFINER) and read through
+-- the admin RPCs below
+ALTER TABLE ah_notification_outbox ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Admins can view notification outbox"
+  ON ah_notification_outbox FOR SELECT
+  USING (public.has_role(auth.uid(), 'admin'));
+
+CREATE TRIGGER update_notification_outbox_updated_at
+  BEFORE UPDATE ON ah_notification_outbox
+  FOR EACH ROW
+  EXECUTE FUNCTION update_updated_at_column();
+
+-- Enqueue a notification. Returns false when the dedupe key already exists.
+CREATE OR REPLACE FUNCTION enqueue_notification(
+  p_template TEXT,
+  p_dedupe_key TEXT,
+  p_user_id UUID,
+  p_payload JSONB
+)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO ah_notification_outbox (template, dedupe_key, user_id, payload)
+  VALUES (p_template, p_dedupe_key, p_user_id, p_payload)
+  ON CONFLICT (dedupe_key) DO NOTHING;
+
+  RETURN FOUND;
+END;
+$$;
+
+-- Low credits: one alert per user and threshold crossing, at the same fixed
+-- threshold as the browser alert this replaces (useCredits). The
+-- user_settings.low_credits_threshold column (default 100) was never applied
+-- to alerts, so it is not read here either; email_low_credits is. The balance is
+-- updated by the ah_usage_logs trigger, so the alert commits (or rolls back)
+-- with the usage row. Concurrent consumptions serialize on the ah_credits row
+-- lock, so only one of them sees the crossing. The dedupe key also caps a
+-- balance bouncing around the threshold to one alert per day.
+CREATE OR REPLACE FUNCTION enqueue_low_credits_notification()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_threshold CONSTANT INTEGER := 20;
+  v_enabled BOOLEAN;
+  v_profile RECORD;
+BEGIN
+  SELECT COALESCE(s.email_low_credits, true)
+  INTO v_enabled
+  FROM (SELECT 1) one
+  LEFT JOIN user_settings s ON s.user_id = NEW.user_id;
+
+  IF NEW.balance >= v_threshold THEN
+    NEW.low_credits_alerted_at := NULL;
+    RETURN NEW;
+  END IF;
+
+  IF NEW.low_credits_alerted_at IS NOT NULL
+     OR NEW.balance < 0
+     OR NOT v_enabled
+     OR public.has_role(NEW.user_id, 'admin') THEN
+    RETURN NEW;
+  END IF;
+
+  SELECT email, full_name INTO v_profile
+  FROM ah_profiles
+  WHERE user_id = NEW.user_id;
+
+  IF v_profile.email IS NOT NULL THEN
+    PERFORM enqueue_notification(
+      'low_credits',
+      format('low_credits:%s:%s:%s', NEW.user_id, v_threshold, to_char(NOW(), 'YYYY-MM-DD')),
+      NEW.user_id,
+      jsonb_build_object(
+        'email', v_profile.email,
+        'name', COALESCE(v_profile.full_name, 'Usuario'),
+        'balance', NEW.balance,
+        'threshold', v_threshold
+      )
+    );
+  END IF;
+
+  NEW.low_credits_alerted_at := NOW();
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trigger_low_credits_notification ON ah_credits;
+
+CREATE TRIGGER trigger_low_credits_notification
+BEFORE UPDATE OF balance ON ah_credits
+FOR EACH ROW
+WHEN (NEW.balance IS DISTINCT FROM OLD.balance)
+EXECUTE FUNCTION enqueue_low_credits_notification();
+
+-- New widget conversation: one email per conversation to the agent owner
+CREATE OR REPLACE FUNCTION enqueue_new_conversation_notification()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_owner RECORD;
+BEGIN
+  SELECT a.user_id, a.name AS agent_name, p.email, p.full_name,
+         COALESCE(s.email_new_message, true) AS enabled
+  INTO v_owner
+  FROM ah_agents a
+  JOIN ah_profiles p ON p.user_id = a.user_id
+  LEFT JOIN user_settings s ON s.user_id = a.user_id
+  WHERE a.id = NEW.agent_id;
+
+  IF v_owner.email IS NULL OR NOT v_owner.enabled THEN
+    RETURN NEW;
+  END IF;
+
+  PERFORM enqueue_notification(
+    'new_conversation',
+    'new_conversation:' || NEW.id,
+    v_owner.user_id,
+    jsonb_build_object(
+      'email', v_owner.email,
+      'ownerName', COALESCE(v_owner.full_name, 'Usuario'),
+      'agentName', v_owner.agent_name,
+      'visitorName', COALESCE(NEW.visitor_name, 'Visitante anónimo'),
+      'visitorEmail', COALESCE(NEW.visitor_email, 'Sin email'),
+      'conversationId', NEW.id
+    )
+  );
+
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trigger_new_conversation_notification ON ah_public_conversations;
+
+CREATE TRIGGER trigger_new_conversation_notification
+AFTER INSERT ON ah_public_conversations
+FOR EACH ROW
+EXECUTE FUNCTION enqueue_new_conversation_notification();
+
+-- Dispatcher RPCs: admins (panel) or the service role (n8n schedule)
+CREATE OR REPLACE FUNCTION can_dispatch_notifications()
+RETURNS BOOLEAN
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+  SELECT COALESCE(auth.role() = 'service_role' OR public.has_role(auth.uid(), 'admin'), false);
+$$;
+
+-- Claim up to p_limit due notifications. SKIP LOCKED lets several dispatchers
+-- drain the outbox at once; rows left in 'sending' longer than p_lease are
+-- taken over.
+CREATE OR REPLACE FUNCTION claim_notifications(
+  p_limit INTEGER DEFAULT 25,
+  p_lease INTERVAL DEFAULT INTERVAL '5 minutes'
+)
+RETURNS SETOF ah_notification_outbox
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  IF NOT can_dispatch_notifications() THEN
+    RAISE EXCEPTION 'Access denied';
+  END IF;
+
+  RETURN QUERY
+  UPDATE ah_notification_outbox o
+  SET status = 'sending',
+      attempts = o.attempts + 1,
+      locked_at = NOW(),
+      claim_token = gen_random_uuid()
+  WHERE o.id IN (
+    SELECT id FROM ah_notification_outbox
+    WHERE (status = 'queued' AND next_attempt_at <= NOW())
+       OR (status = 'sending' AND locked_at < NOW() - p_lease)
+    ORDER BY next_attempt_at
+    LIMIT LEAST(GREATEST(COALESCE(p_limit, 25), 1), 500)
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING o.*;
+END;
+$$;
+
+-- Browser-side claim. With p_conversation_id: the new conversation email of
+-- that conversation (the widget that just created it; the id is only known to
+-- the visitor and the owner). Without: the caller's own notifications.
+CREATE OR REPLACE FUNCTION claim_event_notifications(
+  p_conversation_id UUID DEFAULT NULL,
+  p_limit INTEGER DEFAULT 25
+)
+RETURNS SETOF ah_notification_outbox
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  IF p_conversation_id IS NULL AND auth.uid() IS NULL THEN
+    RETURN;
+  END IF;
+
+  RETURN QUERY
+  UPDATE ah_notification_outbox o
+  SET status = 'sending',
+      attempts = o.attempts + 1,
+      locked_at = NOW(),
+      claim_token = gen_random_uuid()
+  WHERE o.id IN (
+    SELECT id FROM ah_notification_outbox
+    WHERE ((status = 'queued' AND next_attempt_at <= NOW())
+        OR (status = 'sending' AND locked_at < NOW() - INTERVAL '5 minutes'))
+      AND CASE
+            WHEN p_conversation_id IS NOT NULL THEN dedupe_key = 'new_conversation:' || p_conversation_id
+            ELSE user_id = auth.uid()
+          END
+    ORDER BY next_attempt_at
+    LIMIT LEAST(GREATEST(COALESCE(p_limit, 25), 1), 100)
+    FOR UPDATE SKIP LOCKED
+  )
+  RETURNING o.*;
+END;
+$$;
+
+-- Dispatchers confirm any claimed row; browsers only the rows whose claim
+-- token they hold (p_tokens from claim_event_notifications)
+CREATE OR REPLACE FUNCTION complete_notifications(p_ids UUID[], p_tokens UUID[] DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_count INTEGER;
+  v_dispatcher BOOLEAN := can_dispatch_notifications();
+BEGIN
+  IF NOT v_dispatcher AND p_tokens IS NULL THEN
+    RAISE EXCEPTION 'Access denied';
+  END IF;
+
+  UPDATE ah_notification_outbox
+  SET status = 'sent', sent_at = NOW(), locked_at = NULL, claim_token = NULL, error_message = NULL
+  WHERE id = ANY(p_ids) AND status = 'sending'
+    AND (v_dispatcher OR claim_token = ANY(p_tokens));
+
+  GET DIAGNOSTICS v_count = ROW_COUNT;
+  RETURN v_count;
+END;
+$$;
+
+-- Put a failed notification back with exponential backoff (30 s, 1 min,
+-- 2 min, ... capped at 1 h) or mark it failed after max_attempts. Returns
+-- true when it will be retried.
+CREATE OR REPLACE FUNCTION fail_notification(p_id UUID, p_error TEXT, p_token UUID DEFAULT NULL)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_retry BOOLEAN;
+  v_dispatcher BOOLEAN := can_dispatch_notifications();
+BEGIN
+  IF NOT v_dispatcher AND p_token IS NULL THEN
+    RAISE EXCEPTION 'Access denied';
+  END IF;
+
+  UPDATE ah_notification_outbox
+  SET status = CASE WHEN attempts < max_attempts THEN 'queued' ELSE 'failed' END,
+      next_attempt_at = NOW() + LEAST(INTERVAL '30 seconds' * power(2, attempts - 1), INTERVAL '1 hour'),
+      locked_at = NULL,
+      claim_token = NULL,
+      error_message = left(p_error, 1000)
+  WHERE id = p_id AND status = 'sending'
+    AND (v_dispatcher OR claim_token = p_token)
+  RETURNING status = 'queued' INTO v_retry;
+
+  RETURN COALESCE(v_retry, false);
+END;
+$$;
+
+-- Per-template counts and delivery throughput over the last p_hours
+CREATE OR REPLACE FUNCTION get_notification_outbox_stats(p_hours INTEGER DEFAULT 24)
+RETURNS JSON
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  result JSON;
+BEGIN
+  IF NOT can_dispatch_notifications() THEN
+    RAISE EXCEPTION 'Access denied';
+  END IF;
+
+  SELECT COALESCE(json_agg(t ORDER BY t.template), '[]'::json) INTO result FROM (
+    SELECT
+      template,
+      count(*) FILTER (WHERE status = 'queued') AS queued,
+      count(*) FILTER (WHERE status = 'sending') AS sending,
+      count(*) FILTER (WHERE status = 'sent' AND sent_at >= NOW() - make_interval(hours => p_hours)) AS sent,
+      count(*) FILTER (WHERE status = 'failed' AND updated_at >= NOW() - make_interval(hours => p_hours)) AS failed,
+      round((count(*) FILTER (WHERE status = 'sent' AND sent_at >= NOW() - make_interval(hours => p_hours)))::numeric / p_hours, 2) AS sent_per_hour,
+      round(avg(extract(epoch FROM sent_at - created_at)) FILTER (WHERE sent_at >= NOW() - make_interval(hours => p_hours))::numeric, 1) AS avg_delivery_seconds,
+      min(created_at) FILTER (WHERE status = 'queued') AS oldest_queued_at
+    FROM ah_notification_outbox
+    WHERE status IN ('queued', 'sending')
+       OR updated_at >= NOW() - make_interval(hours => p_hours)
+    GROUP BY template
+  ) t;
+
+  RETURN result;
+END;
+$$;
+
+-- Sent rows are only kept for the stats window and dedupe
+CREATE OR REPLACE FUNCTION purge_notification_outbox(p_keep INTERVAL DEFAULT INTERVAL '30 days')
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_count INTEGER;
+BEGIN
+  DELETE FROM ah_notification_outbox
+  WHERE status = 'sent' AND sent_at < NOW() - p_keep;
+
+  GET DIAGNOSTICS v_count = ROW_COUNT;
+  RETURN v_count;
+END;
+$$;
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+    PERFORM cron.schedule('purge-notification-outbox', '30 3 * * *', 'SELECT purge_notification_outbox()');
+  END IF;
+END $$;
+
+REVOKE EXECUTE ON FUNCTION enqueue_notification(TEXT, TEXT, UUID, JSONB) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION purge_notification_outbox(INTERVAL) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION claim_notifications(INTEGER, INTERVAL) TO authenticated, service_role;
+GRANT EXECUTE ON FUNCTION claim_event_notifications(UUID, INTEGER) TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION complete_notifications(UUID[], UUID[]) TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION fail_notification(UUID, TEXT, UUID) TO anon, authenticated, service_role;
+GRANT EXECUTE ON FUNCTION get_notification_outbox_stats(INTEGER) TO authenticated, service_role;
+
+COMMENT ON TABLE ah_notification_outbox IS 'Transactional outbox for notification emails, drained by the notification dispatcher';
+COMMENT ON COLUMN ah_notification_outbox.dedupe_key IS 'Unique per notification, e.g. new_conversation:<id> or low_credits:<user>:<threshold>:<day>';
+COMMENT ON COLUMN ah_credits.low_credits_alerted_at IS 'Set when a low credit alert is queued, cleared when the balance is back over the threshold';
@@ -0,0 +1,387 @@
+-- Migration: Chat Admission Control
+-- Description: Per-agent and per-tenant concurrency caps in front of the n8n
+-- chat webhook, with a bounded wait queue per agent, fair hand-out of a
+-- tenant's slots across its agents, and queue depth / wait time metrics.
+-- The widget asks for a slot (request_chat_slot) before calling the webhook
+-- and gives it back (release_chat_slot) when the answer is in. The widget runs
+-- in the visitor's browser, so the slot is enforced server-side: the widget
+-- calls the chat-dispatch edge function (supabase/functions/chat-dispatch),
+-- which forwards to n8n only when the ticket holds a running slot
+-- (verify_chat_slot). Required with it: the n8n chat webhook only accepts
+-- calls carrying the dispatcher's X-Chat-Dispatch-Secret header.
+
+-- Limits per plan. A tenant is the owner of the agents (ah_agents.user_id).
+CREATE TABLE IF NOT EXISTS ah_chat_admission_limits (
+  plan_type TEXT PRIMARY KEY,
+  -- Webhook calls in flight for one agent
+  agent_max_running INTEGER NOT NULL,
+  -- Visitors waiting for one agent; beyond this requests get the fallback
+  agent_max_queued INTEGER NOT NULL,
+  -- Webhook calls in flight across all the tenant's agents
+  tenant_max_running INTEGER NOT NULL,
+  -- A granted slot not released after this long is reclaimed
+  run_lease_seconds INTEGER NOT NULL DEFAULT 90
+);
+
+INSERT INTO ah_chat_admission_limits (plan_type, agent_max_running, agent_max_queued, tenant_max_running) VALUES
+  ('free', 2, 6, 2),
+  ('pro', 4, 20, 8),
+  ('business', 8, 40, 24)
+ON CONFLICT (plan_type) DO NOTHING;
+
+-- Open tickets only (waiting or running). Short-lived and rebuilt by clients,
+-- so not WAL-logged.
+CREATE UNLOGGED TABLE IF NOT EXISTS ah_chat_tickets (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  agent_id UUID NOT NULL,
+  tenant_id UUID NOT NULL,
+  status TEXT NOT NULL DEFAULT 'waiting' CHECK (status IN ('waiting', 'running')),
+  created_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+  -- Last poll from the client; waiting tickets nobody polls are dropped
+  seen_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+  granted_at TIMESTAMPTZ,
+  lease_until TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_chat_tickets_tenant_status
+ON ah_chat_tickets(tenant_id, status, created_at);
+
+CREATE INDEX IF NOT EXISTS idx_chat_tickets_agent_status
+ON ah_chat_tickets(agent_id, status);
+
+-- Per agent and minute
+CREATE TABLE IF NOT EXISTS ah_chat_admission_metrics (
+  agent_id UUID NOT NULL REFERENCES ah_agents(id) ON DELETE CASCADE,
+  bucket TIMESTAMPTZ NOT NULL,
+  admitted INTEGER NOT NULL DEFAULT 0,
+  rejected INTEGER NOT NULL DEFAULT 0,
+  -- Gave up waiting for a slot
+  queue_timeouts INTEGER NOT NULL DEFAULT 0,
+  -- Webhook call timed out or failed while holding a slot
+  run_failures INTEGER NOT NULL DEFAULT 0,
+  wait_ms_total BIGINT NOT NULL DEFAULT 0,
+  wait_ms_max INTEGER NOT NULL DEFAULT 0,
+  depth_max INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (agent_id, bucket)
+);
+
+-- Only reachable through the functions below
+ALTER TABLE ah_chat_admission_limits ENABLE ROW LEVEL SECURITY;
+ALTER TABLE ah_chat_tickets ENABLE ROW LEVEL SECURITY;
+ALTER TABLE ah_chat_admission_metrics ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Anyone can view admission limits"
+  ON ah_chat_admission_limits FOR SELECT
+  USING (true);
+
+CREATE POLICY "Admins can manage admission limits"
+  ON ah_chat_admission_limits FOR ALL
+  USING (public.has_role(auth.uid(), 'admin'));
+
+CREATE POLICY "Users can view admission metrics of their agents"
+  ON ah_chat_admission_metrics FOR SELECT
+  USING (agent_id IN (SELECT id FROM ah_agents WHERE user_id = auth.uid()));
+
+CREATE OR REPLACE FUNCTION record_chat_admission(
+  p_agent_id UUID,
+  p_admitted INTEGER DEFAULT 0,
+  p_rejected INTEGER DEFAULT 0,
+  p_queue_timeouts INTEGER DEFAULT 0,
+  p_run_failures INTEGER DEFAULT 0,
+  p_wait_ms INTEGER DEFAULT 0,
+  p_depth INTEGER DEFAULT 0
+)
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  INSERT INTO ah_chat_admission_metrics AS m
+    (agent_id, bucket, admitted, rejected, queue_timeouts, run_failures, wait_ms_total, wait_ms_max, depth_max)
+  VALUES
+    (p_agent_id, date_trunc('minute', NOW()), p_admitted, p_rejected, p_queue_timeouts, p_run_failures, p_wait_ms, p_wait_ms, p_depth)
+  ON CONFLICT (agent_id, bucket) DO UPDATE SET
+    admitted = m.admitted + EXCLUDED.admitted,
+    rejected = m.rejected + EXCLUDED.rejected,
+    queue_timeouts = m.queue_timeouts + EXCLUDED.queue_timeouts,
+    run_failures = m.run_failures + EXCLUDED.run_failures,
+    wait_ms_total = m.wait_ms_total + EXCLUDED.wait_ms_total,
+    wait_ms_max = GREATEST(m.wait_ms_max, EXCLUDED.wait_ms_max),
+    depth_max = GREATEST(m.depth_max, EXCLUDED.depth_max);
+$$;
+
+CREATE OR REPLACE FUNCTION chat_admission_limits_for(p_tenant_id UUID)
+RETURNS ah_chat_admission_limits
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  -- Plans without a row fall back to the free limits
+  SELECT l.*
+  FROM ah_chat_admission_limits l
+  WHERE l.plan_type IN (
+    COALESCE((SELECT s.plan_type::text FROM ah_subscriptions s
+              WHERE s.user_id = p_tenant_id AND s.status = 'active'
+              LIMIT 1), 'free'),
+    'free')
+  ORDER BY l.plan_type = 'free'
+  LIMIT 1;
+$$;
+
+-- Hand free tenant slots to waiting tickets. The next ticket is the oldest
+-- one of the agent with the fewest calls in flight, so an agent with a long
+-- queue cannot starve the tenant's other agents. Caller holds the tenant lock.
+CREATE OR REPLACE FUNCTION grant_chat_slots(p_tenant_id UUID, p_limits ah_chat_admission_limits)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_running INTEGER;
+  v_granted INTEGER := 0;
+  v_next ah_chat_tickets;
+BEGIN
+  SELECT count(*) INTO v_running
+  FROM ah_chat_tickets
+  WHERE tenant_id = p_tenant_id AND status = 'running';
+
+  WHILE v_running < p_limits.tenant_max_running LOOP
+    SELECT t.* INTO v_next
+    FROM ah_chat_tickets t
+    CROSS JOIN LATERAL (
+      SELECT count(*) AS n FROM ah_chat_tickets r
+      WHERE r.agent_id = t.agent_id AND r.status = 'running'
+    ) agent_running
+    WHERE t.tenant_id = p_tenant_id
+      AND t.status = 'waiting'
+      AND agent_running.n < p_limits.agent_max_running
+    ORDER BY agent_running.n, t.created_at
+    LIMIT 1;
+
+    EXIT WHEN v_next.id IS NULL;
+
+    UPDATE ah_chat_tickets
+    SET status = 'running',
+        granted_at = clock_timestamp(),
+        lease_until = clock_timestamp() + make_interval(secs => p_limits.run_lease_seconds)
+    WHERE id = v_next.id;
+
+    PERFORM record_chat_admission(
+      v_next.agent_id,
+      p_admitted => 1,
+      p_wait_ms => (extract(epoch FROM clock_timestamp() - v_next.created_at) * 1000)::INTEGER
+    );
+
+    v_running := v_running + 1;
+    v_granted := v_granted + 1;
+    v_next := NULL;
+  END LOOP;
+
+  RETURN v_granted;
+END;
+$$;
+
+-- Ask for a chat slot (p_ticket NULL) or poll an existing ticket.
+-- Returns {ticket, status: granted|waiting|rejected|expired, position, depth,
+-- retry_after_ms}. All decisions for one tenant are serialized by an
+-- advisory lock; tenants never wait on each other.
+CREATE OR REPLACE FUNCTION request_chat_slot(p_agent_id UUID, p_ticket UUID DEFAULT NULL)
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_tenant_id UUID;
+  v_limits ah_chat_admission_limits;
+  v_ticket ah_chat_tickets;
+  v_depth INTEGER;
+  v_position INTEGER;
+BEGIN
+  SELECT user_id INTO v_tenant_id FROM ah_agents WHERE id = p_agent_id;
+  IF v_tenant_id IS NULL THEN
+    RAISE EXCEPTION 'Agent not found';
+  END IF;
+
+  PERFORM pg_advisory_xact_lock(hashtextextended('chat_admission:' || v_tenant_id, 0));
+  v_limits := chat_admission_limits_for(v_tenant_id);
+
+  -- Reclaim slots of clients that died and drop tickets nobody polls anymore
+  DELETE FROM ah_chat_tickets
+  WHERE tenant_id = v_tenant_id
+    AND ((status = 'running' AND lease_until < clock_timestamp())
+      OR (status = 'waiting' AND seen_at < clock_timestamp() - INTERVAL '10 seconds'));
+
+  SELECT count(*) INTO v_depth
+  FROM ah_chat_tickets
+  WHERE agent_id = p_agent_id AND status = 'waiting';
+
+  IF p_ticket IS NULL THEN
+    IF v_depth >= v_limits.agent_max_queued THEN
+      PERFORM record_chat_admission(p_agent_id, p_rejected => 1, p_depth => v_depth);
+      RETURN json_build_object('ticket', NULL, 'status', 'rejected', 'depth', v_depth, 'retry_after_ms', 5000);
+    END IF;
+
+    INSERT INTO ah_chat_tickets (agent_id, tenant_id)
+    VALUES (p_agent_id, v_tenant_id)
+    RETURNING * INTO v_ticket;
+
+    v_depth := v_depth + 1;
+    PERFORM record_chat_admission(p_agent_id, p_depth => v_depth);
+  ELSE
+    UPDATE ah_chat_tickets
+    SET seen_at = clock_timestamp()
+    WHERE id = p_ticket AND agent_id = p_agent_id
+    RETURNING * INTO v_ticket;
+
+    IF v_ticket.id IS NULL THEN
+      RETURN json_build_object('ticket', p_ticket, 'status', 'expired');
+    END IF;
+  END IF;
+
+  IF v_ticket.status = 'waiting' THEN
+    PERFORM grant_chat_slots(v_tenant_id, v_limits);
+    SELECT * INTO v_ticket FROM ah_chat_tickets WHERE id = v_ticket.id;
+  END IF;
+
+  IF v_ticket.status = 'running' THEN
+    RETURN json_build_object('ticket', v_ticket.id, 'status', 'granted', 'lease_until', v_ticket.lease_until);
+  END IF;
+
+  SELECT count(*) INTO v_position
+  FROM ah_chat_tickets
+  WHERE agent_id = p_agent_id AND status = 'waiting' AND created_at < v_ticket.created_at;
+
+  RETURN json_build_object(
+    'ticket', v_ticket.id,
+    'status', 'waiting',
+    'position', v_position,
+    'depth', v_depth,
+    'retry_after_ms', LEAST(250 * (v_position + 1), 2000)
+  );
+END;
+$$;
+
+-- Give a slot back (or leave the queue). p_outcome: ok, timeout, error,
+-- queue_timeout. Hands the slot straight to the next waiting ticket.
+CREATE OR REPLACE FUNCTION release_chat_slot(p_ticket UUID, p_outcome TEXT DEFAULT 'ok')
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_ticket ah_chat_tickets;
+BEGIN
+  SELECT * INTO v_ticket FROM ah_chat_tickets WHERE id = p_ticket;
+  IF v_ticket.id IS NULL THEN
+    RETURN;
+  END IF;
+
+  PERFORM pg_advisory_xact_lock(hashtextextended('chat_admission:' || v_ticket.tenant_id, 0));
+
+  DELETE FROM ah_chat_tickets WHERE id = p_ticket
+  RETURNING * INTO v_ticket;
+
+  IF v_ticket.id IS NULL THEN
+    RETURN;
+  END IF;
+
+  IF v_ticket.status = 'waiting' THEN
+    PERFORM record_chat_admission(
+      v_ticket.agent_id,
+      p_queue_timeouts => 1,
+      p_wait_ms => (extract(epoch FROM clock_timestamp() - v_ticket.created_at) * 1000)::INTEGER
+    );
+  ELSIF p_outcome IN ('timeout', 'error') THEN
+    PERFORM record_chat_admission(v_ticket.agent_id, p_run_failures => 1);
+  END IF;
+
+  IF v_ticket.status = 'running' THEN
+    PERFORM grant_chat_slots(v_ticket.tenant_id, chat_admission_limits_for(v_ticket.tenant_id));
+  END IF;
+END;
+$$;
+
+-- Server-side check for chat-dispatch: true when p_ticket holds a running,
+-- unexpired slot of p_agent_id. Service role only.
+CREATE OR REPLACE FUNCTION verify_chat_slot(p_agent_id UUID, p_ticket UUID)
+RETURNS BOOLEAN
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  SELECT EXISTS (
+    SELECT 1 FROM ah_chat_tickets
+    WHERE id = p_ticket
+      AND agent_id = p_agent_id
+      AND status = 'running'
+      AND lease_until >= clock_timestamp()
+  );
+$$;
+
+-- Current queue and last p_minutes of admission per agent of the caller
+-- (every agent for admins)
+CREATE OR REPLACE FUNCTION get_chat_admission_metrics(
+  p_agent_id UUID DEFAULT NULL,
+  p_minutes INTEGER DEFAULT 60
+)
+RETURNS JSON
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  result JSON;
+  v_is_admin BOOLEAN := public.has_role(auth.uid(), 'admin');
+BEGIN
+  SELECT COALESCE(json_agg(t ORDER BY t.agent_name), '[]'::json) INTO result FROM (
+    SELECT
+      a.id AS agent_id,
+      a.name AS agent_name,
+      (SELECT count(*) FROM ah_chat_tickets t WHERE t.agent_id = a.id AND t.status = 'waiting') AS waiting,
+      (SELECT count(*) FROM ah_chat_tickets t WHERE t.agent_id = a.id AND t.status = 'running') AS running,
+      COALESCE(sum(m.admitted), 0) AS admitted,
+      COALESCE(sum(m.rejected), 0) AS rejected,
+      COALESCE(sum(m.queue_timeouts), 0) AS queue_timeouts,
+      COALESCE(sum(m.run_failures), 0) AS run_failures,
+      CASE WHEN sum(m.admitted) > 0 THEN round(sum(m.wait_ms_total)::numeric / sum(m.admitted)) END AS avg_wait_ms,
+      COALESCE(max(m.wait_ms_max), 0) AS max_wait_ms,
+      COALESCE(max(m.depth_max), 0) AS max_depth
+    FROM ah_agents a
+    LEFT JOIN ah_chat_admission_metrics m
+      ON m.agent_id = a.id
+     AND m.bucket >= date_trunc('minute', NOW()) - make_interval(mins => p_minutes)
+    WHERE (v_is_admin OR a.user_id = auth.uid())
+      AND (p_agent_id IS NULL OR a.id = p_agent_id)
+    GROUP BY a.id, a.name
+  ) t;
+
+  RETURN result;
+END;
+$$;
+
+-- Metrics are kept one week
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+    PERFORM cron.schedule('purge-chat-admission-metrics', '15 4 * * *',
+      $cron$DELETE FROM ah_chat_admission_metrics WHERE bucket < NOW() - INTERVAL '7 days'$cron$);
+  END IF;
+END $$;
+
+REVOKE EXECUTE ON FUNCTION record_chat_admission(UUID, INTEGER, INTEGER, INTEGER, INTEGER, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION grant_chat_slots(UUID, ah_chat_admission_limits) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION verify_chat_slot(UUID, UUID) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION verify_chat_slot(UUID, UUID) TO service_role;
+GRANT EXECUTE ON FUNCTION request_chat_slot(UUID, UUID) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION release_chat_slot(UUID, TEXT) TO anon, authenticated;
+GRANT EXECUTE ON FUNCTION get_chat_admission_metrics(UUID, INTEGER) TO authenticated;
+
+COMMENT ON TABLE ah_chat_admission_limits IS 'Chat webhook concurrency and queue limits per plan';
+COMMENT ON TABLE ah_chat_tickets IS 'Open chat slots (running) and visitors waiting for one (waiting)';
+COMMENT ON TABLE ah_chat_admission_metrics IS 'Per agent and minute: admitted, rejected, timeouts, wait time and queue depth';
@@ -0,0 +1,304 @@
+-- Migration: Answer Cache
+-- Description: Opt-in per-agent cache of widget answers keyed on the
+-- normalized visitor question, with optional embedding-similarity lookup,
+-- TTL and size-bounded eviction, invalidation on prompt/document changes and
+-- daily hit statistics for analytics.
+
+-- Per-agent settings
+ALTER TABLE ah_agents
+  ADD COLUMN IF NOT EXISTS answer_cache_enabled BOOLEAN NOT NULL DEFAULT false,
+  ADD COLUMN IF NOT EXISTS answer_cache_ttl_minutes INTEGER NOT NULL DEFAULT 1440,
+  ADD COLUMN IF NOT EXISTS answer_cache_max_entries INTEGER NOT NULL DEFAULT 200,
+  -- Minimum cosine similarity for an embedding match
+  ADD COLUMN IF NOT EXISTS answer_cache_similarity REAL NOT NULL DEFAULT 0.92;
+
+-- Table: ah_answer_cache
+CREATE TABLE IF NOT EXISTS ah_answer_cache (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  agent_id UUID NOT NULL REFERENCES ah_agents(id) ON DELETE CASCADE,
+  question_key TEXT NOT NULL,
+  question TEXT NOT NULL,
+  answer TEXT NOT NULL,
+  -- Set when the workflow sends the question embedding along
+  question_embedding VECTOR(1536),
+  -- Webhook round-trip of the original answer: what every hit saves
+  source_latency_ms INTEGER NOT NULL DEFAULT 0,
+  hits INTEGER NOT NULL DEFAULT 0,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  last_hit_at TIMESTAMPTZ,
+  expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_answer_cache_agent_key
+ON ah_answer_cache(agent_id, question_key);
+
+CREATE INDEX IF NOT EXISTS idx_answer_cache_expires
+ON ah_answer_cache(expires_at);
+
+-- Table: ah_answer_cache_stats (per agent and day)
+CREATE TABLE IF NOT EXISTS ah_answer_cache_stats (
+  agent_id UUID NOT NULL REFERENCES ah_agents(id) ON DELETE CASCADE,
+  day DATE NOT NULL,
+  lookups INTEGER NOT NULL DEFAULT 0,
+  hits INTEGER NOT NULL DEFAULT 0,
+  semantic_hits INTEGER NOT NULL DEFAULT 0,
+  latency_saved_ms BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (agent_id, day)
+);
+
+-- RLS Policies
+ALTER TABLE ah_answer_cache ENABLE ROW LEVEL SECURITY;
+ALTER TABLE ah_answer_cache_stats ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view answer cache of their agents"
+  ON ah_answer_cache FOR SELECT
+  USING (agent_id IN (SELECT id FROM ah_agents WHERE user_id = auth.uid()));
+
+CREATE POLICY "Users can delete answer cache of their agents"
+  ON ah_answer_cache FOR DELETE
+  USING (agent_id IN (SELECT id FROM ah_agents WHERE user_id = auth.uid()));
+
+CREATE POLICY "Users can view answer cache stats of their agents"
+  ON ah_answer_cache_stats FOR SELECT
+  USING (agent_id IN (SELECT id FROM ah_agents WHERE user_id = auth.uid()));
+
+-- "¿Cuáles son los HORARIOS?" and "cuales son los horarios" share a key:
+-- lower case, accents and punctuation removed, whitespace collapsed.
+CREATE OR REPLACE FUNCTION normalize_question(p_text TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT btrim(regexp_replace(
+    regexp_replace(
+      translate(lower(p_text), 'áàäâéèëêíìïîóòöôúùüû', 'aaaaeeeeiiiioooouuuu'),
+      '[^a-z0-9ñ]+', ' ', 'g'),
+    '\s+', ' ', 'g'));
+$$;
+
+CREATE OR REPLACE FUNCTION record_answer_cache_lookup(
+  p_agent_id UUID,
+  p_hit BOOLEAN,
+  p_semantic BOOLEAN DEFAULT false,
+  p_latency_saved_ms INTEGER DEFAULT 0
+)
+RETURNS VOID
+LANGUAGE sql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  INSERT INTO ah_answer_cache_stats AS s (agent_id, day, lookups, hits, semantic_hits, latency_saved_ms)
+  VALUES (p_agent_id, CURRENT_DATE, 1, p_hit::int, (p_hit AND p_semantic)::int, CASE WHEN p_hit THEN p_latency_saved_ms ELSE 0 END)
+  ON CONFLICT (agent_id, day) DO UPDATE SET
+    lookups = s.lookups + 1,
+    hits = s.hits + EXCLUDED.hits,
+    semantic_hits = s.semantic_hits + EXCLUDED.semantic_hits,
+    latency_saved_ms = s.latency_saved_ms + EXCLUDED.latency_saved_ms;
+$$;
+
+-- Look up a cached answer. Exact match on the normalized question first,
+-- then (when an embedding is given, e.g. by the n8n workflow that already
+-- embeds the question for retrieval) the most similar cached question above
+-- the agent's threshold. Returns {hit, answer, match} and counts the lookup.
+CREATE OR REPLACE FUNCTION lookup_cached_answer(
+  p_agent_id UUID,
+  p_message TEXT,
+  p_embedding VECTOR(1536) DEFAULT NULL
+)
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_agent RECORD;
+  v_entry ah_answer_cache;
+  v_match TEXT := 'exact';
+BEGIN
+  SELECT answer_cache_enabled, answer_cache_similarity INTO v_agent
+  FROM ah_agents WHERE id = p_agent_id;
+
+  IF NOT COALESCE(v_agent.answer_cache_enabled, false) THEN
+    RETURN json_build_object('hit', false, 'enabled', false);
+  END IF;
+
+  SELECT * INTO v_entry
+  FROM ah_answer_cache
+  WHERE agent_id = p_agent_id
+    AND question_key = normalize_question(p_message)
+    AND expires_at > NOW();
+
+  IF v_entry.id IS NULL AND p_embedding IS NOT NULL THEN
+    v_match := 'semantic';
+    SELECT * INTO v_entry
+    FROM ah_answer_cache
+    WHERE agent_id = p_agent_id
+      AND question_embedding IS NOT NULL
+      AND expires_at > NOW()
+      AND 1 - (question_embedding <=> p_embedding) >= v_agent.answer_cache_similarity
+    ORDER BY question_embedding <=> p_embedding
+    LIMIT 1;
+  END IF;
+
+  IF v_entry.id IS NULL THEN
+    PERFORM record_answer_cache_lookup(p_agent_id, false);
+    RETURN json_build_object('hit', false, 'enabled', true);
+  END IF;
+
+  UPDATE ah_answer_cache
+  SET hits = hits + 1, last_hit_at = NOW()
+  WHERE id = v_entry.id;
+
+  PERFORM record_answer_cache_lookup(p_agent_id, true, v_match = 'semantic', v_entry.source_latency_ms);
+
+  RETURN json_build_object(
+    'hit', true,
+    'enabled', true,
+    'answer', v_entry.answer,
+    'match', v_match,
+    'entry_id', v_entry.id
+  );
+END;
+$$;
+
+-- Cache an answer of the agent. Called by the chat workflow (n8n, service
+-- role) with the question it was sent and the answer it produced, never from
+-- the browser: widget messages are visitor-writable, so pairs read from them
+-- could be forged. Evicts the least recently used entries beyond the agent's
+-- limit.
+CREATE OR REPLACE FUNCTION cache_agent_answer(
+  p_agent_id UUID,
+  p_question TEXT,
+  p_answer TEXT,
+  p_latency_ms INTEGER DEFAULT 0,
+  p_embedding VECTOR(1536) DEFAULT NULL
+)
+RETURNS BOOLEAN
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_agent ah_agents;
+  v_key TEXT := normalize_question(p_question);
+BEGIN
+  SELECT * INTO v_agent FROM ah_agents WHERE id = p_agent_id;
+
+  IF NOT COALESCE(v_agent.answer_cache_enabled, false) OR COALESCE(btrim(p_answer), '') = '' THEN
+    RETURN false;
+  END IF;
+
+  -- Only short, self-contained questions are worth caching
+  IF COALESCE(v_key, '') = '' OR length(v_key) > 200 THEN
+    RETURN false;
+  END IF;
+
+  INSERT INTO ah_answer_cache (agent_id, question_key, question, answer, question_embedding, source_latency_ms, expires_at)
+  VALUES (
+    v_agent.id, v_key, p_question, p_answer, p_embedding,
+    GREATEST(COALESCE(p_latency_ms, 0), 0),
+    NOW() + make_interval(mins => v_agent.answer_cache_ttl_minutes)
+  )
+  ON CONFLICT (agent_id, question_key) DO UPDATE SET
+    answer = EXCLUDED.answer,
+    question_embedding = COALESCE(EXCLUDED.question_embedding, ah_answer_cache.question_embedding),
+    source_latency_ms = EXCLUDED.source_latency_ms,
+    expires_at = EXCLUDED.expires_at;
+
+  DELETE FROM ah_answer_cache
+  WHERE id IN (
+    SELECT id FROM ah_answer_cache
+    WHERE agent_id = v_agent.id
+    ORDER BY (expires_at > NOW()) DESC, COALESCE(last_hit_at, created_at) DESC
+    OFFSET v_agent.answer_cache_max_entries
+  );
+
+  RETURN true;
+END;
+$$;
+
+-- Answers depend on the prompt and the knowledge base: drop them when either changes
+CREATE OR REPLACE FUNCTION invalidate_answer_cache()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  IF TG_TABLE_NAME = 'ah_agents' THEN
+    DELETE FROM ah_answer_cache WHERE agent_id = NEW.id;
+  ELSIF TG_OP = 'DELETE' THEN
+    DELETE FROM ah_answer_cache WHERE agent_id = OLD.agent_id;
+  ELSE
+    DELETE FROM ah_answer_cache WHERE agent_id = NEW.agent_id;
+  END IF;
+
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trigger_answer_cache_agent ON ah_agents;
+CREATE TRIGGER trigger_answer_cache_agent
+AFTER UPDATE OF system_prompt, answer_cache_enabled ON ah_agents
+FOR EACH ROW
+WHEN (OLD.system_prompt IS DISTINCT FROM NEW.system_prompt
+   OR OLD.answer_cache_enabled IS DISTINCT FROM NEW.answer_cache_enabled)
+EXECUTE FUNCTION invalidate_answer_cache();
+
+-- A document counts as changed once it is (re-)indexed or removed
+DROP TRIGGER IF EXISTS trigger_answer_cache_document_indexed ON ah_documents;
+CREATE TRIGGER trigger_answer_cache_document_indexed
+AFTER UPDATE OF status ON ah_documents
+FOR EACH ROW
+WHEN (NEW.status = 'indexed' AND OLD.status IS DISTINCT FROM NEW.status AND NEW.agent_id IS NOT NULL)
+EXECUTE FUNCTION invalidate_answer_cache();
+
+DROP TRIGGER IF EXISTS trigger_answer_cache_document_deleted ON ah_documents;
+CREATE TRIGGER trigger_answer_cache_document_deleted
+AFTER DELETE ON ah_documents
+FOR EACH ROW
+WHEN (OLD.agent_id IS NOT NULL)
+EXECUTE FUNCTION invalidate_answer_cache();
+
+-- Per-agent cache statistics for the caller's agents since p_since
+CREATE OR REPLACE FUNCTION get_answer_cache_stats(p_since DATE DEFAULT CURRENT_DATE - 30)
+RETURNS JSON
+LANGUAGE sql
+STABLE
+SECURITY INVOKER
+SET search_path = public
+AS $$
+  SELECT COALESCE(json_agg(t ORDER BY t.hits DESC), '[]'::json) FROM (
+    SELECT
+      a.id AS agent_id,
+      a.name AS agent_name,
+      COALESCE(sum(s.lookups), 0) AS lookups,
+      COALESCE(sum(s.hits), 0) AS hits,
+      COALESCE(sum(s.semantic_hits), 0) AS semantic_hits,
+      CASE WHEN sum(s.lookups) > 0 THEN round(sum(s.hits)::numeric / sum(s.lookups), 4) ELSE 0 END AS hit_rate,
+      COALESCE(sum(s.latency_saved_ms), 0) AS latency_saved_ms,
+      (SELECT count(*) FROM ah_answer_cache c WHERE c.agent_id = a.id AND c.expires_at > NOW()) AS entries
+    FROM ah_agents a
+    LEFT JOIN ah_answer_cache_stats s ON s.agent_id = a.id AND s.day >= p_since
+    WHERE a.user_id = auth.uid() AND a.answer_cache_enabled
+    GROUP BY a.id, a.name
+  ) t;
+$$;
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+    PERFORM cron.schedule('purge-answer-cache', '45 * * * *',
+      $cron$DELETE FROM ah_answer_cache WHERE expires_at < NOW()$cron$);
+  END IF;
+END $$;
+
+REVOKE EXECUTE ON FUNCTION record_answer_cache_lookup(UUID, BOOLEAN, BOOLEAN, INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION lookup_cached_answer(UUID, TEXT, VECTOR) TO anon, authenticated, service_role;
+REVOKE EXECUTE ON FUNCTION cache_agent_answer(UUID, TEXT, TEXT, INTEGER, VECTOR) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION cache_agent_answer(UUID, TEXT, TEXT, INTEGER, VECTOR) TO service_role;
+GRANT EXECUTE ON FUNCTION get_answer_cache_stats(DATE) TO authenticated;
+
+COMMENT ON TABLE ah_answer_cache IS 'Per-agent cache of widget answers keyed on the normalized question';
+COMMENT ON TABLE ah_answer_cache_stats IS 'Answer cache lookups, hits and latency saved per agent and day';
+COMMENT ON COLUMN ah_agents.answer_cache_enabled IS 'Serve repeated visitor questions from ah_answer_cache';
@@ -0,0 +1,67 @@
+-- Migration: Session Snapshot
+-- Description: One RPC returning the signed-in user's roles, profile,
+-- subscription and credit balance, so the dashboard loads its identity in a
+-- single round-trip instead of one auth + role lookup per hook. The tables are
+-- published to realtime so AuthContext can keep the snapshot fresh.
+
+CREATE OR REPLACE FUNCTION get_session_snapshot()
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_user_id UUID := auth.uid();
+  v_profile ah_profiles;
+BEGIN
+  IF v_user_id IS NULL THEN
+    RAISE EXCEPTION 'Not authenticated';
+  END IF;
+
+  SELECT * INTO v_profile FROM ah_profiles WHERE user_id = v_user_id;
+
+  -- Older accounts may have no profile row yet
+  IF v_profile.id IS NULL THEN
+    INSERT INTO ah_profiles (user_id, email)
+    SELECT v_user_id, email FROM auth.users WHERE id = v_user_id
+    RETURNING * INTO v_profile;
+  END IF;
+
+  RETURN json_build_object(
+    'user_id', v_user_id,
+    'roles', COALESCE(
+      (SELECT json_agg(role ORDER BY role) FROM user_roles WHERE user_id = v_user_id),
+      '[]'::json
+    ),
+    'profile', row_to_json(v_profile),
+    'subscription', (
+      SELECT row_to_json(s) FROM ah_subscriptions s WHERE s.user_id = v_user_id LIMIT 1
+    ),
+    'credits', (
+      SELECT json_build_object('user_id', c.user_id, 'balance', c.balance)
+      FROM ah_credits c WHERE c.user_id = v_user_id
+    ),
+    'fetched_at', NOW()
+  );
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION get_session_snapshot() FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION get_session_snapshot() TO authenticated;
+
+-- Realtime: changes to the snapshot tables reach the owner's open sessions
+DO $$
+DECLARE
+  v_table TEXT;
+BEGIN
+  FOREACH v_table IN ARRAY ARRAY['ah_credits', 'ah_profiles', 'ah_subscriptions', 'user_roles'] LOOP
+    IF NOT EXISTS (
+      SELECT 1 FROM pg_publication_tables
+      WHERE pubname = 'supabase_realtime' AND schemaname = 'public' AND tablename = v_table
+    ) THEN
+      EXECUTE format('ALTER PUBLICATION supabase_realtime ADD TABLE public.%I', v_table);
+    END IF;
+  END LOOP;
+END $$;
+
+COMMENT ON FUNCTION get_session_snapshot() IS 'Roles, profile, subscription and credits of auth.uid() in one call (AuthContext)';
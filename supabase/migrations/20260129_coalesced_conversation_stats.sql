@@ -0,0 +1,142 @@
+-- Migration: Coalesced Conversation Stats
+-- Description: Replace the per-message UPDATE of ah_public_conversations
+-- (messages_count, last_message_at) with an append-only delta table written
+-- once per INSERT statement and folded into the conversation rows in batches.
+-- A visitor turn no longer rewrites the conversation row twice, so active
+-- conversations stop accumulating dead tuples and row-lock waits.
+--
+-- The counters on ah_public_conversations trail the messages by at most one
+-- flush (pg_cron, every minute); ah_public_conversation_stats adds the pending
+-- deltas, and is what the dashboards read. Without pg_cron nothing flushes:
+-- the view stays exact, but schedule flush_conversation_stats() elsewhere (n8n,
+-- service role) or the delta table grows without bound.
+
+-- Table: ah_public_conversation_stat_deltas
+-- One row per conversation per inserting statement; only ever inserted and
+-- deleted (by flush_conversation_stats), never updated
+CREATE TABLE IF NOT EXISTS ah_public_conversation_stat_deltas (
+  id BIGSERIAL PRIMARY KEY,
+  conversation_id UUID NOT NULL,
+  messages INTEGER NOT NULL,
+  last_message_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_public_conv_stat_deltas_conv
+  ON ah_public_conversation_stat_deltas(conversation_id);
+
+ALTER TABLE ah_public_conversation_stat_deltas ENABLE ROW LEVEL SECURITY;
+
+-- Owners see pending deltas of their agents' conversations (read through the view)
+CREATE POLICY "Users can view stat deltas for their agents"
+ON ah_public_conversation_stat_deltas
+FOR SELECT
+TO authenticated
+USING (
+  conversation_id IN (
+    SELECT c.id FROM ah_public_conversations c
+    JOIN ah_agents a ON c.agent_id = a.id
+    WHERE a.user_id = auth.uid()
+  )
+);
+
+CREATE POLICY "Admins can view all stat deltas"
+ON ah_public_conversation_stat_deltas
+FOR SELECT
+TO authenticated
+USING (public.has_role(auth.uid(), 'admin'));
+
+-- Statement-level: one delta row per conversation touched by the INSERT,
+-- however many messages it carried
+CREATE OR REPLACE FUNCTION record_conversation_stat_deltas()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO ah_public_conversation_stat_deltas (conversation_id, messages, last_message_at)
+  SELECT conversation_id, COUNT(*), COALESCE(MAX(created_at), NOW())
+  FROM new_messages
+  GROUP BY conversation_id;
+
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trigger_update_conversation_stats ON ah_public_messages;
+
+CREATE TRIGGER trigger_update_conversation_stats
+AFTER INSERT ON ah_public_messages
+REFERENCING NEW TABLE AS new_messages
+FOR EACH STATEMENT
+EXECUTE FUNCTION record_conversation_stat_deltas();
+
+DROP FUNCTION IF EXISTS update_conversation_stats();
+
+-- Fold pending deltas into ah_public_conversations: one UPDATE per
+-- conversation per flush. Deltas committed while it runs wait for the next
+-- one. Returns the number of conversations updated.
+CREATE OR REPLACE FUNCTION flush_conversation_stats()
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_count INTEGER;
+BEGIN
+  WITH moved AS (
+    DELETE FROM ah_public_conversation_stat_deltas
+    RETURNING conversation_id, messages, last_message_at
+  ),
+  totals AS (
+    SELECT conversation_id, SUM(messages)::INTEGER AS messages, MAX(last_message_at) AS last_message_at
+    FROM moved
+    GROUP BY conversation_id
+  )
+  UPDATE ah_public_conversations c
+  SET
+    messages_count = COALESCE(c.messages_count, 0) + t.messages,
+    last_message_at = GREATEST(c.last_message_at, t.last_message_at)
+  FROM totals t
+  WHERE c.id = t.conversation_id;
+
+  GET DIAGNOSTICS v_count = ROW_COUNT;
+  RETURN v_count;
+END;
+$$;
+
+-- Exact counters: stored values plus whatever has not been flushed yet
+CREATE OR REPLACE VIEW ah_public_conversation_stats
+WITH (security_invoker = true)
+AS
+SELECT
+  c.id AS conversation_id,
+  c.agent_id,
+  COALESCE(c.messages_count, 0) + COALESCE(d.messages, 0) AS messages_count,
+  GREATEST(c.last_message_at, d.last_message_at) AS last_message_at,
+  c.started_at
+FROM ah_public_conversations c
+LEFT JOIN (
+  SELECT conversation_id, SUM(messages)::INTEGER AS messages, MAX(last_message_at) AS last_message_at
+  FROM ah_public_conversation_stat_deltas
+  GROUP BY conversation_id
+) d ON d.conversation_id = c.id;
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+    PERFORM cron.schedule('flush-conversation-stats', '* * * * *', 'SELECT flush_conversation_stats()');
+  ELSE
+    RAISE WARNING 'pg_cron is not installed: schedule SELECT flush_conversation_stats() every minute (service role), or ah_public_conversation_stat_deltas keeps growing';
+  END IF;
+END $$;
+
+REVOKE EXECUTE ON FUNCTION record_conversation_stat_deltas() FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION flush_conversation_stats() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION flush_conversation_stats() TO service_role;
+GRANT SELECT ON ah_public_conversation_stats TO authenticated;
+
+COMMENT ON TABLE ah_public_conversation_stat_deltas IS 'Pending messages_count / last_message_at increments, folded by flush_conversation_stats()';
+COMMENT ON FUNCTION flush_conversation_stats() IS 'Apply pending conversation stat deltas in one UPDATE per conversation (pg_cron, every minute)';
+COMMENT ON VIEW ah_public_conversation_stats IS 'messages_count / last_message_at including deltas not flushed yet';
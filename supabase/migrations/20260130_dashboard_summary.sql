@@ -0,0 +1,318 @@
+-- Migration: Dashboard Summary
+-- Description: Per-owner dashboard counters maintained incrementally by
+-- statement-level triggers on ah_public_conversations and ah_usage_logs, so
+-- the dashboard reads its totals, today/7d/30d counts and usage series with
+-- one small RPC (get_dashboard_summary) instead of downloading every
+-- conversation and usage log the owner ever had.
+-- Days are UTC, like the usage chart. The usage triggers touch the same
+-- per-user rows the ah_usage_logs credit trigger already serializes on.
+
+-- ============================================
+-- Tables
+-- ============================================
+
+-- Conversations per agent, all time
+CREATE TABLE IF NOT EXISTS ah_dashboard_agent_totals (
+  agent_id UUID PRIMARY KEY REFERENCES ah_agents(id) ON DELETE CASCADE,
+  user_id UUID NOT NULL,
+  conversations INTEGER NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_dashboard_agent_totals_user ON ah_dashboard_agent_totals(user_id);
+
+-- Conversations started per agent and day
+CREATE TABLE IF NOT EXISTS ah_dashboard_agent_daily (
+  agent_id UUID NOT NULL REFERENCES ah_agents(id) ON DELETE CASCADE,
+  user_id UUID NOT NULL,
+  day DATE NOT NULL,
+  conversations INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (agent_id, day)
+);
+
+CREATE INDEX IF NOT EXISTS idx_dashboard_agent_daily_user ON ah_dashboard_agent_daily(user_id, day);
+
+-- Usage log entries (messages) and credits per owner, all time
+CREATE TABLE IF NOT EXISTS ah_dashboard_usage_totals (
+  user_id UUID PRIMARY KEY,
+  messages INTEGER NOT NULL DEFAULT 0,
+  credits BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Usage per owner and day
+CREATE TABLE IF NOT EXISTS ah_dashboard_usage_daily (
+  user_id UUID NOT NULL,
+  day DATE NOT NULL,
+  messages INTEGER NOT NULL DEFAULT 0,
+  credits BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (user_id, day)
+);
+
+ALTER TABLE ah_dashboard_agent_totals ENABLE ROW LEVEL SECURITY;
+ALTER TABLE ah_dashboard_agent_daily ENABLE ROW LEVEL SECURITY;
+ALTER TABLE ah_dashboard_usage_totals ENABLE ROW LEVEL SECURITY;
+ALTER TABLE ah_dashboard_usage_daily ENABLE ROW LEVEL SECURITY;
+
+-- Read-only for the owner; written by the triggers below
+CREATE POLICY "Users can view their dashboard agent totals"
+ON ah_dashboard_agent_totals FOR SELECT TO authenticated USING (user_id = auth.uid());
+
+CREATE POLICY "Users can view their dashboard agent daily stats"
+ON ah_dashboard_agent_daily FOR SELECT TO authenticated USING (user_id = auth.uid());
+
+CREATE POLICY "Users can view their dashboard usage totals"
+ON ah_dashboard_usage_totals FOR SELECT TO authenticated USING (user_id = auth.uid());
+
+CREATE POLICY "Users can view their dashboard usage daily stats"
+ON ah_dashboard_usage_daily FOR SELECT TO authenticated USING (user_id = auth.uid());
+
+-- ============================================
+-- Maintenance triggers
+-- ============================================
+
+-- Add (p_sign = 1) or remove (p_sign = -1) conversations, grouped by agent and day
+CREATE OR REPLACE FUNCTION apply_dashboard_conversation_delta(p_rows JSONB, p_sign INTEGER)
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  WITH changed AS (
+    SELECT r.agent_id, a.user_id, (COALESCE(r.started_at, NOW()) AT TIME ZONE 'UTC')::date AS day
+    FROM jsonb_to_recordset(p_rows) AS r(agent_id UUID, started_at TIMESTAMPTZ)
+    JOIN ah_agents a ON a.id = r.agent_id
+  ),
+  daily AS (
+    INSERT INTO ah_dashboard_agent_daily AS d (agent_id, user_id, day, conversations)
+    SELECT agent_id, user_id, day, p_sign * COUNT(*)
+    FROM changed
+    GROUP BY agent_id, user_id, day
+    ON CONFLICT (agent_id, day) DO UPDATE
+    SET conversations = GREATEST(d.conversations + EXCLUDED.conversations, 0)
+  )
+  INSERT INTO ah_dashboard_agent_totals AS t (agent_id, user_id, conversations)
+  SELECT agent_id, user_id, p_sign * COUNT(*)
+  FROM changed
+  GROUP BY agent_id, user_id
+  ON CONFLICT (agent_id) DO UPDATE
+  SET conversations = GREATEST(t.conversations + EXCLUDED.conversations, 0),
+      updated_at = NOW();
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION trigger_dashboard_conversations_inserted()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  PERFORM apply_dashboard_conversation_delta(
+    (SELECT jsonb_agg(jsonb_build_object('agent_id', agent_id, 'started_at', started_at)) FROM new_conversations),
+    1
+  );
+  RETURN NULL;
+END;
+$$;
+
+-- Cascaded deletes of a whole agent find no ah_agents row: its dashboard
+-- rows are removed by their own ON DELETE CASCADE
+CREATE OR REPLACE FUNCTION trigger_dashboard_conversations_deleted()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  PERFORM apply_dashboard_conversation_delta(
+    (SELECT jsonb_agg(jsonb_build_object('agent_id', agent_id, 'started_at', started_at)) FROM old_conversations),
+    -1
+  );
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trigger_dashboard_conversations_inserted ON ah_public_conversations;
+CREATE TRIGGER trigger_dashboard_conversations_inserted
+AFTER INSERT ON ah_public_conversations
+REFERENCING NEW TABLE AS new_conversations
+FOR EACH STATEMENT
+EXECUTE FUNCTION trigger_dashboard_conversations_inserted();
+
+DROP TRIGGER IF EXISTS trigger_dashboard_conversations_deleted ON ah_public_conversations;
+CREATE TRIGGER trigger_dashboard_conversations_deleted
+AFTER DELETE ON ah_public_conversations
+REFERENCING OLD TABLE AS old_conversations
+FOR EACH STATEMENT
+EXECUTE FUNCTION trigger_dashboard_conversations_deleted();
+
+CREATE OR REPLACE FUNCTION trigger_dashboard_usage_inserted()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  INSERT INTO ah_dashboard_usage_daily AS d (user_id, day, messages, credits)
+  SELECT user_id, (COALESCE(created_at, NOW()) AT TIME ZONE 'UTC')::date, COUNT(*), COALESCE(SUM(amount), 0)
+  FROM new_usage
+  GROUP BY 1, 2
+  ON CONFLICT (user_id, day) DO UPDATE
+  SET messages = d.messages + EXCLUDED.messages,
+      credits = d.credits + EXCLUDED.credits;
+
+  INSERT INTO ah_dashboard_usage_totals AS t (user_id, messages, credits)
+  SELECT user_id, COUNT(*), COALESCE(SUM(amount), 0)
+  FROM new_usage
+  GROUP BY user_id
+  ON CONFLICT (user_id) DO UPDATE
+  SET messages = t.messages + EXCLUDED.messages,
+      credits = t.credits + EXCLUDED.credits,
+      updated_at = NOW();
+
+  RETURN NULL;
+END;
+$$;
+
+-- On the partitioned parent (20260123_monthly_partitions): cloned to every partition
+DROP TRIGGER IF EXISTS trigger_dashboard_usage_inserted ON ah_usage_logs;
+CREATE TRIGGER trigger_dashboard_usage_inserted
+AFTER INSERT ON ah_usage_logs
+REFERENCING NEW TABLE AS new_usage
+FOR EACH STATEMENT
+EXECUTE FUNCTION trigger_dashboard_usage_inserted();
+
+-- ============================================
+-- Rebuild (backfill, repair)
+-- ============================================
+
+-- Recompute the counters of one owner, or of everyone when p_user_id is NULL
+CREATE OR REPLACE FUNCTION rebuild_dashboard_stats(p_user_id UUID DEFAULT NULL)
+RETURNS VOID
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  DELETE FROM ah_dashboard_agent_totals WHERE p_user_id IS NULL OR user_id = p_user_id;
+  DELETE FROM ah_dashboard_agent_daily WHERE p_user_id IS NULL OR user_id = p_user_id;
+  DELETE FROM ah_dashboard_usage_totals WHERE p_user_id IS NULL OR user_id = p_user_id;
+  DELETE FROM ah_dashboard_usage_daily WHERE p_user_id IS NULL OR user_id = p_user_id;
+
+  INSERT INTO ah_dashboard_agent_daily (agent_id, user_id, day, conversations)
+  SELECT c.agent_id, a.user_id, (COALESCE(c.started_at, NOW()) AT TIME ZONE 'UTC')::date, COUNT(*)
+  FROM ah_public_conversations c
+  JOIN ah_agents a ON a.id = c.agent_id
+  WHERE p_user_id IS NULL OR a.user_id = p_user_id
+  GROUP BY 1, 2, 3;
+
+  INSERT INTO ah_dashboard_agent_totals (agent_id, user_id, conversations)
+  SELECT agent_id, user_id, SUM(conversations)
+  FROM ah_dashboard_agent_daily
+  WHERE p_user_id IS NULL OR user_id = p_user_id
+  GROUP BY 1, 2;
+
+  INSERT INTO ah_dashboard_usage_daily (user_id, day, messages, credits)
+  SELECT user_id, (COALESCE(created_at, NOW()) AT TIME ZONE 'UTC')::date, COUNT(*), COALESCE(SUM(amount), 0)
+  FROM ah_usage_logs
+  WHERE p_user_id IS NULL OR user_id = p_user_id
+  GROUP BY 1, 2;
+
+  INSERT INTO ah_dashboard_usage_totals (user_id, messages, credits)
+  SELECT user_id, SUM(messages), SUM(credits)
+  FROM ah_dashboard_usage_daily
+  WHERE p_user_id IS NULL OR user_id = p_user_id
+  GROUP BY 1;
+END;
+$$;
+
+SELECT rebuild_dashboard_stats();
+
+-- ============================================
+-- Read
+-- ============================================
+
+-- Everything DashboardPage, StatsCard, UsageChart and the agent cards show
+CREATE OR REPLACE FUNCTION get_dashboard_summary(p_days INTEGER DEFAULT 30)
+RETURNS JSON
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_user_id UUID := auth.uid();
+  v_today DATE := (NOW() AT TIME ZONE 'UTC')::date;
+  v_days INTEGER := LEAST(GREATEST(COALESCE(p_days, 30), 1), 366);
+BEGIN
+  IF v_user_id IS NULL THEN
+    RAISE EXCEPTION 'Not authenticated';
+  END IF;
+
+  RETURN json_build_object(
+    'conversations', json_build_object(
+      'total', (SELECT COALESCE(SUM(conversations), 0) FROM ah_dashboard_agent_totals WHERE user_id = v_user_id),
+      'today', (SELECT COALESCE(SUM(conversations), 0) FROM ah_dashboard_agent_daily WHERE user_id = v_user_id AND day = v_today),
+      'last_7d', (SELECT COALESCE(SUM(conversations), 0) FROM ah_dashboard_agent_daily WHERE user_id = v_user_id AND day > v_today - 7),
+      'last_30d', (SELECT COALESCE(SUM(conversations), 0) FROM ah_dashboard_agent_daily WHERE user_id = v_user_id AND day > v_today - 30)
+    ),
+    'messages', json_build_object(
+      'total', (SELECT COALESCE(SUM(messages), 0) FROM ah_dashboard_usage_totals WHERE user_id = v_user_id),
+      'today', (SELECT COALESCE(SUM(messages), 0) FROM ah_dashboard_usage_daily WHERE user_id = v_user_id AND day = v_today),
+      'last_7d', (SELECT COALESCE(SUM(messages), 0) FROM ah_dashboard_usage_daily WHERE user_id = v_user_id AND day > v_today - 7),
+      'last_30d', (SELECT COALESCE(SUM(messages), 0) FROM ah_dashboard_usage_daily WHERE user_id = v_user_id AND day > v_today - 30)
+    ),
+    'agents', COALESCE(
+      (SELECT json_object_agg(agent_id, conversations) FROM ah_dashboard_agent_totals WHERE user_id = v_user_id),
+      '{}'::json
+    ),
+    -- Oldest first, one entry per day including empty ones
+    'series', (
+      SELECT json_agg(json_build_object(
+        'day', s.day,
+        'conversations', COALESCE(c.conversations, 0),
+        'messages', COALESCE(u.messages, 0),
+        'credits', COALESCE(u.credits, 0)
+      ) ORDER BY s.day)
+      FROM (
+        SELECT (v_today - n) AS day FROM generate_series(0, v_days - 1) n
+      ) s
+      LEFT JOIN (
+        SELECT day, SUM(conversations) AS conversations
+        FROM ah_dashboard_agent_daily
+        WHERE user_id = v_user_id AND day > v_today - v_days
+        GROUP BY day
+      ) c ON c.day = s.day
+      LEFT JOIN ah_dashboard_usage_daily u ON u.user_id = v_user_id AND u.day = s.day
+    ),
+    'fetched_at', NOW()
+  );
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION apply_dashboard_conversation_delta(JSONB, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION rebuild_dashboard_stats(UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION get_dashboard_summary(INTEGER) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION get_dashboard_summary(INTEGER) TO authenticated;
+
+-- Realtime: every counter change touches a totals row of its owner
+DO $$
+DECLARE
+  v_table TEXT;
+BEGIN
+  FOREACH v_table IN ARRAY ARRAY['ah_dashboard_agent_totals', 'ah_dashboard_usage_totals'] LOOP
+    IF NOT EXISTS (
+      SELECT 1 FROM pg_publication_tables
+      WHERE pubname = 'supabase_realtime' AND schemaname = 'public' AND tablename = v_table
+    ) THEN
+      EXECUTE format('ALTER PUBLICATION supabase_realtime ADD TABLE public.%I', v_table);
+    END IF;
+  END LOOP;
+END $$;
+
+COMMENT ON TABLE ah_dashboard_agent_totals IS 'Widget conversations per agent, maintained by trigger (dashboard agent cards)';
+COMMENT ON TABLE ah_dashboard_usage_daily IS 'Usage log entries and credits per owner and UTC day, maintained by trigger';
+COMMENT ON FUNCTION get_dashboard_summary(INTEGER) IS 'Dashboard totals, today/7d/30d counts, per-agent conversations and a daily series for auth.uid()';
+COMMENT ON FUNCTION rebuild_dashboard_stats(UUID) IS 'Recompute dashboard counters from ah_public_conversations and ah_usage_logs';
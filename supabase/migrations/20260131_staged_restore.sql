@@ -0,0 +1,560 @@
+-- Migration: Staged Backup Restore
+-- Description: Restore backups in bounded steps instead of one RPC carrying
+-- the whole file (admin_restore_all_data / user_restore_my_data). The client
+-- streams the backup and uploads each table's rows in small batches
+-- (restore_stage_batch). It then calls restore_apply until it reports done:
+-- each call applies a few thousand rows, one INSERT ... SELECT per batch, in
+-- dependency order.
+--
+-- A job is keyed by the backup file. A restore interrupted while uploading or
+-- applying resumes where it stopped: staged batches are not uploaded again,
+-- and applied batches are not applied again. Rows are upserted on their
+-- primary (or natural) key, so re-applying a batch is harmless.
+
+-- ============================================
+-- TABLES
+-- ============================================
+
+-- What each backup section restores into, and how. Sections are the keys of
+-- backup.tables (admin) or backup.data (user); anything not listed is skipped.
+CREATE TABLE IF NOT EXISTS ah_restore_tables (
+  kind TEXT NOT NULL CHECK (kind IN ('admin', 'user')),
+  section TEXT NOT NULL,
+  table_name TEXT NOT NULL,
+  position INTEGER NOT NULL,
+  -- NULL: primary key
+  conflict_columns TEXT[],
+  -- NULL: every column present in the backup
+  insert_columns TEXT[],
+  -- NULL: every inserted column; '{}': ON CONFLICT DO NOTHING
+  update_columns TEXT[],
+  -- Never overwritten on conflict
+  preserve_columns TEXT[] NOT NULL DEFAULT '{}',
+  -- Merged into every row
+  overrides JSONB NOT NULL DEFAULT '{}'::jsonb,
+  -- User restores: rows must belong to the caller through scope_column
+  scope TEXT CHECK (scope IN ('owner', 'agent', 'conversation', 'public_conversation')),
+  scope_column TEXT,
+  PRIMARY KEY (kind, section)
+);
+
+ALTER TABLE ah_restore_tables ENABLE ROW LEVEL SECURITY;
+
+-- Parents first. Usage logs do not deduct credits while restoring (see the
+-- triggers below); the balance comes from the restored credits rows.
+-- Agents come back as drafts and keep their name/prompt-only update, as the
+-- previous restore did; conversations start at messages_count 0 because the
+-- restored messages count themselves (coalesced stats trigger).
+INSERT INTO ah_restore_tables
+  (kind, section, table_name, position, conflict_columns, insert_columns, update_columns, preserve_columns, overrides, scope, scope_column)
+VALUES
+  ('admin', 'ah_profiles', 'ah_profiles', 10, '{user_id}', NULL, '{full_name,company_name,company_website,phone}', '{}', '{}', NULL, NULL),
+  ('admin', 'user_roles', 'user_roles', 20, '{user_id,role}', NULL, '{}', '{}', '{}', NULL, NULL),
+  ('admin', 'user_settings', 'user_settings', 30, '{user_id}', NULL, NULL, '{id}', '{}', NULL, NULL),
+  ('admin', 'ah_subscriptions', 'ah_subscriptions', 40, NULL, NULL, NULL, '{}', '{}', NULL, NULL),
+  ('admin', 'ah_agents', 'ah_agents', 50, NULL, NULL, '{name,description,personality,system_prompt}', '{}', '{"status": "draft"}', NULL, NULL),
+  ('admin', 'ah_documents', 'ah_documents', 60, NULL, NULL, NULL, '{}', '{}', NULL, NULL),
+  ('admin', 'api_tokens', 'api_tokens', 70, NULL, NULL, NULL, '{}', '{}', NULL, NULL),
+  ('admin', 'ah_conversations', 'ah_conversations', 80, NULL, NULL, NULL, '{}', '{}', NULL, NULL),
+  ('admin', 'ah_messages', 'ah_messages', 90, NULL, NULL, '{}', '{}', '{}', NULL, NULL),
+  ('admin', 'ah_public_conversations', 'ah_public_conversations', 100, NULL, NULL, NULL, '{messages_count,last_message_at}', '{"messages_count": 0}', NULL, NULL),
+  ('admin', 'ah_public_messages', 'ah_public_messages', 110, NULL, NULL, '{}', '{}', '{}', NULL, NULL),
+  ('admin', 'n8n_chat_histories', 'n8n_chat_histories', 120, NULL, NULL, '{}', '{}', '{}', NULL, NULL),
+  ('admin', 'ah_usage_logs', 'ah_usage_logs', 130, NULL, NULL, '{}', '{}', '{}', NULL, NULL),
+  ('admin', 'credit_transactions', 'credit_transactions', 140, NULL, NULL, '{}', '{}', '{}', NULL, NULL),
+  ('admin', 'ah_credits', 'ah_credits', 150, '{user_id}', NULL, '{balance}', '{}', '{}', NULL, NULL),
+  ('admin', 'credits', 'credits', 160, '{user_id}', NULL, '{balance,total_purchased,total_used}', '{}', '{}', NULL, NULL),
+  -- Users restore their own content only: no credits, subscription, usage or tokens
+  ('user', 'profile', 'ah_profiles', 10, '{user_id}', '{user_id,full_name,company_name,company_website,phone}', '{full_name,company_name,company_website,phone}', '{}', '{}', 'owner', 'user_id'),
+  ('user', 'settings', 'user_settings', 20, '{user_id}', '{user_id,email_welcome,email_new_message,email_low_credits,email_marketing,email_weekly_report,low_credits_threshold}', NULL, '{}', '{}', 'owner', 'user_id'),
+  ('user', 'agents', 'ah_agents', 30, NULL, NULL, '{name,description,personality,system_prompt}', '{}', '{"status": "draft"}', 'owner', 'user_id'),
+  ('user', 'documents', 'ah_documents', 40, NULL, NULL, NULL, '{}', '{}', 'agent', 'agent_id'),
+  ('user', 'conversations', 'ah_conversations', 50, NULL, NULL, NULL, '{}', '{}', 'owner', 'user_id'),
+  ('user', 'messages', 'ah_messages', 60, NULL, NULL, '{}', '{}', '{}', 'conversation', 'conversation_id'),
+  ('user', 'public_conversations', 'ah_public_conversations', 70, NULL, NULL, NULL, '{messages_count,last_message_at}', '{"messages_count": 0}', 'agent', 'agent_id'),
+  ('user', 'public_messages', 'ah_public_messages', 80, NULL, NULL, '{}', '{}', '{}', 'public_conversation', 'conversation_id')
+ON CONFLICT (kind, section) DO NOTHING;
+
+-- One restore of one backup file by one user
+CREATE TABLE IF NOT EXISTS ah_restore_jobs (
+  id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+  user_id UUID NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+  kind TEXT NOT NULL CHECK (kind IN ('admin', 'user')),
+  -- name:size:lastModified of the file, to find the job again on resume
+  file_key TEXT NOT NULL,
+  backup_version TEXT,
+  backup_date TIMESTAMPTZ,
+  status TEXT NOT NULL DEFAULT 'staging' CHECK (status IN ('staging', 'applying', 'completed', 'failed')),
+  -- Rows applied per table
+  restored JSONB NOT NULL DEFAULT '{}'::jsonb,
+  error TEXT,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  completed_at TIMESTAMPTZ
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_restore_jobs_open_file
+  ON ah_restore_jobs(user_id, kind, file_key)
+  WHERE status <> 'completed';
+
+-- Uploaded rows waiting to be applied; deleted once the job completes
+CREATE TABLE IF NOT EXISTS ah_restore_batches (
+  job_id UUID NOT NULL REFERENCES ah_restore_jobs(id) ON DELETE CASCADE,
+  section TEXT NOT NULL,
+  seq INTEGER NOT NULL,
+  position INTEGER NOT NULL,
+  rows JSONB NOT NULL,
+  row_count INTEGER NOT NULL,
+  applied_at TIMESTAMPTZ,
+  PRIMARY KEY (job_id, section, seq)
+);
+
+CREATE INDEX IF NOT EXISTS idx_restore_batches_pending
+  ON ah_restore_batches(job_id, position, seq)
+  WHERE applied_at IS NULL;
+
+ALTER TABLE ah_restore_jobs ENABLE ROW LEVEL SECURITY;
+ALTER TABLE ah_restore_batches ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Users can view own restore jobs"
+ON ah_restore_jobs
+FOR SELECT
+TO authenticated
+USING (user_id = auth.uid());
+
+DROP TRIGGER IF EXISTS update_restore_jobs_updated_at ON ah_restore_jobs;
+
+CREATE TRIGGER update_restore_jobs_updated_at
+  BEFORE UPDATE ON ah_restore_jobs
+  FOR EACH ROW
+  EXECUTE FUNCTION update_updated_at_column();
+
+-- Restored rows are history, not events. While applying (app.restoring):
+-- no owner email for restored conversations, no low-credit alert for a
+-- restored balance and no credit deduction for restored usage logs. The
+-- dashboard counters still follow the restored rows.
+DROP TRIGGER IF EXISTS trigger_new_conversation_notification ON ah_public_conversations;
+
+CREATE TRIGGER trigger_new_conversation_notification
+AFTER INSERT ON ah_public_conversations
+FOR EACH ROW
+WHEN (current_setting('app.restoring', true) IS DISTINCT FROM 'on')
+EXECUTE FUNCTION enqueue_new_conversation_notification();
+
+DROP TRIGGER IF EXISTS trigger_low_credits_notification ON ah_credits;
+
+CREATE TRIGGER trigger_low_credits_notification
+BEFORE UPDATE OF balance ON ah_credits
+FOR EACH ROW
+WHEN (NEW.balance IS DISTINCT FROM OLD.balance
+  AND current_setting('app.restoring', true) IS DISTINCT FROM 'on')
+EXECUTE FUNCTION enqueue_low_credits_notification();
+
+DO $$
+BEGIN
+  IF to_regprocedure('public.handle_new_usage_log()') IS NOT NULL THEN
+    DROP TRIGGER IF EXISTS on_usage_log_insert ON ah_usage_logs;
+    CREATE TRIGGER on_usage_log_insert
+    AFTER INSERT ON ah_usage_logs
+    FOR EACH ROW
+    WHEN (current_setting('app.restoring', true) IS DISTINCT FROM 'on')
+    EXECUTE FUNCTION handle_new_usage_log();
+  END IF;
+END $$;
+
+-- ============================================
+-- RPCs
+-- ============================================
+
+-- The caller's job, locked. Admin jobs need the admin role.
+CREATE OR REPLACE FUNCTION get_restore_job(p_job_id UUID)
+RETURNS ah_restore_jobs
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_job ah_restore_jobs;
+BEGIN
+  SELECT * INTO v_job FROM ah_restore_jobs WHERE id = p_job_id FOR UPDATE;
+
+  IF v_job.id IS NULL OR v_job.user_id <> auth.uid() THEN
+    RAISE EXCEPTION 'Restore job not found';
+  END IF;
+  IF v_job.kind = 'admin' AND NOT public.has_role(auth.uid(), 'admin') THEN
+    RAISE EXCEPTION 'Access denied';
+  END IF;
+
+  RETURN v_job;
+END;
+$$;
+
+-- Start a restore, or pick up the unfinished one for the same file.
+-- Returns { job_id, status, resumed, sections: [...], staged: {section: batches} }
+CREATE OR REPLACE FUNCTION restore_begin(p_kind TEXT, p_file_key TEXT)
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_user_id UUID := auth.uid();
+  v_job ah_restore_jobs;
+  v_resumed BOOLEAN := true;
+BEGIN
+  IF v_user_id IS NULL THEN
+    RAISE EXCEPTION 'Not authenticated';
+  END IF;
+  IF p_kind NOT IN ('admin', 'user') THEN
+    RAISE EXCEPTION 'Unknown restore kind %', p_kind;
+  END IF;
+  IF p_kind = 'admin' AND NOT public.has_role(v_user_id, 'admin') THEN
+    RAISE EXCEPTION 'Access denied';
+  END IF;
+
+  SELECT * INTO v_job
+  FROM ah_restore_jobs
+  WHERE user_id = v_user_id AND kind = p_kind AND file_key = p_file_key AND status <> 'completed';
+
+  IF v_job.id IS NULL THEN
+    INSERT INTO ah_restore_jobs (user_id, kind, file_key)
+    VALUES (v_user_id, p_kind, p_file_key)
+    RETURNING * INTO v_job;
+    v_resumed := false;
+  END IF;
+
+  RETURN json_build_object(
+    'job_id', v_job.id,
+    'status', v_job.status,
+    'resumed', v_resumed,
+    'sections', (SELECT json_agg(section ORDER BY position) FROM ah_restore_tables WHERE kind = p_kind),
+    'staged', COALESCE((
+      SELECT json_object_agg(section, batches)
+      FROM (
+        SELECT section, COUNT(*) AS batches
+        FROM ah_restore_batches
+        WHERE job_id = v_job.id
+        GROUP BY section
+      ) s
+    ), '{}'::json)
+  );
+END;
+$$;
+
+-- Upload one batch (at most 1000 rows) of a section. Batches are numbered per
+-- section from 0; uploading one again does nothing.
+CREATE OR REPLACE FUNCTION restore_stage_batch(p_job_id UUID, p_section TEXT, p_seq INTEGER, p_rows JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_job ah_restore_jobs := get_restore_job(p_job_id);
+  v_position INTEGER;
+BEGIN
+  IF v_job.status <> 'staging' THEN
+    RAISE EXCEPTION 'Restore job is not accepting rows (status %)', v_job.status;
+  END IF;
+  IF jsonb_typeof(p_rows) <> 'array' OR jsonb_array_length(p_rows) > 1000 THEN
+    RAISE EXCEPTION 'A batch must be an array of at most 1000 rows';
+  END IF;
+
+  SELECT position INTO v_position
+  FROM ah_restore_tables
+  WHERE kind = v_job.kind AND section = p_section;
+
+  IF v_position IS NULL THEN
+    RAISE EXCEPTION 'Section % cannot be restored', p_section;
+  END IF;
+
+  INSERT INTO ah_restore_batches (job_id, section, seq, position, rows, row_count)
+  VALUES (p_job_id, p_section, p_seq, v_position, p_rows, jsonb_array_length(p_rows))
+  ON CONFLICT (job_id, section, seq) DO NOTHING;
+
+  RETURN jsonb_array_length(p_rows);
+END;
+$$;
+
+-- Every batch is uploaded: check the header and start applying.
+-- Returns { batches, rows, applied_rows }
+CREATE OR REPLACE FUNCTION restore_finish_staging(p_job_id UUID, p_header JSONB)
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_job ah_restore_jobs := get_restore_job(p_job_id);
+BEGIN
+  IF v_job.status = 'staging' THEN
+    IF p_header->>'backup_version' IS NULL THEN
+      RAISE EXCEPTION 'Invalid backup format: missing backup_version';
+    END IF;
+    IF v_job.kind = 'user' AND p_header->>'backup_type' IS DISTINCT FROM 'user' THEN
+      RAISE EXCEPTION 'Invalid backup type. Expected user backup.';
+    END IF;
+
+    UPDATE ah_restore_jobs
+    SET status = 'applying',
+        backup_version = p_header->>'backup_version',
+        backup_date = (p_header->>'backup_date')::timestamptz
+    WHERE id = p_job_id;
+  END IF;
+
+  RETURN (
+    SELECT json_build_object(
+      'batches', COUNT(*),
+      'rows', COALESCE(SUM(row_count), 0),
+      'applied_rows', COALESCE(SUM(row_count) FILTER (WHERE applied_at IS NOT NULL), 0)
+    )
+    FROM ah_restore_batches
+    WHERE job_id = p_job_id
+  );
+END;
+$$;
+
+-- SQL condition tying a row (alias p_alias) to the restoring user ($2)
+CREATE OR REPLACE FUNCTION restore_scope_condition(p_scope TEXT, p_column TEXT, p_alias TEXT)
+RETURNS TEXT
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT CASE p_scope
+    WHEN 'owner' THEN format('%I.%I = $2', p_alias, p_column)
+    WHEN 'agent' THEN format('%I.%I IN (SELECT id FROM ah_agents WHERE user_id = $2)', p_alias, p_column)
+    WHEN 'conversation' THEN format('%I.%I IN (SELECT id FROM ah_conversations WHERE user_id = $2)', p_alias, p_column)
+    WHEN 'public_conversation' THEN format(
+      '%I.%I IN (SELECT c.id FROM ah_public_conversations c JOIN ah_agents a ON a.id = c.agent_id WHERE a.user_id = $2)',
+      p_alias, p_column)
+    ELSE 'true'
+  END;
+$$;
+
+-- Apply one staged batch with a single INSERT ... SELECT. Returns the rows
+-- inserted or updated.
+CREATE OR REPLACE FUNCTION apply_restore_batch(p_job ah_restore_jobs, p_batch ah_restore_batches)
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_cfg ah_restore_tables;
+  v_table REGCLASS;
+  v_rows JSONB;
+  v_keys TEXT[];
+  v_columns TEXT[];
+  v_conflict TEXT[];
+  v_update TEXT[];
+  v_action TEXT;
+  v_count INTEGER;
+BEGIN
+  SELECT * INTO v_cfg FROM ah_restore_tables WHERE kind = p_job.kind AND section = p_batch.section;
+  v_table := format('public.%I', v_cfg.table_name)::regclass;
+
+  IF v_cfg.scope = 'owner' THEN
+    v_cfg.overrides := v_cfg.overrides || jsonb_build_object(v_cfg.scope_column, p_job.user_id);
+  END IF;
+
+  SELECT jsonb_agg(r || v_cfg.overrides) INTO v_rows
+  FROM jsonb_array_elements(p_batch.rows) r
+  WHERE jsonb_typeof(r) = 'object';
+
+  IF v_rows IS NULL THEN
+    RETURN 0;
+  END IF;
+
+  SELECT array_agg(DISTINCT k) INTO v_keys
+  FROM jsonb_array_elements(v_rows) r, jsonb_object_keys(r) k;
+
+  -- Writable columns present in the backup (defaults fill the rest)
+  SELECT array_agg(a.attname::text ORDER BY a.attnum) INTO v_columns
+  FROM pg_attribute a
+  WHERE a.attrelid = v_table
+    AND a.attnum > 0
+    AND NOT a.attisdropped
+    AND a.attgenerated = ''
+    AND a.attidentity <> 'a'
+    AND a.attname::text = ANY(v_keys)
+    AND (v_cfg.insert_columns IS NULL OR a.attname::text = ANY(v_cfg.insert_columns));
+
+  v_conflict := COALESCE(v_cfg.conflict_columns, (
+    SELECT array_agg(a.attname::text ORDER BY array_position(i.indkey::int2[], a.attnum))
+    FROM pg_index i
+    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+    WHERE i.indrelid = v_table AND i.indisprimary
+  ));
+
+  SELECT array_agg(c) INTO v_update
+  FROM unnest(v_columns) c
+  WHERE c <> ALL(v_conflict)
+    AND c <> ALL(v_cfg.preserve_columns)
+    AND (v_cfg.update_columns IS NULL OR c = ANY(v_cfg.update_columns));
+
+  IF v_update IS NULL THEN
+    v_action := 'DO NOTHING';
+  ELSE
+    v_action := format('DO UPDATE SET %s', (
+      SELECT string_agg(format('%1$I = EXCLUDED.%1$I', c), ', ') FROM unnest(v_update) c
+    ));
+    IF p_job.kind = 'user' THEN
+      v_action := v_action || ' WHERE ' || restore_scope_condition(v_cfg.scope, v_cfg.scope_column, 't');
+    END IF;
+  END IF;
+
+  EXECUTE format(
+    'INSERT INTO %1$s AS t (%2$s)
+     SELECT %3$s FROM jsonb_populate_recordset(NULL::%1$s, $1) r
+     WHERE %4$s
+     ON CONFLICT (%5$s) %6$s',
+    v_table,
+    (SELECT string_agg(format('%I', c), ', ') FROM unnest(v_columns) c),
+    (SELECT string_agg(format('r.%I', c), ', ') FROM unnest(v_columns) c),
+    CASE WHEN p_job.kind = 'user' THEN restore_scope_condition(v_cfg.scope, v_cfg.scope_column, 'r') ELSE 'true' END,
+    (SELECT string_agg(format('%I', c), ', ') FROM unnest(v_conflict) c),
+    v_action
+  ) USING v_rows, p_job.user_id;
+
+  GET DIAGNOSTICS v_count = ROW_COUNT;
+  RETURN v_count;
+END;
+$$;
+
+-- Apply pending batches in dependency order until about p_max_rows rows were
+-- processed. Call again while done is false. A failing batch marks the job
+-- failed and is retried by the next call.
+-- Returns { success, done, table, applied_rows, remaining_batches, restored, message? }
+CREATE OR REPLACE FUNCTION restore_apply(p_job_id UUID, p_max_rows INTEGER DEFAULT 5000)
+RETURNS JSON
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_job ah_restore_jobs := get_restore_job(p_job_id);
+  v_batch ah_restore_batches;
+  v_table TEXT;
+  v_rows INTEGER := 0;
+  v_count INTEGER;
+  v_remaining INTEGER;
+  v_seq RECORD;
+BEGIN
+  IF v_job.status = 'staging' THEN
+    RAISE EXCEPTION 'Restore job is still staging';
+  END IF;
+
+  IF v_job.status <> 'completed' THEN
+    PERFORM set_config('app.restoring', 'on', true);
+
+    FOR v_batch IN
+      SELECT * FROM ah_restore_batches
+      WHERE job_id = p_job_id AND applied_at IS NULL
+      ORDER BY position, seq
+    LOOP
+      EXIT WHEN v_rows >= GREATEST(p_max_rows, 1);
+      SELECT table_name INTO v_table FROM ah_restore_tables WHERE kind = v_job.kind AND section = v_batch.section;
+
+      BEGIN
+        v_count := apply_restore_batch(v_job, v_batch);
+      EXCEPTION WHEN OTHERS THEN
+        UPDATE ah_restore_jobs
+        SET status = 'failed', restored = v_job.restored, error = v_table || ': ' || SQLERRM
+        WHERE id = p_job_id;
+        RETURN json_build_object(
+          'success', false,
+          'done', false,
+          'table', v_table,
+          'message', v_table || ': ' || SQLERRM
+        );
+      END;
+
+      UPDATE ah_restore_batches SET applied_at = NOW()
+      WHERE job_id = p_job_id AND section = v_batch.section AND seq = v_batch.seq;
+
+      v_job.restored := jsonb_set(
+        v_job.restored, ARRAY[v_table],
+        to_jsonb(COALESCE((v_job.restored->>v_table)::int, 0) + v_count)
+      );
+      v_rows := v_rows + v_batch.row_count;
+    END LOOP;
+
+    SELECT COUNT(*) INTO v_remaining
+    FROM ah_restore_batches
+    WHERE job_id = p_job_id AND applied_at IS NULL;
+
+    IF v_remaining = 0 THEN
+      -- Serial ids were inserted explicitly: move their sequences past them
+      FOR v_seq IN
+        SELECT DISTINCT t.table_name, a.attname, pg_get_serial_sequence(format('public.%I', t.table_name), a.attname::text) AS seq
+        FROM ah_restore_tables t
+        JOIN pg_attribute a ON a.attrelid = format('public.%I', t.table_name)::regclass
+        WHERE t.kind = v_job.kind AND a.attnum > 0 AND NOT a.attisdropped
+      LOOP
+        CONTINUE WHEN v_seq.seq IS NULL;
+        EXECUTE format('SELECT setval(%L, GREATEST((SELECT MAX(%I) FROM public.%I), 1))',
+          v_seq.seq, v_seq.attname, v_seq.table_name);
+      END LOOP;
+
+      DELETE FROM ah_restore_batches WHERE job_id = p_job_id;
+      UPDATE ah_restore_jobs
+      SET status = 'completed', restored = v_job.restored, error = NULL, completed_at = NOW()
+      WHERE id = p_job_id;
+      v_job.status := 'completed';
+    ELSE
+      UPDATE ah_restore_jobs
+      SET status = 'applying', restored = v_job.restored, error = NULL
+      WHERE id = p_job_id;
+    END IF;
+  END IF;
+
+  RETURN json_build_object(
+    'success', true,
+    'done', v_job.status = 'completed',
+    'table', v_table,
+    'applied_rows', v_rows,
+    'remaining_batches', COALESCE(v_remaining, 0),
+    'restored', v_job.restored
+  );
+END;
+$$;
+
+-- Abandoned jobs keep their staged rows; drop them after a week
+CREATE OR REPLACE FUNCTION purge_restore_jobs(p_older_than INTERVAL DEFAULT INTERVAL '7 days')
+RETURNS INTEGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_count INTEGER;
+BEGIN
+  DELETE FROM ah_restore_jobs WHERE updated_at < NOW() - p_older_than;
+  GET DIAGNOSTICS v_count = ROW_COUNT;
+  RETURN v_count;
+END;
+$$;
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+    PERFORM cron.schedule('purge-restore-jobs', '30 3 * * *', 'SELECT purge_restore_jobs()');
+  END IF;
+END $$;
+
+REVOKE EXECUTE ON FUNCTION get_restore_job(UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION apply_restore_batch(ah_restore_jobs, ah_restore_batches) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION purge_restore_jobs(INTERVAL) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION restore_begin(TEXT, TEXT) FROM PUBLIC, anon;
+REVOKE EXECUTE ON FUNCTION restore_stage_batch(UUID, TEXT, INTEGER, JSONB) FROM PUBLIC, anon;
+REVOKE EXECUTE ON FUNCTION restore_finish_staging(UUID, JSONB) FROM PUBLIC, anon;
+REVOKE EXECUTE ON FUNCTION restore_apply(UUID, INTEGER) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION restore_begin(TEXT, TEXT) TO authenticated;
+GRANT EXECUTE ON FUNCTION restore_stage_batch(UUID, TEXT, INTEGER, JSONB) TO authenticated;
+GRANT EXECUTE ON FUNCTION restore_finish_staging(UUID, JSONB) TO authenticated;
+GRANT EXECUTE ON FUNCTION restore_apply(UUID, INTEGER) TO authenticated;
+
+COMMENT ON TABLE ah_restore_tables IS 'Backup sections restorable by restore_apply, in dependency order (position)';
+COMMENT ON TABLE ah_restore_jobs IS 'Staged backup restores, one per user and backup file; resumable until completed';
+COMMENT ON TABLE ah_restore_batches IS 'Uploaded backup rows waiting for restore_apply';
+COMMENT ON FUNCTION restore_apply(UUID, INTEGER) IS 'Apply up to p_max_rows staged rows of a restore job with bulk upserts';
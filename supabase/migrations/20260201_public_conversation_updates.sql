@@ -0,0 +1,29 @@
+-- Migration: Owner-only Conversation Updates
+-- Description: Only the owner of the agent changes a widget conversation
+-- (status: human_takeover, resolved). Until now "Public can update their
+-- conversations" (20260113) and "Public can update conversations"
+-- (MASTER_FIX_ALL.sql) let anyone holding the anon key rewrite any
+-- conversation, and owners only got their updates through them.
+--
+-- The widget keeps inserting conversations and messages and reading them
+-- ("Public can view conversations" / "Public can view messages"): it looks up
+-- the visitor's conversation with the shared client, signed in or not.
+
+DROP POLICY IF EXISTS "Public can update their conversations" ON ah_public_conversations;
+DROP POLICY IF EXISTS "Public can update conversations" ON ah_public_conversations;
+
+DROP POLICY IF EXISTS "Users can update conversations for their agents" ON ah_public_conversations;
+CREATE POLICY "Users can update conversations for their agents"
+ON ah_public_conversations
+FOR UPDATE
+TO authenticated
+USING (
+  agent_id IN (
+    SELECT id FROM ah_agents WHERE user_id = auth.uid()
+  )
+)
+WITH CHECK (
+  agent_id IN (
+    SELECT id FROM ah_agents WHERE user_id = auth.uid()
+  )
+);
@@ -0,0 +1,40 @@
+"""
+Runner and tooling around the TestSprite scenarios (TC0xx_*.py).
+
+The TC scripts stay standalone (each one runs itself with asyncio.run); the
+harness decides which of them to run, runs them in parallel subprocesses and
+keeps their results (statuses, steps, console signatures, page metrics) in
+tmp/results.sqlite.
+
+Scenarios run against the production build of the tree, served locally under
+/agentes/ (harness.preview); --dev tests the Vite dev server on :8080 instead.
+
+Run from testsprite_tests/:
+    python -m harness run                   # scenarios affected by the diff
+    python -m harness run --since main -j 4
+    python -m harness run --all
+    python -m harness run --dev             # against `npm run dev`
+    python -m harness build | serve         # the cached production build
+    python -m harness run --no-budgets      # do not fail on request budgets
+    python -m harness run --profile mobile-3g
+    python -m harness perf --agent <agent id> --profile desktop --profile mobile-3g
+    python -m harness plan --since main     # selection and schedule only
+    python -m harness soak --agent <agent id> --hours 4
+    python -m harness takeover --agent <agent id> --visitors 4
+    python -m harness api -k rls            # REST/RLS contracts, no browser
+    python -m harness history flaky --last 20
+    python -m harness history durations|steps|console|metrics --last 20
+    python -m harness import tmp/test_results.json
+"""
+
+from pathlib import Path
+
+TESTS_DIR = Path(__file__).resolve().parent.parent
+TMP_DIR = TESTS_DIR / "tmp"
+REPO_ROOT = TESTS_DIR.parent
+
+# Environment variables read by harness.instrument: where to write its report,
+# the budgets file to enforce ("off" to only observe) and the device profile
+REPORT_ENV = "HARNESS_REPORT"
+BUDGETS_ENV = "HARNESS_BUDGETS"
+PROFILE_ENV = "HARNESS_PROFILE"
@@ -0,0 +1,294 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+from . import BUDGETS_ENV, PROFILE_ENV, flows, history, preview, selection, store
+from .budgets import BUDGETS_FILE
+from .preview import app_server
+from .profiles import PROFILES
+
+
+def build_plan(args):
+    scenarios = selection.discover()
+    if args.all:
+        picked = selection.Selection(sorted(scenarios), full=True, full_reason="--all")
+    else:
+        picked = selection.select_since(args.since, scenarios)
+    durations = selection.load_durations()
+    order = selection.schedule(picked.tests, durations)
+    expected = selection.estimates(order, durations)
+    return scenarios, picked, order, expected
+
+
+def print_plan(picked, order, expected, workers):
+    if picked.full:
+        print(f"Full suite ({picked.full_reason})")
+    elif not order:
+        print("No scenario affected by the changes")
+        return
+    for test_id in order:
+        why = ", ".join(picked.reasons.get(test_id, []))
+        print(f"  {test_id}  ~{expected[test_id]:5.0f}s  {why}")
+    total = sum(expected.values())
+    print(f"{len(order)} scenarios, ~{total:.0f}s serial, "
+          f"~{selection.makespan(order, expected, workers):.0f}s on {workers} workers")
+
+
+def cmd_plan(args):
+    _, picked, order, expected = build_plan(args)
+    print_plan(picked, order, expected, args.workers)
+    return 0
+
+
+def cmd_run(args):
+    from .runner import run_suite
+
+    scenarios, picked, order, expected = build_plan(args)
+    print_plan(picked, order, expected, args.workers)
+    if not order:
+        return 0
+
+    env = {BUDGETS_ENV: "off" if args.no_budgets else args.budgets}
+    if args.profile:
+        env[PROFILE_ENV] = args.profile
+    start = time.monotonic()
+    with app_server(args.dev) as (_, build):
+        results = asyncio.run(run_suite(order, scenarios, args.workers, args.timeout, env))
+    with store.open_db() as db:
+        run_id = store.start_run(db, base_ref=None if args.all else args.since, workers=args.workers,
+                                 full_suite=picked.full, profile=args.profile, build=build)
+        for r in results:
+            store.record_result(
+                db, run_id, r.test_id, r.status, r.duration * 1000,
+                error=r.report.get("error") or (r.output if r.status != "passed" else None),
+                steps=r.report.get("steps", ()),
+                console=r.report.get("console", ()),
+                metrics=r.report.get("metrics"),
+            )
+
+    failed = [r for r in results if r.status != "passed"]
+    for result in failed:
+        print(f"\n--- {result.test_id} ({result.status}) ---\n{result.output}")
+    print(f"\n{len(results) - len(failed)} passed, {len(failed)} failed "
+          f"in {time.monotonic() - start:.0f}s (run {run_id})")
+    return 1 if failed else 0
+
+
+def cmd_soak(args):
+    if not args.agent:
+        print(f"An agent id is needed for the widget: --agent or {flows.AGENT_ENV}", file=sys.stderr)
+        return 2
+    from . import soak
+
+    limits = dict(soak.SLOPE_LIMITS)
+    for item in args.max_slope:
+        name, _, value = item.partition("=")
+        limits[name] = float(value)
+
+    start = time.monotonic()
+    with app_server(args.dev) as (_, build):
+        watched, failures = asyncio.run(soak.run_soak(
+            args.agent, args.hours, args.interval, args.warmup * 60, args.message_every, limits,
+            headless=not args.headed,
+        ))
+    run_id = soak.record(watched, failures, args.warmup * 60, time.monotonic() - start, build)
+
+    print()
+    for w in watched:
+        trend = soak.slopes(w.samples, args.warmup * 60)
+        print(f"{w.label:13} " + "  ".join(f"{name} {slope:+.2f}/h" for name, slope in trend.items()))
+    failed = {label: grown for label, grown in failures.items() if grown}
+    for label, grown in failed.items():
+        print(f"FAIL {label}: " + ", ".join(
+            f"{name} +{slope:.2f}/h (limit {limits[name]})" for name, slope in grown.items()
+        ))
+    print(f"Soak run {run_id}: {'failed' if failed else 'passed'}")
+    return 1 if failed else 0
+
+
+def cmd_perf(args):
+    from . import perf
+
+    profiles = [PROFILES[name] for name in args.profile or ["desktop", "mobile-4g", "mobile-3g"]]
+    with app_server(args.dev) as (_, build):
+        results, seconds = asyncio.run(perf.run_perf(args.agent, profiles, args.repeat, headless=not args.headed))
+    perf.record(results, seconds, build)
+    history.print_table([
+        {"scenario": scenario, "profile": profile, **{
+            name: round(value) for name, value in perf.medians(runs).items()
+        }}
+        for (scenario, profile), runs in results.items()
+    ])
+    return 0
+
+
+def cmd_takeover(args):
+    if not args.agent:
+        print(f"An agent id is needed for the widget: --agent or {flows.AGENT_ENV}", file=sys.stderr)
+        return 2
+    from . import takeover
+
+    with app_server(args.dev) as (_, build):
+        timings = asyncio.run(takeover.run_takeover(args.agent, args.visitors, args.exchanges,
+                                                    headless=not args.headed))
+    rows = takeover.summary(timings)
+    run_id = takeover.record(timings, rows, build)
+    history.print_table([{key: round(v) if isinstance(v, float) else v for key, v in row.items()}
+                         for row in rows])
+    for error in timings.errors:
+        print(f"FAIL {error}")
+    print(f"Takeover run {run_id}: {'failed' if timings.errors else 'passed'}")
+    return 1 if timings.errors else 0
+
+
+def cmd_api(args):
+    from .contracts import run_contracts
+
+    setup_ms, results = asyncio.run(run_contracts(args.k))
+    with store.open_db() as db:
+        run_id = store.start_run(db, source="api")
+        for r in results:
+            store.record_result(db, run_id, f"API-{r.name}", r.status, r.duration_ms, error=r.error)
+
+    print(f"fixtures  {setup_ms:7.0f} ms")
+    for r in results:
+        covers = f" ({r.covers})" if r.covers else ""
+        print(f"{r.status.upper():8}  {r.duration_ms:7.0f} ms  {r.name}{covers}")
+        if r.error:
+            print(f"          {r.error}")
+    known = sum(r.status == "known" for r in results)
+    failed = sum(r.status == "failed" for r in results)
+    print(f"\n{len(results) - failed - known} passed, {known} known, {failed} failed (run {run_id})")
+    return 1 if failed else 0
+
+
+def cmd_build(args):
+    root, cached = preview.ensure_build()
+    print(f"{root} ({'cached' if cached else 'built'})")
+    return 0
+
+
+def cmd_serve(args):
+    root, _ = preview.ensure_build()
+    with preview.serve(root, args.port) as base_url:
+        print(f"Serving {root.name} at {base_url}/ (Ctrl+C to stop)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+def cmd_history(args):
+    with store.open_db() as db:
+        if args.report == "flaky":
+            rows = history.flakiness(db, args.last)
+        elif args.report == "durations":
+            rows = history.duration_trends(db, args.last)
+        elif args.report == "steps":
+            rows = history.slowest_steps(db, args.last, args.limit)
+        elif args.report == "metrics":
+            rows = history.metric_trends(db, args.last, args.profile)
+        else:
+            rows = history.console_signatures(db, args.last, args.limit)
+    history.print_table(rows)
+    return 0
+
+
+def cmd_import(args):
+    with open(args.file, encoding="utf-8") as f:
+        results = json.load(f)
+    with store.open_db() as db:
+        run_id = store.import_testsprite(db, results)
+    print(f"Imported {len(results)} results as run {run_id}")
+    return 0
+
+
+DEV_HELP = "test the Vite dev server already running on :8080 instead of the production build"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m harness")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, handler, help_text in (
+        ("run", cmd_run, "run the affected scenarios"),
+        ("plan", cmd_plan, "print the selection and schedule without running"),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--since", default="main", help="base ref for the diff (default: main)")
+        command.add_argument("--all", action="store_true", help="run every scenario")
+        command.add_argument("-j", "--workers", type=int, default=2)
+        command.add_argument("--timeout", type=float, default=600, help="seconds per scenario")
+        command.set_defaults(handler=handler)
+    run = commands.choices["run"]
+    run.add_argument("--budgets", default=str(BUDGETS_FILE), help="request budgets file")
+    run.add_argument("--no-budgets", action="store_true", help="record traffic without failing on budgets")
+    run.add_argument("--profile", choices=sorted(PROFILES), help="device profile for every scenario")
+    run.add_argument("--dev", action="store_true", help=DEV_HELP)
+
+    command = commands.add_parser("soak", help="keep dashboard and widget open and watch for leaks")
+    command.add_argument("--agent", default=os.environ.get(flows.AGENT_ENV), help="agent id for the widget")
+    command.add_argument("--hours", type=float, default=4)
+    command.add_argument("--interval", type=float, default=60, help="seconds between samples (default: 60)")
+    command.add_argument("--warmup", type=float, default=10, help="minutes left out of the slopes (default: 10)")
+    command.add_argument("--message-every", type=float, default=90, help="seconds between visitor messages")
+    command.add_argument("--max-slope", action="append", default=[], metavar="METRIC=PER_HOUR",
+                         help="override a growth limit, e.g. heap_mb=5")
+    command.add_argument("--headed", action="store_true")
+    command.add_argument("--dev", action="store_true", help=DEV_HELP)
+    command.set_defaults(handler=cmd_soak)
+
+    command = commands.add_parser("perf", help="widget and dashboard timings per device profile")
+    command.add_argument("--agent", default=os.environ.get(flows.AGENT_ENV),
+                         help="agent id for the widget (dashboard only without it)")
+    command.add_argument("--profile", action="append", choices=sorted(PROFILES),
+                         help="repeatable (default: desktop, mobile-4g, mobile-3g)")
+    command.add_argument("--repeat", type=int, default=3)
+    command.add_argument("--headed", action="store_true")
+    command.add_argument("--dev", action="store_true", help=DEV_HELP)
+    command.set_defaults(handler=cmd_perf)
+
+    command = commands.add_parser("takeover", help="operator/visitor takeover latency, several visitors at once")
+    command.add_argument("--agent", default=os.environ.get(flows.AGENT_ENV), help="agent id for the widget")
+    command.add_argument("--visitors", type=int, default=4)
+    command.add_argument("--exchanges", type=int, default=3, help="messages each way per conversation")
+    command.add_argument("--headed", action="store_true")
+    command.add_argument("--dev", action="store_true", help=DEV_HELP)
+    command.set_defaults(handler=cmd_takeover)
+
+    command = commands.add_parser("build", help="production build of this tree (cached by content hash)")
+    command.set_defaults(handler=cmd_build)
+
+    command = commands.add_parser("serve", help="serve the production build like the suite does")
+    command.add_argument("--port", type=int, default=preview.PORT)
+    command.set_defaults(handler=cmd_serve)
+
+    command = commands.add_parser("api", help="data contracts against Supabase REST, without a browser")
+    command.add_argument("-k", help="only contracts whose name contains this")
+    command.set_defaults(handler=cmd_api)
+
+    command = commands.add_parser("history", help="trends over the stored runs")
+    command.add_argument("report", choices=["flaky", "durations", "steps", "console", "metrics"])
+    command.add_argument("--last", type=int, default=20, help="runs to include (default: 20)")
+    command.add_argument("--limit", type=int, default=20, help="rows for steps/console (default: 20)")
+    command.add_argument("--profile", help="only runs with this device profile (metrics)")
+    command.set_defaults(handler=cmd_history)
+
+    command = commands.add_parser("import", help="store a TestSprite test_results.json as a run")
+    command.add_argument("file")
+    command.set_defaults(handler=cmd_import)
+
+    args = parser.parse_args(argv)
+    try:
+        return args.handler(args)
+    except preview.BuildError as err:
+        print(err, file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+"""
+Supabase REST and RPC client for the API-level scenarios (harness.contracts).
+
+One httpx.AsyncClient (keep-alive pool) serves every session; a session is
+only the bearer token requests go out with: the anon key for the public
+widget, or the operator's JWT after a password sign-in. The URL and anon
+key come from the environment or the repo's .env (the VITE_ variables the
+app is built with).
+"""
+
+import os
+
+import httpx
+
+from . import REPO_ROOT
+from .flows import credentials
+
+MAX_CONNECTIONS = 20
+TIMEOUT_S = 15
+
+
+def load_env(path=REPO_ROOT / ".env"):
+    values = {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                key, sep, value = line.strip().partition("=")
+                if sep and not key.startswith("#"):
+                    values[key.strip()] = value.strip().strip("'\"")
+    except FileNotFoundError:
+        pass
+    values.update(os.environ)
+    return values
+
+
+class ApiError(AssertionError):
+    def __init__(self, response):
+        super().__init__(f"{response.request.method} {response.request.url.path} -> "
+                         f"{response.status_code}: {response.text[:300]}")
+        self.response = response
+
+
+class Supabase:
+    def __init__(self, url=None, anon_key=None):
+        env = load_env()
+        self.url = (url or env["VITE_SUPABASE_URL"]).rstrip("/")
+        self.anon_key = anon_key or env.get("VITE_SUPABASE_PUBLISHABLE_KEY") or env["VITE_SUPABASE_ANON_KEY"]
+        self.http = httpx.AsyncClient(
+            base_url=self.url,
+            headers={"apikey": self.anon_key},
+            timeout=TIMEOUT_S,
+            limits=httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.http.aclose()
+
+    def anon(self):
+        return Session(self, self.anon_key)
+
+    async def sign_in(self, email=None, password=None):
+        if email is None:
+            email, password = credentials()
+        response = await self.http.post(
+            "/auth/v1/token", params={"grant_type": "password"},
+            json={"email": email, "password": password},
+        )
+        if response.is_error:
+            raise ApiError(response)
+        body = response.json()
+        return Session(self, body["access_token"], body["user"]["id"])
+
+
+class Session:
+    """Requests as one role: anon, or a signed-in user"""
+
+    def __init__(self, supabase, token, user_id=None):
+        self.http = supabase.http
+        self.user_id = user_id
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    async def _send(self, method, path, *, params=None, json=None, prefer=None, check=True):
+        headers = dict(self.headers)
+        if prefer:
+            headers["Prefer"] = prefer
+        response = await self.http.request(method, path, params=params, json=json, headers=headers)
+        if check and response.is_error:
+            raise ApiError(response)
+        return response
+
+    async def select(self, table, count=False, **params):
+        """Rows matching PostgREST params (select=, order=, limit=, col=eq.x);
+        with count=True also the total from Content-Range"""
+        response = await self._send("GET", f"/rest/v1/{table}", params=params,
+                                    prefer="count=exact" if count else None)
+        if not count:
+            return response.json()
+        total = response.headers.get("content-range", "*/0").rsplit("/", 1)[1]
+        return response.json(), int(total) if total != "*" else None
+
+    async def insert(self, table, rows, returning=True):
+        response = await self._send("POST", f"/rest/v1/{table}", json=rows,
+                                    prefer="return=representation" if returning else "return=minimal")
+        return response.json() if returning else None
+
+    async def update(self, table, values, **filters):
+        """Rows changed (as visible to this role after the update)"""
+        response = await self._send("PATCH", f"/rest/v1/{table}", params=filters, json=values,
+                                    prefer="return=representation")
+        return response.json()
+
+    async def delete(self, table, **filters):
+        response = await self._send("DELETE", f"/rest/v1/{table}", params=filters,
+                                    prefer="return=representation")
+        return response.json()
+
+    async def rpc(self, function, **args):
+        response = await self._send("POST", f"/rest/v1/rpc/{function}", json=args)
+        return response.json() if response.content else None
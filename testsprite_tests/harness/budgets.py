@@ -0,0 +1,212 @@
+"""
+Backend request budgets per page (testsprite_tests/budgets.json).
+
+Every request a scenario sends to Supabase or n8n (the "backends" URL
+patterns) is counted against the page that was showing when it was sent. A
+page visit starts whenever the route of a tab changes, and lasts until the
+next change. The route (without the /agentes base of the production build)
+is matched against the "pages" patterns in order, falling back to
+"default"; the keys a page sets override the default ones:
+
+    max_requests   requests in one visit
+    max_kb         response and request bytes in one visit
+    max_in_flight  requests pending at the same time
+    polling        at most max_per_endpoint requests to one endpoint
+                   (method and path) in any window_ms window
+
+A visit over budget fails the scenario, with its traffic broken down by
+endpoint and query shape (ids replaced), which is where an N+1 shows up as
+one endpoint with many near-identical queries.
+"""
+
+import asyncio
+import json
+import re
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from urllib.parse import urlsplit
+
+from . import TESTS_DIR
+from .preview import BASE_PATH
+
+BUDGETS_FILE = TESTS_DIR / "budgets.json"
+
+# Endpoints and query shapes listed per violated visit
+BREAKDOWN_ROWS = 8
+
+_IDS = [
+    (re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.I), "<uuid>"),
+    (re.compile(r"\d{4}-\d{2}-\d{2}T[\d:.%A-F]+Z?"), "<time>"),
+    (re.compile(r"(?<==)(eq|gt|gte|lt|lte|neq)\.\d+"), r"\1.<n>"),
+]
+
+
+def load_budgets(path=BUDGETS_FILE):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def query_shape(query):
+    for pattern, replacement in _IDS:
+        query = pattern.sub(replacement, query)
+    return query
+
+
+@dataclass
+class Visit:
+    route: str
+    budget: dict
+    requests: list = field(default_factory=list)  # (ms since start, endpoint, query)
+    bytes: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+
+
+class TrafficMonitor:
+    """Attributes backend requests to page visits while a scenario runs"""
+
+    def __init__(self, budgets):
+        self.budgets = budgets
+        self.visits = []
+        self._current = {}  # page -> Visit
+        self._pending = {}  # request -> Visit
+        self._sizes = set()
+        self._start = time.perf_counter()
+
+    def watch(self, context):
+        context.on("request", self._on_request)
+        context.on("requestfinished", lambda request: self._on_done(request, finished=True))
+        context.on("requestfailed", lambda request: self._on_done(request, finished=False))
+
+    def _backend(self, url):
+        return any(
+            fnmatch(url, pattern)
+            for patterns in self.budgets["backends"].values()
+            for pattern in patterns
+        )
+
+    def budget_for(self, route):
+        budget = dict(self.budgets["default"])
+        for pattern, overrides in self.budgets.get("pages", {}).items():
+            if fnmatch(route, pattern):
+                budget.update(overrides)
+                break
+        return budget
+
+    def _visit(self, page):
+        route = urlsplit(page.url).path or "/"
+        if route.startswith(BASE_PATH):  # production build under /agentes/
+            route = route[len(BASE_PATH) - 1:]
+        visit = self._current.get(page)
+        if visit is None or visit.route != route:
+            visit = Visit(route, self.budget_for(route))
+            self._current[page] = visit
+            self.visits.append(visit)
+        return visit
+
+    def _on_request(self, request):
+        if not self._backend(request.url):
+            return
+        try:
+            page = request.frame.page
+        except Exception:  # service worker requests have no frame
+            return
+        visit = self._visit(page)
+        url = urlsplit(request.url)
+        visit.requests.append((
+            (time.perf_counter() - self._start) * 1000,
+            f"{request.method} {url.path}",
+            query_shape(url.query),
+        ))
+        visit.in_flight += 1
+        visit.max_in_flight = max(visit.max_in_flight, visit.in_flight)
+        self._pending[request] = visit
+
+    def _on_done(self, request, finished):
+        visit = self._pending.pop(request, None)
+        if visit is None:
+            return
+        visit.in_flight -= 1
+        if finished:
+            task = asyncio.ensure_future(self._add_size(visit, request))
+            self._sizes.add(task)
+            task.add_done_callback(self._sizes.discard)
+
+    async def _add_size(self, visit, request):
+        try:
+            sizes = await request.sizes()
+        except Exception:  # the context closed first
+            return
+        visit.bytes += sum(sizes.get(key, 0) for key in (
+            "requestHeadersSize", "requestBodySize", "responseHeadersSize", "responseBodySize",
+        ))
+
+    async def settle(self):
+        """Wait for the byte counts; call before the context closes"""
+        if self._sizes:
+            await asyncio.gather(*self._sizes, return_exceptions=True)
+
+    def totals(self):
+        return {
+            "backend_requests": sum(len(v.requests) for v in self.visits),
+            "backend_kb": sum(v.bytes for v in self.visits) / 1024,
+            "backend_max_in_flight": max((v.max_in_flight for v in self.visits), default=0),
+        }
+
+    def violations(self):
+        return [message for visit in self.visits for message in _check(visit)]
+
+
+def _max_in_window(times, window_ms):
+    window = deque()
+    peak = 0
+    for at in times:
+        window.append(at)
+        while at - window[0] > window_ms:
+            window.popleft()
+        peak = max(peak, len(window))
+    return peak
+
+
+def _check(visit):
+    budget = visit.budget
+    problems = []
+    if len(visit.requests) > budget["max_requests"]:
+        problems.append(f"{len(visit.requests)} requests > {budget['max_requests']}")
+    if visit.bytes > budget["max_kb"] * 1024:
+        problems.append(f"{visit.bytes / 1024:.0f} KB > {budget['max_kb']} KB")
+    if visit.max_in_flight > budget["max_in_flight"]:
+        problems.append(f"{visit.max_in_flight} in flight > {budget['max_in_flight']}")
+
+    polling = budget.get("polling")
+    if polling:
+        times = {}
+        for at, endpoint, _ in visit.requests:
+            times.setdefault(endpoint, []).append(at)
+        for endpoint, endpoint_times in sorted(times.items()):
+            peak = _max_in_window(endpoint_times, polling["window_ms"])
+            if peak > polling["max_per_endpoint"]:
+                problems.append(
+                    f"{endpoint}: {peak} requests in {polling['window_ms'] / 1000:.0f}s"
+                    f" > {polling['max_per_endpoint']}"
+                )
+
+    if not problems:
+        return []
+    return [f"Budget exceeded on {visit.route}: " + "; ".join(problems) + "\n" + breakdown(visit)]
+
+
+def breakdown(visit):
+    endpoints = Counter(endpoint for _, endpoint, _ in visit.requests)
+    shapes = Counter((endpoint, query) for _, endpoint, query in visit.requests)
+    lines = []
+    for endpoint, count in endpoints.most_common(BREAKDOWN_ROWS):
+        lines.append(f"  {count:5}  {endpoint}")
+        endpoint_shapes = [(query, n) for (e, query), n in shapes.most_common() if e == endpoint]
+        for query, n in endpoint_shapes[:3]:
+            lines.append(f"  {n:9}  ?{query}" if query else f"  {n:9}  (no query)")
+        if len(endpoint_shapes) > 3:
+            lines.append(f"  {'':9}  ... {len(endpoint_shapes) - 3} more query shapes")
+    return "\n".join(lines)
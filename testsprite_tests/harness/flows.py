@@ -0,0 +1,59 @@
+"""
+Page flows shared by the harness modes that drive the app themselves (soak,
+profiles, takeover) instead of running a TC script. Selectors are the form
+ids, placeholders and aria-labels of LoginPage and ChatWidget; the TC
+scripts' absolute xpaths break with any layout change.
+"""
+
+import json
+import os
+
+from . import TMP_DIR
+
+CONFIG_FILE = TMP_DIR / "config.json"
+BASE_URL_ENV = "HARNESS_BASE_URL"
+AGENT_ENV = "HARNESS_AGENT_ID"
+
+
+def load_config():
+    with open(CONFIG_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def base_url():
+    return os.environ.get(BASE_URL_ENV) or load_config()["localEndpoint"].rstrip("/")
+
+
+def credentials():
+    config = load_config()
+    return config["loginUser"], config["loginPassword"]
+
+
+async def login(page, timeout=15000):
+    """Sign in as the configured operator; ends on /dashboard"""
+    email, password = credentials()
+    await page.goto(f"{base_url()}/login")
+    await page.fill("#email", email)
+    await page.fill("#password", password)
+    await page.click("button[type=submit]")
+    await page.wait_for_url("**/dashboard", timeout=timeout)
+
+
+async def open_widget(page, agent_id, visitor_name="Visitante", visitor_email="visitante@example.com"):
+    """Open the public widget and get past the pre-chat form if it shows"""
+    await page.goto(f"{base_url()}/widget/{agent_id}")
+    await page.click("[aria-label='Open chat']")
+    name = page.get_by_placeholder("Tu nombre")
+    message = page.get_by_placeholder("Escribe tu mensaje...")
+    await name.or_(message).first.wait_for()
+    if await name.is_visible():
+        await name.fill(visitor_name)
+        await page.get_by_placeholder("tu@email.com").fill(visitor_email)
+        await page.get_by_role("button", name="Iniciar Chat").click()
+    await message.wait_for()
+
+
+async def send_widget_message(page, text):
+    box = page.get_by_placeholder("Escribe tu mensaje...")
+    await box.fill(text)
+    await box.press("Enter")
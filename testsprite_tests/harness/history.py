@@ -0,0 +1,154 @@
+"""
+Trend queries over the results store, across the last N runs. Every
+duration is reported in milliseconds.
+"""
+
+import statistics
+
+from . import store
+
+
+def _in_runs(run_ids):
+    return ",".join("?" * len(run_ids))
+
+
+def flakiness(db, last):
+    """Per scenario: runs, failures and flips (status changes between
+    consecutive runs of the scenario) as rates"""
+    run_ids = store.last_runs(db, last)
+    if not run_ids:
+        return []
+    statuses = {}
+    for row in db.execute(
+        f"SELECT test_id, status FROM results WHERE run_id IN ({_in_runs(run_ids)}) ORDER BY test_id, run_id",
+        run_ids,
+    ):
+        statuses.setdefault(row["test_id"], []).append(row["status"])
+
+    rows = []
+    for test_id, history in statuses.items():
+        failures = sum(status != "passed" for status in history)
+        flips = sum(a != b for a, b in zip(history, history[1:]))
+        rows.append({
+            "test": test_id,
+            "runs": len(history),
+            "fail_rate": failures / len(history),
+            "flip_rate": flips / (len(history) - 1) if len(history) > 1 else 0.0,
+            "recent": "".join("." if status == "passed" else "F" for status in history[-20:]),
+        })
+    return sorted(rows, key=lambda r: (-r["flip_rate"], -r["fail_rate"], r["test"]))
+
+
+def duration_trends(db, last):
+    """Per scenario: median, p90 and latest duration, and the change of the
+    newer half of the runs against the older half"""
+    run_ids = store.last_runs(db, last)
+    if not run_ids:
+        return []
+    durations = {}
+    for row in db.execute(
+        f"SELECT test_id, duration_ms FROM results WHERE run_id IN ({_in_runs(run_ids)}) ORDER BY test_id, run_id",
+        run_ids,
+    ):
+        durations.setdefault(row["test_id"], []).append(row["duration_ms"])
+
+    rows = []
+    for test_id, values in durations.items():
+        half = len(values) // 2
+        older, newer = values[:half], values[half:]
+        trend = (statistics.median(newer) / statistics.median(older) - 1) if older else None
+        rows.append({
+            "test": test_id,
+            "runs": len(values),
+            "median_ms": round(statistics.median(values)),
+            "p90_ms": round(statistics.quantiles(values, n=10)[-1]) if len(values) > 1 else values[0],
+            "last_ms": values[-1],
+            "trend": trend,
+        })
+    return sorted(rows, key=lambda r: -r["median_ms"])
+
+
+def slowest_steps(db, last, limit):
+    run_ids = store.last_runs(db, last)
+    if not run_ids:
+        return []
+    return [dict(row) for row in db.execute(
+        f"""
+        SELECT test_id AS test, seq, action, target, COUNT(*) AS runs,
+               CAST(AVG(duration_ms) AS INTEGER) AS avg_ms, MAX(duration_ms) AS max_ms,
+               SUM(ok = 0) AS failed
+        FROM steps WHERE run_id IN ({_in_runs(run_ids)})
+        GROUP BY test_id, seq, action, target
+        ORDER BY avg_ms DESC LIMIT ?
+        """,
+        [*run_ids, limit],
+    )]
+
+
+def console_signatures(db, last, limit):
+    run_ids = store.last_runs(db, last)
+    if not run_ids:
+        return []
+    return [dict(row) for row in db.execute(
+        f"""
+        SELECT s.level, s.text, SUM(c.count) AS count, COUNT(DISTINCT c.test_id) AS tests
+        FROM console_counts c JOIN console_signatures s ON s.id = c.signature_id
+        WHERE c.run_id IN ({_in_runs(run_ids)})
+        GROUP BY s.id ORDER BY count DESC LIMIT ?
+        """,
+        [*run_ids, limit],
+    )]
+
+
+def metric_trends(db, last, profile=None):
+    """Median and latest value of every stored metric, per scenario and
+    device profile"""
+    run_ids = store.last_runs(db, last)
+    if not run_ids:
+        return []
+    query = f"""
+        SELECT m.test_id, COALESCE(r.profile, '-') AS profile, m.name, m.value
+        FROM metrics m JOIN runs r ON r.id = m.run_id
+        WHERE m.run_id IN ({_in_runs(run_ids)})
+    """
+    params = list(run_ids)
+    if profile:
+        query += " AND r.profile = ?"
+        params.append(profile)
+    series = {}
+    for row in db.execute(query + " ORDER BY m.run_id", params):
+        series.setdefault((row["test_id"], row["profile"], row["name"]), []).append(row["value"])
+    return [
+        {
+            "test": test_id,
+            "profile": profile_name,
+            "metric": name,
+            "runs": len(values),
+            "median": statistics.median(values),
+            "last": values[-1],
+        }
+        for (test_id, profile_name, name), values in sorted(series.items())
+    ]
+
+
+def _cell(column, value):
+    if value is None:
+        return "-"
+    if column.endswith("rate") or column == "trend":
+        return f"{value:+.0%}" if column == "trend" else f"{value:.0%}"
+    if isinstance(value, float):
+        return f"{value:.1f}"
+    return str(value)
+
+
+def print_table(rows, width=80):
+    """Plain aligned columns; long text cells are cut to `width`"""
+    if not rows:
+        print("Nothing recorded in the selected runs")
+        return
+    columns = list(rows[0])
+    cells = [[_cell(column, row[column])[:width] for column in columns] for row in rows]
+    widths = [max(len(column), *(len(line[i]) for line in cells)) for i, column in enumerate(columns)]
+    print("  ".join(column.ljust(w) for column, w in zip(columns, widths)))
+    for line in cells:
+        print("  ".join(cell.ljust(w) for cell, w in zip(line, widths)))
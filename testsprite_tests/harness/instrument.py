@@ -0,0 +1,211 @@
+"""
+Runs one TC script with Playwright instrumented, then writes what it saw as
+JSON to the path in HARNESS_REPORT:
+
+    python -m harness.instrument TC003_Generate_and_Retrieve_QR_Code_for_Device_Pairing.py
+
+Steps are the user-visible actions (goto, click, fill, wheel, visibility
+assertions) with their own duration; the fixed wait_for_timeout pauses
+between them are not steps. Console messages and page errors are collected
+from every page of every context. Before a context closes, the navigation
+and paint timings of its pages are read as metrics.
+
+Backend traffic is checked against the request budgets (harness.budgets)
+unless HARNESS_BUDGETS is "off"; a budget violation fails the scenario.
+HARNESS_PROFILE names a device profile (harness.profiles) applied to every
+context and page the script creates.
+"""
+
+import json
+import os
+import re
+import runpy
+import sys
+import time
+import traceback
+from functools import wraps
+
+from playwright import async_api
+
+from . import BUDGETS_ENV, PROFILE_ENV, REPORT_ENV
+from .budgets import BUDGETS_FILE, TrafficMonitor, load_budgets
+from .profiles import PROFILES
+
+# Navigation timing of the current document, read before the context closes
+PAGE_METRICS_JS = """() => {
+    const nav = performance.getEntriesByType('navigation')[0];
+    const fcp = performance.getEntriesByName('first-contentful-paint')[0];
+    const resources = performance.getEntriesByType('resource');
+    return {
+        ttfb_ms: nav ? nav.responseStart - nav.startTime : null,
+        dom_content_loaded_ms: nav ? nav.domContentLoadedEventEnd - nav.startTime : null,
+        load_ms: nav && nav.loadEventEnd ? nav.loadEventEnd - nav.startTime : null,
+        fcp_ms: fcp ? fcp.startTime : null,
+        resources: resources.length,
+        transfer_kb: resources.reduce((sum, r) => sum + (r.transferSize || 0), 0) / 1024,
+        js_heap_mb: performance.memory ? performance.memory.usedJSHeapSize / 1048576 : null,
+    };
+}"""
+
+_SELECTOR = re.compile(r"selector='(.*)'>$")
+
+
+class Recorder:
+    def __init__(self, monitor=None, profile=None):
+        self.steps = []
+        self.console = []
+        self.metrics = {}
+        self.monitor = monitor
+        self.profile = profile
+
+    def step(self, action, target, started, ok):
+        self.steps.append({
+            "action": action,
+            "target": target,
+            "duration_ms": (time.perf_counter() - started) * 1000,
+            "ok": ok,
+        })
+
+    def watch(self, context):
+        if self.monitor:
+            self.monitor.watch(context)
+        context.on("page", self.watch_page)
+        for page in context.pages:
+            self.watch_page(page)
+
+    def watch_page(self, page):
+        page.on("console", lambda message: self.console.append((message.type, _console_text(message))))
+        page.on("pageerror", lambda error: self.console.append(("pageerror", str(error))))
+
+    async def collect_metrics(self, context):
+        if self.monitor:
+            await self.monitor.settle()
+            self.metrics.update(self.monitor.totals())
+        for page in context.pages:
+            try:
+                values = await page.evaluate(PAGE_METRICS_JS)
+            except async_api.Error:
+                continue
+            self.metrics.update({name: value for name, value in values.items() if value is not None})
+
+    def violations(self):
+        return self.monitor.violations() if self.monitor else []
+
+    def report(self, error):
+        return {
+            "steps": self.steps,
+            "console": self.console,
+            "metrics": self.metrics,
+            "budget_violations": self.violations(),
+            "error": error,
+        }
+
+
+def _console_text(message):
+    location = message.location or {}
+    url = location.get("url")
+    return f"{message.text} (at {url})" if url else message.text
+
+
+def _locator_target(locator):
+    match = _SELECTOR.search(repr(locator))
+    return match.group(1) if match else repr(locator)
+
+
+def _timed(cls, name, target):
+    original = getattr(cls, name)
+
+    @wraps(original)
+    async def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        ok = False
+        try:
+            result = await original(self, *args, **kwargs)
+            ok = True
+            return result
+        finally:
+            recorder.step(name, target(self, args), started, ok)
+
+    setattr(cls, name, wrapper)
+
+
+def _wrap_new_context():
+    original = async_api.Browser.new_context
+
+    @wraps(original)
+    async def new_context(self, *args, **kwargs):
+        if recorder.profile:
+            kwargs = {**kwargs, **recorder.profile.context_options()}
+        context = await original(self, *args, **kwargs)
+        recorder.watch(context)
+        return context
+
+    async_api.Browser.new_context = new_context
+
+    original_new_page = async_api.BrowserContext.new_page
+
+    @wraps(original_new_page)
+    async def new_page(self, *args, **kwargs):
+        page = await original_new_page(self, *args, **kwargs)
+        if recorder.profile:
+            await recorder.profile.apply(page)
+        return page
+
+    async_api.BrowserContext.new_page = new_page
+
+    original_close = async_api.BrowserContext.close
+
+    @wraps(original_close)
+    async def close(self, *args, **kwargs):
+        await recorder.collect_metrics(self)
+        return await original_close(self, *args, **kwargs)
+
+    async_api.BrowserContext.close = close
+
+
+def _assertion_target(assertions, _args):
+    locator = getattr(getattr(assertions, "_impl_obj", None), "_actual_locator", None)
+    return _locator_target(locator) if locator is not None else ""
+
+
+def install():
+    _wrap_new_context()
+    _timed(async_api.Page, "goto", lambda page, args: args[0] if args else "")
+    _timed(async_api.Page, "reload", lambda page, args: page.url)
+    for action in ("click", "fill", "press", "check", "select_option"):
+        _timed(async_api.Locator, action, lambda locator, args: _locator_target(locator))
+    _timed(async_api.Mouse, "wheel", lambda mouse, args: ",".join(map(str, args)))
+    for assertion in ("to_be_visible", "to_have_text", "to_contain_text"):
+        _timed(async_api.LocatorAssertions, assertion, _assertion_target)
+
+
+recorder = Recorder()
+
+
+def main(script):
+    budgets = os.environ.get(BUDGETS_ENV, str(BUDGETS_FILE))
+    if budgets != "off":
+        recorder.monitor = TrafficMonitor(load_budgets(budgets))
+    if os.environ.get(PROFILE_ENV):
+        recorder.profile = PROFILES[os.environ[PROFILE_ENV]]
+    install()
+    error = None
+    try:
+        runpy.run_path(script, run_name="__main__")
+        if recorder.violations():
+            error = "\n".join(recorder.violations())
+    except Exception as exc:
+        error = "".join(traceback.format_exception_only(type(exc), exc)).strip()
+    finally:
+        path = os.environ.get(REPORT_ENV)
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(recorder.report(error), f)
+    if error:
+        print(error, file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1]))
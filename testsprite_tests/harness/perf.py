@@ -0,0 +1,148 @@
+"""
+Widget and dashboard timings under device profiles.
+
+For each profile, every repeat uses a fresh context (cold cache):
+
+    widget_interactive_ms  navigation until the chat is open and its first
+                           input (pre-chat form or message box) is ready
+    first_reply_ms         visitor message sent until the agent's reply shows
+    input_latency_ms       slowest keystroke while typing it (Event Timing;
+                           0 when every event was under 16 ms)
+    dashboard_ready_ms     navigation until the dashboard heading shows and no
+                           skeleton is left (operator session already signed in)
+
+plus fcp_ms and load_ms of each page.
+
+    python -m harness perf --agent <agent id> --profile desktop --profile mobile-3g
+"""
+
+import statistics
+import time
+
+from playwright.async_api import async_playwright
+
+from . import flows, store
+from .instrument import PAGE_METRICS_JS
+
+REPLY_TIMEOUT_MS = 60000
+
+EVENT_TIMING_JS = """(() => {
+    window.__inputLatency = [];
+    new PerformanceObserver(list => {
+        for (const entry of list.getEntries()) {
+            if (['keydown', 'keypress', 'input', 'keyup'].includes(entry.name)) {
+                window.__inputLatency.push(entry.duration);
+            }
+        }
+    }).observe({ type: 'event', buffered: true, durationThreshold: 16 });
+})();"""
+
+ASSISTANT_MESSAGES = "div.justify-start p.whitespace-pre-wrap"
+SKELETONS = "main .animate-pulse"
+
+
+def _elapsed_ms(started):
+    return (time.perf_counter() - started) * 1000
+
+
+async def _page(browser, profile, **options):
+    context = await browser.new_context(**profile.context_options(), **options)
+    page = await context.new_page()
+    await profile.apply(page)
+    return context, page
+
+
+async def _page_metrics(page):
+    values = await page.evaluate(PAGE_METRICS_JS)
+    return {name: values[name] for name in ("fcp_ms", "load_ms") if values.get(name) is not None}
+
+
+async def measure_widget(browser, profile, agent_id):
+    context, page = await _page(browser, profile)
+    try:
+        await page.add_init_script(EVENT_TIMING_JS)
+        started = time.perf_counter()
+        await flows.open_widget(page, agent_id)
+        metrics = {"widget_interactive_ms": _elapsed_ms(started)}
+
+        replies = page.locator(ASSISTANT_MESSAGES)
+        before = await replies.count()
+        box = page.get_by_placeholder("Escribe tu mensaje...")
+        await box.press_sequentially("Hola, ¿cuáles son los horarios de atención?", delay=40)
+        started = time.perf_counter()
+        await box.press("Enter")
+        await replies.nth(before).wait_for(timeout=REPLY_TIMEOUT_MS)
+        metrics["first_reply_ms"] = _elapsed_ms(started)
+        metrics["input_latency_ms"] = await page.evaluate(
+            "() => Math.max(0, ...window.__inputLatency)"
+        )
+        metrics.update(await _page_metrics(page))
+        return metrics
+    finally:
+        await context.close()
+
+
+async def measure_dashboard(browser, profile, storage_state):
+    context, page = await _page(browser, profile, storage_state=storage_state)
+    try:
+        started = time.perf_counter()
+        await page.goto(f"{flows.base_url()}/dashboard")
+        await page.locator("main h1").wait_for()
+        await page.wait_for_function(
+            "selector => document.querySelectorAll(selector).length === 0", arg=SKELETONS,
+        )
+        metrics = {"dashboard_ready_ms": _elapsed_ms(started)}
+        metrics.update(await _page_metrics(page))
+        return metrics
+    finally:
+        await context.close()
+
+
+async def run_perf(agent_id, profiles, repeat, headless=True):
+    """{(scenario, profile name): [metrics per repeat]} and the seconds each
+    scenario took in total"""
+    results = {}
+    seconds = {}
+
+    async def measure(key, run):
+        started = time.perf_counter()
+        results.setdefault(key, []).append(await run)
+        seconds[key] = seconds.get(key, 0) + time.perf_counter() - started
+
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=headless)
+        # Sign in once, unthrottled; the timed dashboard loads reuse the session
+        context = await browser.new_context()
+        await flows.login(await context.new_page())
+        storage_state = await context.storage_state()
+        await context.close()
+
+        for profile in profiles:
+            for _ in range(repeat):
+                if agent_id:
+                    await measure(("widget", profile.name), measure_widget(browser, profile, agent_id))
+                await measure(("dashboard", profile.name), measure_dashboard(browser, profile, storage_state))
+        await browser.close()
+    return results, seconds
+
+
+def medians(runs):
+    names = {name for metrics in runs for name in metrics}
+    return {
+        name: statistics.median(metrics[name] for metrics in runs if name in metrics)
+        for name in sorted(names)
+    }
+
+
+def record(results, seconds, build=None):
+    """One stored run per profile; scenarios keep their median metrics"""
+    run_ids = []
+    with store.open_db() as db:
+        for profile_name in dict.fromkeys(profile for _, profile in results):
+            run_id = store.start_run(db, source="perf", profile=profile_name, build=build)
+            for (scenario, profile), runs in results.items():
+                if profile == profile_name:
+                    store.record_result(db, run_id, f"PERF-{scenario}", "passed",
+                                        seconds[(scenario, profile)] * 1000, metrics=medians(runs))
+            run_ids.append(run_id)
+    return run_ids
@@ -0,0 +1,190 @@
+"""
+Production build and static preview server for the E2E suite.
+
+The app is built with `vite build` (production mode: base /agentes/, no
+component tagger) into tmp/builds/<hash>, where the hash covers every build
+input: sources, public assets, lockfiles, build configs and .env (the VITE_
+values are baked into the bundle). A tree that was already built is served
+from the cache, so the suite builds once per commit, and dirty trees build
+once per change.
+
+The server answers like the production host: files under /agentes/, the
+SPA fallback to index.html, long-lived caching for the hashed assets, and
+gzip for text. Everything outside /agentes/ redirects into it, so the TC
+scripts' goto("http://localhost:8080") lands on the app.
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+import subprocess
+import threading
+from contextlib import contextmanager
+from fnmatch import fnmatch
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from . import REPO_ROOT, TMP_DIR
+from .flows import BASE_URL_ENV
+
+BUILDS_DIR = TMP_DIR / "builds"
+BASE_PATH = "/agentes/"
+PORT = 8080
+# Builds kept in the cache, newest first
+KEEP_BUILDS = 5
+
+BUILD_INPUTS = [
+    "src/*", "public/*", "index.html", ".env",
+    "package.json", "package-lock.json", "bun.lockb",
+    "vite.config.ts", "tailwind.config.ts", "postcss.config.js", "tsconfig*.json", "components.json",
+]
+COMPRESSIBLE = {".html", ".js", ".css", ".json", ".svg", ".txt", ".map"}
+
+
+class BuildError(RuntimeError):
+    pass
+
+
+def build_inputs():
+    """Tracked and untracked (not ignored) files the bundle depends on, plus .env"""
+    listed = subprocess.run(
+        ["git", "ls-files", "--cached", "--others", "--exclude-standard"],
+        cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+    ).stdout.splitlines()
+    paths = {path for path in listed if any(fnmatch(path, pattern) for pattern in BUILD_INPUTS)}
+    if (REPO_ROOT / ".env").exists():
+        paths.add(".env")
+    return sorted(path for path in paths if (REPO_ROOT / path).is_file())
+
+
+def content_hash():
+    digest = hashlib.sha256()
+    for path in build_inputs():
+        digest.update(path.encode())
+        digest.update(b"\0")
+        digest.update((REPO_ROOT / path).read_bytes())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def ensure_build():
+    """Path of the production bundle for the current tree, building it if needed.
+    Returns (path, cached)."""
+    key = content_hash()
+    target = BUILDS_DIR / key
+    if (target / "index.html").exists():
+        target.touch()
+        return target, True
+
+    if not (REPO_ROOT / "node_modules").exists():
+        raise BuildError("node_modules is missing; run npm install first (or use --dev)")
+    staging = BUILDS_DIR / f"{key}.partial"
+    shutil.rmtree(staging, ignore_errors=True)
+    result = subprocess.run(
+        ["npx", "vite", "build", "--mode", "production", "--outDir", str(staging), "--emptyOutDir"],
+        cwd=REPO_ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise BuildError(f"vite build failed:\n{result.stdout[-2000:]}{result.stderr[-2000:]}")
+    staging.rename(target)
+    _prune()
+    return target, False
+
+
+def _prune():
+    builds = sorted((p for p in BUILDS_DIR.iterdir() if p.is_dir() and not p.name.endswith(".partial")),
+                    key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in builds[KEEP_BUILDS:]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+class PreviewHandler(SimpleHTTPRequestHandler):
+    root: Path
+    # Compressed bodies by path; the bundle never changes under a running server
+    gzipped: dict
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def do_GET(self, head=False):
+        path = self.path.split("?", 1)[0].split("#", 1)[0]
+        if not path.startswith(BASE_PATH):
+            if path + "/" == BASE_PATH:
+                return self._redirect(BASE_PATH)
+            query = self.path[len(path):]
+            return self._redirect(BASE_PATH + path.lstrip("/") + query)
+
+        relative = path[len(BASE_PATH):]
+        file = (self.root / relative).resolve()
+        if self.root not in file.parents and file != self.root:
+            return self.send_error(HTTPStatus.NOT_FOUND)
+        if not file.is_file():
+            if "." in Path(relative).name:  # a missing asset, not a route
+                return self.send_error(HTTPStatus.NOT_FOUND)
+            file = self.root / "index.html"
+        self._send_file(file, relative.startswith("assets/"), head)
+
+    def _redirect(self, location):
+        self.send_response(HTTPStatus.FOUND)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send_file(self, file, immutable, head):
+        body = file.read_bytes()
+        encoding = None
+        if file.suffix in COMPRESSIBLE and "gzip" in self.headers.get("Accept-Encoding", ""):
+            if file not in self.gzipped:
+                self.gzipped[file] = gzip.compress(body, compresslevel=6)
+            body, encoding = self.gzipped[file], "gzip"
+
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", self.guess_type(str(file)))
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "public, max-age=31536000, immutable" if immutable else "no-cache")
+        if encoding:
+            self.send_header("Content-Encoding", encoding)
+            self.send_header("Vary", "Accept-Encoding")
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+
+@contextmanager
+def serve(root, port=PORT):
+    """Serve a build on localhost:port in a background thread"""
+    handler = type("Handler", (PreviewHandler,), {"root": Path(root).resolve(), "gzipped": {}})
+    try:
+        server = ThreadingHTTPServer(("localhost", port), handler)
+    except OSError as err:
+        raise BuildError(f"port {port} is busy ({err.strerror}); stop the dev server or use --dev") from err
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://localhost:{port}{BASE_PATH.rstrip('/')}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextmanager
+def app_server(dev=False):
+    """The app under test: the dev server already running on PORT, or the
+    production build of this tree served here. Yields (base URL, build id)
+    and exports the URL as HARNESS_BASE_URL for flows and scenario processes."""
+    if dev:
+        base_url, build = f"http://localhost:{PORT}", "dev"
+        os.environ[BASE_URL_ENV] = base_url
+        yield base_url, build
+        return
+    root, cached = ensure_build()
+    print(f"Production build {root.name} ({'cached' if cached else 'built'})", flush=True)
+    with serve(root) as base_url:
+        os.environ[BASE_URL_ENV] = base_url
+        yield base_url, root.name
@@ -0,0 +1,67 @@
+"""
+Device profiles: viewport, network and CPU emulation for a browser context.
+
+Network and CPU throttling go through CDP (Chromium only) and are applied
+per page, so `apply` has to run on each new page before it navigates.
+Network numbers follow the DevTools presets; the 4G ones are the Lighthouse
+mobile defaults.
+"""
+
+from dataclasses import dataclass
+
+MOBILE_USER_AGENT = (
+    "Mozilla/5.0 (Linux; Android 13; Pixel 7) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36"
+)
+
+
+@dataclass(frozen=True)
+class Profile:
+    name: str
+    latency_ms: float = 0
+    # 0 leaves the direction unthrottled
+    download_kbps: float = 0
+    upload_kbps: float = 0
+    cpu_rate: float = 1
+    viewport: tuple = (1280, 720)
+    mobile: bool = False
+    scale: float = 1
+
+    @property
+    def throttled(self):
+        return bool(self.latency_ms or self.download_kbps or self.upload_kbps) or self.cpu_rate > 1
+
+    def context_options(self):
+        width, height = self.viewport
+        options = {"viewport": {"width": width, "height": height}, "device_scale_factor": self.scale}
+        if self.mobile:
+            options.update(is_mobile=True, has_touch=True, user_agent=MOBILE_USER_AGENT)
+        return options
+
+    async def apply(self, page):
+        if not self.throttled:
+            return
+        cdp = await page.context.new_cdp_session(page)
+        await cdp.send("Network.enable")
+        await cdp.send("Network.emulateNetworkConditions", {
+            "offline": False,
+            "latency": self.latency_ms,
+            "downloadThroughput": self.download_kbps * 1024 / 8 if self.download_kbps else -1,
+            "uploadThroughput": self.upload_kbps * 1024 / 8 if self.upload_kbps else -1,
+        })
+        await cdp.send("Emulation.setCPUThrottlingRate", {"rate": self.cpu_rate})
+
+
+PROFILES = {
+    profile.name: profile
+    for profile in (
+        Profile("desktop"),
+        Profile("desktop-cpu4", cpu_rate=4),
+        Profile("4g", latency_ms=150, download_kbps=1600, upload_kbps=750),
+        Profile("3g", latency_ms=562.5, download_kbps=1440, upload_kbps=675),
+        Profile("mobile-4g", latency_ms=150, download_kbps=1600, upload_kbps=750, cpu_rate=4,
+                viewport=(390, 844), mobile=True, scale=3),
+        Profile("mobile-3g", latency_ms=562.5, download_kbps=1440, upload_kbps=675, cpu_rate=6,
+                viewport=(360, 740), mobile=True, scale=3),
+    )
+}
@@ -0,0 +1,80 @@
+"""
+Parallel runner for the TC scripts.
+
+Each scenario runs in its own Python process (the scripts start their own
+browser), so a crash or a hung page only takes down that scenario. Scripts
+run under harness.instrument, which reports their steps, console output and
+page metrics. Workers pull from one queue ordered longest-expected-first.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+
+from . import REPORT_ENV, TESTS_DIR
+
+# Lines of output kept from a failing scenario for the summary
+OUTPUT_TAIL = 20
+
+
+@dataclass
+class Result:
+    test_id: str
+    status: str  # passed | failed | timeout
+    duration: float
+    output: str = ""
+    # harness.instrument report: steps, console, metrics, error
+    report: dict = field(default_factory=dict)
+
+
+async def run_one(scenario, timeout, env=None):
+    fd, report_path = tempfile.mkstemp(prefix=f"{scenario.test_id}-", suffix=".json")
+    os.close(fd)
+    start = time.monotonic()
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "harness.instrument", str(scenario.path),
+        cwd=TESTS_DIR,
+        env={**os.environ, **(env or {}), REPORT_ENV: report_path},
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+    )
+    try:
+        stdout, _ = await asyncio.wait_for(process.communicate(), timeout)
+        status = "passed" if process.returncode == 0 else "failed"
+    except asyncio.TimeoutError:
+        process.kill()
+        stdout, _ = await process.communicate()
+        status = "timeout"
+    duration = time.monotonic() - start
+    output = "\n".join(stdout.decode(errors="replace").splitlines()[-OUTPUT_TAIL:])
+    return Result(scenario.test_id, status, duration, output, _read_report(report_path))
+
+
+def _read_report(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    finally:
+        os.unlink(path)
+
+
+async def run_suite(order, scenarios, workers, timeout, env=None):
+    """Run `order` (already longest-first) on `workers` parallel workers;
+    `env` adds variables for the scenario processes"""
+    queue = list(order)
+    results = []
+
+    async def worker():
+        while queue:
+            result = await run_one(scenarios[queue.pop(0)], timeout, env)
+            results.append(result)
+            print(f"{result.status.upper():8} {result.test_id}  {result.duration:6.1f}s", flush=True)
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(workers, len(queue))))))
+    return results
@@ -0,0 +1,158 @@
+"""
+Impact-based test selection and longest-first scheduling.
+
+Changed files (git diff) are mapped to scenarios through the feature map in
+tmp/code_summary.json: every feature lists its source files (glob patterns)
+and the TC scripts that exercise it. Shared files (app shell, UI kit,
+Supabase client, build config) select the whole suite, and so does any
+source file no feature claims. Ignored files (docs, SQL, benchmarks) select
+nothing. When the diff cannot be computed the whole suite runs.
+
+Durations of past runs (from the results store) let the runner start the
+longest scenarios first (LPT), which keeps parallel runs from ending on one
+slow straggler.
+"""
+
+import heapq
+import json
+import statistics
+import subprocess
+from dataclasses import dataclass, field
+from fnmatch import fnmatch
+from pathlib import Path
+
+from . import REPO_ROOT, TESTS_DIR, TMP_DIR, store
+
+FEATURE_MAP_FILE = TMP_DIR / "code_summary.json"
+
+# The estimate is the median of the most recent runs of a scenario
+ESTIMATE_WINDOW = 5
+# Seconds assumed for a scenario that never ran (when nothing else is known)
+DEFAULT_DURATION = 120.0
+
+
+@dataclass
+class Scenario:
+    test_id: str
+    path: Path
+
+
+@dataclass
+class Selection:
+    tests: list
+    full: bool = False
+    # Why each test was picked: feature names or file paths
+    reasons: dict = field(default_factory=dict)
+    full_reason: str = ""
+
+
+def discover():
+    """TC scripts by id ("TC008" -> TC008_Store_and_Retrieve_...py)"""
+    scenarios = {}
+    for path in sorted(TESTS_DIR.glob("TC[0-9]*_*.py")):
+        test_id = path.name.split("_", 1)[0]
+        scenarios[test_id] = Scenario(test_id, path)
+    return scenarios
+
+
+def load_feature_map(path=FEATURE_MAP_FILE):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _git(*args):
+    result = subprocess.run(
+        ["git", *args], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+    )
+    return [line for line in result.stdout.splitlines() if line]
+
+
+def changed_files(since):
+    """Files changed since `since` (merge base), plus uncommitted and untracked ones"""
+    files = set(_git("diff", "--name-only", f"{since}...HEAD"))
+    files.update(_git("diff", "--name-only", "HEAD"))
+    files.update(_git("ls-files", "--others", "--exclude-standard"))
+    return sorted(files)
+
+
+def _matches(path, patterns):
+    return any(fnmatch(path, pattern) for pattern in patterns)
+
+
+def select(changed, scenarios, feature_map):
+    """Scenarios affected by the changed files"""
+    everything = sorted(scenarios)
+    picked = {}
+    tests_prefix = TESTS_DIR.relative_to(REPO_ROOT).as_posix() + "/"
+
+    for path in changed:
+        name = path[len(tests_prefix):] if path.startswith(tests_prefix) else None
+        if name and name.startswith("TC") and name.endswith(".py"):
+            test_id = name.split("_", 1)[0]
+            if test_id in scenarios:
+                picked.setdefault(test_id, []).append(path)
+            continue
+        if _matches(path, feature_map.get("ignored_files", [])):
+            continue
+        if _matches(path, feature_map.get("shared_files", [])):
+            return Selection(everything, full=True, full_reason=f"shared file {path}")
+
+        features = [f for f in feature_map["features"] if _matches(path, f["files"])]
+        if not features:
+            if path.startswith("src/"):
+                return Selection(everything, full=True, full_reason=f"{path} is not in the feature map")
+            continue
+        for feature in features:
+            for test_id in feature.get("tests", []):
+                if test_id in scenarios:
+                    picked.setdefault(test_id, []).append(feature["name"])
+
+    reasons = {test_id: sorted(set(why)) for test_id, why in picked.items()}
+    return Selection(sorted(picked), reasons=reasons)
+
+
+def select_since(since, scenarios, feature_map=None):
+    """select() over the git diff; the whole suite when git cannot tell"""
+    try:
+        changed = changed_files(since)
+    except (subprocess.CalledProcessError, FileNotFoundError) as err:
+        detail = err.stderr.strip().splitlines()[0] if getattr(err, "stderr", None) else str(err)
+        return Selection(sorted(scenarios), full=True, full_reason=f"no diff against {since}: {detail}")
+    return select(changed, scenarios, feature_map or load_feature_map())
+
+
+# ---------------------------------------------------------------------------
+# Duration history and scheduling
+# ---------------------------------------------------------------------------
+
+def load_durations():
+    """Seconds of the last ESTIMATE_WINDOW runs per scenario"""
+    with store.open_db() as db:
+        return store.duration_history(db, ESTIMATE_WINDOW)
+
+
+def estimates(tests, history):
+    """Expected seconds per test. Tests without history get the slowest known
+    estimate, so a new scenario is never the one left for last."""
+    known = {
+        test_id: statistics.median(runs)
+        for test_id, runs in history.items()
+        if runs
+    }
+    fallback = max(known.values(), default=DEFAULT_DURATION)
+    return {test_id: known.get(test_id, fallback) for test_id in tests}
+
+
+def schedule(tests, history):
+    """Longest expected first; workers pull from the front of this list"""
+    expected = estimates(tests, history)
+    return sorted(tests, key=lambda test_id: (-expected[test_id], test_id))
+
+
+def makespan(order, expected, workers):
+    """Wall time of running `order` on `workers` workers that each take the
+    next test when they finish"""
+    finish = [0.0] * max(1, workers)
+    for test_id in order:
+        heapq.heapreplace(finish, finish[0] + expected[test_id])
+    return max(finish)
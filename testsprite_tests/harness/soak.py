@@ -0,0 +1,206 @@
+"""
+Soak mode: keeps an operator's dashboard and conversations tabs and a
+visitor's widget open for hours while the visitor chats, and fails when a
+page keeps growing.
+
+Every interval each page is sampled (after a forced GC): JS heap, DOM
+nodes, active intervals and pending timeouts, open WebSockets, and backend
+requests per minute. Timers and sockets are counted by an init script that
+wraps setInterval/setTimeout and WebSocket. After the warmup, the slope of
+each metric (least squares, per hour) must stay under its limit.
+
+    python -m harness soak --agent <agent id> --hours 4
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import dataclass, field
+
+from playwright.async_api import async_playwright
+
+from . import flows, store
+
+# Largest growth per hour tolerated after the warmup
+SLOPE_LIMITS = {
+    "heap_mb": 10.0,
+    "dom_nodes": 200.0,
+    "intervals": 0.5,
+    "timeouts": 2.0,
+    "sockets": 0.5,
+    "requests_per_min": 1.0,
+}
+
+VISITOR_MESSAGES = [
+    "Hola, ¿qué horarios tienen?",
+    "¿Hacen envíos al interior?",
+    "Quiero saber el precio del plan mensual",
+    "Gracias, eso es todo por ahora",
+    "¿Puedo hablar con una persona?",
+]
+
+TRACKERS_JS = """(() => {
+    const intervals = new Set(), timeouts = new Set(), sockets = new Set();
+    const { setInterval: si, clearInterval: ci, setTimeout: st, clearTimeout: ct } = window;
+    window.setInterval = function (...args) {
+        const id = si.apply(this, args);
+        intervals.add(id);
+        return id;
+    };
+    window.setTimeout = function (fn, ...rest) {
+        let id;
+        const run = typeof fn === 'function'
+            ? function (...args) { timeouts.delete(id); return fn.apply(this, args); }
+            : fn;
+        id = st.call(this, run, ...rest);
+        timeouts.add(id);
+        return id;
+    };
+    const clear = id => { intervals.delete(id); timeouts.delete(id); };
+    window.clearInterval = function (id) { clear(id); return ci.call(this, id); };
+    window.clearTimeout = function (id) { clear(id); return ct.call(this, id); };
+    const NativeWebSocket = window.WebSocket;
+    window.WebSocket = class extends NativeWebSocket {
+        constructor(...args) {
+            super(...args);
+            sockets.add(this);
+            this.addEventListener('close', () => sockets.delete(this));
+        }
+    };
+    window.__soakCounts = () => ({
+        intervals: intervals.size,
+        timeouts: timeouts.size,
+        sockets: [...sockets].filter(s => s.readyState <= 1).length,
+    });
+})();"""
+
+SAMPLE_JS = """() => ({
+    heap_mb: performance.memory ? performance.memory.usedJSHeapSize / 1048576 : null,
+    dom_nodes: document.getElementsByTagName('*').length,
+    ...(window.__soakCounts ? window.__soakCounts() : {}),
+})"""
+
+
+@dataclass
+class Watched:
+    label: str
+    page: object
+    cdp: object = None
+    requests: int = 0
+    samples: list = field(default_factory=list)  # (seconds, {metric: value})
+
+
+def slope_per_hour(points):
+    """Least-squares slope of (seconds, value) points, per hour"""
+    if len(points) < 2:
+        return 0.0
+    n = len(points)
+    mean_t = sum(t for t, _ in points) / n
+    mean_v = sum(v for _, v in points) / n
+    spread = sum((t - mean_t) ** 2 for t, _ in points)
+    if spread == 0:
+        return 0.0
+    return sum((t - mean_t) * (v - mean_v) for t, v in points) / spread * 3600
+
+
+def slopes(samples, warmup):
+    series = {}
+    for at, values in samples:
+        if at < warmup:
+            continue
+        for name, value in values.items():
+            if value is not None:
+                series.setdefault(name, []).append((at, value))
+    return {name: slope_per_hour(points) for name, points in series.items()}
+
+
+async def _watch(context, label, url_or_flow):
+    page = await context.new_page()
+    watched = Watched(label, page)
+    if isinstance(url_or_flow, str):
+        await page.goto(url_or_flow)
+    else:
+        await url_or_flow(page)
+    watched.cdp = await context.new_cdp_session(page)
+    return watched
+
+
+async def _sample(watched, started, interval):
+    await watched.cdp.send("HeapProfiler.collectGarbage")
+    values = await watched.page.evaluate(SAMPLE_JS)
+    values["requests_per_min"] = watched.requests / (interval / 60)
+    watched.requests = 0
+    watched.samples.append((time.monotonic() - started, values))
+    return values
+
+
+async def run_soak(agent_id, hours, interval, warmup, message_every, limits, headless=True):
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(
+            headless=headless,
+            args=["--window-size=1280,720", "--enable-precise-memory-info"],
+        )
+        operator = await browser.new_context()
+        visitor = await browser.new_context()
+        for context in (operator, visitor):
+            await context.add_init_script(TRACKERS_JS)
+
+        login_page = await operator.new_page()
+        await flows.login(login_page)
+        await login_page.close()
+        watched = [
+            await _watch(operator, "dashboard", f"{flows.base_url()}/dashboard"),
+            await _watch(operator, "conversations", f"{flows.base_url()}/conversations"),
+            await _watch(visitor, "widget", lambda page: flows.open_widget(page, agent_id)),
+        ]
+        by_page = {w.page: w for w in watched}
+
+        def count_request(request):
+            try:
+                target = by_page.get(request.frame.page)
+            except Exception:  # service worker requests have no frame
+                return
+            if target and request.resource_type in ("fetch", "xhr"):
+                target.requests += 1
+
+        operator.on("request", count_request)
+        visitor.on("request", count_request)
+
+        started = time.monotonic()
+        deadline = started + hours * 3600
+        next_message = started + message_every
+        widget = watched[-1].page
+        while time.monotonic() < deadline:
+            await asyncio.sleep(interval)
+            if time.monotonic() >= next_message:
+                await flows.send_widget_message(widget, random.choice(VISITOR_MESSAGES))
+                next_message += message_every
+            for w in watched:
+                values = await _sample(w, started, interval)
+                print(f"{(time.monotonic() - started) / 60:7.1f} min  {w.label:13} "
+                      + "  ".join(f"{k}={v:.1f}" for k, v in values.items() if v is not None), flush=True)
+
+        await browser.close()
+
+    failures = {
+        w.label: {
+            name: slope for name, slope in slopes(w.samples, warmup).items()
+            if slope > limits.get(name, float("inf"))
+        }
+        for w in watched
+    }
+    return watched, failures
+
+
+def record(watched, failures, warmup, duration_s, build=None):
+    with store.open_db() as db:
+        run_id = store.start_run(db, source="soak", build=build)
+        for w in watched:
+            grown = failures[w.label]
+            store.record_result(
+                db, run_id, f"SOAK-{w.label}", "failed" if grown else "passed", duration_s * 1000,
+                error="; ".join(f"{name} +{slope:.2f}/h" for name, slope in grown.items()) or None,
+                metrics={f"{name}_per_h": slope for name, slope in slopes(w.samples, warmup).items()},
+            )
+            store.record_samples(db, run_id, f"SOAK-{w.label}", w.samples)
+    return run_id
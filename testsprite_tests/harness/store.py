@@ -0,0 +1,249 @@
+"""
+Local results store (tmp/results.sqlite).
+
+One row per run, per scenario in a run and per step in a scenario (soak runs
+add their sampled time series). Console
+output is reduced to signatures (level + text with build hashes, positions
+and ids stripped) counted per scenario, so the React Router warning that
+fills raw_report.md is stored once. Durations are integer milliseconds.
+"""
+
+import re
+import sqlite3
+import subprocess
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from . import REPO_ROOT, TMP_DIR
+
+DB_FILE = TMP_DIR / "results.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id          INTEGER PRIMARY KEY,
+    started_at  TEXT NOT NULL,
+    source      TEXT NOT NULL DEFAULT 'local',
+    git_commit  TEXT,
+    base_ref    TEXT,
+    workers     INTEGER,
+    full_suite  INTEGER NOT NULL DEFAULT 0,
+    profile     TEXT,
+    build       TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id      INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    test_id     TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    error       TEXT,
+    PRIMARY KEY (run_id, test_id)
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run_id      INTEGER NOT NULL,
+    test_id     TEXT NOT NULL,
+    seq         INTEGER NOT NULL,
+    action      TEXT NOT NULL,
+    target      TEXT NOT NULL DEFAULT '',
+    duration_ms INTEGER NOT NULL,
+    ok          INTEGER NOT NULL,
+    PRIMARY KEY (run_id, test_id, seq),
+    FOREIGN KEY (run_id, test_id) REFERENCES results(run_id, test_id) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS console_signatures (
+    id          INTEGER PRIMARY KEY,
+    level       TEXT NOT NULL,
+    text        TEXT NOT NULL,
+    UNIQUE (level, text)
+);
+CREATE TABLE IF NOT EXISTS console_counts (
+    run_id       INTEGER NOT NULL,
+    test_id      TEXT NOT NULL,
+    signature_id INTEGER NOT NULL REFERENCES console_signatures(id),
+    count        INTEGER NOT NULL,
+    PRIMARY KEY (run_id, test_id, signature_id),
+    FOREIGN KEY (run_id, test_id) REFERENCES results(run_id, test_id) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id      INTEGER NOT NULL,
+    test_id     TEXT NOT NULL,
+    name        TEXT NOT NULL,
+    value       REAL NOT NULL,
+    PRIMARY KEY (run_id, test_id, name),
+    FOREIGN KEY (run_id, test_id) REFERENCES results(run_id, test_id) ON DELETE CASCADE
+);
+CREATE TABLE IF NOT EXISTS samples (
+    run_id      INTEGER NOT NULL,
+    test_id     TEXT NOT NULL,
+    at_s        REAL NOT NULL,
+    name        TEXT NOT NULL,
+    value       REAL NOT NULL,
+    PRIMARY KEY (run_id, test_id, at_s, name),
+    FOREIGN KEY (run_id, test_id) REFERENCES results(run_id, test_id) ON DELETE CASCADE
+);
+"""
+
+SIGNATURE_LENGTH = 500
+
+_VOLATILE = [
+    (re.compile(r"\?v=[0-9a-f]+"), ""),                       # vite dep hashes
+    (re.compile(r":\d+:\d+\b"), ""),                          # line:column
+    (re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.I), "<uuid>"),
+    (re.compile(r"\d{4}-\d{2}-\d{2}T[\d:.]+Z?"), "<time>"),
+]
+
+
+def connect(path=DB_FILE):
+    db = sqlite3.connect(path)
+    db.row_factory = sqlite3.Row
+    db.execute("PRAGMA foreign_keys = ON")
+    db.executescript(SCHEMA)
+    # Stores created before these columns existed
+    columns = {row["name"] for row in db.execute("PRAGMA table_info(runs)")}
+    for column in ("profile", "build"):
+        if column not in columns:
+            db.execute(f"ALTER TABLE runs ADD COLUMN {column} TEXT")
+    return db
+
+
+@contextmanager
+def open_db(path=DB_FILE):
+    """Connection that commits on success and is closed afterwards"""
+    db = connect(path)
+    try:
+        with db:
+            yield db
+    finally:
+        db.close()
+
+
+def signature(text):
+    for pattern, replacement in _VOLATILE:
+        text = pattern.sub(replacement, text)
+    return " ".join(text.split())[:SIGNATURE_LENGTH]
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _head_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def start_run(db, *, source="local", base_ref=None, workers=None, full_suite=False,
+              started_at=None, profile=None, build=None):
+    """`build` is the preview build hash, or "dev" for the Vite dev server"""
+    cursor = db.execute(
+        "INSERT INTO runs (started_at, source, git_commit, base_ref, workers, full_suite, profile, build)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        (started_at or _now(), source, _head_commit() if source != "testsprite" else None,
+         base_ref, workers, int(full_suite), profile, build),
+    )
+    return cursor.lastrowid
+
+
+def record_result(db, run_id, test_id, status, duration_ms, *, error=None,
+                  steps=(), console=(), metrics=None):
+    """Store one scenario. `console` is (level, text) pairs, deduplicated here."""
+    db.execute(
+        "INSERT OR REPLACE INTO results (run_id, test_id, status, duration_ms, error)"
+        " VALUES (?, ?, ?, ?, ?)",
+        (run_id, test_id, status, round(duration_ms), error),
+    )
+    db.executemany(
+        "INSERT INTO steps (run_id, test_id, seq, action, target, duration_ms, ok)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+        [(run_id, test_id, seq, step["action"], step.get("target", ""),
+          round(step["duration_ms"]), int(step.get("ok", True)))
+         for seq, step in enumerate(steps)],
+    )
+
+    counts = {}
+    for level, text in console:
+        key = (level, signature(text))
+        counts[key] = counts.get(key, 0) + 1
+    for (level, text), count in counts.items():
+        db.execute("INSERT OR IGNORE INTO console_signatures (level, text) VALUES (?, ?)", (level, text))
+        signature_id = db.execute(
+            "SELECT id FROM console_signatures WHERE level = ? AND text = ?", (level, text)
+        ).fetchone()[0]
+        db.execute(
+            "INSERT INTO console_counts (run_id, test_id, signature_id, count) VALUES (?, ?, ?, ?)",
+            (run_id, test_id, signature_id, count),
+        )
+
+    db.executemany(
+        "INSERT INTO metrics (run_id, test_id, name, value) VALUES (?, ?, ?, ?)",
+        [(run_id, test_id, name, value) for name, value in (metrics or {}).items() if value is not None],
+    )
+
+
+def record_samples(db, run_id, test_id, samples):
+    """Time series of a soak run: (seconds since start, {metric: value})"""
+    db.executemany(
+        "INSERT INTO samples (run_id, test_id, at_s, name, value) VALUES (?, ?, ?, ?, ?)",
+        [(run_id, test_id, round(at, 1), name, value)
+         for at, values in samples for name, value in values.items() if value is not None],
+    )
+
+
+def duration_history(db, limit):
+    """Seconds of the last `limit` results per scenario, oldest first"""
+    rows = db.execute(
+        """
+        SELECT test_id, duration_ms FROM (
+            SELECT test_id, duration_ms, run_id,
+                   ROW_NUMBER() OVER (PARTITION BY test_id ORDER BY run_id DESC) AS n
+            FROM results
+        ) WHERE n <= ? ORDER BY test_id, run_id
+        """,
+        (limit,),
+    )
+    history = {}
+    for row in rows:
+        history.setdefault(row["test_id"], []).append(row["duration_ms"] / 1000)
+    return history
+
+
+def last_runs(db, count):
+    return [row["id"] for row in db.execute("SELECT id FROM runs ORDER BY id DESC LIMIT ?", (count,))]
+
+
+# ---------------------------------------------------------------------------
+# TestSprite results import
+# ---------------------------------------------------------------------------
+
+_CONSOLE_LINE = re.compile(r"^\[(\w+)\] (.*)$")
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def import_testsprite(db, results):
+    """Store a tmp/test_results.json array as one run (without the test code)"""
+    started = min(_parse_time(r["created"]) for r in results)
+    run_id = start_run(db, source="testsprite", started_at=started.isoformat(timespec="seconds"))
+    for result in results:
+        test_id = result["title"].split("-", 1)[0]
+        error, _, logs = (result.get("testError") or "").partition("Browser Console Logs:")
+        console = [
+            (match.group(1).lower(), match.group(2))
+            for match in map(_CONSOLE_LINE.match, logs.splitlines())
+            if match
+        ]
+        elapsed = _parse_time(result["modified"]) - _parse_time(result["created"])
+        record_result(
+            db, run_id, test_id,
+            "passed" if result["testStatus"] == "PASSED" else "failed",
+            elapsed.total_seconds() * 1000,
+            error=error.strip() or None,
+            console=console,
+        )
+    return run_id
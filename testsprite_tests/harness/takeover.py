@@ -0,0 +1,177 @@
+"""
+Human-takeover latency: one operator and several widget visitors in one
+browser, each in its own context.
+
+Every visitor opens the widget (with its own name, so the operator can find
+the conversation) and asks a question. The operator then takes over each
+conversation in turn, exchanges messages with the visitor and resolves it.
+Each transition is timed from the action on one side until its text is on
+the other side's screen:
+
+    takeover        operator clicks "Tomar Control"  -> notice in the widget
+    operator_reply  operator sends a reply           -> reply in the widget
+    visitor_message visitor sends during takeover    -> message in the inbox
+    resolve         operator clicks "Resolver"       -> notice in the widget
+
+The widget polls every 3 s and the inbox follows realtime plus a 5 s poll,
+so the two directions have different distributions; both are reported.
+
+    python -m harness takeover --agent <agent id> --visitors 4 --exchanges 3
+"""
+
+import asyncio
+import statistics
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from playwright.async_api import async_playwright
+
+from . import flows, store
+
+TAKEOVER_NOTICE = "Ahora estás hablando con un operador humano"
+RESOLVED_NOTICE = "Esta conversación ha sido marcada como resuelta"
+SEEN_TIMEOUT_MS = 30000
+
+DIRECTIONS = {
+    "takeover": "operator->visitor",
+    "operator_reply": "operator->visitor",
+    "visitor_message": "visitor->operator",
+    "resolve": "operator->visitor",
+}
+
+
+@dataclass
+class Visitor:
+    name: str
+    page: object
+
+
+@dataclass
+class Timings:
+    started: float = field(default_factory=time.perf_counter)
+    # transition -> [(seconds since start, delay ms)]
+    delays: dict = field(default_factory=dict)
+    errors: list = field(default_factory=list)
+
+    def add(self, transition, delay_ms):
+        self.delays.setdefault(transition, []).append((time.perf_counter() - self.started, delay_ms))
+
+
+async def _shows(page, text):
+    await page.wait_for_function(
+        "text => document.body.textContent.includes(text)", arg=text, polling="raf", timeout=SEEN_TIMEOUT_MS,
+    )
+
+
+async def _timed(timings, transition, action, page, text):
+    """Run `action`, then time until `text` is on `page`"""
+    started = time.perf_counter()
+    await action()
+    await _shows(page, text)
+    timings.add(transition, (time.perf_counter() - started) * 1000)
+
+
+async def _open_visitor(browser, agent_id, name):
+    context = await browser.new_context()
+    page = await context.new_page()
+    await flows.open_widget(page, agent_id, visitor_name=name, visitor_email=f"{name.lower()}@example.com")
+    await flows.send_widget_message(page, f"Hola, soy {name}. Necesito ayuda con mi pedido.")
+    return Visitor(name, page)
+
+
+async def _handle(operator, visitor, exchanges, timings):
+    await operator.get_by_placeholder("Buscar conversaciones...").fill(visitor.name)
+    await operator.get_by_role("button", name=visitor.name).first.click()
+
+    take_over = operator.get_by_role("button", name="Tomar Control")
+    await _timed(timings, "takeover", take_over.click, visitor.page, TAKEOVER_NOTICE)
+
+    reply_box = operator.get_by_placeholder("Escribe tu respuesta como humano...")
+    for _ in range(exchanges):
+        reply = f"Respuesta del operador {uuid.uuid4().hex[:8]}"
+
+        async def send_reply():
+            await reply_box.fill(reply)
+            await reply_box.press("Enter")
+
+        await _timed(timings, "operator_reply", send_reply, visitor.page, reply)
+
+        message = f"Consulta del visitante {uuid.uuid4().hex[:8]}"
+        await _timed(timings, "visitor_message",
+                     lambda: flows.send_widget_message(visitor.page, message), operator, message)
+
+    resolve = operator.get_by_role("button", name="Resolver")
+    await _timed(timings, "resolve", resolve.click, visitor.page, RESOLVED_NOTICE)
+
+
+async def run_takeover(agent_id, visitors, exchanges, headless=True):
+    timings = Timings()
+    run_tag = uuid.uuid4().hex[:6]
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=headless)
+        operator_context = await browser.new_context()
+        operator = await operator_context.new_page()
+        await flows.login(operator)
+
+        # Visitors arrive together; their widgets keep polling for the whole run
+        opened = await asyncio.gather(*(
+            _open_visitor(browser, agent_id, f"Takeover{run_tag}v{i}") for i in range(visitors)
+        ))
+        await operator.goto(f"{flows.base_url()}/conversations")
+
+        for visitor in opened:
+            try:
+                await _handle(operator, visitor, exchanges, timings)
+            except Exception as exc:  # one stuck conversation should not hide the others
+                timings.errors.append(f"{visitor.name}: {type(exc).__name__}: {str(exc).splitlines()[0]}")
+        await browser.close()
+    return timings
+
+
+def distribution(delays):
+    values = sorted(delay for _, delay in delays)
+    return {
+        "count": len(values),
+        "p50_ms": statistics.median(values),
+        "p90_ms": statistics.quantiles(values, n=10)[-1] if len(values) > 1 else values[0],
+        "max_ms": values[-1],
+    }
+
+
+def summary(timings):
+    rows = []
+    for transition, direction in DIRECTIONS.items():
+        if transition in timings.delays:
+            rows.append({"transition": transition, "direction": direction,
+                         **distribution(timings.delays[transition])})
+    for direction in sorted(set(DIRECTIONS.values())):
+        delays = [d for t, values in timings.delays.items() if DIRECTIONS[t] == direction for d in values]
+        if delays:
+            rows.append({"transition": "all", "direction": direction, **distribution(delays)})
+    return rows
+
+
+def _label(row):
+    """Metric prefix: the transition, or the direction for the "all" rows"""
+    if row["transition"] != "all":
+        return row["transition"]
+    return "to_visitor" if row["direction"].endswith("visitor") else "to_operator"
+
+
+def record(timings, rows, build=None):
+    with store.open_db() as db:
+        run_id = store.start_run(db, source="takeover", build=build)
+        metrics = {
+            f"{_label(row)}_{key}": row[key] for row in rows for key in ("p50_ms", "p90_ms", "max_ms")
+        }
+        store.record_result(
+            db, run_id, "TAKEOVER", "failed" if timings.errors else "passed",
+            (time.perf_counter() - timings.started) * 1000,
+            error="\n".join(timings.errors) or None, metrics=metrics,
+        )
+        store.record_samples(db, run_id, "TAKEOVER", [
+            (at, {f"{transition}_ms": delay})
+            for transition, values in timings.delays.items() for at, delay in values
+        ])
+    return run_id